@@ -1,41 +1,56 @@
+import time
+
+APP_T0 = time.perf_counter()
+
 import streamlit as st
-import sqlite3
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
 from common.stock_loader import load_stock_list_with_names
 from ui.price_break_display_module import display_price_break_analysis
 from ui.plot_price_position_zone import plot_price_position_zone
 from ui.rs_rsi_display_module import display_rs_rsi_info
 from ui.plot_strength_table import analyze_10day_strength
-import plotly.graph_objects as go
 from ui.plot_price_interactive_final import plot_price_interactive
-from ui.plot_institution_combo_plotly_final import plot_institution_combo_plotly
-from ui.plot_main_force_plotly_final import plot_main_force_charts
-from ui.plot_holder_concentration_plotly_final import plot_holder_concentration_plotly
-from ui.plot_monthly_revenue_with_close_on_left_final import plot_monthly_revenue_plotly
-from ui.plot_eps_with_close_price import plot_eps_with_close_price
-from ui.plot_profitability_ratios_final import plot_profitability_ratios_with_close_price
 from common.login_helper import init_session_login_objects
+from common.quote_service import get_quote_service
+from common.realtime_quotes import ensure_realtime_feed, get_quote_table
 from common.adding_new_stocks_helper import append_unique_stocks
 from common.shared_stock_selector import save_selected_stock, get_last_selected_or_default
-import subprocess
 from ui.collect_stock_button import render_collect_stock_button
 from ui.show_temp_list_expander import render_temp_list_expander
 from ui.bias_calculator import render_bias_calculator
 from ui.peg_calculator import render_peg_calculator
 from ui.volume_avg_calculator import render_volume_avg_calculator
-from common.futures_spread_helper import get_futures_spread_info, format_futures_spread_display
+from common.futures_spread_helper import get_futures_spread_info, format_futures_spread_display, get_spread_service
 from tools.t2_settlement_tracker import render_t2_settlement_tracker
 from ui.key_price_checker import render_key_price_checker
+from ui.lazy_sections import record_section_cost, render_lazy_section, timed_section
+from ui.price_break_display_module import (
+    get_baseline_and_deduction, get_effective_today_date, get_week_month_baseline_and_deduction,
+    get_week_month_high_low,
+)
+from common.stock_prefetch import get_prefetcher, get_stock_cache, neighbors
+from common.profiler import finish_render, profile_section, start_render
+from ui.profiler_panel import profiler_enabled, render_profiler_panel
+from common.job_runner import get_job_runner
+from ui.job_panel import render_job_badge, render_job_panel
+from common.lazy_import import lazy_function
+
+# 預設收合的圖表區塊：打開（或背景預取）時才 import
+plot_institution_combo_plotly = lazy_function("ui.plot_institution_combo_plotly_final", "plot_institution_combo_plotly")
+plot_main_force_charts = lazy_function("ui.plot_main_force_plotly_final", "plot_main_force_charts")
+plot_holder_concentration_plotly = lazy_function("ui.plot_holder_concentration_plotly_final", "plot_holder_concentration_plotly")
+plot_monthly_revenue_plotly = lazy_function("ui.plot_monthly_revenue_with_close_on_left_final", "plot_monthly_revenue_plotly")
+plot_eps_with_close_price = lazy_function("ui.plot_eps_with_close_price", "plot_eps_with_close_price")
+plot_profitability_ratios_with_close_price = lazy_function("ui.plot_profitability_ratios_final", "plot_profitability_ratios_with_close_price")
 
 
-plt.rcParams['font.family'] = 'Microsoft JhengHei'
-plt.rcParams['axes.unicode_minus'] = False
-
 # --- Streamlit ---
 st.set_page_config(page_title="量價趨勢 主力確認, eps上修", layout="wide")
 
+# 🔹 效能分析（debug expander 勾選或 DASHBOARD_PROFILE=1 時才記錄）
+render_profile = start_render("dashboard", enabled=profiler_enabled())
+
 # 🔹 在頁面最頂部放一個錨點
 st.markdown('<div id="top"></div>', unsafe_allow_html=True)
 
@@ -73,31 +88,195 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-sdk, dl = init_session_login_objects()
+with profile_section("login"):
+    sdk, dl = init_session_login_objects()
+
+# 🔹 觀察清單（持股、temp_list、key_price.txt）的即時報價走 WebSocket：get_today_prices 先查記憶體報價表
+#    只在交易時段啟動（盤外不連線、不為此登入）；收盤後自動斷線，盤中重繪時再啟動
+if sdk is not None:
+    get_quote_service(sdk)
+    ensure_realtime_feed()
+
+# 🔹 圖表與重計算走共用快取；畫完目前這檔後在背景預取清單中的上一檔 / 下一檔
+stock_cache = get_stock_cache()
+analyze_10day_strength = stock_cache.memoize(analyze_10day_strength)
+plot_price_interactive = stock_cache.memoize(plot_price_interactive)
+plot_main_force_charts = stock_cache.memoize(plot_main_force_charts)
+plot_institution_combo_plotly = stock_cache.memoize(plot_institution_combo_plotly)
+plot_holder_concentration_plotly = stock_cache.memoize(plot_holder_concentration_plotly)
+plot_monthly_revenue_plotly = stock_cache.memoize(plot_monthly_revenue_plotly)
+plot_eps_with_close_price = stock_cache.memoize(plot_eps_with_close_price)
+plot_profitability_ratios_with_close_price = stock_cache.memoize(plot_profitability_ratios_with_close_price)
+
+# 各區塊的圖表函式（預取時只算使用者有打開的區塊）
+SECTION_BUILDERS = {
+    "price": [plot_price_interactive],
+    "main_force": [plot_main_force_charts],
+    "institutional": [plot_institution_combo_plotly],
+    "holder": [plot_holder_concentration_plotly],
+    "revenue": [plot_monthly_revenue_plotly],
+    "eps": [plot_eps_with_close_price, plot_profitability_ratios_with_close_price],
+}
+
+prefetcher = get_prefetcher()
+prefetcher.enter_foreground()
+
+
+def warm_stock(stock_id: str, builders: list) -> None:
+    """
+    背景 thread 執行：只呼叫純讀 DB 的函式（不碰 st.*），結果存進 stock_cache。
+    日期與 n 要跟 display_price_break_analysis 的呼叫一致，否則 key 不同、預取白做；
+    報價日期只看記憶體裡的即時報價表，不為了預取打 API
+    """
+    realtime = get_quote_table().get(stock_id)
+    today_date = get_effective_today_date(realtime.get("date") if realtime else None)
+    tasks = [
+        lambda: analyze_10day_strength(stock_id),
+        lambda: get_week_month_high_low(stock_id),
+        *[lambda n=n: get_baseline_and_deduction(stock_id, today_date, n=n) for n in (5, 10, 24)],
+        lambda: get_week_month_baseline_and_deduction(stock_id, today_date, period="W", n=5),
+        lambda: get_week_month_baseline_and_deduction(stock_id, today_date, period="M", n=5),
+    ] + [lambda fn=fn: fn(stock_id) for fn in builders]
+    for task in tasks:
+        try:
+            task()
+        except Exception:
+            pass  # 資料不足等情況留給前景顯示訊息
+
+
+# ---- 背景更新：交給常駐的 job runner（同一檔已在排隊 / 執行中就不會重複排入）----
+def _run_main_force_update(stock_id: str) -> int:
+    from tools.update_single_stock_main_force import update_main_force
+    return update_main_force(stock_id)
+
+
+def _run_institutional_update(stock_id: str) -> bool:
+    from tools.update_single_stock_institutional import update_institutional_data
+    return update_institutional_data(stock_id)
+
+
+def _run_new_stocks_setup(stock_file: str):
+    from tools.run_new_stocks_setup import run_setup
+    return run_setup(stock_file)
 
 
 def trigger_main_force_update(stock_id: str) -> None:
-    cmd = f"start /min python src\\tools\\update_single_stock_main_force.py {stock_id}"
-    subprocess.Popen(cmd, shell=True)
-    st.session_state[f"show_update_msg_{stock_id}"] = True
+    get_job_runner().submit("main_force", _run_main_force_update, stock_id, label=f"{stock_id} 主力")
 
 
 def trigger_institutional_update(stock_id: str) -> None:
-    cmd = f"start /min python src\\tools\\update_single_stock_institutional.py {stock_id}"
-    subprocess.Popen(cmd, shell=True)
-    st.session_state[f"show_update_msg_inst_{stock_id}"] = True
+    get_job_runner().submit("institutional", _run_institutional_update, stock_id, label=f"{stock_id} 外資投信")
+
+
+# ---- 圖表區塊：由 render_lazy_section 決定是否執行（打開才查詢與畫圖，並記錄耗時）----
+def render_price_section(selected: str) -> None:
+    fig_price = plot_price_interactive(selected)
+    st.plotly_chart(fig_price, use_container_width=True)
+
+
+def render_main_force_section(selected: str) -> None:
+    # 🔹 添加更新按鈕（與訊息在同一行）
+    col_title, col_btn, col_msg = st.columns([3, 1, 4])
+
+    with col_btn:
+        if st.button("🔄 更新", key=f"update_main_force_{selected}", help="背景更新此股票的主力買賣超資料"):
+            trigger_main_force_update(selected)
+
+    with col_msg:
+        # 背景工作的狀態 / 進度（完成後頁面自動重跑）
+        render_job_badge(get_job_runner().find("main_force", selected))
+
+    fig_main1, fig_main2 = plot_main_force_charts(selected)
+    st.plotly_chart(fig_main1, use_container_width=True)
+    st.plotly_chart(fig_main2, use_container_width=True)
+
+
+def render_institutional_section(selected: str) -> None:
+    # 🔹 添加更新按鈕（與訊息在同一行）
+    col_title2, col_btn2, col_msg2 = st.columns([3, 1, 4])
+
+    with col_btn2:
+        if st.button("🔄 更新", key=f"update_institutional_{selected}", help="背景更新此股票的外資、投信買賣超與持股比率資料"):
+            trigger_institutional_update(selected)
+
+    with col_msg2:
+        # 背景工作的狀態 / 進度（完成後頁面自動重跑）
+        render_job_badge(get_job_runner().find("institutional", selected))
+
+    fig1, fig2 = plot_institution_combo_plotly(selected)
+    st.plotly_chart(fig1, use_container_width=True)
+    st.plotly_chart(fig2, use_container_width=True)
+
+
+def render_holder_section(selected: str) -> None:
+    fig3, fig4 = plot_holder_concentration_plotly(selected)
+    st.plotly_chart(fig3, use_container_width=True)
+    st.plotly_chart(fig4, use_container_width=True)
+
+
+def render_revenue_section(selected: str) -> None:
+    fig5, fig6, fig7, df_revenue = plot_monthly_revenue_plotly(selected)
+    st.plotly_chart(fig5, use_container_width=True)
+
+    # 🔹 營收 YoY 條件提示
+    if df_revenue is not None and not df_revenue.empty:
+        # 取得最近兩個月的 YoY（df 已經按 year_month 排序）
+        latest_yoy = df_revenue.iloc[-1]["yoy_rate"] if len(df_revenue) >= 1 else None
+        second_latest_yoy = df_revenue.iloc[-2]["yoy_rate"] if len(df_revenue) >= 2 else None
+
+        alerts = []
+
+        # 條件1: 最近連續兩個月 YoY > 20%
+        if latest_yoy is not None and second_latest_yoy is not None:
+            if latest_yoy > 20 and second_latest_yoy > 20:
+                alerts.append(f"🔥 **連續兩個月 YoY > 20%** ({second_latest_yoy:.1f}% → {latest_yoy:.1f}%)")
+
+        # 條件2: 最近單月 YoY > 30%
+        if latest_yoy is not None and latest_yoy > 30:
+            alerts.append(f"⚡ **最新單月 YoY > 30%** ({latest_yoy:.1f}%)")
+
+        # 顯示提示
+        if alerts:
+            st.success("📊 **營收成長強勁提示：**\n" + "\n".join([f"- {alert}" for alert in alerts]))
+
+    st.plotly_chart(fig6, use_container_width=True)
+    st.plotly_chart(fig7, use_container_width=True)
+
+
+def render_eps_section(selected: str) -> None:
+    try:
+        fig_eps = plot_eps_with_close_price(selected)
+        st.plotly_chart(fig_eps, use_container_width=True)
+    except ValueError as e:
+        st.warning(str(e))
+
+    try:
+        fig8 = plot_profitability_ratios_with_close_price(selected)
+        st.plotly_chart(fig8, use_container_width=True)
+    except ValueError as e:
+        st.warning(str(e))
 
 
 col1, col2 = st.columns([1, 6])
 with col1:
     # 🔹 期現價差資訊（添加在股票代碼選單上方）
     with st.expander("📊 台指期現價差", expanded=False):
-        futures_data = get_futures_spread_info()
+        with profile_section("futures_spread"):
+            futures_data = get_futures_spread_info()
         spread_display = format_futures_spread_display(futures_data)
         st.markdown(spread_display)
+        # 近 20 個交易日的價差（futures_spread_daily）
+        spread_history = get_spread_service().history(days=20)
+        if len(spread_history) > 1:
+            st.line_chart(
+                pd.DataFrame({"價差": [h.spread_pts for h in spread_history]},
+                             index=[h.trade_date for h in spread_history]),
+                height=120,
+            )
     
     # 下拉選單區
-    stock_ids, stock_display = load_stock_list_with_names(refresh=True)
+    with profile_section("stock_list"):
+        stock_ids, stock_display = load_stock_list_with_names()
     
     # 🔹 使用 session_state 來追蹤當前股票，避免被共享檔案覆蓋
     if "current_stock_id" not in st.session_state:
@@ -140,10 +319,10 @@ with col1:
         temp_txt="temp_list.txt",
     )
 
-    # 更新 temp_list 的股票(r_new_stocks_manual_setup.bat) & 加進持股清單(my_stock_holdings.txt)
+    # 更新 temp_list 的股票(tools/run_new_stocks_setup.py) & 加進持股清單(my_stock_holdings.txt)
     if st.button("➕ 更新 temp_list 的股票 & 加進持股清單"):
-        # 非同步執行批次檔，不阻塞畫面
-        subprocess.Popen("start r_new_stocks_manual_setup.bat", shell=True)
+        # 背景執行，不阻塞畫面；進度顯示在下方「背景工作」
+        get_job_runner().submit("new_stocks_setup", _run_new_stocks_setup, "temp_list.txt", label="temp_list 初始資料")
         msg = append_unique_stocks()
         st.success(msg)
         st.rerun()  # 🔁 直接重新跑整頁
@@ -166,6 +345,9 @@ with col1:
     with quick_col2:
         if st.button("🔄 外資", key=f"sidebar_update_institutional_{selected}", use_container_width=True):
             trigger_institutional_update(selected)
+
+    # 🔹 背景工作進度（主力 / 外資 / temp_list 初始資料）
+    render_job_panel()
     
     # 🔹 當前週數顯示
     today = datetime.now()
@@ -217,29 +399,33 @@ with col1:
     )
 
     # 🔹 移到左側最底部：temp_list 快速檢視
-    render_key_price_checker(sdk=sdk)
+    with profile_section("key_price_checker"):
+        render_key_price_checker(sdk=sdk)
 
-    render_temp_list_expander(
-        temp_txt="temp_list.txt",
-        db_path="data/institution.db",
-        title="📄 show temp_list"
-    )
+    with profile_section("temp_list"):
+        render_temp_list_expander(
+            temp_txt="temp_list.txt",
+            db_path="data/institution.db",
+            title="📄 show temp_list"
+        )
 
 with col2:
     if selected:
         with st.expander("🧮 RSI / RS & 乖離率 / 成交量 / PEG 快算 / 📕 第一根帶量突破k棒可上車 / 🎢 買在 三盤突破(遠離上方壓力 or 帶量突破壓力) or 上升波.量縮拉回支撐 / 🥀 賣在力竭 / ☄️ 量即↗↘", expanded=False):
-            col_left, col_mid, col_right = st.columns([2, 3, 3])
-            with col_left:
-                display_rs_rsi_info(selected)
+            with timed_section("quick_calc"):
+                col_left, col_mid, col_right = st.columns([2, 3, 3])
+                with col_left:
+                    display_rs_rsi_info(selected)
 
-            with col_mid:
-                render_bias_calculator(key_suffix=selected, compact=True)
-                render_volume_avg_calculator(key_suffix=selected, compact=True, default_days=5)
+                with col_mid:
+                    render_bias_calculator(key_suffix=selected, compact=True)
+                    render_volume_avg_calculator(key_suffix=selected, compact=True, default_days=5)
 
-            with col_right:
-                render_peg_calculator(selected, sdk=sdk, key_suffix=selected)
+                with col_right:
+                    render_peg_calculator(selected, sdk=sdk, key_suffix=selected)
 
-        result = display_price_break_analysis(selected, dl=dl, sdk=sdk)
+        with timed_section("price_break"):
+            result = display_price_break_analysis(selected, dl=dl, sdk=sdk)
         if result:
             today_date, c1, o, c2, h, l, w1, w2, m1, m2, summary_term1, summary_term2, summary_term3 = result
         else:
@@ -256,156 +442,30 @@ with col2:
         <span style='font-size:20px'>📈 強勢股，應在上漲過程中，守住基準價與扣抵值(上軌道 可續抱) 與5日均</span>
         <span style='font-size:16px; color:gray'>　{selected_display}</span>
         """, unsafe_allow_html=True)
-        fig_strength = analyze_10day_strength(selected)
-        st.plotly_chart(fig_strength, use_container_width=True, config={"displayModeBar": False})
-
-        st.subheader("📉 收盤價 (日)")
-        fig_price = plot_price_interactive(selected)
-        st.plotly_chart(fig_price, use_container_width=True)
-        
-
-        st.subheader("📈 主力 買賣超 & 買賣家數差 (日)")
-        
-        # 🔹 添加更新按鈕（與訊息在同一行）
-        col_title, col_btn, col_msg = st.columns([3, 1, 4])
-        
-        with col_btn:
-            if st.button("🔄 更新", key=f"update_main_force_{selected}", help="背景更新此股票的主力買賣超資料"):
-                trigger_main_force_update(selected)
-        
-        with col_msg:
-            # 顯示背景執行提示（3秒後自動淡出）
-            if st.session_state.get(f'show_update_msg_{selected}', False):
-                st.markdown("""
-                <div id="update-msg" style="
-                    padding: 0.5rem 1rem;
-                    background-color: #d1ecf1;
-                    border: 1px solid #bee5eb;
-                    border-radius: 0.25rem;
-                    color: #0c5460;
-                    animation: fadeOut 0.5s ease-in-out 2.5s forwards;
-                ">
-                    ℹ️ ⏳ 背景更新中...完成後會有提示音
-                </div>
-                <style>
-                    @keyframes fadeOut {
-                        from { opacity: 1; }
-                        to { opacity: 0; visibility: hidden; }
-                    }
-                </style>
-                <script>
-                    setTimeout(function() {
-                        var msg = document.getElementById('update-msg');
-                        if (msg) {
-                            setTimeout(function() {
-                                msg.style.display = 'none';
-                            }, 3000);
-                        }
-                    }, 100);
-                </script>
-                """, unsafe_allow_html=True)
-                # 重置狀態（避免訊息一直顯示）
-                st.session_state[f'show_update_msg_{selected}'] = False
-        
-        fig_main1, fig_main2 = plot_main_force_charts(selected)
-        st.plotly_chart(fig_main1, use_container_width=True)
-        st.plotly_chart(fig_main2, use_container_width=True)
-        
-
-        st.subheader("📊 外資、投信 買賣超 & 持股比率 (日)")
-        
-        # 🔹 添加更新按鈕（與訊息在同一行）
-        col_title2, col_btn2, col_msg2 = st.columns([3, 1, 4])
-        
-        with col_btn2:
-            if st.button("🔄 更新", key=f"update_institutional_{selected}", help="背景更新此股票的外資、投信買賣超與持股比率資料"):
-                trigger_institutional_update(selected)
-        
-        with col_msg2:
-            # 顯示背景執行提示（3秒後自動淡出）
-            if st.session_state.get(f'show_update_msg_inst_{selected}', False):
-                st.markdown("""
-                <div id="update-msg-inst" style="
-                    padding: 0.5rem 1rem;
-                    background-color: #d1ecf1;
-                    border: 1px solid #bee5eb;
-                    border-radius: 0.25rem;
-                    color: #0c5460;
-                    animation: fadeOut 0.5s ease-in-out 2.5s forwards;
-                ">
-                    ℹ️ ⏳ 背景更新中...完成後會有提示音
-                </div>
-                <style>
-                    @keyframes fadeOut {
-                        from { opacity: 1; }
-                        to { opacity: 0; visibility: hidden; }
-                    }
-                </style>
-                <script>
-                    setTimeout(function() {
-                        var msg = document.getElementById('update-msg-inst');
-                        if (msg) {
-                            setTimeout(function() {
-                                msg.style.display = 'none';
-                            }, 3000);
-                        }
-                    }, 100);
-                </script>
-                """, unsafe_allow_html=True)
-                # 重置狀態（避免訊息一直顯示）
-                st.session_state[f'show_update_msg_inst_{selected}'] = False
-        
-        fig1, fig2 = plot_institution_combo_plotly(selected)
-        st.plotly_chart(fig1, use_container_width=True)
-        st.plotly_chart(fig2, use_container_width=True)
-
-
-        st.subheader("📈 籌碼集中度 & 千張大戶持股比率 (週)")
-        fig3, fig4 = plot_holder_concentration_plotly(selected)
-        st.plotly_chart(fig3, use_container_width=True)
-        st.plotly_chart(fig4, use_container_width=True)
-        
-        st.subheader("📈 營收年增率 & 月營收 & 營收月增率")
-        fig5, fig6, fig7, df_revenue = plot_monthly_revenue_plotly(selected)
-        st.plotly_chart(fig5, use_container_width=True)
-        
-        # 🔹 營收 YoY 條件提示
-        if df_revenue is not None and not df_revenue.empty:
-            # 取得最近兩個月的 YoY（df 已經按 year_month 排序）
-            latest_yoy = df_revenue.iloc[-1]["yoy_rate"] if len(df_revenue) >= 1 else None
-            second_latest_yoy = df_revenue.iloc[-2]["yoy_rate"] if len(df_revenue) >= 2 else None
-            
-            alerts = []
-            
-            # 條件1: 最近連續兩個月 YoY > 20%
-            if latest_yoy is not None and second_latest_yoy is not None:
-                if latest_yoy > 20 and second_latest_yoy > 20:
-                    alerts.append(f"🔥 **連續兩個月 YoY > 20%** ({second_latest_yoy:.1f}% → {latest_yoy:.1f}%)")
-            
-            # 條件2: 最近單月 YoY > 30%
-            if latest_yoy is not None and latest_yoy > 30:
-                alerts.append(f"⚡ **最新單月 YoY > 30%** ({latest_yoy:.1f}%)")
-            
-            # 顯示提示
-            if alerts:
-                st.success("📊 **營收成長強勁提示：**\n" + "\n".join([f"- {alert}" for alert in alerts]))
-        
-        st.plotly_chart(fig6, use_container_width=True)
-        st.plotly_chart(fig7, use_container_width=True)
-        
-        st.subheader("📊 EPS & 三率 & 季收盤價 (20季)")
-        try:
-            fig_eps = plot_eps_with_close_price(selected)
-            st.plotly_chart(fig_eps, use_container_width=True)
-        except ValueError as e:
-            st.warning(str(e))
-
-        try:
-            fig8 = plot_profitability_ratios_with_close_price(selected)
-            st.plotly_chart(fig8, use_container_width=True)
-        except ValueError as e:
-            st.warning(str(e))
-
+        with timed_section("strength"):
+            fig_strength = analyze_10day_strength(selected)
+            st.plotly_chart(fig_strength, use_container_width=True, config={"displayModeBar": False})
+
+        render_lazy_section("price", "📉 收盤價 (日)", render_price_section, selected, default_open=True)
+        record_section_cost("first_paint", time.perf_counter() - APP_T0)
+
+        render_lazy_section("main_force", "📈 主力 買賣超 & 買賣家數差 (日)", render_main_force_section, selected)
+        render_lazy_section("institutional", "📊 外資、投信 買賣超 & 持股比率 (日)", render_institutional_section, selected)
+        render_lazy_section("holder", "📈 籌碼集中度 & 千張大戶持股比率 (週)", render_holder_section, selected)
+        render_lazy_section("revenue", "📈 營收年增率 & 月營收 & 營收月增率", render_revenue_section, selected)
+        render_lazy_section("eps", "📊 EPS & 三率 & 季收盤價 (20季)", render_eps_section, selected)
+
+        open_builders = [
+            fn for key, fns in SECTION_BUILDERS.items()
+            if st.session_state.get(f"section_open_{key}", key == "price")
+            for fn in fns
+        ]
+        if render_profile is not None:
+            render_profile.meta["stock_id"] = selected
+        prefetcher.schedule(
+            neighbors(stock_ids, selected),
+            lambda stock_id: warm_stock(stock_id, open_builders),
+        )
 
 with st.expander("📘 說明：這是什麼？"):
     st.markdown("""
@@ -431,4 +491,10 @@ with st.expander("📘 說明：這是什麼？"):
         - 籌碼集中度與大戶比率 (週)
         - 月營收與年增率 (月)
         - 三率（毛利率、營業利益率、稅後淨利率）與季收盤價 (季)        
-    """)
\ No newline at end of file
+    """)
+
+# 沒有選股（未排入預取）時也要結束前景，讓背景預取繼續
+prefetcher.leave_foreground()
+
+finish_render(render_profile)
+render_profiler_panel("dashboard")
@@ -1,4 +1,4 @@
-:: 這支程式現在可以直接透過 Streamlit 的按鈕來執行!!
+:: Streamlit 的「➕ 更新 temp_list 的股票」按鈕改為在背景執行 src\tools\run_new_stocks_setup.py（同樣的步驟，in-process）
 :: 當手上的持股庫存有新增的股票時，要先手動新增到 temp_list.txt，然後執行此腳本(建立初始資料)
 :: 此腳本的用途是手動+指定更新特定股票，補上排程因時間差的缺失資料，裡面的py也可以單獨執行，缺啥補啥
 @echo off
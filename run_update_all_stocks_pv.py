@@ -1,21 +1,15 @@
-import subprocess
 import sys
 from pathlib import Path
 
-# 手動更新全部股票的 Fubon OHLCV 資料，部分缺的FinMind補上 (每天排程已經有更新了，這支理論上用不到)
-
-# 設定 virtualenv Python 路徑
-python_path = Path("venv/Scripts/python.exe")
+# 手動更新全部股票的日K：先用交易所全市場報表一次抓 (2 個 request)，缺的再由 FinMind 逐檔補上
+# (每天排程已經有更新了，這支理論上用不到)
+# 改為直接呼叫 in-process orchestrator，不再 subprocess 另開 python
 
 # 路徑轉絕對（避免排程中路徑錯誤）
 base_dir = Path(__file__).resolve().parent
-py1 = base_dir / "src" / "fetch" / "fubon" / "fetch_fubon_daily_ohlcv_all_stocks_to_db_fixed.py"
-py2 = base_dir / "src" / "fetch" / "finmind" / "update_twse_prices_wz_param.py"
+sys.path.append(str(base_dir / "src"))
 
-print("[1/2] 📥 開始執行 Fubon OHLCV 更新...")
-subprocess.run([str(python_path), "-m", "src.fetch.fubon.fetch_fubon_daily_ohlcv_all_stocks_to_db_fixed"], check=True)
-print("✅ Fubon OHLCV 更新完成")
+from tools.run_daily_ingestion import main
 
-print("[2/2] 📥 開始執行 TWSE Prices 補資料...")
-subprocess.run([str(python_path), "-m", "src.fetch.finmind.update_twse_prices_wz_param", "1"], check=True)
-print("✅ TWSE Prices 補資料完成")
+if __name__ == "__main__":
+    sys.exit(main(["--only", "prices_gap", "--days", "7"]))
@@ -2,10 +2,14 @@ import sqlite3
 import pandas as pd
 from datetime import datetime
 import sys, os
-from common.login_helper import get_logged_in_dl, get_logged_in_sdk
-from FinMind.data import DataLoader
+from common.login_helper import get_logged_in_dl
 from fetch.finmind.finmind_db_fetcher import fetch_with_finmind_recent
 from common.time_utils import is_fubon_api_maintenance_time
+from common.profiler import profiled
+from common.quote_service import get_quote_service
+
+# 儀表板效能分析：外部 API 各自算一個區塊（未啟用 profiler 時不影響）
+fetch_with_finmind_recent = profiled("finmind.recent")(fetch_with_finmind_recent)
 
 
 DB_PATH = "data/institution.db" 
@@ -145,6 +149,7 @@ def get_latest_price_from_db(stock_id):
         "c2": prev_row["close"]  # 第二新資料的收盤價為 c2
     }
 
+@profiled("fubon.quote")
 def get_today_prices(stock_id, sdk=None):
     """
     回傳：
@@ -158,17 +163,15 @@ def get_today_prices(stock_id, sdk=None):
         "v":  <成交量(張) = total.tradeVolume>
       }
     富邦 API 維護/失敗時，改走 DB fallback（僅保證 date/c1/o/c2）。
+    報價經過 common.quote_service（短 TTL 快取 + 同檔請求合併），同一次畫面繪製不會重複查同一檔；
+    多檔時先呼叫 prefetch_today_prices() 批次取。
     """
     if is_fubon_api_maintenance_time():
         # print("⚠️ 富邦 API 維護時間，改用資料庫 fallback")
         return get_latest_price_from_db(stock_id)
 
     try:
-        if sdk is None:
-            sdk = get_logged_in_sdk()
-        sdk.init_realtime()
-
-        quote = sdk.marketdata.rest_client.stock.intraday.quote(symbol=stock_id)
+        quote = get_quote_service(sdk).get(stock_id)
 
         # volume 在 total.tradeVolume，保留頂層 volume 作為備援
         vol = (quote.get("total") or {}).get("tradeVolume")
@@ -203,6 +206,16 @@ def get_today_prices(stock_id, sdk=None):
         return get_latest_price_from_db(stock_id)
 
 
+def prefetch_today_prices(stock_ids, sdk=None) -> int:
+    """批次取多檔盤中報價放進快取（之後逐檔 get_today_prices 直接命中），回傳取到的檔數"""
+    if is_fubon_api_maintenance_time():
+        return 0
+    try:
+        return len(get_quote_service(sdk).get_many(stock_ids))
+    except Exception as e:
+        print(f"⚠️ 批次取報價失敗，改逐檔查詢：{e}")
+        return 0
+
 
 def analyze_stock(stock_id, dl=None, sdk=None):
 
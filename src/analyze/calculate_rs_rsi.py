@@ -1,7 +1,11 @@
 import pandas as pd
 import sqlite3
 import numpy as np
+import sys
 from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
 
 def compute_rsi_wilder(series: pd.Series, period: int = 14) -> pd.Series:
     delta = series.diff()
@@ -15,24 +19,27 @@ def compute_rsi_wilder(series: pd.Series, period: int = 14) -> pd.Series:
     rsi = 100 - (100 / (1 + rs))
     return rsi
 
-def compute_minervini_rs(db_path="data/institution.db", table="twse_prices", months=12):
-    conn = sqlite3.connect(db_path)
-
-    df_meta = pd.read_sql_query("SELECT stock_id, name FROM stock_meta", conn)
-    df_meta["stock_id"] = df_meta["stock_id"].astype(str)
-    df_meta = df_meta[
-        (~df_meta["stock_id"].str.startswith("0")) &
-        (~df_meta["name"].str.endswith("-DR"))
-    ]
-    valid_ids = df_meta["stock_id"].tolist()
-
+def _load_close_sqlite(conn, table, valid_ids):
     query = f"""
     SELECT stock_id, date, close FROM {table}
     WHERE stock_id IN ({','.join(['?']*len(valid_ids))})
     """
-    df = pd.read_sql_query(query, conn, params=valid_ids, parse_dates=["date"])
-    conn.close()
+    return pd.read_sql_query(query, conn, params=valid_ids, parse_dates=["date"])
+
+
+def _load_close_columnar(valid_ids, months):
+    """欄式鏡像只讀 stock_id/date/close 三欄、且只讀需要的區間（1Y 與 YTD 取較早者）"""
+    from common.columnar_store import latest_period, load_prices
+
+    latest = latest_period("daily")
+    if latest is None:
+        raise FileNotFoundError("欄式鏡像沒有日K，請先執行 python src/common/columnar_store.py --sync")
+    latest_ts = pd.Timestamp(str(latest))
+    start = min(latest_ts - pd.DateOffset(months=months), pd.Timestamp(latest_ts.year, 1, 1))
+    return load_prices("daily", columns=["stock_id", "date", "close"], start=start, stock_ids=valid_ids)
 
+
+def _rs_from_frame(df, months):
     df["stock_id"] = df["stock_id"].astype(str)
     df = df.sort_values(by=["stock_id", "date"])
     df = df.dropna(subset=["close"])
@@ -68,6 +75,113 @@ def compute_minervini_rs(db_path="data/institution.db", table="twse_prices", mon
         rsi_value = group["rsi14"].iloc[-1] if not group["rsi14"].dropna().empty else np.nan
         rsi_df.append({"stock_id": sid, "rsi14": rsi_value})
     rsi_df = pd.DataFrame(rsi_df)
+    return returns_1y, returns_ytd, rsi_df
+
+
+def _rs_from_matrix(valid_ids, months, root=None):
+    """
+    由 common.price_matrix 的 (交易日 × 股票) 矩陣計算，與 _rs_from_frame 同樣的定義：
+    區間內第一個 / 最後一個有收盤價的交易日算報酬率，RSI 只用有資料的交易日。
+    """
+    from common.price_matrix import ROOT, PriceMatrix, first_last_valid
+
+    m = PriceMatrix(root or ROOT)
+    ids = [sid for sid in valid_ids if sid in m.index]
+    close = m.field("close")[:, m.columns(ids)]
+    has_data = ~np.isnan(close).all(axis=1)
+    if not has_data.any():
+        raise ValueError("price matrix 沒有任何有效收盤價")
+    last_row = int(np.nonzero(has_data)[0][-1])
+    latest_date = pd.Timestamp(str(m.dates[last_row]))
+    # float32 → float64 並四捨五入，還原成與 SQLite 相同的價格
+    close = np.round(close[: last_row + 1].astype(np.float64), 4)
+    dates = m.dates[: last_row + 1]
+
+    def _returns(since, name):
+        start = int(np.searchsorted(dates, int(since.strftime("%Y%m%d"))))
+        first, last = first_last_valid(close[start:])
+        out = pd.DataFrame({"stock_id": ids, name: (last - first) / first}).dropna(subset=[name])
+        return out.reset_index(drop=True)
+
+    returns_1y = _returns(latest_date - pd.DateOffset(months=months), "return_1y")
+    returns_1y["rs_score_1y"] = returns_1y["return_1y"].rank(pct=True) * 100
+    returns_ytd = _returns(pd.Timestamp(latest_date.year, 1, 1), "return_ytd")
+    returns_ytd["rs_score_ytd"] = returns_ytd["return_ytd"].rank(pct=True) * 100
+
+    start = int(np.searchsorted(dates, int((latest_date - pd.Timedelta(days=90)).strftime("%Y%m%d"))))
+    rsi_values = []
+    for k in range(len(ids)):
+        col = close[start:, k]
+        col = pd.Series(col[~np.isnan(col)])
+        rsi = compute_rsi_wilder(col, period=14)
+        rsi_values.append(rsi.iloc[-1] if not rsi.dropna().empty else np.nan)
+    rsi_df = pd.DataFrame({"stock_id": ids, "rsi14": rsi_values})
+    return returns_1y, returns_ytd, rsi_df
+
+
+def _rs_from_duckdb(db_path, valid_ids, months, engine_name="duckdb"):
+    """
+    報酬率在 DuckDB 端以 window function 一次算完（common.analytics_engine.period_returns），
+    只有 RSI 需要的近 90 天收盤價才拉回 pandas。
+    """
+    from common.analytics_engine import get_engine, period_returns
+
+    with get_engine(engine_name, db_path) as eng:
+        latest = eng.query_df("SELECT MAX(date) AS d FROM twse_prices WHERE close IS NOT NULL")["d"].iloc[0]
+        latest_date = pd.Timestamp(latest)
+        since_1y = (latest_date - pd.DateOffset(months=months)).strftime("%Y-%m-%d")
+        since_ytd = f"{latest_date.year}-01-01"
+
+        returns_1y = period_returns(eng, since_1y, valid_ids).rename(columns={"ret": "return_1y"})
+        returns_ytd = period_returns(eng, since_ytd, valid_ids).rename(columns={"ret": "return_ytd"})
+
+        since_rsi = (latest_date - pd.Timedelta(days=90)).strftime("%Y-%m-%d")
+        df_rsi_input = eng.query_df(
+            "SELECT stock_id, date, close FROM twse_prices WHERE close IS NOT NULL AND date >= ? ORDER BY stock_id, date",
+            [since_rsi],
+        )
+
+    returns_1y["rs_score_1y"] = returns_1y["return_1y"].rank(pct=True) * 100
+    returns_ytd["rs_score_ytd"] = returns_ytd["return_ytd"].rank(pct=True) * 100
+
+    df_rsi_input = df_rsi_input[df_rsi_input["stock_id"].isin(set(valid_ids))]
+    rsi_df = []
+    for sid, group in df_rsi_input.groupby("stock_id"):
+        rsi = compute_rsi_wilder(group["close"].reset_index(drop=True), period=14)
+        rsi_df.append({"stock_id": sid, "rsi14": rsi.iloc[-1] if not rsi.dropna().empty else np.nan})
+    return returns_1y, returns_ytd, pd.DataFrame(rsi_df, columns=["stock_id", "rsi14"])
+
+
+def compute_minervini_rs(db_path="data/institution.db", table="twse_prices", months=12, engine="sqlite"):
+    """
+    engine="columnar"：日K改由 common.columnar_store 讀取（需先 --sync）
+    engine="matrix"  ：直接在 common.price_matrix 的 memory-mapped 矩陣上做橫斷面計算
+    engine="duckdb"  ：報酬率交給 DuckDB（common.analytics_engine）以 window function 計算
+    """
+    conn = sqlite3.connect(db_path)
+
+    df_meta = pd.read_sql_query("SELECT stock_id, name FROM stock_meta", conn)
+    df_meta["stock_id"] = df_meta["stock_id"].astype(str)
+    df_meta = df_meta[
+        (~df_meta["stock_id"].str.startswith("0")) &
+        (~df_meta["name"].str.endswith("-DR"))
+    ]
+    valid_ids = df_meta["stock_id"].tolist()
+
+    if engine == "matrix":
+        conn.close()
+        returns_1y, returns_ytd, rsi_df = _rs_from_matrix(valid_ids, months)
+    elif engine in ("duckdb", "duckdb-columnar"):
+        conn.close()
+        returns_1y, returns_ytd, rsi_df = _rs_from_duckdb(db_path, valid_ids, months, engine)
+    else:
+        if engine == "columnar":
+            conn.close()
+            df = _load_close_columnar(valid_ids, months)
+        else:
+            df = _load_close_sqlite(conn, table, valid_ids)
+            conn.close()
+        returns_1y, returns_ytd, rsi_df = _rs_from_frame(df, months)
 
     # === 合併所有欄位 ===
     result = (
@@ -130,8 +244,16 @@ def compute_minervini_rs(db_path="data/institution.db", table="twse_prices", mon
     print(f"✅ 計算完成，已寫入資料表 stock_rs_rsi（更新日：{today_str}）")
 
 if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="計算 Minervini RS 與 RSI14，寫入 stock_rs_rsi")
+    ap.add_argument("--engine", choices=["sqlite", "columnar", "matrix", "duckdb", "duckdb-columnar"], default="sqlite",
+                    help="日K來源：sqlite（預設）、columnar（common.columnar_store 鏡像）、matrix（common.price_matrix）、"
+                         "duckdb / duckdb-columnar（common.analytics_engine）")
+    args = ap.parse_args()
+
     if datetime.today().weekday() == 6:
         print("⛔ 今天是星期日，不執行 RS/RSI 計算")
         exit()
 
-    compute_minervini_rs()
+    compute_minervini_rs(engine=args.engine)
@@ -1,5 +1,5 @@
 from analyze.analyze_price_break_conditions_dataloader import (
-    get_today_prices, get_week_month_high_low, is_fubon_api_maintenance_time
+    get_today_prices, get_week_month_high_low, is_fubon_api_maintenance_time, prefetch_today_prices
 )
 from common.stock_loader import load_stock_list_with_names
 import sys
@@ -23,7 +23,8 @@ def detect_signals(file_path="my_stock_holdings.txt", sdk=None):
     id_name_map = {s.split()[0]: s.split()[1] for s in display_options if " " in s}
 
     print(f"🔍 開始檢測 {len(stocks)} 檔股票的突破訊號...")
-    
+    prefetch_today_prices(stocks, sdk)   # 一次批次取完，迴圈內直接讀快取
+
     for i, stock_id in enumerate(stocks, 1):
         try:
             print(f"⏳ ({i}/{len(stocks)}) 處理 {stock_id}...")
@@ -63,7 +64,8 @@ def detect_uptrending_stocks(file_path="shareholding_concentration_list.txt", sd
     id_name_map = {s.split()[0]: s.split()[1] for s in display_options if " " in s}
     
     print(f"\n🔍 開始檢測 {len(stocks)} 檔股票的向上趨勢...")
-    
+    prefetch_today_prices(stocks, sdk)
+
     for i, stock_id in enumerate(stocks, 1):
         try:
             print(f"⏳ ({i}/{len(stocks)}) 處理 {stock_id}...")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析查詢的引擎層：同一段 SQL 可以交給 SQLite（預設）或內嵌的 DuckDB 執行。
+
+- sqlite : 原本的 sqlite3 + pd.read_sql_query（單執行緒、逐列轉換）
+- duckdb : DuckDB ATTACH institution.db（sqlite extension，唯讀），聚合 / window function / join
+           多執行緒向量化執行，結果以 Arrow 回傳；source="columnar" 時 twse_prices 改掃
+           common.columnar_store 的 Arrow 鏡像（mmap，零拷貝）
+- 兩個引擎都把資料表以原本的名稱提供（twse_prices、stock_meta、monthly_revenue…），
+  SQL 只用兩邊都支援的語法（CTE、window function、ROUND/AVG…）即可共用
+
+常用的夜間批次查詢也放在這裡（monthly_close_summary、latest_moving_average），
+壓測：python src/tools/bench_analytics_engines.py
+
+使用方式
+    from common.analytics_engine import get_engine
+
+    with get_engine("duckdb") as eng:
+        df = eng.query_df("SELECT stock_id, COUNT(*) AS n FROM twse_prices GROUP BY stock_id")
+        tbl = eng.query_arrow("SELECT ...")            # 只有 duckdb 引擎
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterable, Optional, Sequence
+
+DB_PATH = "data/institution.db"
+ENGINES = ("sqlite", "duckdb")
+
+
+class SqliteExtensionUnavailable(RuntimeError):
+    """DuckDB 的 sqlite extension 沒裝、也下載不到（離線）"""
+
+
+class SqliteEngine:
+    name = "sqlite"
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+
+    def query_df(self, sql: str, params: Sequence = ()):
+        import pandas as pd
+        return pd.read_sql_query(sql, self.conn, params=list(params))
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DuckDBEngine:
+    name = "duckdb"
+
+    def __init__(self, db_path: str = DB_PATH, source: str = "sqlite", threads: Optional[int] = None,
+                 columnar_root: Optional[str] = None):
+        import duckdb
+
+        self.db_path = db_path
+        self.source = source
+        self.conn = duckdb.connect()
+        if threads:
+            self.conn.execute(f"SET threads TO {int(threads)}")
+        self._load_sqlite_extension()
+        path = str(db_path).replace("'", "''")
+        self.conn.execute(f"ATTACH '{path}' AS inst (TYPE SQLITE, READ_ONLY)")
+
+        with sqlite3.connect(db_path) as sconn:
+            tables = [t for (t,) in sconn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            )]
+        for table in tables:
+            if source == "columnar" and table == "twse_prices":
+                continue
+            self.conn.execute(f'CREATE VIEW "{table}" AS SELECT * FROM inst."{table}"')
+        if source == "columnar":
+            self._register_columnar(columnar_root)
+
+    def _load_sqlite_extension(self) -> None:
+        """先 LOAD 已安裝的 extension；沒有才 INSTALL（需要網路下載）"""
+        import duckdb
+
+        try:
+            self.conn.execute("LOAD sqlite")
+            return
+        except duckdb.Error:
+            pass
+        try:
+            self.conn.execute("INSTALL sqlite")
+            self.conn.execute("LOAD sqlite")
+        except duckdb.Error as e:
+            self.conn.close()
+            raise SqliteExtensionUnavailable(f"DuckDB sqlite extension 無法載入：{e}") from e
+
+    def _register_columnar(self, root: Optional[str]) -> None:
+        from common import columnar_store
+
+        self._dataset = columnar_store.open_dataset("daily", root or columnar_store.ROOT)
+        self.conn.register("twse_prices_arrow", self._dataset)
+        # 與 SQLite 相同的欄位型別：stock_id 字串、date 'YYYY-MM-DD'
+        self.conn.execute("""
+            CREATE VIEW twse_prices AS
+            SELECT CAST(stock_id AS VARCHAR) AS stock_id,
+                   strftime(make_date(date // 10000, (date // 100) % 100, date % 100), '%Y-%m-%d') AS date,
+                   CAST(open AS DOUBLE) AS open, CAST(high AS DOUBLE) AS high,
+                   CAST(low AS DOUBLE) AS low, CAST(close AS DOUBLE) AS close, volume
+            FROM twse_prices_arrow
+        """)
+
+    def query_arrow(self, sql: str, params: Sequence = ()):
+        return self.conn.execute(sql, list(params)).arrow()
+
+    def query_df(self, sql: str, params: Sequence = ()):
+        return self.conn.execute(sql, list(params)).df()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def get_engine(name: str = "sqlite", db_path: str = DB_PATH, **kwargs):
+    """name: sqlite / duckdb / duckdb-columnar"""
+    if name == "sqlite":
+        return SqliteEngine(db_path)
+    if name == "duckdb":
+        return DuckDBEngine(db_path, **kwargs)
+    if name == "duckdb-columnar":
+        return DuckDBEngine(db_path, source="columnar", **kwargs)
+    raise ValueError(f"未知的引擎：{name}")
+
+
+def _in_clause(column: str, values: Optional[Iterable[str]]):
+    if not values:
+        return "", []
+    values = [str(v) for v in values]
+    return f" AND {column} IN ({','.join(['?'] * len(values))})", values
+
+
+# ---------------------------- 夜間批次查詢 ----------------------------
+def monthly_close_summary(engine, stock_ids: Optional[Iterable[str]] = None):
+    """
+    每檔、每月的平均收盤價與月底收盤價（year_month 為 'YYYYMM'，與 monthly_revenue 相同）。
+    一次 set-based 查詢，取代逐檔 read_sql 再 groupby。
+    """
+    cond, params = _in_clause("stock_id", stock_ids)
+    return engine.query_df(f"""
+        WITH m AS (
+            SELECT stock_id,
+                   substr(date, 1, 4) || substr(date, 6, 2) AS year_month,
+                   close,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY stock_id, substr(date, 1, 4) || substr(date, 6, 2) ORDER BY date DESC
+                   ) AS rn
+            FROM twse_prices
+            WHERE close IS NOT NULL{cond}
+        )
+        SELECT stock_id, year_month,
+               ROUND(AVG(close), 2) AS monthly_avg_close,
+               ROUND(MAX(CASE WHEN rn = 1 THEN close END), 2) AS monthly_last_close
+        FROM m
+        GROUP BY stock_id, year_month
+        ORDER BY stock_id, year_month
+    """, params)
+
+
+def latest_moving_average(engine, window: int = 20, since: Optional[str] = None):
+    """每檔最新一天的收盤價與 N 日均線（window function）"""
+    where = "WHERE close > 0" + (" AND date >= ?" if since else "")
+    return engine.query_df(f"""
+        WITH w AS (
+            SELECT stock_id, date, close,
+                   AVG(close) OVER (PARTITION BY stock_id ORDER BY date
+                                    ROWS BETWEEN {int(window) - 1} PRECEDING AND CURRENT ROW) AS ma,
+                   ROW_NUMBER() OVER (PARTITION BY stock_id ORDER BY date DESC) AS rn
+            FROM twse_prices
+            {where}
+        )
+        SELECT stock_id, date, close, ma FROM w WHERE rn = 1 ORDER BY stock_id
+    """, [since] if since else [])
+
+
+def period_returns(engine, since: str, stock_ids: Optional[Iterable[str]] = None):
+    """since 之後第一個與最後一個有收盤價的交易日之間的報酬率（RS 排名用）"""
+    cond, params = _in_clause("stock_id", stock_ids)
+    return engine.query_df(f"""
+        WITH w AS (
+            SELECT stock_id, close,
+                   ROW_NUMBER() OVER (PARTITION BY stock_id ORDER BY date) AS rn_first,
+                   ROW_NUMBER() OVER (PARTITION BY stock_id ORDER BY date DESC) AS rn_last
+            FROM twse_prices
+            WHERE close IS NOT NULL AND date >= ?{cond}
+        )
+        SELECT stock_id,
+               (MAX(CASE WHEN rn_last = 1 THEN close END) - MAX(CASE WHEN rn_first = 1 THEN close END))
+                   / MAX(CASE WHEN rn_first = 1 THEN close END) AS ret
+        FROM w
+        GROUP BY stock_id
+        ORDER BY stock_id
+    """, [since] + params)
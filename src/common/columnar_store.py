@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+twse_prices / twse_prices_weekly / twse_prices_monthly 的欄式鏡像（Arrow IPC），給全市場掃描用。
+
+    data/columnar/
+        manifest.json                  # 每個分區的簽章（筆數、最大日期、各價量欄位總和）
+        daily/year=2025/part.arrow     # 依年份分區；未壓縮 → 讀取時 memory map、零拷貝
+        weekly/year=2025/part.arrow
+        monthly/year=2025/part.arrow
+
+欄位型別
+    stock_id : dictionary<int32, string>（轉 pandas 為 categorical）
+    date     : int32 YYYYMMDD        （weekly: year_week int32 YYYYWW；monthly: year_month int32 YYYYMM）
+    open / high / low / close : float32
+    volume   : int64
+
+增量維護：sync() 只重寫簽章有變動的年份（新交易日通常只動到今年這一個檔）。
+選用 Arrow IPC 而非 Parquet：Parquet 必須解壓縮才能讀，IPC 可以直接 mmap 成 Arrow 陣列。
+
+使用方式
+    python src/common/columnar_store.py --sync              # 由 institution.db 更新鏡像
+
+    from common.columnar_store import load_prices
+    df = load_prices("daily", columns=["stock_id", "date", "close"], start="2024-08-01")
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+DB_PATH = "data/institution.db"
+ROOT = "data/columnar"
+
+# freq → (來源資料表, 期間欄位)
+FREQS = {
+    "daily": ("twse_prices", "date"),
+    "weekly": ("twse_prices_weekly", "year_week"),
+    "monthly": ("twse_prices_monthly", "year_month"),
+}
+PRICE_COLUMNS = ("open", "high", "low", "close")
+
+
+def available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def period_to_int(value) -> int:
+    """'2025-08-15' / date → 20250815；'2025-34' → 202534；'2025-08' → 202508；int 原樣回傳"""
+    if isinstance(value, int):
+        return value
+    if hasattr(value, "strftime"):  # date / datetime / pd.Timestamp
+        return int(value.strftime("%Y%m%d"))
+    return int(str(value)[:10].replace("-", ""))
+
+
+def _schema(key: str):
+    import pyarrow as pa
+
+    return pa.schema(
+        [("stock_id", pa.dictionary(pa.int32(), pa.string())), (key, pa.int32())]
+        + [(c, pa.float32()) for c in PRICE_COLUMNS]
+        + [("volume", pa.int64())]
+    )
+
+
+# ---------------------------- manifest ----------------------------
+def _manifest_path(root: str) -> Path:
+    return Path(root) / "manifest.json"
+
+
+def load_manifest(root: str = ROOT) -> dict:
+    path = _manifest_path(root)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_manifest(root: str, manifest: dict) -> None:
+    path = _manifest_path(root)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _signatures(conn: sqlite3.Connection, table: str, key: str) -> Dict[str, list]:
+    """
+    每年一組 (筆數, 最大期間, open / high / low / close / volume 各自的總和)；
+    任何寫入（含補舊資料、只更正某一個欄位）都會改變簽章
+    """
+    totals = ", ".join(f"ROUND(TOTAL({c}), 4)" for c in (*PRICE_COLUMNS, "volume"))
+    rows = conn.execute(
+        f"SELECT substr({key}, 1, 4) AS y, COUNT(*), MAX({key}), {totals} FROM {table} GROUP BY y"
+    ).fetchall()
+    return {y: list(rest) for y, *rest in rows if y}
+
+
+def _has_table(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+# ---------------------------- 寫入 ----------------------------
+def _build_year(conn: sqlite3.Connection, table: str, key: str, year: str):
+    import pyarrow as pa
+
+    rows = conn.execute(
+        f"SELECT stock_id, {key}, open, high, low, close, volume FROM {table} "
+        f"WHERE {key} >= ? AND {key} < ? ORDER BY stock_id, {key}",
+        (year, str(int(year) + 1)),
+    ).fetchall()
+    schema = _schema(key)
+    if not rows:
+        return schema.empty_table()
+    cols = list(zip(*rows))
+    arrays = [
+        pa.array([str(s) for s in cols[0]], pa.string()).dictionary_encode(),
+        pa.array([period_to_int(k) for k in cols[1]], pa.int32()),
+    ]
+    arrays += [pa.array(cols[i], pa.float64()).cast(pa.float32()) for i in range(2, 6)]
+    arrays.append(pa.array([int(v) if v is not None else None for v in cols[6]], pa.int64()))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_partition(table, path: Path) -> None:
+    from pyarrow import feather
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    feather.write_feather(table, tmp, compression="uncompressed")
+    os.replace(tmp, path)
+
+
+def sync(db_path: str = DB_PATH, root: str = ROOT, freqs: Sequence[str] = tuple(FREQS)) -> Dict[str, List[str]]:
+    """依簽章增量更新鏡像；回傳 {freq: [重寫的年份]}"""
+    manifest = load_manifest(root)
+    rebuilt: Dict[str, List[str]] = {}
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        for freq in freqs:
+            table, key = FREQS[freq]
+            if not _has_table(conn, table):
+                continue
+            current = _signatures(conn, table, key)
+            previous = manifest.get(freq, {})
+            base = Path(root) / freq
+
+            changed = sorted(y for y, sig in current.items() if previous.get(y) != sig)
+            for year in changed:
+                _write_partition(_build_year(conn, table, key, year), base / f"year={year}" / "part.arrow")
+            for year in set(previous) - set(current):  # 來源已無資料的年份
+                shutil.rmtree(base / f"year={year}", ignore_errors=True)
+
+            manifest[freq] = current
+            rebuilt[freq] = changed
+            _save_manifest(root, manifest)
+    finally:
+        conn.close()
+    return rebuilt
+
+
+# ---------------------------- 讀取 ----------------------------
+def latest_period(freq: str = "daily", root: str = ROOT) -> Optional[int]:
+    """鏡像中最新的期間（int），不必開檔"""
+    sigs = load_manifest(root).get(freq) or {}
+    return max((period_to_int(sig[1]) for sig in sigs.values()), default=None)
+
+
+def open_dataset(freq: str = "daily", root: str = ROOT):
+    """pyarrow.dataset（mmap 開啟、year 為 hive 分區欄位）；DuckDB 等可直接掃描"""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    base = Path(root) / freq
+    if not base.exists():
+        raise FileNotFoundError(f"{base} 不存在，請先執行 python src/common/columnar_store.py --sync")
+    return ds.dataset(
+        str(base), format="ipc", filesystem=fs.LocalFileSystem(use_mmap=True),
+        partitioning=ds.partitioning(pa.schema([("year", pa.int32())]), flavor="hive"),
+    )
+
+
+def load_table(freq: str = "daily", columns: Optional[Iterable[str]] = None, start=None, end=None,
+               stock_ids: Optional[Iterable[str]] = None, root: str = ROOT):
+    """
+    回傳 pyarrow.Table：只讀需要的欄位；start / end（含，與該 freq 的期間格式相同）
+    先以年份分區剪枝，再以期間欄位過濾。
+    檔案以 mmap 開啟，沒有過濾條件的欄位不會複製。
+    """
+    import pyarrow.dataset as ds
+
+    _, key = FREQS[freq]
+    dataset = open_dataset(freq, root)
+    # 週 / 月的期間欄位少兩位數（YYYYWW / YYYYMM）
+    scale = 10000 if freq == "daily" else 100
+    expr = None
+
+    def _and(e):
+        return e if expr is None else expr & e
+
+    if start is not None:
+        s = period_to_int(start)
+        expr = _and((ds.field("year") >= s // scale) & (ds.field(key) >= s))
+    if end is not None:
+        e = period_to_int(end)
+        expr = _and((ds.field("year") <= e // scale) & (ds.field(key) <= e))
+    if stock_ids is not None:
+        expr = _and(ds.field("stock_id").isin([str(s) for s in stock_ids]))
+
+    columns = list(columns) if columns is not None else list(_schema(key).names)
+    return dataset.to_table(columns=columns, filter=expr)
+
+
+def load_prices(freq: str = "daily", columns: Optional[Iterable[str]] = None, start=None, end=None,
+                stock_ids: Optional[Iterable[str]] = None, root: str = ROOT, parse_dates: bool = True):
+    """
+    load_table 的 pandas 版：stock_id 為 categorical、價格 float32；
+    parse_dates=True 時日K的 date 在 Arrow 端轉為 datetime64（不經過 Python 字串）。
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = load_table(freq, columns, start, end, stock_ids, root)
+    if parse_dates and freq == "daily" and "date" in table.column_names:
+        idx = table.column_names.index("date")
+        parsed = pc.strptime(pc.cast(table.column(idx), pa.string()), format="%Y%m%d", unit="s")
+        table = table.set_column(idx, "date", parsed)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="twse_prices 欄式鏡像（Arrow IPC）")
+    ap.add_argument("--sync", action="store_true", help="由 SQLite 增量更新鏡像")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--root", default=ROOT)
+    ap.add_argument("--freq", nargs="*", choices=list(FREQS), default=list(FREQS))
+    args = ap.parse_args()
+    if args.sync:
+        for freq, years in sync(args.db, args.root, args.freq).items():
+            print(f"✅ {freq}: 重寫 {len(years)} 個年份 {years}" if years else f"✅ {freq}: 無變動")
+    else:
+        ap.print_help()
@@ -1,20 +1,96 @@
 import pandas as pd
 import sqlite3
+from common.db_writer import open_reader
+
+PRICE_COLUMNS = ("stock_id", "date", "open", "high", "low", "close", "volume")
+
+
+def load_price_frame(
+    conn: sqlite3.Connection,
+    stock_ids=None,
+    columns=None,
+    start: str = None,
+    end: str = None,
+    price_dtype: str = "float32",
+    chunksize: int = 200_000,
+) -> pd.DataFrame:
+    """
+    以精簡型別讀取 twse_prices：OHLC 為 float32（price_dtype）、volume 為 int64（NULL 視為 0）、
+    stock_id 為 category、date 在讀取時以固定格式解析成 datetime64（不再另外 pd.to_datetime）。
+
+    columns 只讀需要的欄位；分批讀取並逐批轉型，全市場載入時不會先堆出整份 float64/object 的暫存。
+    """
+    columns = list(columns or PRICE_COLUMNS)
+    unknown = [c for c in columns if c not in PRICE_COLUMNS]
+    if unknown:
+        raise ValueError(f"未知的欄位：{unknown}")
+
+    conds, params = [], []
+    if stock_ids is not None:
+        stock_ids = [str(s) for s in stock_ids]
+        conds.append(f"stock_id IN ({','.join(['?'] * len(stock_ids))})")
+        params.extend(stock_ids)
+    if start:
+        conds.append("date >= ?")
+        params.append(str(start))
+    if end:
+        conds.append("date <= ?")
+        params.append(str(end))
+    where = (" WHERE " + " AND ".join(conds)) if conds else ""
+
+    id_dtype = None
+    if "stock_id" in columns:
+        ids = stock_ids if stock_ids is not None else [
+            r[0] for r in conn.execute("SELECT DISTINCT stock_id FROM twse_prices")
+        ]
+        id_dtype = pd.CategoricalDtype(sorted(set(ids)))
+
+    order = [c for c in ("stock_id", "date") if c in columns]
+    sql = f"SELECT {', '.join(columns)} FROM twse_prices{where}"
+    if order:
+        sql += " ORDER BY " + ", ".join(order)
+
+    parse_dates = {"date": {"format": "%Y-%m-%d"}} if "date" in columns else None
+    chunks = []
+    for chunk in pd.read_sql_query(sql, conn, params=params, parse_dates=parse_dates, chunksize=chunksize):
+        for col in ("open", "high", "low", "close"):
+            if col in chunk:
+                chunk[col] = chunk[col].astype(price_dtype)
+        if "volume" in chunk:
+            chunk["volume"] = chunk["volume"].fillna(0).astype("int64")
+        if id_dtype is not None:
+            chunk["stock_id"] = chunk["stock_id"].astype(str).astype(id_dtype)
+        chunks.append(chunk)
+
+    if not chunks:
+        empty = pd.DataFrame(columns=columns)
+        for col in ("open", "high", "low", "close"):
+            if col in empty:
+                empty[col] = empty[col].astype(price_dtype)
+        if "volume" in empty:
+            empty["volume"] = empty["volume"].astype("int64")
+        if "date" in empty:
+            empty["date"] = empty["date"].astype("datetime64[ns]")
+        if id_dtype is not None:
+            empty["stock_id"] = empty["stock_id"].astype(id_dtype)
+        return empty
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """DataFrame 實際佔用的記憶體（含 object 字串），單位 MB"""
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
 
 def fetch_stock_history_from_db(conn: sqlite3.Connection, stock_code: str) -> pd.DataFrame:
     """
     從資料庫中抓取指定股票代碼的歷史收盤價與成交量資料。
+    收盤價維持 float64：篩選結果會直接輸出成報表。
     """
-    query = '''
-        SELECT date, close AS Close, volume AS Volume
-        FROM twse_prices
-        WHERE stock_id = ?
-        ORDER BY date
-    '''
-    df = pd.read_sql_query(query, conn, params=(stock_code,))
+    df = load_price_frame(conn, [stock_code], columns=["date", "close", "volume"], price_dtype="float64")
     if df.empty:
         return df
-    df["date"] = pd.to_datetime(df["date"])
+    df = df.rename(columns={"close": "Close", "volume": "Volume"})
     df.set_index("date", inplace=True)
     return df
 
@@ -23,7 +99,7 @@ def fetch_close_history_from_db(stock_id: str, db_path: str = "data/institution.
     """
     從 SQLite 資料庫中讀取某檔股票的每日收盤價。
     """
-    conn = sqlite3.connect(db_path)
+    conn = open_reader(db_path)
     try:
         df = pd.read_sql_query(
             "SELECT date, close FROM twse_prices WHERE stock_id = ? ORDER BY date",
@@ -38,7 +114,7 @@ def fetch_close_history_trading_only_from_db(stock_id: str, db_path: str = "data
     僅回傳「有收盤價(>0)」的交易日序列，用於排除停牌或無收盤價的日期。
     欄位：date, close；依日期由小到大排序。
     """
-    conn = sqlite3.connect(db_path)
+    conn = open_reader(db_path)
     try:
         df = pd.read_sql_query(
             """
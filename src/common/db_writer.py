@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+institution.db 的單一寫入者 (single writer)：所有寫入排進同一個 queue，由一條 writer thread
+以「群組交易」(group commit) 一次 commit 多個批次，取代各處自己的 execute_with_retry /
+commit_with_retry 與 threading.Lock。
+
+- 同一個 process 內：get_writer() 回傳共用的 DBWriter（背景 thread）
+- 跨 process（Streamlit、背景 update_single_stock_*、排程）：先啟動寫入服務
+      python src/common/db_writer.py --serve
+  之後 get_writer() 會自動改連到服務（multiprocessing.connection，只聽 127.0.0.1）；
+  連線的 authkey 是每個使用者各自的隨機金鑰（common.local_secret：data/.db_writer.key，權限 0600，
+  或環境變數 DB_WRITER_AUTHKEY），其他使用者的 process 不能送 SQL 進來
+  服務沒開時退回 process 內的 DBWriter，行為不變；服務中途重啟 / 結束時，下一次寫入自動重連
+  （連不上就改用 process 內的 DBWriter）並重送該批次
+- 每個批次各自一個 SAVEPOINT：單一批次失敗只回滾自己，不影響同一交易內的其他批次
+- 讀取端用 open_reader()：WAL 快照讀取，不會被寫入擋住（common.query_cache / stock_prefetch、
+  common.db_helpers、ui.price_break_display_module、ui.peg_calculator 都已改用）
+- 每次 commit 順便把有變動的資料表在 table_versions 的版本號 +1（common.query_cache 用來判斷快取是否過期）
+
+使用方式
+    from common.db_writer import get_writer
+
+    writer = get_writer()
+    inserted = writer.executemany(
+        "INSERT OR IGNORE INTO holder_concentration VALUES (?, ?, ?, ?, ?)", rows
+    )                                     # 回傳實際變動筆數（已 commit）
+    future = writer.submit(sql, rows)     # 不等待；future.result() 取得變動筆數
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+DB_PATH = "data/institution.db"
+DEFAULT_ADDRESS = ("127.0.0.1", 6553)
+AUTHKEY_NAME = "db_writer"
+AUTHKEY_ENV = "DB_WRITER_AUTHKEY"
+MAX_BATCH_JOBS = 64     # 一個交易最多合併幾個批次
+LINGER = 0.02           # 取到第一個批次後，最多再等多久收集同一交易的其他批次（秒）
+
+_WRITE_TARGET = re.compile(
+    r"^\s*(?:(?:INSERT|REPLACE)\b.*?\bINTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[\"`\[]?(\w+)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+_writers: Dict[str, "DBWriter"] = {}
+_writers_lock = threading.Lock()
+_STOP = object()
+
+
+def _resolve(db_path: str) -> str:
+    return str(Path(db_path).resolve())
+
+
+def _configure(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA busy_timeout = 30000;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+
+
+def written_table(sql: Optional[str]) -> Optional[str]:
+    """INSERT / REPLACE / UPDATE / DELETE 寫入的資料表名稱；DDL 與其他語句回傳 None"""
+    match = _WRITE_TARGET.match(sql or "")
+    return match.group(1) if match else None
+
+
+def ensure_table_versions(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version    INTEGER NOT NULL,
+            updated_at TEXT
+        )
+    """)
+
+
+def bump_table_versions(conn: sqlite3.Connection, tables: Iterable[str]) -> None:
+    """在呼叫端的交易內把 tables 的版本號 +1；不經 DBWriter 的寫入也可以自行呼叫"""
+    conn.executemany(
+        """
+        INSERT INTO table_versions (table_name, version, updated_at) VALUES (?, 1, datetime('now', 'localtime'))
+        ON CONFLICT(table_name) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at
+        """,
+        [(t,) for t in sorted(set(tables))],
+    )
+
+
+def open_reader(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """唯讀連線：WAL 下讀取的是交易開始時的快照，不會與 writer 互卡（autocommit，不會長時間佔著讀取交易）"""
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+    _configure(conn)
+    conn.execute("PRAGMA query_only = ON;")
+    return conn
+
+
+class DBWriter:
+    def __init__(self, db_path: str = DB_PATH, max_batch_jobs: int = MAX_BATCH_JOBS, linger: float = LINGER):
+        self.db_path = db_path
+        self.max_batch_jobs = max_batch_jobs
+        self.linger = linger
+        self.stats = {"jobs": 0, "transactions": 0, "failed_jobs": 0}
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"db-writer:{Path(db_path).name}", daemon=True)
+        self._thread.start()
+
+    # ---- producer ----
+    def submit(self, sql: Optional[str], rows: Iterable[Sequence] = ((),)) -> Future:
+        """排入一個批次（同一句 SQL 套多筆參數）；Future 結果為實際變動筆數，commit 後才完成"""
+        future: Future = Future()
+        if not self._thread.is_alive():
+            raise RuntimeError("DBWriter 已關閉")
+        self._queue.put((sql, list(rows), future))
+        return future
+
+    def executemany(self, sql: str, rows: Iterable[Sequence]) -> int:
+        rows = list(rows)
+        if not rows:
+            return 0
+        return self.submit(sql, rows).result()
+
+    def execute(self, sql: str, params: Sequence = ()) -> int:
+        return self.submit(sql, [params]).result()
+
+    def flush(self) -> None:
+        """等到目前排隊中的批次都 commit 完"""
+        self.submit(None, []).result()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    # ---- writer thread ----
+    def _collect(self, first) -> list:
+        jobs = [first]
+        deadline = time.monotonic() + self.linger
+        while len(jobs) < self.max_batch_jobs:
+            timeout = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            jobs.append(job)
+            if job is _STOP:
+                break
+        return jobs
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        _configure(conn)
+        ensure_table_versions(conn)
+        try:
+            while True:
+                jobs = self._collect(self._queue.get())
+                stop = jobs[-1] is _STOP
+                if stop:
+                    jobs.pop()
+                if jobs:
+                    self._commit_group(conn, jobs)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _commit_group(self, conn: sqlite3.Connection, jobs: list) -> None:
+        results = []
+        changed = set()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for sql, rows, future in jobs:
+                before = conn.total_changes
+                conn.execute("SAVEPOINT job")
+                try:
+                    if sql is None:       # flush() 的標記
+                        pass
+                    elif len(rows) == 1:  # 單句（含 CREATE TABLE 等 DDL）
+                        conn.execute(sql, rows[0])
+                    else:
+                        conn.executemany(sql, rows)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    results.append((future, e))
+                else:
+                    results.append((future, conn.total_changes - before))
+                    if conn.total_changes != before and written_table(sql):
+                        changed.add(written_table(sql))
+                conn.execute("RELEASE job")
+            if changed:
+                bump_table_versions(conn, changed)
+            conn.execute("COMMIT")
+        except Exception as e:  # BEGIN / COMMIT 失敗（如 busy_timeout 仍拿不到鎖）→ 整組失敗
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [(future, e) for _, _, future in jobs]
+
+        self.stats["transactions"] += 1
+        for future, result in results:
+            self.stats["jobs"] += 1
+            if isinstance(result, Exception):
+                self.stats["failed_jobs"] += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class RemoteWriter:
+    """
+    連到 --serve 啟動的寫入服務；介面與 DBWriter 相同。
+    連線斷掉（服務重啟 / 結束）時換成 _replace_writer() 給的新 writer，並把這個批次重送一次
+    （批次在同一個交易內，斷線時不是已 commit 就是整批沒寫入；INSERT OR IGNORE / upsert 重送無害）
+    """
+
+    def __init__(self, conn, db_path: str):
+        self._conn = conn
+        self._lock = threading.Lock()
+        self._replacement = None
+        self.db_path = db_path
+
+    def _write(self, sql: str, rows: list) -> int:
+        with self._lock:
+            if self._replacement is None:
+                try:
+                    self._conn.send(("write", sql, rows))
+                    status, value = self._conn.recv()
+                except (EOFError, OSError) as e:
+                    print(f"⚠️ DB 寫入服務連線中斷，重新連線：{e}")
+                    self._close_quietly()
+                    self._replacement = _replace_writer(self)
+                else:
+                    if status == "error":
+                        raise value
+                    return value
+            replacement = self._replacement
+        return replacement.submit(sql, rows).result()
+
+    def submit(self, sql: str, rows: Iterable[Sequence] = ((),)) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(self._write(sql, list(rows)))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def executemany(self, sql: str, rows: Iterable[Sequence]) -> int:
+        rows = list(rows)
+        if not rows:
+            return 0
+        return self._write(sql, rows)
+
+    def execute(self, sql: str, params: Sequence = ()) -> int:
+        return self._write(sql, [params])
+
+    def flush(self) -> None:
+        pass  # 每次呼叫都已等到 commit
+
+    def _close_quietly(self) -> None:
+        try:
+            self._conn.close()
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        self._close_quietly()
+
+
+def _authkey(create: bool = False) -> Optional[bytes]:
+    from common.local_secret import load_secret
+
+    key = load_secret(AUTHKEY_NAME, AUTHKEY_ENV, create=create)
+    return key.encode("utf-8") if key else None
+
+
+def _server_address() -> Tuple[str, int]:
+    value = os.getenv("DB_WRITER_ADDRESS")
+    if not value:
+        return DEFAULT_ADDRESS
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _connect_remote(db_path: str) -> Optional[RemoteWriter]:
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+
+    authkey = _authkey()
+    if authkey is None:         # 沒有金鑰 → 服務沒在這個使用者下啟動過
+        return None
+    try:
+        conn = Client(_server_address(), authkey=authkey)
+        conn.send(("hello",))
+        _, served_path = conn.recv()
+    except (OSError, EOFError, AuthenticationError):
+        return None
+    if served_path != _resolve(db_path):
+        conn.close()
+        return None
+    return RemoteWriter(conn, db_path)
+
+
+def get_writer(db_path: str = DB_PATH):
+    """寫入服務有開且服務同一個 DB → RemoteWriter；否則 process 內共用的 DBWriter"""
+    key = _resolve(db_path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _connect_remote(db_path) or DBWriter(db_path)
+            _writers[key] = writer
+        return writer
+
+
+def _replace_writer(stale: RemoteWriter):
+    """把斷線的 RemoteWriter 從快取移除，改用重新連線的服務或 process 內的 DBWriter"""
+    key = _resolve(stale.db_path)
+    with _writers_lock:
+        if _writers.get(key) is stale:
+            del _writers[key]
+    return get_writer(stale.db_path)
+
+
+@atexit.register
+def close_all() -> None:
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+# ---------------------------- 寫入服務 ----------------------------
+def _serve_client(conn, writer: DBWriter) -> None:
+    with conn:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            if message[0] == "hello":
+                conn.send(("ok", _resolve(writer.db_path)))
+                continue
+            _, sql, rows = message
+            try:
+                conn.send(("ok", writer.submit(sql, rows).result()))
+            except Exception as e:
+                conn.send(("error", e))
+
+
+def serve(db_path: str = DB_PATH, address: Optional[Tuple[str, int]] = None) -> None:
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Listener
+
+    writer = DBWriter(db_path)
+    address = address or _server_address()
+    with Listener(address, authkey=_authkey(create=True)) as listener:
+        print(f"🗄️ DB 寫入服務啟動：{address[0]}:{address[1]} → {_resolve(db_path)}")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError, OSError) as e:   # 金鑰不符 / 半途斷線：拒絕這條就好
+                    print(f"⚠️ 拒絕 DB 寫入連線：{e!r}")
+                    continue
+                threading.Thread(target=_serve_client, args=(conn, writer), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            writer.close()
+            print(f"🛑 DB 寫入服務結束：{writer.stats}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="institution.db 單一寫入服務")
+    ap.add_argument("--serve", action="store_true", help="啟動跨 process 寫入服務")
+    ap.add_argument("--db", default=DB_PATH)
+    args = ap.parse_args()
+    if args.serve:
+        serve(args.db)
+    else:
+        ap.print_help()
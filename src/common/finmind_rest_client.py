@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FinMind v4 REST 的共用 client（取代各檔案自己 requests.get 的寫法）：
+
+- requests.Session + Bearer token（連線重用），token 預設讀 .env 的 FINMIND_TOKEN
+- 日期區間一次查完（start_date ~ end_date），不再一天一個 request
+- 連線錯誤 / 5xx 指數退避重試；402（超過用量上限）與其他 4xx 直接拋出，不浪費額度
+- fetch_many() 以有限的並行數 fan out 多檔股票
+- ttl > 0 時走 common.response_cache（key 不含 token）
+
+使用方式
+    from common.finmind_rest_client import FinMindRestClient
+
+    client = FinMindRestClient()
+    rows = client.get("TaiwanStockPrice", "2330", "2025-06-01", "2025-08-15")
+    results = client.fetch_many("TaiwanStockPrice", ["2330", "2317"], "2025-08-01", "2025-08-15")
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Union
+
+from common import replay, response_cache
+
+FINMIND_API = "https://api.finmindtrade.com/api/v4/data"
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0   # 秒；第 n 次重試等待 BACKOFF_BASE * 2**(n-1)
+MAX_WORKERS = 4
+
+
+class FinMindRestError(RuntimeError):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class FinMindRestClient:
+    def __init__(self, token: Optional[str] = None, session=None, timeout: float = 20.0,
+                 max_workers: int = MAX_WORKERS):
+        if token is None:
+            from dotenv import load_dotenv
+            load_dotenv()
+            token = os.getenv("FINMIND_TOKEN")
+        if session is None and replay.replaying():
+            session = replay.OfflineSession()
+        elif session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+        if token:
+            session.headers["Authorization"] = f"Bearer {token}"
+        self.session = session
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+
+    def close(self) -> None:
+        self.session.close()
+
+    # ---- 單一 dataset 查詢 ----
+    def get(self, dataset: str, data_id: Optional[str] = None, start_date: Optional[str] = None,
+            end_date: Optional[str] = None, ttl: float = 0, **extra) -> List[dict]:
+        """回傳 FinMind 的 data 列表（list of dict）；查無資料回傳 []"""
+        params = {"dataset": dataset, **extra}
+        if data_id is not None:
+            params["data_id"] = data_id
+        if start_date is not None:
+            params["start_date"] = start_date
+        if end_date is not None:
+            params["end_date"] = end_date
+
+        if ttl > 0:
+            body = response_cache.get(FINMIND_API, params, ttl)
+            if body is not None:
+                return json.loads(body).get("data", [])
+
+        payload, content = self._request(params)
+        rows = payload.get("data") or []
+        if ttl > 0 and rows:
+            response_cache.put(FINMIND_API, params, content)
+        return rows
+
+    def get_df(self, dataset: str, data_id: Optional[str] = None, start_date: Optional[str] = None,
+               end_date: Optional[str] = None, ttl: float = 0, **extra):
+        import pandas as pd
+        return pd.DataFrame(self.get(dataset, data_id, start_date, end_date, ttl=ttl, **extra))
+
+    def _request(self, params: dict):
+        last_error = None
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                resp = self._send(params)
+            except replay.ReplayMiss:
+                raise
+            except Exception as e:  # 連線錯誤、逾時
+                last_error = FinMindRestError(f"{type(e).__name__}: {e}")
+            else:
+                with self._stats_lock:
+                    self.requests += 1
+                try:
+                    payload = resp.json()
+                except ValueError:
+                    payload = {}
+                status = payload.get("status", resp.status_code)
+                if resp.status_code == 200 and status == 200:
+                    return payload, resp.content
+                error = FinMindRestError(payload.get("msg") or f"HTTP {resp.status_code}", status)
+                if resp.status_code < 500 and status < 500:
+                    raise error  # 402 額度用完 / 參數錯誤：重試沒有意義
+                last_error = error
+            if attempt < MAX_RETRIES:
+                time.sleep(BACKOFF_BASE * 2 ** (attempt - 1))
+        raise last_error
+
+    def _send(self, params: dict):
+        """FETCH_REPLAY 啟用時改為錄製 / 重播（見 common.replay）"""
+        store = replay.active_store()
+        key = response_cache.cache_key(FINMIND_API, params)
+        if store is not None and store.replaying:
+            return replay.ReplayResponse(store.load("finmind_rest", key))
+        resp = self.session.get(FINMIND_API, params=params, timeout=self.timeout)
+        if store is not None and resp.status_code == 200:
+            store.save("finmind_rest", key, {"params": params}, resp.content)
+        return resp
+
+    # ---- 多檔 fan out ----
+    def fetch_many(self, dataset: str, data_ids: Iterable[str], start_date: str, end_date: str,
+                   ttl: float = 0) -> Dict[str, Union[List[dict], Exception]]:
+        """每檔一個區間 request，最多 max_workers 個同時進行；失敗的檔以 Exception 物件回傳"""
+        data_ids = list(data_ids)
+
+        def _one(data_id):
+            try:
+                return self.get(dataset, data_id, start_date, end_date, ttl=ttl)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(data_ids, executor.map(_one, data_ids)))
+
+
+def price_rows_to_db_rows(stock_id: str, rows: Iterable[dict]) -> list:
+    """TaiwanStockPrice 的 data → twse_prices 欄位順序 (stock_id, date, open, high, low, close, volume)"""
+    return [
+        (stock_id, r["date"], r["open"], r["max"], r["min"], r["close"], r["Trading_Volume"])
+        for r in rows
+        if r.get("close")
+    ]
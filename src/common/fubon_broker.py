@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+富邦 SDK 共用 session broker：一個常駐 process 持有登入後的 SDK 與行情連線（init_realtime 只做一次），
+其他 CLI / Streamlit 透過本機 socket 查行情，不必各自用憑證登入（每次數秒，且有同時 session 上限）。
+
+- 協定：127.0.0.1 上的 TCP，一行一個 JSON（{"method", "params", "authkey"} → {"ok", "result" | "error"}）；
+  每個請求都要帶 authkey，不符就回錯誤並斷線 —— 本機其他使用者 / 網頁不能借用登入後的 session。
+  金鑰每個使用者各自一把（common.local_secret，同 common.db_writer）：環境變數 FUBON_BROKER_AUTHKEY，
+  否則 broker 第一次啟動時產生 data/.fubon_broker.key（0600）；沒有金鑰的用戶端視同 broker 沒在跑
+- 只開放行情：quote(symbol)、snapshot(market)、candles(symbol, from_, to, timeframe)，沒有下單 / 帳務
+- 相同請求合併 (coalescing)：同一個 key 正在向富邦查詢時，其他請求等它的結果，不會重複打 API
+- 短 TTL 快取：即時報價 QUOTE_TTL 秒；日 K 區間含今天 CANDLES_TTL 秒，已收盤的區間 HISTORICAL_TTL 秒
+- 速率限制沿用 common.fubon_rest_client 的 token bucket —— 現在所有 process 共用同一個 bucket
+- get_logged_in_sdk() 偵測到 broker 在跑時回傳 BrokerSDK（介面同 FubonSDK 的行情部分），呼叫端不必改；
+  FUBON_BROKER=off 可停用
+- --realtime：broker 同時維護 WebSocket 即時報價表（common.realtime_quotes），quote() 先查表，
+  觀察清單的報價所有 process 都不必打 REST
+- FakeFubonSDK：離線用的假 SDK（決定性的報價 / 日 K），`fubon_broker.py --fake` 起一個假的 broker
+
+使用方式
+    python src/tools/fubon_broker.py                # 常駐（登入一次）
+    python src/tools/fubon_broker.py --fake         # 離線假資料
+    python src/tools/fubon_broker.py --status
+
+    from common.fubon_broker import BrokerClient
+    client = BrokerClient()
+    client.quote("2330")
+    client.candles("2330", "2025-08-01", "2025-08-15")
+"""
+
+from __future__ import annotations
+
+import hmac
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from common.fubon_rest_client import FubonRestClient, RateLimitError
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+AUTHKEY_NAME = "fubon_broker"           # data/.fubon_broker.key
+AUTHKEY_ENV = "FUBON_BROKER_AUTHKEY"
+QUOTE_TTL = 2.0           # 秒；盤中報價
+CANDLES_TTL = 60.0        # 日 K 區間含今天（盤中還會變）
+HISTORICAL_TTL = 3600.0   # 日 K 區間都在今天以前
+ERROR_TTL = 1.0           # 失敗結果也短暫快取，合併等待的請求拿到同一個錯誤
+CONNECT_TIMEOUT = 0.3
+
+
+class BrokerError(RuntimeError):
+    """broker 回傳的錯誤（富邦 API 失敗、登入失敗…）"""
+
+
+class BrokerAuthError(BrokerError):
+    """authkey 不符，broker 拒絕請求"""
+
+
+def broker_address(address: Optional[str] = None) -> Tuple[str, int]:
+    host, _, port = (address or os.getenv("FUBON_BROKER_ADDR") or DEFAULT_ADDRESS).rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def broker_authkey(authkey: Optional[str] = None, create: bool = False) -> Optional[str]:
+    """指定的 authkey → 環境變數 → 金鑰檔；create=True（broker 端）時沒有就產生，用戶端沒有時回傳 None"""
+    if authkey:
+        return authkey
+    from common.local_secret import load_secret
+
+    return load_secret(AUTHKEY_NAME, AUTHKEY_ENV, create=create)
+
+
+# ---------------------------- 伺服端 ----------------------------
+class SessionBroker:
+    """持有一個登入後的 SDK；行情請求經過 TTL 快取與合併後才呼叫 FubonRestClient"""
+
+    def __init__(self, sdk_factory: Callable[[], Any], clock: Callable[[], float] = time.monotonic,
+                 realtime=None):
+        self._sdk_factory = sdk_factory
+        self.realtime = realtime            # common.realtime_quotes.QuoteTable（--realtime 時）
+        self._clock = clock
+        self._sdk = None
+        self._client: Optional[FubonRestClient] = None
+        self._login_lock = threading.Lock()
+        self._cache: Dict[tuple, tuple] = {}          # key → (到期時間, ok, 結果或錯誤)
+        self._inflight: Dict[tuple, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.stats = {"requests": 0, "realtime": 0, "cache_hits": 0, "coalesced": 0, "upstream": 0, "errors": 0,
+                      "logins": 0}
+
+    # ---- 登入 ----
+    def client(self) -> FubonRestClient:
+        with self._login_lock:
+            if self._client is None:
+                self._sdk = self._sdk_factory()
+                self._client = FubonRestClient(self._sdk)
+                self.stats["logins"] += 1
+            return self._client
+
+    def relogin(self) -> None:
+        """丟掉目前的 session（下一個請求重新登入）"""
+        with self._login_lock:
+            self._logout()
+        with self._lock:
+            self._cache.clear()
+
+    def _logout(self) -> None:
+        sdk, self._sdk, self._client = self._sdk, None, None
+        if sdk is not None:
+            try:
+                sdk.logout()
+            except Exception as e:
+                print(f"⚠️ 登出失敗：{e}")
+
+    def close(self) -> None:
+        with self._login_lock:
+            self._logout()
+
+    # ---- 快取 + 合併 ----
+    def _cached(self, key: tuple, ttl: float, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.stats["requests"] += 1
+        waited = False
+        while True:
+            with self._lock:
+                entry = self._cache.get(key)
+                if entry is not None and entry[0] > self._clock():
+                    self.stats["cache_hits" if not waited else "coalesced"] += 1
+                    break
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    entry = None
+                    break
+            waited = True
+            event.wait()          # 別的連線正在查同一個 key → 等它查完再讀快取
+
+        if entry is None:
+            try:
+                with self._lock:
+                    self.stats["upstream"] += 1
+                try:
+                    entry = (self._clock() + ttl, True, compute())
+                except Exception as e:
+                    with self._lock:
+                        self.stats["errors"] += 1
+                    entry = (self._clock() + ERROR_TTL, False, e)
+                with self._lock:
+                    self._cache[key] = entry
+                    if len(self._cache) > 5000:
+                        now = self._clock()
+                        for k in [k for k, v in self._cache.items() if v[0] <= now]:
+                            del self._cache[k]
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+        _, ok, value = entry
+        if not ok:
+            raise value
+        return value
+
+    # ---- 行情 ----
+    def quote(self, symbol: str) -> dict:
+        live = self.realtime.get(symbol) if self.realtime is not None else None
+        if live is not None:
+            with self._lock:
+                self.stats["requests"] += 1
+                self.stats["realtime"] += 1
+            return live
+        return self._cached(("quote", symbol), QUOTE_TTL, lambda: self.client().quote(symbol))
+
+    def snapshot(self, market: str) -> dict:
+        return self._cached(("snapshot", market), QUOTE_TTL, lambda: self.client().snapshot(market))
+
+    def candles(self, symbol: str, from_: str, to: str, timeframe: str = "D") -> list:
+        ttl = HISTORICAL_TTL if to < date.today().isoformat() else CANDLES_TTL
+        return self._cached(("candles", symbol, from_, to, timeframe), ttl,
+                            lambda: self.client().candles(symbol, from_, to, timeframe))
+
+    def status(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, cached=len(self._cache))
+        status = dict(stats, logged_in=self._client is not None, uptime=round(time.time() - self.started, 1),
+                      pid=os.getpid())
+        if self.realtime is not None:
+            status["realtime_feed"] = dict(self.realtime.stats, healthy=self.realtime.healthy,
+                                           symbols=len(self.realtime.all()))
+        return status
+
+    def handle(self, method: str, params: dict) -> Any:
+        if method == "quote":
+            return self.quote(**params)
+        if method == "snapshot":
+            return self.snapshot(**params)
+        if method == "candles":
+            return self.candles(**params)
+        if method == "ping":
+            return "pong"
+        if method == "status":
+            return self.status()
+        if method == "relogin":
+            self.relogin()
+            return "ok"
+        raise BrokerError(f"未知的 method：{method}")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        broker: SessionBroker = self.server.broker
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if not hmac.compare_digest(str(request.get("authkey", "")).encode("utf-8"),
+                                           self.server.authkey.encode("utf-8")):
+                    self._reply({"ok": False, "error": "authkey 不符", "type": "BrokerAuthError"})
+                    return
+                method = request.get("method")
+                if method == "shutdown":
+                    self._reply({"ok": True, "result": "bye"})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                reply = {"ok": True, "result": broker.handle(method, request.get("params") or {})}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e), "type": type(e).__name__}
+            self._reply(reply)
+
+    def _reply(self, reply: dict) -> None:
+        self.wfile.write((json.dumps(reply, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, broker: SessionBroker, address: Optional[str] = None, authkey: Optional[str] = None):
+        self.broker = broker
+        self.authkey = broker_authkey(authkey, create=True)
+        super().__init__(broker_address(address), _Handler)
+
+    @property
+    def address(self) -> str:
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+    def serve_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="fubon-broker", daemon=True)
+        thread.start()
+        return thread
+
+    def server_close(self):
+        super().server_close()
+        self.broker.close()
+
+
+# ---------------------------- 用戶端 ----------------------------
+class BrokerClient:
+    """每個 thread 各自一條連線（broker 端每條連線一個 thread，可同時處理）"""
+
+    def __init__(self, address: Optional[str] = None, timeout: float = 60.0, authkey: Optional[str] = None):
+        self.address = broker_address(address)
+        self._authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+        sock.settimeout(self.timeout)
+        self._local.sock, self._local.file = sock, sock.makefile("rwb")
+        return self._local.file
+
+    def close(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            self._local.file.close()
+            sock.close()
+            self._local.sock = None
+
+    @property
+    def authkey(self) -> Optional[str]:
+        # 每次呼叫才讀：用戶端可能比 broker 先啟動（金鑰檔是 broker 第一次啟動時才產生）
+        return broker_authkey(self._authkey)
+
+    def call(self, method: str, **params) -> Any:
+        authkey = self.authkey
+        if authkey is None:
+            raise BrokerAuthError(f"沒有 broker 金鑰（{AUTHKEY_ENV} 或 broker 啟動時產生的金鑰檔）")
+        payload = (json.dumps({"method": method, "params": params, "authkey": authkey}) + "\n").encode("utf-8")
+        for attempt in range(2):     # broker 重啟過的舊連線重連一次
+            f = self._local.file if getattr(self._local, "sock", None) else self._connect()
+            try:
+                f.write(payload)
+                f.flush()
+                line = f.readline()
+                if not line:
+                    raise ConnectionError("broker 連線已關閉")
+                break
+            except (OSError, ConnectionError):
+                self.close()
+                if attempt:
+                    raise
+        reply = json.loads(line)
+        if reply["ok"]:
+            return reply["result"]
+        if reply.get("type") == "RateLimitError":
+            raise RateLimitError(reply["error"])
+        if reply.get("type") == "BrokerAuthError":
+            self.close()                 # broker 已斷線
+            raise BrokerAuthError(reply["error"])
+        raise BrokerError(reply["error"])
+
+    def ping(self) -> bool:
+        if self.authkey is None:     # 這個使用者沒啟動過 broker
+            return False
+        try:
+            return self.call("ping") == "pong"
+        except OSError:
+            return False
+        except BrokerAuthError:
+            print("⚠️ broker 拒絕連線：authkey 不符（檢查 FUBON_BROKER_AUTHKEY）")
+            return False
+
+    def quote(self, symbol: str) -> dict:
+        return self.call("quote", symbol=symbol)
+
+    def snapshot(self, market: str) -> dict:
+        return self.call("snapshot", market=market)
+
+    def candles(self, symbol: str, from_: str, to: str, timeframe: str = "D") -> list:
+        return self.call("candles", symbol=symbol, from_=from_, to=to, timeframe=timeframe)
+
+    def status(self) -> dict:
+        return self.call("status")
+
+    def shutdown(self) -> None:
+        self.call("shutdown")
+        self.close()
+
+
+class BrokerSDK:
+    """
+    看起來像登入後的 FubonSDK（只有行情部分），實際轉給 broker：
+    sdk.init_realtime()、sdk.marketdata.rest_client.stock.intraday.quote(symbol=...)、
+    ...historical.candles(symbol=..., from_=..., to=...)；logout() 不會登出共用的 session
+    """
+
+    def __init__(self, client: BrokerClient):
+        self.client = client
+
+        def candles(symbol, from_, to, timeframe="D", **_):
+            return {"symbol": symbol, "timeframe": timeframe, "data": client.candles(symbol, from_, to, timeframe)}
+
+        stock = SimpleNamespace(intraday=SimpleNamespace(quote=lambda symbol, **_: client.quote(symbol)),
+                                snapshot=SimpleNamespace(quotes=lambda market, **_: client.snapshot(market)),
+                                historical=SimpleNamespace(candles=candles))
+        self.marketdata = SimpleNamespace(rest_client=SimpleNamespace(stock=stock))
+
+    def init_realtime(self):
+        pass
+
+    def logout(self):
+        self.client.close()
+        return True
+
+    def __repr__(self):
+        host, port = self.client.address
+        return f"<BrokerSDK {host}:{port}>"
+
+
+def connect_broker_sdk(address: Optional[str] = None) -> Optional[BrokerSDK]:
+    """broker 在跑就回傳 BrokerSDK，否則 None（FUBON_BROKER=off 時一律 None）"""
+    if os.getenv("FUBON_BROKER", "auto").lower() in ("off", "0", "false"):
+        return None
+    client = BrokerClient(address)
+    if not client.ping():
+        return None
+    return BrokerSDK(client)
+
+
+# ---------------------------- 離線假 SDK ----------------------------
+class FakeFubonSDK:
+    """
+    離線用的假富邦 SDK：報價 / 日 K 由股票代號決定（同一天同一檔結果固定），欄位格式同真實 API。
+    latency 模擬每次呼叫的網路延遲；calls 記錄呼叫次數（測試合併 / 快取用）。
+    """
+
+    def __init__(self, latency: float = 0.0, login_delay: float = 0.0, today: Optional[date] = None):
+        self.latency = latency
+        self.login_delay = login_delay
+        self.today = today or date.today()
+        self.calls = {"login": 0, "init_realtime": 0, "quote": 0, "candles": 0, "snapshot": 0}
+        self.symbols = {"TSE": [], "OTC": []}       # snapshot 回傳的股票（預設空市場）
+        self._lock = threading.Lock()
+        stock = SimpleNamespace(intraday=SimpleNamespace(quote=self._quote),
+                                historical=SimpleNamespace(candles=self._candles),
+                                snapshot=SimpleNamespace(quotes=self._snapshot))
+        self.marketdata = SimpleNamespace(rest_client=SimpleNamespace(stock=stock))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+
+    def login(self, *args, **kwargs):
+        self._count("login")
+        time.sleep(self.login_delay)
+        return SimpleNamespace(is_success=True, message=None, data=["FAKE-ACCOUNT"])
+
+    def init_realtime(self):
+        self._count("init_realtime")
+
+    def logout(self):
+        return True
+
+    @staticmethod
+    def _bar(symbol: str, day: date) -> dict:
+        seed = zlib.crc32(f"{symbol}:{day.isoformat()}".encode())
+        base = 20 + zlib.crc32(symbol.encode()) % 980
+        close = round(base * (1 + ((seed % 2001) - 1000) / 10000), 2)
+        open_ = round(close * (1 + ((seed >> 11) % 41 - 20) / 1000), 2)
+        return {"date": day.isoformat(), "open": open_, "high": round(max(open_, close) * 1.01, 2),
+                "low": round(min(open_, close) * 0.99, 2), "close": close, "volume": 1000 + seed % 50000}
+
+    def _trading_days(self, start: date, end: date):
+        d = end
+        while d >= start:
+            if d.weekday() < 5:
+                yield d
+            d -= timedelta(days=1)
+
+    def _quote(self, symbol: str, **_) -> dict:
+        self._count("quote")
+        time.sleep(self.latency)
+        return self._quote_fields(symbol)
+
+    def _quote_fields(self, symbol: str) -> dict:
+        days = self._trading_days(self.today - timedelta(days=10), self.today)
+        bar, prev = self._bar(symbol, next(days)), self._bar(symbol, next(days))
+        return {
+            "date": bar["date"], "symbol": symbol, "name": f"FAKE{symbol}",
+            "openPrice": bar["open"], "highPrice": bar["high"], "lowPrice": bar["low"],
+            "closePrice": bar["close"], "previousClose": prev["close"],
+            "total": {"tradeVolume": bar["volume"]},
+            "lastUpdated": int(datetime.now().timestamp() * 1_000_000),
+        }
+
+    def _snapshot(self, market: str, **_) -> dict:
+        self._count("snapshot")
+        time.sleep(self.latency)
+        data = []
+        for symbol in self.symbols.get(market, []):
+            q = self._quote_fields(symbol)
+            data.append({"symbol": symbol, "name": q["name"], "openPrice": q["openPrice"],
+                         "highPrice": q["highPrice"], "lowPrice": q["lowPrice"], "closePrice": q["closePrice"],
+                         "change": round(q["closePrice"] - q["previousClose"], 2),
+                         "tradeVolume": q["total"]["tradeVolume"], "lastUpdated": q["lastUpdated"]})
+        return {"date": self.today.isoformat(), "market": market, "data": data}
+
+    def _candles(self, symbol: str, from_: str, to: str, timeframe: str = "D", **_) -> dict:
+        self._count("candles")
+        time.sleep(self.latency)
+        end = min(date.fromisoformat(to), self.today)
+        data = [self._bar(symbol, d) for d in self._trading_days(date.fromisoformat(from_), end)]
+        return {"symbol": symbol, "type": "EQUITY", "timeframe": timeframe, "data": data}
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+富邦 Neo 行情 REST 的共用包裝：
+
+- init_realtime() 每個 sdk 只做一次（舊程式每抓一檔就呼叫一次）
+- Token bucket 限速：依官方行情 API 速率上限設定（歷史行情 60 次/分、日內行情 300 次/分），
+  多執行緒共用同一個 bucket，取代固定的 time.sleep(1.2)
+- 遇到 429 / rate limit 回應時指數退避 (backoff)，並暫停整個 bucket，不再「盲目重試兩次」
+- 統計每次執行的 request 數、重試、被限流次數、失敗清單、延遲，供 log 摘要
+
+使用方式
+    from common.fubon_rest_client import FubonRestClient
+
+    client = FubonRestClient(sdk)
+    df_rows = client.candles("2330", "2025-08-01", "2025-08-15")
+    print(client.summary())
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+HISTORICAL_PER_MINUTE = 60   # 富邦行情 API：historical/* 上限
+INTRADAY_PER_MINUTE = 300    # 富邦行情 API：intraday/*、snapshot/* 上限
+MAX_RETRIES = 4
+BACKOFF_BASE = 2.0           # 秒；第 n 次重試等待 BACKOFF_BASE * 2**(n-1)
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class TokenBucket:
+    """執行緒安全的 token bucket；capacity 為允許的瞬間突發量。"""
+
+    def __init__(self, per_minute: int, capacity: Optional[int] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1, per_minute // 6)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """被限流時整個 bucket 暫停，並清空突發額度，避免其他執行緒馬上又撞牆。"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+
+def is_rate_limit(payload_or_error: Any) -> bool:
+    if isinstance(payload_or_error, dict):
+        status = payload_or_error.get("statusCode") or payload_or_error.get("status")
+        if status == 429:
+            return True
+        text = str(payload_or_error.get("message", ""))
+    else:
+        text = str(payload_or_error)
+    text = text.lower()
+    return "429" in text or "rate limit" in text or "too many requests" in text
+
+
+class FubonRestClient:
+    def __init__(self, sdk, historical_per_minute: int = HISTORICAL_PER_MINUTE,
+                 intraday_per_minute: int = INTRADAY_PER_MINUTE):
+        self.sdk = sdk
+        self._init_lock = threading.Lock()
+        self._reststock = None
+        self.historical_bucket = TokenBucket(historical_per_minute)
+        self.intraday_bucket = TokenBucket(intraday_per_minute)
+
+        self._stats_lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.stats: Dict[str, Any] = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": [],
+            "latency_total": 0.0,
+        }
+
+    # ---- 連線 ----
+    @property
+    def reststock(self):
+        if self._reststock is None:
+            with self._init_lock:
+                if self._reststock is None:
+                    self.sdk.init_realtime()
+                    self._reststock = self.sdk.marketdata.rest_client.stock
+        return self._reststock
+
+    # ---- 共用呼叫 ----
+    def _call(self, bucket: TokenBucket, label: str, func, **kwargs):
+        last_error = None
+        for attempt in range(1, MAX_RETRIES + 1):
+            bucket.acquire()
+            t0 = time.perf_counter()
+            try:
+                result = func(**kwargs)
+                error = result if is_rate_limit(result) else None
+            except Exception as e:
+                result, error = None, e
+            elapsed = time.perf_counter() - t0
+
+            with self._stats_lock:
+                self.stats["requests"] += 1
+                self.stats["latency_total"] += elapsed
+
+            if error is None:
+                return result
+
+            last_error = error
+            if is_rate_limit(error):
+                wait = BACKOFF_BASE * 2 ** (attempt - 1)
+                bucket.pause(wait)
+                with self._stats_lock:
+                    self.stats["rate_limited"] += 1
+            elif attempt == MAX_RETRIES:
+                break
+            else:
+                time.sleep(BACKOFF_BASE * attempt / 2)
+            with self._stats_lock:
+                self.stats["retries"] += 1
+
+        with self._stats_lock:
+            self.stats["failures"].append((label, str(last_error)))
+        raise RateLimitError(str(last_error)) if is_rate_limit(last_error) else RuntimeError(str(last_error))
+
+    # ---- 行情 API ----
+    def candles(self, symbol: str, from_: str, to: str, timeframe: str = "D") -> List[dict]:
+        result = self._call(
+            self.historical_bucket, symbol, self.reststock.historical.candles,
+            symbol=symbol, from_=from_, to=to, timeframe=timeframe,
+        )
+        return (result or {}).get("data", [])
+
+    def quote(self, symbol: str) -> dict:
+        return self._call(self.intraday_bucket, symbol, self.reststock.intraday.quote, symbol=symbol) or {}
+
+    def snapshot(self, market: str) -> dict:
+        """整個市場（TSE / OTC）的即時快照，一次 request"""
+        return self._call(self.intraday_bucket, f"snapshot:{market}", self.reststock.snapshot.quotes,
+                          market=market) or {}
+
+    # ---- 統計 ----
+    def summary(self) -> str:
+        with self._stats_lock:
+            s = dict(self.stats)
+            failures = list(s["failures"])
+        elapsed = time.perf_counter() - self.started
+        throughput = s["requests"] / elapsed * 60 if elapsed > 0 else 0.0
+        avg_latency = s["latency_total"] / s["requests"] if s["requests"] else 0.0
+        lines = [
+            f"📊 requests: {s['requests']}，重試: {s['retries']}，被限流: {s['rate_limited']}，失敗: {len(failures)}",
+            f"⏱️ 耗時 {elapsed:.1f}s，吞吐 {throughput:.1f} req/min，平均延遲 {avg_latency * 1000:.0f} ms",
+        ]
+        if failures:
+            lines.append("⚠️ 失敗清單: " + ", ".join(label for label, _ in failures))
+        return "\n".join(lines)
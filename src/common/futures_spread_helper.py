@@ -1,115 +1,221 @@
-import os
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+台指期現價差服務（in-process）：取代「subprocess 執行 get_tw_fut_spread.py --json + JSON 快取檔」。
+
+- 每日價差存在 institution.db 的 futures_spread_daily（歷史可畫圖 / 回測），寫入經過 common.db_writer
+- 快取是否過期看交易日曆（common.trading_calendar），不再掃 twse_prices 的 MAX(date)：
+  交易日 PUBLISH_TIME 之後應有當天的價差，之前（或休市日）應有前一個交易日的
+- 需要更新時直接呼叫 futures_spread.get_tw_fut_spread.compute_tw_fut_spread（TX 走 FinMind 磁碟快取、
+  ^TWII 收盤在 process 內記憶）；資料源還沒更新時 RETRY_SECONDS 內不重抓，rerun 直接回傳快取
+- 舊的 data/futures_spread_cache.json 第一次啟動時匯入歷史表
+
+使用方式
+    from common.futures_spread_helper import get_spread_service, get_futures_spread_info
+
+    service = get_spread_service()
+    spread = service.latest()            # FuturesSpread 或 None
+    rows = service.history(days=60)      # 近 60 個交易日
+    info = get_futures_spread_info()     # dict 版（format_futures_spread_display 用）
+"""
+
+from __future__ import annotations
+
 import json
+import os
 import sqlite3
-import subprocess
-from datetime import datetime, date
-from typing import Optional, Dict, Any
-
-def get_latest_trade_date_from_db() -> Optional[str]:
-    """從 twse_prices 資料庫獲取最新交易日期"""
-    try:
-        conn = sqlite3.connect("data/institution.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT MAX(date) FROM twse_prices")
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result and result[0] else None
-    except Exception:
-        return None
-
-def load_futures_spread_cache() -> Optional[Dict[str, Any]]:
-    """讀取期現價差快取檔案"""
-    cache_file = "data/futures_spread_cache.json"
-    if not os.path.exists(cache_file):
-        return None
-    
-    try:
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
-        return None
-
-def save_futures_spread_cache(data: Dict[str, Any]) -> None:
-    """保存期現價差到快取檔案"""
-    cache_file = "data/futures_spread_cache.json"
-    os.makedirs("data", exist_ok=True)
-    
-    try:
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"保存期現價差快取失敗: {e}")
-
-def fetch_futures_spread_data() -> Optional[Dict[str, Any]]:
-    """執行期現價差程式獲取最新資料"""
-    try:
-        import sys
-        script_path = os.path.join("src", "futures_spread", "get_tw_fut_spread.py")
-        
-        # 使用當前 Python 解釋器的完整路徑
-        python_path = sys.executable
-        
-        result = subprocess.run([
-            python_path, script_path, "--json"
-        ], capture_output=True, text=True, encoding='utf-8', cwd=os.getcwd())
-        
-        # print(f"使用 Python: {python_path}")
-        # print(f"工作目錄: {os.getcwd()}")
-        # print(f"執行結果: {result.returncode}")
-        # print(f"stdout: {result.stdout}")
-        # print(f"stderr: {result.stderr}")
-        
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        else:
+import threading
+import time as _time
+from dataclasses import asdict, dataclass, fields
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from common.db_writer import DB_PATH, get_writer
+from common.query_cache import get_query_cache
+from common.trading_calendar import TradingCalendar, get_trading_calendar
+
+LEGACY_CACHE_FILE = "data/futures_spread_cache.json"
+PUBLISH_TIME = time(15, 0)     # 日盤 13:45 收盤，FinMind 期貨日資料約下午更新
+RETRY_SECONDS = 10 * 60        # 資料源還沒有預期交易日的資料時，多久後再試
+
+try:
+    from zoneinfo import ZoneInfo
+    TPE = ZoneInfo("Asia/Taipei")
+except Exception:
+    TPE = timezone(timedelta(hours=8))
+
+
+@dataclass(frozen=True)
+class FuturesSpread:
+    trade_date: str            # YYYY-MM-DD
+    spot_close: float          # 加權指數收盤
+    future_near_month: str     # 近月契約 YYYYMM
+    future_price: float
+    spread_pts: float          # 期貨 - 現貨
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_FIELDS = [f.name for f in fields(FuturesSpread)]
+
+
+def now_tpe() -> datetime:
+    return datetime.now(TPE).replace(tzinfo=None)
+
+
+def expected_trade_date(now: datetime, calendar: TradingCalendar) -> date:
+    """此刻應該拿得到的最新價差交易日"""
+    today = now.date()
+    if calendar.is_trading_day(today) and now.time() >= PUBLISH_TIME:
+        return today
+    return calendar.previous_trading_day(today)
+
+
+def _fetch_spread(on_day: Optional[date]) -> Dict[str, Any]:
+    from futures_spread.get_tw_fut_spread import compute_tw_fut_spread  # yfinance / pandas 用到才 import
+    return compute_tw_fut_spread(on_day, os.environ.get("FINMIND_TOKEN"))
+
+
+def ensure_table(writer) -> None:
+    writer.execute("""
+        CREATE TABLE IF NOT EXISTS futures_spread_daily (
+            trade_date        TEXT PRIMARY KEY,
+            spot_close        REAL,
+            future_near_month TEXT,
+            future_price      REAL,
+            spread_pts        REAL,
+            updated_at        TEXT
+        )
+    """)
+
+
+class FuturesSpreadService:
+    def __init__(self, db_path: str = DB_PATH, fetch: Optional[Callable[[Optional[date]], dict]] = None,
+                 calendar: Optional[TradingCalendar] = None, retry_seconds: float = RETRY_SECONDS):
+        self.db_path = db_path
+        self.retry_seconds = retry_seconds
+        self._fetch = fetch or _fetch_spread
+        self._calendar = calendar
+        self._latest: Optional[FuturesSpread] = None
+        self._last_attempt: Dict[date, float] = {}
+        self._lock = threading.Lock()
+        self._writer = get_writer(db_path)
+        ensure_table(self._writer)
+        self._import_legacy_cache()
+
+    @property
+    def calendar(self) -> TradingCalendar:
+        return self._calendar or get_trading_calendar()
+
+    # ---- 歷史表 ----
+    def save(self, spread: FuturesSpread) -> None:
+        self._writer.execute("""
+            INSERT INTO futures_spread_daily
+                (trade_date, spot_close, future_near_month, future_price, spread_pts, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(trade_date) DO UPDATE SET
+                spot_close=excluded.spot_close,
+                future_near_month=excluded.future_near_month,
+                future_price=excluded.future_price,
+                spread_pts=excluded.spread_pts,
+                updated_at=excluded.updated_at
+        """, [*(getattr(spread, f) for f in _FIELDS), datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+
+    def history(self, days: int = 60) -> List[FuturesSpread]:
+        """近 days 筆（舊 → 新）"""
+        rows = get_query_cache(self.db_path).fetchall(
+            f"SELECT {', '.join(_FIELDS)} FROM futures_spread_daily ORDER BY trade_date DESC LIMIT ?",
+            [days], tables=["futures_spread_daily"],
+        )
+        return [FuturesSpread(*row) for row in reversed(rows)]
+
+    def stored_latest(self) -> Optional[FuturesSpread]:
+        rows = self.history(days=1)
+        return rows[-1] if rows else None
+
+    def stored(self, trade_date: str) -> Optional[FuturesSpread]:
+        rows = get_query_cache(self.db_path).fetchall(
+            f"SELECT {', '.join(_FIELDS)} FROM futures_spread_daily WHERE trade_date = ?",
+            [trade_date], tables=["futures_spread_daily"],
+        )
+        return FuturesSpread(*rows[0]) if rows else None
+
+    def _import_legacy_cache(self) -> None:
+        if not os.path.exists(LEGACY_CACHE_FILE) or self.stored_latest() is not None:
+            return
+        try:
+            with open(LEGACY_CACHE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.save(FuturesSpread(**{k: data[k] for k in _FIELDS}))
+        except (OSError, ValueError, KeyError, TypeError, sqlite3.Error) as e:
+            print(f"⚠️ 舊期現價差快取匯入失敗: {e}")
+
+    # ---- 取得 ----
+    def refresh(self, on_day: Optional[date] = None) -> Optional[FuturesSpread]:
+        """
+        向資料源抓一次並寫入歷史表；加權指數收盤尚未對齊期貨交易日時不寫入。
+        與歷史表同一天的值完全相同時也不寫（寫入會讓 data_version 變動，整張表的查詢快取跟著失效）
+        """
+        try:
+            data = self._fetch(on_day)
+        except Exception as e:
+            print(f"⚠️ 期現價差取得失敗: {e}")
             return None
-    except Exception as e:
-        print(f"執行期現價差程式出錯: {e}")
-        return None
+        spread = FuturesSpread(**{k: data[k] for k in _FIELDS})
+        if data.get("spot_date", spread.trade_date) != spread.trade_date:
+            print(f"⏳ ^TWII {spread.trade_date} 收盤尚未更新，稍後再試")
+            return None
+        if self.stored(spread.trade_date) != spread:
+            self.save(spread)
+        if self._latest is None or spread.trade_date >= self._latest.trade_date:
+            self._latest = spread
+        return spread
+
+    def latest(self, now: Optional[datetime] = None) -> Optional[FuturesSpread]:
+        """依交易日曆判斷快取是否過期；過期才抓（同一個預期交易日 retry_seconds 內只試一次）"""
+        expected = expected_trade_date(now or now_tpe(), self.calendar)
+        with self._lock:
+            if self._latest is not None and self._latest.trade_date >= expected.isoformat():
+                return self._latest
+            stored = self.stored_latest()      # 其他 process 可能已經更新過
+            if stored is not None and stored.trade_date >= expected.isoformat():
+                self._latest = stored
+                return stored
+
+            last = self._last_attempt.get(expected)
+            if last is not None and _time.monotonic() - last < self.retry_seconds:
+                return self._latest or stored
+            self._last_attempt[expected] = _time.monotonic()
+            return self.refresh() or self._latest or stored
+
+
+_service: Optional[FuturesSpreadService] = None
+_service_lock = threading.Lock()
+
+
+def get_spread_service() -> FuturesSpreadService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = FuturesSpreadService()
+        return _service
 
 
 def get_futures_spread_info() -> Optional[Dict[str, Any]]:
-    """
-    獲取期現價差資訊（智慧快取）
-    先檢查快取，如果資料不是最新交易日的就重新獲取
-    """
-    # 確保 data 目錄存在
-    os.makedirs("data", exist_ok=True)
-    
-    latest_trade_date = get_latest_trade_date_from_db()
-    if not latest_trade_date:
-        # 如果無法獲取最新交易日，直接獲取新資料
-        data = fetch_futures_spread_data()
-        if data:
-            save_futures_spread_cache(data)
-        return data
-    
-    # 檢查快取
-    cached_data = load_futures_spread_cache()
-
-    # 👇 這裡比對日期：檢查快取資料的交易日是否等於最新交易日
-    if cached_data and cached_data.get("trade_date") == latest_trade_date:
-        # 快取資料是最新的，直接使用
-        return cached_data
-    
-    # 快取資料過期或不存在，重新獲取
-    fresh_data = fetch_futures_spread_data()
-    if fresh_data:
-        save_futures_spread_cache(fresh_data)
-        return fresh_data
-    
-    # 如果無法獲取新資料，返回快取資料（如果有的話）
-    return cached_data
+    """最新的期現價差（dict）；沒有任何資料時回傳 None"""
+    spread = get_spread_service().latest()
+    return spread.to_dict() if spread else None
 
 
 def format_futures_spread_display(data: Dict[str, Any]) -> str:
     """格式化期現價差資料用於顯示"""
     if not data:
         return "❌ 無法獲取期現價差資料"
-    
+
     def fmt_num(x: float) -> str:
         return f"{x:,.2f}"
-    
+
     def get_market_sentiment(spread_pts: float) -> str:
         """根據期現價差判斷市場情緒"""
         if spread_pts >= 100:
@@ -120,17 +226,17 @@ def format_futures_spread_display(data: Dict[str, Any]) -> str:
             return "😐 市場情緒中立"
         else:
             return "😰 市場情緒悲觀"
-    
+
     sentiment = get_market_sentiment(data['spread_pts'])
-    
+
     return f"""
 **📅 日期:** {data['trade_date']}
 
 **📊 價格資訊:**
 - 加權股價指數: {fmt_num(data['spot_close'])}
-- 台指期: {fmt_num(data['future_price'])}({data['future_near_month']}) 
+- 台指期: {fmt_num(data['future_price'])}({data['future_near_month']})
 
 **💰 期現價差:** {fmt_num(data['spread_pts'])} 點
 
 **🎯 市場解讀:** {sentiment}
-"""
\ No newline at end of file
+"""
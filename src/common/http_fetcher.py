@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共用的網頁抓取層：每個資料來源宣告自己能不能「純 HTTP」取得。
+
+- http_ok=True  ：伺服器端渲染 (server-rendered) 的頁面，直接用共用的 httpx Client
+                   (連線池 / keep-alive) 抓 HTML，不需要開瀏覽器。
+- http_ok=False ：需要 JS 或互動 (選單、點擊) 才有資料的頁面，仍走 Selenium。
+- HTTP 失敗 (被擋、逾時、非 200) 時，自動退回 Selenium 取 page_source；
+  200 但內容不對 (擋爬蟲 / 驗證碼頁、缺資料表) 由呼叫端的 validate(html) 判斷，不通過同樣退回 Selenium。
+
+解析 (parse) 一律交給 fetch/html_parsers.py 的純函式 (輸入 HTML 字串)，
+因此可以直接拿存下來的 HTML fixture 做單元測試，不需要網路。
+
+使用方式
+    from common.http_fetcher import FetchSource, fetch_html
+
+    SOURCE = FetchSource(
+        name="holder_concentration",
+        url_template="https://norway.twsthr.info/StockHolders.aspx?stock={stock_id}",
+        http_ok=True,
+    )
+    html = fetch_html(SOURCE, stock_id="2330")
+    html = fetch_html(SOURCE, validate=lambda html: "<table" in html, stock_id="2330")
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from common import replay, response_cache
+from common.response_cache import cache_key
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
+}
+
+_clients = {}
+_client_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class FetchSource:
+    name: str
+    url_template: str
+    http_ok: bool = True           # True: 純 HTTP 可取得完整 HTML；False: 一定要瀏覽器
+    encoding: Optional[str] = None  # 例如 wearn 為 big5；None 則依 response header
+    selenium_wait: float = 3.0      # Selenium 退路：載入後等待秒數
+
+    def url(self, **params) -> str:
+        return self.url_template.format(**params)
+
+
+def get_http_client(verify: bool = True):
+    """
+    取得全程序共用的 httpx.Client（連線池，thread-safe，延遲建立）。
+    verify=False 另開一個 client：TWSE 的憑證鏈在部分環境驗證失敗，既有程式都用 verify=False。
+    """
+    client = _clients.get(verify)
+    if client is None:
+        with _client_lock:
+            client = _clients.get(verify)
+            if client is None:
+                import httpx
+
+                client = httpx.Client(
+                    headers=DEFAULT_HEADERS,
+                    timeout=httpx.Timeout(15.0, connect=5.0),
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                    follow_redirects=True,
+                    verify=verify,
+                )
+                _clients[verify] = client
+    return client
+
+
+def close_http_client() -> None:
+    with _client_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def _send(url: str, params: Optional[dict], verify: bool, headers: Optional[dict]):
+    """實際送出 request；FETCH_REPLAY 啟用時改為錄製 / 重播（見 common.replay）"""
+    store = replay.active_store()
+    if store is not None and store.replaying:
+        return replay.ReplayResponse(store.load("http", cache_key(url, params)))
+
+    resp = get_http_client(verify).get(url, params=params, headers=headers)
+    resp.raise_for_status()
+    if store is not None:
+        store.save("http", cache_key(url, params), {"url": url, "params": params}, resp.content)
+    return resp
+
+
+def _get_with_retry(url: str, params: Optional[dict], verify: bool, retries: int, delay: float,
+                    headers: Optional[dict] = None):
+    for attempt in range(retries + 1):
+        try:
+            return _send(url, params, verify, headers)
+        except replay.ReplayMiss:
+            raise
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(delay * (attempt + 1))
+
+
+def fetch_html_http(url: str, encoding: Optional[str] = None, retries: int = 2, delay: float = 1.0) -> str:
+    """純 HTTP 抓 HTML；非 2xx 或連線錯誤時重試，最後一次失敗則拋出例外。"""
+    resp = _get_with_retry(url, None, True, retries, delay)
+    if encoding:
+        resp.encoding = encoding
+    return resp.text
+
+
+def _is_cacheable(payload) -> bool:
+    """錯誤回應、查無資料不快取（非交易日 / 尚未公布的空表下次還要再問）"""
+    if not payload:
+        return False
+    if isinstance(payload, dict):
+        if str(payload.get("stat", "OK")).upper() != "OK" or payload.get("status", 200) != 200:
+            return False
+        if "data" in payload and not payload["data"]:
+            return False
+    return True
+
+
+def fetch_json_http(url: str, params: Optional[dict] = None, verify: bool = True,
+                    retries: int = 2, delay: float = 1.0, headers: Optional[dict] = None, ttl: float = 0):
+    """
+    純 HTTP 抓 JSON（交易所 / 櫃買中心的報表 API）。
+    ttl > 0 時先查 common.response_cache（key 為 url + params，不含 headers）；
+    已結束的期間傳 response_cache.FOREVER，當月 / 當日傳 month_ttl() / day_ttl() 的結果。
+    """
+    if ttl > 0:
+        body = response_cache.get(url, params, ttl)
+        if body is not None:
+            return json.loads(body)
+
+    resp = _get_with_retry(url, params, verify, retries, delay, headers)
+    payload = resp.json()
+    if ttl > 0 and _is_cacheable(payload):
+        response_cache.put(url, params, resp.content)
+    return payload
+
+
+def fetch_html_selenium(url: str, wait_seconds: float = 3.0) -> str:
+    """Selenium 退路：開 headless Chrome 取 page_source（只在 HTTP 不可行時使用）。"""
+    store = replay.active_store()
+    if store is not None and store.replaying:
+        return store.load("selenium", cache_key(url)).decode("utf-8")
+
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    try:
+        driver.get(url)
+        time.sleep(wait_seconds)
+        page_source = driver.page_source
+        if store is not None:
+            store.save("selenium", cache_key(url), {"url": url}, page_source.encode("utf-8"))
+        return page_source
+    finally:
+        driver.quit()
+
+
+def fetch_html(source: FetchSource, validate: Optional[Callable[[str], bool]] = None, **params) -> str:
+    """依來源宣告選擇抓取方式：http_ok 先走 HTTP，失敗或 validate(html) 不通過再退回 Selenium。"""
+    url = source.url(**params)
+    if source.http_ok:
+        try:
+            html = fetch_html_http(url, encoding=source.encoding)
+        except Exception as e:
+            print(f"⚠️ {source.name} HTTP 抓取失敗，改用 Selenium：{e}")
+        else:
+            if validate is None or validate(html):
+                return html
+            print(f"⚠️ {source.name} HTTP 回應沒有預期的資料（可能被擋），改用 Selenium")
+    return fetch_html_selenium(url, wait_seconds=source.selenium_wait)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+極簡的 in-process 工作 DAG 執行器。
+
+- 每個 Job 宣告名稱、要執行的函式與相依 (deps)
+- 沒有相依關係的 Job 在 thread pool 中並行；某 Job 完成後，所有相依已完成的下游 Job 立刻開跑
+- 上游失敗 → 下游標記為 skipped（不會拿不完整的資料去算指標）
+- 回傳每個 Job 的狀態與耗時，format_timing_report() 產生耗時報表
+
+Job 函式簽名： func(ctx, inputs) -> Any
+    ctx    : 呼叫端自訂的共用物件（共用登入、股票清單…）
+    inputs : {dep 名稱: 該 dep 的回傳值}
+"""
+
+from __future__ import annotations
+
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    func: Callable[[Any, Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = ()
+
+
+@dataclass
+class JobResult:
+    name: str
+    status: str                 # "ok" / "failed" / "skipped"
+    started: float = 0.0        # 相對於整體開始的秒數
+    elapsed: float = 0.0
+    value: Any = None
+    error: Optional[str] = None
+    deps: Tuple[str, ...] = field(default_factory=tuple)
+
+
+def validate_jobs(jobs: Iterable[Job]) -> List[Job]:
+    jobs = list(jobs)
+    names = [j.name for j in jobs]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Job 名稱重複：{names}")
+    known = set(names)
+    for j in jobs:
+        missing = [d for d in j.deps if d not in known]
+        if missing:
+            raise ValueError(f"{j.name} 相依的 Job 不存在：{missing}")
+
+    # 拓撲排序檢查循環相依
+    remaining = {j.name: set(j.deps) for j in jobs}
+    while remaining:
+        ready = [n for n, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Job 之間有循環相依：{sorted(remaining)}")
+        for n in ready:
+            del remaining[n]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return jobs
+
+
+def select_jobs(jobs: Iterable[Job], only: Iterable[str]) -> List[Job]:
+    """只保留指定的 Job 與其所有上游相依"""
+    by_name = {j.name: j for j in jobs}
+    keep = set()
+    stack = list(only)
+    while stack:
+        name = stack.pop()
+        if name not in by_name:
+            raise ValueError(f"未知的 Job：{name}")
+        if name in keep:
+            continue
+        keep.add(name)
+        stack.extend(by_name[name].deps)
+    return [j for j in jobs if j.name in keep]
+
+
+def run_dag(jobs: Iterable[Job], ctx: Any = None, max_workers: int = 4,
+            log: Callable[[str], None] = print) -> Dict[str, JobResult]:
+    jobs = validate_jobs(jobs)
+    pending = {j.name: j for j in jobs}
+    results: Dict[str, JobResult] = {}
+    t0 = time.perf_counter()
+
+    def _run(job: Job, inputs: Dict[str, Any]) -> JobResult:
+        started = time.perf_counter()
+        log(f"▶️ [{job.name}] 開始")
+        try:
+            value = job.func(ctx, inputs)
+            status, error = "ok", None
+        except (Exception, SystemExit) as e:  # 舊腳本的 exit() 也要攔下，不能讓整個 orchestrator 結束
+            value, status = None, "failed"
+            error = f"{type(e).__name__}: {e}"
+            log(f"❌ [{job.name}] 失敗：{error}\n{traceback.format_exc()}")
+        elapsed = time.perf_counter() - started
+        if status == "ok":
+            log(f"✅ [{job.name}] 完成（{elapsed:.1f}s）")
+        return JobResult(job.name, status, started - t0, elapsed, value, error, job.deps)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while pending or running:
+            changed = True
+            while changed:
+                changed = False
+                for name, job in list(pending.items()):
+                    dep_results = [results.get(d) for d in job.deps]
+                    if any(r is not None and r.status != "ok" for r in dep_results):
+                        failed = [r.name for r in dep_results if r is not None and r.status != "ok"]
+                        results[name] = JobResult(name, "skipped", time.perf_counter() - t0,
+                                                  error=f"上游未完成：{failed}", deps=job.deps)
+                        log(f"⏭️ [{name}] 略過（上游未完成：{', '.join(failed)}）")
+                        del pending[name]
+                        changed = True
+                    elif all(r is not None for r in dep_results):
+                        inputs = {d: results[d].value for d in job.deps}
+                        running[executor.submit(_run, job, inputs)] = name
+                        del pending[name]
+
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+
+    return results
+
+
+def format_timing_report(results: Dict[str, JobResult]) -> str:
+    """依開始時間排序的耗時報表，加上整體 wall-clock 與各 Job 加總（可看出並行省下多少時間）"""
+    icon = {"ok": "✅", "failed": "❌", "skipped": "⏭️"}
+    rows = sorted(results.values(), key=lambda r: r.started)
+    width = max((len(r.name) for r in rows), default=4)
+    lines = [f"{'job'.ljust(width)}  {'start':>8}  {'elapsed':>8}  status"]
+    for r in rows:
+        line = f"{r.name.ljust(width)}  {r.started:8.1f}  {r.elapsed:8.1f}  {icon.get(r.status, r.status)} {r.status}"
+        if r.error and r.status != "ok":
+            line += f"  ({r.error.splitlines()[0][:80]})"
+        lines.append(line)
+    wall = max((r.started + r.elapsed for r in rows), default=0.0)
+    serial = sum(r.elapsed for r in rows)
+    lines.append(f"⏱️ wall-clock {wall:.1f}s，各 Job 加總 {serial:.1f}s")
+    return "\n".join(lines)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 版的批次工作日誌（job journal），取代 wearn_completed.log 這類純文字進度檔。
+
+資料表（與資料同放在 institution.db）
+    job_runs  : 一次批次執行（source + run_key 相同且尚未完成的 run 會被「續跑」）
+    job_items : 每個項目（通常是 stock_id）的狀態 / 嘗試次數 / 最後錯誤 / 耗時
+
+使用方式
+    journal = JobJournal("wearn_prices", run_key=f"{today}:months=13")
+    for stock_id in journal.start(all_ids):          # 只回傳尚未完成、或失敗但還可重試的項目
+        with journal.track(stock_id):                 # 自動記錄耗時；例外 → failed 並往外拋
+            process_stock(stock_id)
+    journal.finish()
+
+    # 或是不丟例外的寫法
+    journal.mark_failed(stock_id, "無資料")
+
+    # 各來源延遲統計（調整並行數用）
+    python src/common/job_journal.py --stats
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+DB_PATH = "data/institution.db"
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def ensure_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_runs (
+            run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+            source      TEXT NOT NULL,
+            run_key     TEXT NOT NULL,
+            status      TEXT NOT NULL,      -- running / finished / partial
+            started_at  TEXT,
+            finished_at TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_items (
+            run_id      INTEGER NOT NULL,
+            item        TEXT NOT NULL,
+            status      TEXT NOT NULL,      -- pending / done / failed
+            attempts    INTEGER NOT NULL DEFAULT 0,
+            last_error  TEXT,
+            duration    REAL,               -- 最後一次嘗試的秒數
+            updated_at  TEXT,
+            PRIMARY KEY (run_id, item)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_source ON job_runs(source, run_key)")
+
+
+class JobJournal:
+    def __init__(self, source: str, run_key: Optional[str] = None, db_path: str = DB_PATH,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.source = source
+        self.run_key = run_key or datetime.today().strftime("%Y-%m-%d")
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.run_id: Optional[int] = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        ensure_tables(self._conn)
+        self._conn.commit()
+
+    # ---- run ----
+    def start(self, items: Iterable[str]) -> List[str]:
+        """
+        建立或續跑 run，回傳這次需要處理的項目（保持輸入順序）：
+        尚未做過的 + 失敗但 attempts < max_attempts 的。
+        """
+        items = [str(i) for i in items]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM job_runs WHERE source = ? AND run_key = ? AND status != 'finished' "
+                "ORDER BY run_id DESC LIMIT 1",
+                (self.source, self.run_key),
+            ).fetchone()
+            if row:
+                self.run_id = row[0]
+                self._conn.execute("UPDATE job_runs SET status = 'running' WHERE run_id = ?", (self.run_id,))
+            else:
+                cur = self._conn.execute(
+                    "INSERT INTO job_runs (source, run_key, status, started_at) VALUES (?, ?, 'running', ?)",
+                    (self.source, self.run_key, _now()),
+                )
+                self.run_id = cur.lastrowid
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO job_items (run_id, item, status, updated_at) VALUES (?, ?, 'pending', ?)",
+                [(self.run_id, item, _now()) for item in items],
+            )
+            self._conn.commit()
+
+            status_map = dict(self._conn.execute(
+                "SELECT item, status || ':' || attempts FROM job_items WHERE run_id = ?", (self.run_id,)
+            ).fetchall())
+
+        todo = []
+        for item in items:
+            status, attempts = status_map[item].split(":")
+            if status == "pending" or (status == "failed" and int(attempts) < self.max_attempts):
+                todo.append(item)
+        resumed = len(items) - len(todo)
+        if row:
+            print(f"♻️ {self.source} 續跑 run #{self.run_id}：略過已完成 {resumed} 項，待處理 {len(todo)} 項")
+        return todo
+
+    def finish(self) -> Dict[str, int]:
+        counts = self.counts()
+        status = "finished" if counts.get("pending", 0) == 0 and counts.get("failed", 0) == 0 else "partial"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_runs SET status = ?, finished_at = ? WHERE run_id = ?", (status, _now(), self.run_id)
+            )
+            self._conn.commit()
+        return counts
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ---- items ----
+    def _update(self, item: str, status: str, error: Optional[str], duration: Optional[float]) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE job_items
+                SET status = ?, attempts = attempts + 1, last_error = ?, duration = ?, updated_at = ?
+                WHERE run_id = ? AND item = ?
+                """,
+                (status, error, duration, _now(), self.run_id, str(item)),
+            )
+            self._conn.commit()
+
+    def mark_done(self, item: str, duration: Optional[float] = None) -> None:
+        self._update(item, "done", None, duration)
+
+    def mark_failed(self, item: str, error: str, duration: Optional[float] = None) -> None:
+        self._update(item, "failed", str(error)[:500], duration)
+
+    @contextmanager
+    def track(self, item: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.mark_failed(item, f"{type(e).__name__}: {e}", time.perf_counter() - started)
+            raise
+        else:
+            self.mark_done(item, time.perf_counter() - started)
+
+    # ---- 查詢 ----
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM job_items WHERE run_id = ? GROUP BY status", (self.run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def failed_items(self) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT item, attempts, last_error FROM job_items WHERE run_id = ? AND status = 'failed' ORDER BY item",
+                (self.run_id,),
+            ).fetchall()
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def latency_stats(db_path: str = DB_PATH, source: Optional[str] = None, last_runs: int = 10) -> List[dict]:
+    """每個來源最近 N 次 run 的單項耗時統計（count / 失敗率 / avg / p50 / p95 / max）"""
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_tables(conn)
+        sources = [source] if source else [r[0] for r in conn.execute("SELECT DISTINCT source FROM job_runs")]
+        stats = []
+        for src in sources:
+            rows = conn.execute(
+                """
+                SELECT i.status, i.duration
+                FROM job_items i
+                JOIN (SELECT run_id FROM job_runs WHERE source = ? ORDER BY run_id DESC LIMIT ?) r
+                  ON r.run_id = i.run_id
+                WHERE i.status IN ('done', 'failed')
+                """,
+                (src, last_runs),
+            ).fetchall()
+            durations = sorted(d for _, d in rows if d is not None)
+            failed = sum(1 for s, _ in rows if s == "failed")
+            stats.append({
+                "source": src,
+                "count": len(rows),
+                "fail_rate": failed / len(rows) if rows else 0.0,
+                "avg": sum(durations) / len(durations) if durations else 0.0,
+                "p50": _percentile(durations, 0.5),
+                "p95": _percentile(durations, 0.95),
+                "max": durations[-1] if durations else 0.0,
+            })
+        return stats
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="批次工作日誌查詢")
+    ap.add_argument("--stats", action="store_true", help="各來源延遲統計")
+    ap.add_argument("--source", default=None)
+    ap.add_argument("--db", default=DB_PATH)
+    args = ap.parse_args()
+
+    for s in latency_stats(args.db, args.source):
+        print(
+            f"{s['source']:<24} n={s['count']:<6} fail={s['fail_rate']:.1%}  "
+            f"avg={s['avg']:.2f}s  p50={s['p50']:.2f}s  p95={s['p95']:.2f}s  max={s['max']:.2f}s"
+        )
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常駐的 in-process 背景工作執行器，取代 UI 上 `start /min python ...` / `start xxx.bat` 的觸發方式。
+
+- 一個 process 共用一份 JobRunner（get_job_runner），Streamlit 每次 rerun 拿到同一個 job table
+- 同一個 (kind, args) 已在排隊或執行中時，submit 直接回傳那個 Job，不會重複排入
+- 工作函式內的 print 會同時寫進該 Job 的 log（畫面上即時顯示），report_progress() 回報進度
+- warm_resource()：在 worker thread 內重複使用同一個資源（例如 headless Chrome），
+  下一個工作直接沿用，不必每次重開瀏覽器；資源出錯時自動關閉、下次重建
+
+使用方式
+    from common.job_runner import get_job_runner, report_progress, warm_resource
+
+    runner = get_job_runner()
+    job = runner.submit("main_force", update_main_force, "2330", label="2330 主力")
+    job.status, job.progress, job.message, list(job.log)
+
+    # 工作函式內
+    report_progress(0.5, "WantGoo")
+    with warm_resource("chrome", build_driver, close=lambda d: d.quit()) as driver:
+        driver.get(url)
+"""
+
+from __future__ import annotations
+
+import atexit
+import itertools
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+MAX_WORKERS = 2
+HISTORY = 50           # 保留最近幾筆已結束的 Job
+LOG_LINES = 200        # 每個 Job 保留的 log 行數
+
+_local = threading.local()
+_ids = itertools.count(1)
+
+
+@dataclass
+class Job:
+    kind: str
+    args: Tuple
+    label: str
+    job_id: int = field(default_factory=lambda: next(_ids))
+    status: str = "queued"            # queued / running / done / failed
+    progress: Optional[float] = None  # 0~1；None 表示工作沒有回報進度
+    message: str = ""
+    result: Any = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    log: Deque[str] = field(default_factory=lambda: deque(maxlen=LOG_LINES))
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def key(self) -> Tuple:
+        return (self.kind, self.args)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+# ---------------------------- 工作函式內使用 ----------------------------
+def current_job() -> Optional[Job]:
+    return getattr(_local, "job", None)
+
+
+@contextmanager
+def attach_job(job: Optional[Job]):
+    """工作函式自己再開 thread 時，讓那些 thread 的 print / report_progress 也算在同一個 Job"""
+    previous = current_job()
+    _local.job = job
+    try:
+        yield job
+    finally:
+        _local.job = previous
+
+
+def report_progress(fraction: Optional[float] = None, message: Optional[str] = None,
+                    job: Optional[Job] = None) -> None:
+    """回報 Job（預設為目前 thread 的 Job）的進度（0~1）與狀態文字；不在 JobRunner 內執行時不做任何事"""
+    job = job or current_job()
+    if job is None:
+        return
+    if fraction is not None:
+        job.progress = min(max(float(fraction), 0.0), 1.0)
+    if message is not None:
+        job.message = message
+
+
+def _close_quietly(close: Optional[Callable], resource) -> None:
+    if close is None:
+        return
+    try:
+        close(resource)
+    except Exception:
+        pass
+
+
+@contextmanager
+def warm_resource(name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], None]] = None):
+    """
+    在 JobRunner 的 worker thread 內：同名資源建立一次後持續沿用（離開時不關閉）；
+    區塊內拋出例外 → 視為資源已損壞，關閉並丟棄。
+    不在 worker 內（例如命令列直接執行）：每次建立、用完即關閉。
+    """
+    runner = getattr(_local, "runner", None)
+    if runner is None:
+        resource = factory()
+        try:
+            yield resource
+        finally:
+            _close_quietly(close, resource)
+        return
+
+    resources = getattr(_local, "resources", None)
+    if resources is None:
+        resources = _local.resources = {}
+    if name not in resources:
+        resources[name] = (factory(), close)
+        runner._track_resource(resources[name])
+    resource = resources[name][0]
+    try:
+        yield resource
+    except BaseException:
+        runner._untrack_resource(resources.pop(name))
+        _close_quietly(close, resource)
+        raise
+
+
+# ---------------------------- stdout 轉送 ----------------------------
+_line_buffers: Dict[Tuple[int, int], str] = {}   # (job_id, thread id) → 未滿一行的輸出
+
+
+class _JobStdout:
+    """worker thread 的輸出同時寫進 Job.log；其他 thread 照常輸出"""
+
+    def __init__(self, original):
+        self._original = original
+
+    def write(self, text: str) -> int:
+        job = current_job()
+        if job is not None:
+            key = (job.job_id, threading.get_ident())
+            *lines, rest = (_line_buffers.get(key, "") + text).split("\n")
+            job.log.extend(line for line in lines if line.strip())
+            _line_buffers[key] = rest
+        return self._original.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._original, name)
+
+
+def _install_stdout() -> None:
+    # 其他程式（測試框架、IDE…）可能事後換掉 sys.stdout，每次 submit 時確認一次
+    if not isinstance(sys.stdout, _JobStdout):
+        sys.stdout = _JobStdout(sys.stdout)
+
+
+def _flush_job_output(job: Job) -> None:
+    for key in [k for k in _line_buffers if k[0] == job.job_id]:
+        rest = _line_buffers.pop(key)
+        if rest.strip():
+            job.log.append(rest)
+
+
+# ---------------------------- Runner ----------------------------
+class JobRunner:
+    def __init__(self, max_workers: int = MAX_WORKERS, history: int = HISTORY):
+        self.history = history
+        self._jobs: Dict[int, Job] = {}
+        self._lock = threading.Lock()
+        self._resources: List[Tuple[Any, Optional[Callable]]] = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-runner",
+                                            initializer=self._init_worker)
+
+    def _init_worker(self) -> None:
+        _local.runner = self
+
+    def _track_resource(self, entry) -> None:
+        with self._lock:
+            self._resources.append(entry)
+
+    def _untrack_resource(self, entry) -> None:
+        with self._lock:
+            if entry in self._resources:
+                self._resources.remove(entry)
+
+    def submit(self, kind: str, fn: Callable, *args, label: Optional[str] = None) -> Job:
+        """排入背景工作；相同 (kind, args) 還沒結束時回傳既有的 Job"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.active and job.key == (kind, args):
+                    return job
+            job = Job(kind, args, label or " ".join([kind, *map(str, args)]))
+            self._jobs[job.job_id] = job
+            self._trim()
+        _install_stdout()
+        self._executor.submit(self._execute, job, fn)
+        return job
+
+    def _execute(self, job: Job, fn: Callable) -> None:
+        _local.job = job
+        job.status, job.started_at = "running", time.time()
+        try:
+            job.result = fn(*job.args)
+            job.status = "done"
+            if job.progress is not None:
+                job.progress = 1.0
+        except (Exception, SystemExit) as e:  # 舊腳本的 sys.exit() 也要攔下，不能讓 worker 消失
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+            print(f"❌ {job.label} 失敗：{job.error}\n{traceback.format_exc()}")
+        finally:
+            _flush_job_output(job)
+            job.finished_at = time.time()
+            _local.job = None
+            job.done.set()
+
+    def _trim(self) -> None:
+        finished = [j for j in self._jobs.values() if not j.active]
+        for job in finished[: max(len(finished) - self.history, 0)]:
+            del self._jobs[job.job_id]
+
+    def jobs(self, active_only: bool = False) -> List[Job]:
+        """新到舊"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j for j in reversed(jobs) if j.active or not active_only]
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def find(self, kind: str, *args) -> Optional[Job]:
+        """同一個 (kind, args) 最近的一筆 Job"""
+        return next((j for j in self.jobs() if j.key == (kind, args)), None)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            resources, self._resources = self._resources, []
+        for resource, close in resources:
+            _close_quietly(close, resource)
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+            atexit.register(_runner.shutdown, False)
+        return _runner
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+延遲 import：模組在第一次呼叫時才載入，縮短 Streamlit 入口程式的冷啟動時間。
+
+- lazy_function("ui.plot_eps_with_close_price", "plot_eps_with_close_price")：
+  回傳可直接呼叫的代理；__module__ / __qualname__ 與原函式相同，
+  __signature__ 在被查詢時才 import（common.stock_prefetch.StockCache.memoize 可直接包裝）
+- 多個 thread 同時第一次呼叫時只 import 一次
+
+使用方式
+    from common.lazy_import import lazy_function
+
+    plot_eps = lazy_function("ui.plot_eps_with_close_price", "plot_eps_with_close_price")
+    fig = plot_eps("2330")           # 這時才 import ui.plot_eps_with_close_price
+"""
+
+from __future__ import annotations
+
+import importlib
+import inspect
+import threading
+from typing import Any, Callable
+
+
+class LazyFunction:
+    def __init__(self, module: str, name: str):
+        self.__module__ = module
+        self.__name__ = self.__qualname__ = name
+        self.__doc__ = f"{module}.{name}（第一次呼叫時才 import）"
+        self._target: Callable = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    def resolve(self) -> Callable:
+        with self._lock:
+            if self._target is None:
+                self._target = getattr(importlib.import_module(self.__module__), self.__name__)
+            return self._target
+
+    @property
+    def __signature__(self) -> inspect.Signature:
+        return inspect.signature(self.resolve())
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<lazy {self.__module__}.{self.__name__} {'loaded' if self.loaded else 'pending'}>"
+
+
+def lazy_function(module: str, name: str) -> LazyFunction:
+    return LazyFunction(module, name)
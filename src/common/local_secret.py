@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本機服務（common.db_writer 寫入服務、common.fubon_broker）的共用金鑰：每個使用者各自一把，不寫死在 repo。
+
+- 環境變數有設就用環境變數（多台機器 / 服務帳號要共用同一把時）
+- 否則用 data/.<name>.key：服務端第一次啟動時以 secrets 產生、權限 0600（只有自己讀得到）；
+  用戶端只讀不建立 —— 檔案不存在代表服務沒啟動過，直接當作連不上
+
+使用方式
+    from common.local_secret import load_secret
+
+    key = load_secret("db_writer", "DB_WRITER_AUTHKEY", create=True)    # 服務端
+    key = load_secret("db_writer", "DB_WRITER_AUTHKEY")                 # 用戶端；沒有金鑰時 None
+"""
+
+from __future__ import annotations
+
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Optional
+
+SECRET_DIR = "data"
+
+
+def secret_path(name: str, secret_dir: Optional[str] = None) -> Path:
+    return Path(secret_dir or SECRET_DIR) / f".{name}.key"
+
+
+def _read(path: Path) -> Optional[str]:
+    for _ in range(20):         # 另一個 process 剛建立、還沒寫完
+        try:
+            value = path.read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+        if value:
+            return value
+        time.sleep(0.05)
+    return None
+
+
+def load_secret(name: str, env_var: str, create: bool = False, secret_dir: Optional[str] = None) -> Optional[str]:
+    value = os.getenv(env_var)
+    if value:
+        return value
+    path = secret_path(name, secret_dir)
+    value = _read(path)
+    if value or not create:
+        return value
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:     # 同時啟動的另一個服務先建立了
+        return _read(path)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(secrets.token_hex(32))
+    return _read(path)
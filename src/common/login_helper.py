@@ -1,16 +1,32 @@
 # login_helper.py
+# fubon_neo / FinMind / streamlit 都在函式內 import：只用到其中一個的程式（CLI、背景工作）不必付另外兩個的載入時間
 
-from fubon_neo.sdk import FubonSDK
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from FinMind.data import DataLoader
-import streamlit as st
 from common.time_utils import is_fubon_api_maintenance_time
+from common import replay
 
 # 強制載入 .env 設定
 load_dotenv(override=True)
 
-def get_logged_in_sdk():
+def get_logged_in_sdk(use_broker=True):
+    """
+    登入後的富邦 SDK。本機有 session broker（src/tools/fubon_broker.py）在跑時回傳 BrokerSDK，
+    行情查詢共用 broker 的登入與快取；use_broker=False 一定自己用憑證登入（broker 本身用這個）
+    """
+    if replay.replaying():  # 離線重播：不登入，回傳錄製的 SDK
+        return replay.active_store().wrap(None, "fubon_sdk")
+
+    if use_broker:
+        from common.fubon_broker import connect_broker_sdk
+
+        sdk = connect_broker_sdk()
+        if sdk is not None:
+            print("🔌 使用本機富邦 session broker")
+            return sdk
+
     user_id = os.getenv("FUBON_USER_ID")
     password = os.getenv("FUBON_PASSWORD")
     cert_path = os.getenv("FUBON_CERT_PATH")
@@ -31,6 +47,8 @@ def get_logged_in_sdk():
             print("❌", err)
         raise EnvironmentError("登入資訊錯誤，請檢查 .env 與憑證檔案")
 
+    from fubon_neo.sdk import FubonSDK
+
     sdk = FubonSDK()
     print("🚪 嘗試登入富邦 API...")
     result = sdk.login(user_id, password, cert_path)
@@ -40,23 +58,70 @@ def get_logged_in_sdk():
         raise ConnectionError("富邦 API 登入失敗")
 
     print("✅ 登入成功")
-    return sdk
+    return replay.maybe_wrap(sdk, "fubon_sdk")
 
 def get_logged_in_dl():
+    if replay.replaying():
+        return replay.active_store().wrap(None, "finmind_sdk")
+
+    from FinMind.data import DataLoader
+
     load_dotenv()
     dl = DataLoader()
     dl.login(user_id=os.getenv("FINMIND_USER_1"), password=os.getenv("FINMIND_PASSWORD_1"))
-    return dl
+    return replay.maybe_wrap(dl, "finmind_sdk")
+
+class LazyLogin:
+    """
+    延遲登入的代理物件：第一次存取屬性（sdk.marketdata、dl.taiwan_stock_daily…）才真正登入，
+    之後都轉給登入後的物件。登入失敗時 RETRY_SECONDS 內直接拋出同一個錯誤，不會每次查價都重登。
+    """
+
+    RETRY_SECONDS = 60
+
+    def __init__(self, factory, name: str):
+        self._factory = factory
+        self._name = name
+        self._obj = None
+        self._error = None
+        self._failed_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def logged_in(self) -> bool:
+        return self._obj is not None
+
+    def get(self):
+        with self._lock:
+            if self._obj is None:
+                if self._error is not None and time.monotonic() - self._failed_at < self.RETRY_SECONDS:
+                    raise self._error
+                try:
+                    self._obj = self._factory()
+                    self._error = None
+                except Exception as e:
+                    self._error, self._failed_at = e, time.monotonic()
+                    raise
+            return self._obj
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+    def __repr__(self):
+        return f"<LazyLogin {self._name} {'logged in' if self.logged_in else 'pending'}>"
+
 
 def init_session_login_objects():
-    """初始化 st.session_state 中的 sdk 與 dl，只執行一次"""
+    """初始化 st.session_state 中的 sdk 與 dl，只執行一次；實際登入延到第一次查價 / 查資料時"""
+    import streamlit as st
+
     if "sdk" not in st.session_state:
         if is_fubon_api_maintenance_time():
             st.session_state.sdk = None
         else:
-            st.session_state.sdk = get_logged_in_sdk()
+            st.session_state.sdk = LazyLogin(get_logged_in_sdk, "fubon_sdk")
 
     if "dl" not in st.session_state:
-        st.session_state.dl = get_logged_in_dl()
+        st.session_state.dl = LazyLogin(get_logged_in_dl, "finmind_dl")
 
     return st.session_state.sdk, st.session_state.dl
\ No newline at end of file
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日K的「交易日 × 股票」稠密矩陣（memory-mapped .npy），給 RS 排名、相關係數、市場寬度等橫斷面計算。
+
+    data/matrix/
+        meta.json      # stocks（欄位順序 = 股票索引）、capacity（預留欄數）
+        calendar.npy   # int32 YYYYMMDD，列索引 = 交易日
+        close.npy / high.npy / low.npy    # float32，shape = (交易日數, capacity)，缺值 NaN
+        volume.npy                        # int64，缺值 0
+
+- np.load(mmap_mode="r") 開啟：幾乎不佔 RSS，多個 process 共用同一份 page cache
+- 新交易日直接接在檔尾（C order → 一列就是一段連續 bytes），再改寫固定長度的 .npy header，
+  不必重寫整個檔案；最近 REFRESH_DAYS 個交易日就地覆寫（補資料 / 更正），
+  更早的日期與 DB 的逐日筆數 / 成交量對不上時（補歷史資料）從那天起覆寫
+- 新上市股票使用預留欄位（STOCK_SLACK），載入完整歷史；預留用完才整個重建
+
+使用方式
+    python src/common/price_matrix.py --build      # 全量建立
+    python src/common/price_matrix.py              # 增量：接上新交易日、刷新最近幾天
+
+    from common.price_matrix import PriceMatrix
+    m = PriceMatrix()
+    close = m.window("close", start=20240801)      # (天數, 股票數) 的唯讀 view
+    tsmc = m.series("2330", "close")
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+DB_PATH = "data/institution.db"
+ROOT = "data/matrix"
+FIELDS = {"close": np.float32, "high": np.float32, "low": np.float32, "volume": np.int64}
+STOCK_SLACK = 256       # 預留給新上市股票的欄數
+REFRESH_DAYS = 5        # 增量更新時重新寫入最近幾個交易日
+HEADER_SIZE = 128       # 固定 .npy header 長度，shape 變長時仍可就地改寫
+FETCH_BATCH = 200_000
+
+
+def _fill_value(field: str):
+    return 0 if np.dtype(FIELDS[field]).kind == "i" else np.nan
+
+
+# ---------------------------- .npy header ----------------------------
+def _write_header(fp, shape, dtype) -> None:
+    header = repr({
+        "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        "fortran_order": False,
+        "shape": tuple(int(n) for n in shape),
+    }).encode("latin1")
+    pad = HEADER_SIZE - 10 - len(header) - 1
+    if pad < 0:
+        raise ValueError(f"npy header 超過 {HEADER_SIZE} bytes：{header!r}")
+    fp.seek(0)
+    fp.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", HEADER_SIZE - 10) + header + b" " * pad + b"\n")
+
+
+def _create(path: Path, rows: int, cols: int, field: str) -> np.memmap:
+    dtype = np.dtype(FIELDS[field])
+    with open(path, "wb") as fp:
+        _write_header(fp, (rows, cols), dtype)
+        fp.truncate(HEADER_SIZE + rows * cols * dtype.itemsize)
+    mm = np.memmap(path, dtype=dtype, mode="r+", offset=HEADER_SIZE, shape=(rows, cols))
+    mm[:] = _fill_value(field)
+    return mm
+
+
+def _append_rows(path: Path, n_new: int, cols: int, field: str) -> None:
+    """在檔尾接上 n_new 列（填缺值），最後才改 header，讀取端不會看到半列"""
+    dtype = np.dtype(FIELDS[field])
+    rows = np.load(path, mmap_mode="r").shape[0]
+    block = np.full((n_new, cols), _fill_value(field), dtype=dtype)
+    with open(path, "r+b") as fp:
+        fp.seek(HEADER_SIZE + rows * cols * dtype.itemsize)
+        fp.write(block.tobytes())
+        fp.flush()
+        _write_header(fp, (rows + n_new, cols), dtype)
+
+
+# ---------------------------- meta / calendar ----------------------------
+def _save_json(path: Path, obj) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(obj, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _save_calendar(root: Path, calendar: np.ndarray) -> None:
+    tmp = root / "calendar.tmp.npy"
+    np.save(tmp, calendar.astype(np.int32))
+    os.replace(tmp, root / "calendar.npy")
+
+
+def _date_int(value) -> int:
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if hasattr(value, "strftime"):
+        return int(value.strftime("%Y%m%d"))
+    return int(str(value)[:10].replace("-", ""))
+
+
+def _fill_from_rows(mms: Dict[str, np.memmap], cursor, row_of: Dict[int, int], col_of: Dict[str, int]) -> int:
+    """cursor 產生 (date, stock_id, close, high, low, volume)，批次向量化寫入矩陣"""
+    total = 0
+    while True:
+        batch = cursor.fetchmany(FETCH_BATCH)
+        if not batch:
+            return total
+        dates, sids, close, high, low, volume = zip(*batch)
+        r = np.fromiter((row_of.get(_date_int(d), -1) for d in dates), dtype=np.int64, count=len(batch))
+        c = np.fromiter((col_of.get(str(s), -1) for s in sids), dtype=np.int64, count=len(batch))
+        ok = (r >= 0) & (c >= 0)
+        values = {
+            "close": np.array(close, dtype=np.float64),
+            "high": np.array(high, dtype=np.float64),
+            "low": np.array(low, dtype=np.float64),
+            "volume": np.array([v or 0 for v in volume], dtype=np.float64),
+        }
+        for field in ("close", "high", "low"):
+            v = values[field]
+            v[~(v > 0)] = np.nan  # NULL / 0 → 缺值
+        for field, mm in mms.items():
+            mm[r[ok], c[ok]] = values[field][ok].astype(FIELDS[field])
+        total += int(ok.sum())
+
+
+def _query_rows(conn: sqlite3.Connection, since: Optional[str] = None):
+    sql = "SELECT date, stock_id, close, high, low, volume FROM twse_prices"
+    if since:
+        return conn.execute(sql + " WHERE date >= ?", (since,))
+    return conn.execute(sql)
+
+
+def _iso(d: int) -> str:
+    s = str(d)
+    return f"{s[:4]}-{s[4:6]}-{s[6:]}"
+
+
+# ---------------------------- 建立 / 增量 ----------------------------
+def build(db_path: str = DB_PATH, root: str = ROOT, slack: int = STOCK_SLACK) -> dict:
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        calendar = np.array(sorted({
+            _date_int(d) for (d,) in conn.execute("SELECT DISTINCT date FROM twse_prices WHERE close > 0")
+        }), dtype=np.int32)
+        stocks = [str(s) for (s,) in conn.execute("SELECT DISTINCT stock_id FROM twse_prices ORDER BY stock_id")]
+        capacity = len(stocks) + slack
+
+        # 先寫到暫存檔再 os.replace：其他 process 正 mmap 著的舊檔不會被截斷
+        mms = {f: _create(root / f"{f}.tmp.npy", len(calendar), capacity, f) for f in FIELDS}
+        row_of = {int(d): i for i, d in enumerate(calendar)}
+        col_of = {s: i for i, s in enumerate(stocks)}
+        cells = _fill_from_rows(mms, _query_rows(conn), row_of, col_of)
+    for mm in mms.values():
+        mm.flush()
+    del mms
+    for f in FIELDS:
+        os.replace(root / f"{f}.tmp.npy", root / f"{f}.npy")
+
+    _save_calendar(root, calendar)
+    _save_json(root / "meta.json", {"stocks": stocks, "capacity": capacity})
+    return {"dates": len(calendar), "stocks": len(stocks), "cells": cells, "rebuilt": True}
+
+
+def _day_stats(conn: sqlite3.Connection) -> Dict[int, tuple]:
+    """DB 每個日期的（有收盤價的筆數, 成交量合計）"""
+    return {
+        _date_int(d): (int(n or 0), int(v or 0)) for d, n, v in conn.execute(
+            "SELECT date, SUM(close > 0), SUM(COALESCE(volume, 0)) FROM twse_prices GROUP BY date")
+    }
+
+
+def _first_changed(stats: Dict[int, tuple], mms: Dict[str, np.memmap], calendar: np.ndarray,
+                   n_stocks: int) -> Optional[int]:
+    """矩陣與 DB 的逐日統計不一致的最早日期（舊日期補進的歷史資料也會被發現）；都一致時回傳 None"""
+    counts = (~np.isnan(mms["close"][:, :n_stocks])).sum(axis=1)
+    volumes = mms["volume"][:, :n_stocks].sum(axis=1)
+    for i, d in enumerate(calendar):
+        if stats.get(int(d), (0, 0)) != (int(counts[i]), int(volumes[i])):
+            return int(d)
+    return None
+
+
+def update(db_path: str = DB_PATH, root: str = ROOT, refresh_days: int = REFRESH_DAYS) -> dict:
+    """
+    接上新交易日、重寫最近 refresh_days 天；新股票的欄位載入完整歷史，
+    最近幾天以前有資料變動（補歷史資料）時從最早變動的日期開始重寫。
+    矩陣不存在、預留欄位不足、或補進了矩陣中間的新交易日時改為 build()
+    """
+    root_path = Path(root)
+    if not (root_path / "meta.json").exists():
+        return build(db_path, root)
+    meta = json.loads((root_path / "meta.json").read_text(encoding="utf-8"))
+    stocks: List[str] = meta["stocks"]
+    capacity = meta["capacity"]
+    calendar = np.load(root_path / "calendar.npy")
+    if len(calendar) == 0:
+        return build(db_path, root)
+
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        stats = _day_stats(conn)
+        last_date = int(calendar[-1])
+        known_dates = set(int(d) for d in calendar)
+        trading_dates = {d for d, (n, _) in stats.items() if n > 0}
+        if any(d < last_date and d not in known_dates for d in trading_dates):
+            return build(db_path, root)     # 列不能插在檔案中間
+        new_dates = sorted(d for d in trading_dates if d > last_date)
+
+        known = set(stocks)
+        new_stocks = sorted({str(s) for (s,) in conn.execute("SELECT DISTINCT stock_id FROM twse_prices")} - known)
+        if len(stocks) + len(new_stocks) > capacity:
+            return build(db_path, root)
+        stocks = stocks + new_stocks
+
+        window_from = int(calendar[-min(refresh_days, len(calendar))])
+        if new_dates:
+            for field in FIELDS:
+                _append_rows(root_path / f"{field}.npy", len(new_dates), capacity, field)
+            calendar = np.concatenate([calendar, np.array(new_dates, dtype=np.int32)])
+
+        mms = {field: np.memmap(root_path / f"{field}.npy", dtype=FIELDS[field], mode="r+",
+                                offset=HEADER_SIZE, shape=(len(calendar), capacity)) for field in FIELDS}
+        row_of = {int(d): i for i, d in enumerate(calendar)}
+        cells = 0
+        if new_stocks:              # 新股票：整欄歷史（可能早於最近幾天，例如補抓的上櫃股）
+            col_of = {s: stocks.index(s) for s in new_stocks}
+            for i in range(0, len(new_stocks), 500):
+                chunk = new_stocks[i:i + 500]
+                cursor = conn.execute(
+                    "SELECT date, stock_id, close, high, low, volume FROM twse_prices "
+                    f"WHERE stock_id IN ({','.join('?' * len(chunk))})", chunk)
+                cells += _fill_from_rows(mms, cursor, row_of, col_of)
+
+        changed = _first_changed(stats, mms, calendar, len(stocks))
+        refresh_from = window_from if changed is None else min(window_from, changed)
+        first_row = int(np.searchsorted(calendar, refresh_from))
+        for field, mm in mms.items():
+            mm[first_row:] = _fill_value(field)
+        row_of = {int(d): i for i, d in enumerate(calendar) if i >= first_row}
+        col_of = {s: i for i, s in enumerate(stocks)}
+        cells += _fill_from_rows(mms, _query_rows(conn, _iso(refresh_from)), row_of, col_of)
+    for mm in mms.values():
+        mm.flush()
+    del mms
+
+    _save_calendar(root_path, calendar)  # header 已更新後才換 calendar → 讀取端只會看到完整的列
+    _save_json(root_path / "meta.json", {"stocks": stocks, "capacity": capacity})
+    return {"dates": len(calendar), "stocks": len(stocks), "cells": cells, "rebuilt": False,
+            "appended": len(new_dates), "new_stocks": new_stocks, "refresh_from": refresh_from}
+
+
+# ---------------------------- 讀取 ----------------------------
+class PriceMatrix:
+    """唯讀開啟矩陣；field() 回傳 (交易日, 股票) 的 memmap view，只有實際存取的 page 會讀進記憶體"""
+
+    def __init__(self, root: str = ROOT):
+        self.root = Path(root)
+        meta = json.loads((self.root / "meta.json").read_text(encoding="utf-8"))
+        self.stock_ids: List[str] = meta["stocks"]
+        self.index: Dict[str, int] = {s: i for i, s in enumerate(self.stock_ids)}
+        self.dates: np.ndarray = np.load(self.root / "calendar.npy")
+        self._fields: Dict[str, np.ndarray] = {}
+
+    def field(self, name: str) -> np.ndarray:
+        if name not in self._fields:
+            mm = np.load(self.root / f"{name}.npy", mmap_mode="r")
+            self._fields[name] = mm[: len(self.dates), : len(self.stock_ids)]
+        return self._fields[name]
+
+    def rows(self, start=None, end=None) -> slice:
+        lo = 0 if start is None else int(np.searchsorted(self.dates, _date_int(start), side="left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, _date_int(end), side="right"))
+        return slice(lo, hi)
+
+    def window(self, name: str, start=None, end=None) -> np.ndarray:
+        return self.field(name)[self.rows(start, end)]
+
+    def series(self, stock_id: str, name: str = "close", start=None, end=None) -> np.ndarray:
+        return self.window(name, start, end)[:, self.index[str(stock_id)]]
+
+    def columns(self, stock_ids: Iterable[str]) -> np.ndarray:
+        return np.array([self.index[str(s)] for s in stock_ids], dtype=np.int64)
+
+    def to_frame(self, name: str, start=None, end=None):
+        """轉成 pandas（index=日期、columns=stock_id）；會複製資料，只在需要 pandas 運算時使用"""
+        import pandas as pd
+
+        rows = self.rows(start, end)
+        index = pd.to_datetime(self.dates[rows].astype(str), format="%Y%m%d")
+        return pd.DataFrame(np.asarray(self.window(name, start, end)), index=index, columns=self.stock_ids)
+
+
+def first_last_valid(values: np.ndarray):
+    """每欄第一個與最後一個非 NaN 的值（全 NaN 的欄回傳 NaN）；報酬率 / RS 排名用"""
+    valid = ~np.isnan(values)
+    has = valid.any(axis=0)
+    first_idx = valid.argmax(axis=0)
+    last_idx = values.shape[0] - 1 - valid[::-1].argmax(axis=0)
+    cols = np.arange(values.shape[1])
+    first = np.where(has, values[first_idx, cols], np.nan)
+    last = np.where(has, values[last_idx, cols], np.nan)
+    return first, last
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="日K稠密矩陣（memory-mapped .npy）")
+    ap.add_argument("--build", action="store_true", help="全量重建")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--root", default=ROOT)
+    ap.add_argument("--refresh-days", type=int, default=REFRESH_DAYS)
+    args = ap.parse_args()
+    info = build(args.db, args.root) if args.build else update(args.db, args.root, args.refresh_days)
+    print(f"✅ 矩陣 {info['dates']} 個交易日 × {info['stocks']} 檔，寫入 {info['cells']} 格"
+          + ("（全量重建）" if info["rebuilt"] else f"（新增 {info['appended']} 天）"))
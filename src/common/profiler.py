@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+儀表板的效能剖析：每次 rerun 記錄各區塊的耗時、SQLite 查詢次數與讀取筆數，
+畫面上可打開 debug expander 看 flame 圖，樣本另存到 data/metrics.db 供趨勢分析。
+
+- profile_render(page)：一次畫面的根節點（或 start_render / finish_render 成對呼叫）
+- profile_section(name) / @profiled(name)：巢狀區塊；沒有進行中的 render 時不做任何事
+- 有 render 進行中時 sqlite3.connect 改用會計數的 Connection（只計算目前 thread 有 render 的查詢）；
+  install / uninstall 以引用計數配對，最後一個 render 結束就換回原本的 sqlite3.connect
+- 樣本寫在獨立的 data/metrics.db：寫進 institution.db 會讓 data_version 每次 rerun 都變，
+  common.query_cache 的快取就全失效了
+
+使用方式
+    from common.profiler import profile_render, profile_section, profiled
+
+    with profile_render("dashboard", stock_id="2330") as render:
+        with profile_section("price"):
+            ...
+    # 環境變數 DASHBOARD_PROFILE=1 時預設啟用
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+METRICS_DB = "data/metrics.db"
+ENV_FLAG = "DASHBOARD_PROFILE"
+
+_local = threading.local()
+_last_renders: Dict[str, "Render"] = {}
+_hook_lock = threading.Lock()
+_hook_users = 0
+_original_connect = sqlite3.connect
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    wall: float = 0.0
+    queries: int = 0
+    rows: int = 0
+    children: List["Span"] = field(default_factory=list)
+
+
+@dataclass
+class Render:
+    page: str
+    meta: Dict[str, str]
+    root: Span
+    render_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    started_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+
+def env_enabled() -> bool:
+    return os.getenv(ENV_FLAG, "0") == "1"
+
+
+# ---------------------------- SQLite 計數 ----------------------------
+def _current_span() -> Optional[Span]:
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+class _ProfiledCursor(sqlite3.Cursor):
+    def execute(self, *args, **kwargs):
+        span = _current_span()
+        if span is not None:
+            span.queries += 1
+        return super().execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        span = _current_span()
+        if span is not None:
+            span.queries += 1
+        return super().executemany(*args, **kwargs)
+
+    def _count(self, n: int) -> None:
+        span = _current_span()
+        if span is not None:
+            span.rows += n
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._count(row is not None)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._count(len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        self._count(1)
+        return row
+
+
+class _ProfiledConnection(sqlite3.Connection):
+    # Connection.execute 不會經過 cursor()，要自己轉過去才計得到
+    def cursor(self, factory=_ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args, **kwargs):
+        return self.cursor().execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self.cursor().executemany(*args, **kwargs)
+
+
+def _profiled_connect(*args, **kwargs):
+    kwargs.setdefault("factory", _ProfiledConnection)
+    return _original_connect(*args, **kwargs)
+
+
+def install_sqlite_hook() -> None:
+    global _hook_users
+    with _hook_lock:
+        _hook_users += 1
+        sqlite3.connect = _profiled_connect
+
+
+def uninstall_sqlite_hook() -> None:
+    """與 install_sqlite_hook 成對呼叫；沒有人在用時才換回原本的 sqlite3.connect"""
+    global _hook_users
+    with _hook_lock:
+        _hook_users = max(_hook_users - 1, 0)
+        if _hook_users == 0:
+            sqlite3.connect = _original_connect
+
+
+# ---------------------------- 區塊 ----------------------------
+def current_render() -> Optional[Render]:
+    return getattr(_local, "render", None)
+
+
+def start_render(page: str, enabled: Optional[bool] = None, **meta) -> Optional[Render]:
+    """開始一次 render；未啟用時回傳 None，之後的 profile_section 都是空操作"""
+    if not (env_enabled() if enabled is None else enabled):
+        return None
+    if current_render() is not None:    # 上一次沒有 finish（例如 rerun 中斷）：視同結束，釋放它的 hook
+        uninstall_sqlite_hook()
+    install_sqlite_hook()
+    render = Render(page=page, meta={k: str(v) for k, v in meta.items()}, root=Span(page, time.perf_counter()))
+    _local.render = render
+    _local.stack = [render.root]
+    return render
+
+
+def finish_render(render: Optional[Render], save: bool = True, db_path: str = METRICS_DB) -> None:
+    if render is None or current_render() is not render:
+        return
+    render.root.wall = time.perf_counter() - render.root.start
+    _local.render = None
+    _local.stack = None
+    uninstall_sqlite_hook()
+    _last_renders[render.page] = render
+    if save:
+        try:
+            save_render(render, db_path)
+        except sqlite3.Error as e:
+            print(f"⚠️ 無法寫入效能樣本：{e}")
+
+
+@contextmanager
+def profile_render(page: str, enabled: Optional[bool] = None, save: bool = True, **meta):
+    render = start_render(page, enabled, **meta)
+    try:
+        yield render
+    finally:
+        finish_render(render, save=save)
+
+
+@contextmanager
+def profile_section(name: str):
+    stack = getattr(_local, "stack", None)
+    if not stack:
+        yield None
+        return
+    span = Span(name, time.perf_counter())
+    stack[-1].children.append(span)
+    stack.append(span)
+    try:
+        yield span
+    finally:
+        span.wall = time.perf_counter() - span.start
+        if stack and stack[-1] is span:
+            stack.pop()
+
+
+def profiled(name: Optional[str] = None):
+    """@profiled("fubon.quote")：整個函式算一個區塊"""
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile_section(label):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def last_render(page: str) -> Optional[Render]:
+    return _last_renders.get(page)
+
+
+# ---------------------------- 報表 / 儲存 ----------------------------
+def flatten(render: Render) -> List[dict]:
+    """展開成列：path、depth、start_ms（相對 render 開始）、wall/self 毫秒、含子區塊的查詢數與筆數"""
+    rows: List[dict] = []
+
+    def _walk(span: Span, path: str, depth: int) -> tuple:
+        index = len(rows)
+        rows.append({})
+        queries, n_rows, child_wall = span.queries, span.rows, 0.0
+        for child in span.children:
+            q, r = _walk(child, f"{path}/{child.name}", depth + 1)
+            queries, n_rows, child_wall = queries + q, n_rows + r, child_wall + child.wall
+        rows[index] = {
+            "path": path,
+            "name": span.name,
+            "depth": depth,
+            "start_ms": (span.start - render.root.start) * 1000,
+            "wall_ms": span.wall * 1000,
+            "self_ms": max(span.wall - child_wall, 0.0) * 1000,
+            "queries": queries,
+            "rows": n_rows,
+        }
+        return queries, n_rows
+
+    _walk(render.root, render.root.name, 0)
+    return rows
+
+
+def _ensure_metrics_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS render_metrics (
+            render_id TEXT,
+            ts        TEXT,
+            page      TEXT,
+            stock_id  TEXT,
+            path      TEXT,
+            depth     INTEGER,
+            start_ms  REAL,
+            wall_ms   REAL,
+            self_ms   REAL,
+            queries   INTEGER,
+            rows      INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_render_metrics_page_ts ON render_metrics(page, ts)")
+
+
+def save_render(render: Render, db_path: str = METRICS_DB) -> None:
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = _original_connect(db_path, timeout=5)
+    try:
+        with conn:
+            _ensure_metrics_table(conn)
+            conn.executemany(
+                "INSERT INTO render_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (render.render_id, render.started_at, render.page, render.meta.get("stock_id"), r["path"],
+                     r["depth"], round(r["start_ms"], 2), round(r["wall_ms"], 2), round(r["self_ms"], 2),
+                     r["queries"], r["rows"])
+                    for r in flatten(render)
+                ],
+            )
+    finally:
+        conn.close()
+
+
+def section_trend(page: str, last_n: int = 50, db_path: str = METRICS_DB) -> List[tuple]:
+    """最近 last_n 次 render 各區塊的 (path, 次數, 平均 ms, 最大 ms, 平均查詢數)"""
+    if not Path(db_path).exists():
+        return []
+    conn = _original_connect(db_path, timeout=5)
+    try:
+        _ensure_metrics_table(conn)
+        return conn.execute("""
+            SELECT path, COUNT(*), ROUND(AVG(wall_ms), 1), ROUND(MAX(wall_ms), 1), ROUND(AVG(queries), 1)
+            FROM render_metrics
+            WHERE render_id IN (
+                SELECT render_id FROM render_metrics WHERE page = ? AND depth = 0 ORDER BY ts DESC LIMIT ?
+            )
+            GROUP BY path
+            ORDER BY AVG(wall_ms) DESC
+        """, (page, last_n)).fetchall()
+    finally:
+        conn.close()
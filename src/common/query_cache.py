@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查詢結果快取：以 (SQL, params) 為 key，資料庫有新寫入時自動失效，不必再 st.cache_data.clear()。
+
+- 失效依據：SQLite 的 PRAGMA data_version。快取用一條常駐的唯讀連線，其他連線 / process
+  commit 後 data_version 就會改變 → 之前的結果全部視為過期；沒有新資料時每次 rerun 都是純快取命中
+- use_table_versions=True：data_version 變了之後，再比對查詢宣告的 tables 在 table_versions
+  的版本號（common.db_writer 每次 commit 會自動 +1），沒被寫到的資料表其結果繼續沿用。
+  只適合「全部寫入都經過 DBWriter / bump_table_versions」的資料表
+- LRU：最多保留 maxsize 筆結果
+
+使用方式
+    from common.query_cache import get_query_cache
+
+    cache = get_query_cache()
+    df = cache.read_sql("SELECT * FROM twse_prices WHERE stock_id = ?", ["2330"], tables=["twse_prices"])
+    rows = cache.fetchall("SELECT stock_id, name FROM stock_meta")
+    print(cache.stats)     # {'hits': .., 'misses': .., 'evictions': ..}
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+from common.db_writer import open_reader
+
+DB_PATH = "data/institution.db"
+MAXSIZE = 256
+
+_caches: Dict[str, "QueryCache"] = {}
+_caches_lock = threading.Lock()
+
+
+class QueryCache:
+    def __init__(self, db_path: str = DB_PATH, maxsize: int = MAXSIZE, use_table_versions: bool = False):
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self.use_table_versions = use_table_versions
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._entries: OrderedDict = OrderedDict()   # key → (data_version, table 版本, 結果)
+        self._lock = threading.RLock()
+        self.conn = open_reader(db_path)
+
+    def data_version(self) -> int:
+        with self._lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _table_versions(self, tables: Optional[Sequence[str]]):
+        if not tables:
+            return None
+        try:
+            rows = dict(self.conn.execute(
+                f"SELECT table_name, version FROM table_versions WHERE table_name IN ({','.join(['?'] * len(tables))})",
+                list(tables),
+            ))
+        except sqlite3.OperationalError:  # 還沒有 table_versions
+            return None
+        return tuple(rows.get(t, 0) for t in tables)
+
+    def _get(self, kind: str, sql: str, params: Sequence, tables: Optional[Iterable[str]], load: Callable):
+        tables = tuple(sorted(set(tables))) if tables else None
+        key = (kind, sql, tuple(params))
+        with self._lock:
+            version = self.data_version()
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, table_versions, value = entry
+                fresh = entry_version == version
+                if not fresh and self.use_table_versions and table_versions is not None:
+                    fresh = self._table_versions(tables) == table_versions
+                    if fresh:
+                        self._entries[key] = (version, table_versions, value)
+                if fresh:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            table_versions = self._table_versions(tables) if self.use_table_versions else None
+            value = load(self.conn)
+            self._entries[key] = (version, table_versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            return value
+
+    def read_sql(self, sql: str, params: Sequence = (), tables: Optional[Iterable[str]] = None):
+        """pd.read_sql_query 的快取版；回傳複本，呼叫端可以放心修改"""
+        import pandas as pd
+
+        df = self._get("df", sql, params, tables, lambda conn: pd.read_sql_query(sql, conn, params=list(params)))
+        return df.copy()
+
+    def fetchall(self, sql: str, params: Sequence = (), tables: Optional[Iterable[str]] = None) -> list:
+        rows = self._get("rows", sql, params, tables, lambda conn: conn.execute(sql, list(params)).fetchall())
+        return list(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        self.clear()
+        self.conn.close()
+
+
+def get_query_cache(db_path: str = DB_PATH) -> QueryCache:
+    """同一個 DB 共用一份快取（Streamlit 每次 rerun 都拿到同一個）"""
+    key = str(Path(db_path).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = QueryCache(db_path)
+        return cache
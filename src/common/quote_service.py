@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+盤中報價服務：get_today_prices 的批次 / 去重 / 短 TTL 快取層。
+
+- 一次要多檔時（偵測腳本、關鍵價位檢查）用 get_many() 批次取：
+  檔數 ≥ SNAPSHOT_MIN_SYMBOLS 時改打 snapshot/quotes（上市、上櫃各一次就有全市場），
+  其餘用執行緒並行呼叫 intraday/quote，速率由 common.fubon_rest_client 的 token bucket 控制
+- 同一檔同時有多個請求時只查一次，其他請求等結果（同 common.stock_prefetch 的 in-flight 做法）
+- 結果快取 QUOTE_TTL 秒：同一次畫面繪製中 PEG、突破分析、缺口圖都要同一檔的報價，只會查一次；
+  查詢失敗也快取 ERROR_TTL 秒，API 異常時不會每個區塊各重試一次
+- init_realtime() 只在第一次建立 FubonRestClient 時做一次（舊寫法每次查價都呼叫）
+- 有即時行情（common.realtime_quotes 的 WebSocket 報價表）且連線正常時直接用表裡的報價，不打 REST
+
+使用方式
+    from common.quote_service import get_quote_service
+
+    service = get_quote_service(sdk)        # sdk 可省略（第一次查價時才 get_logged_in_sdk()）
+    quotes = service.get_many(["2330", "2317", "2454"])   # {symbol: 富邦 quote dict}
+    quote = service.get("2330")             # 查不到時拋出原本的錯誤
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Optional
+
+from common.fubon_rest_client import FubonRestClient
+
+QUOTE_TTL = 15.0             # 秒；涵蓋一次畫面繪製
+ERROR_TTL = 3.0
+MAX_WORKERS = 8
+SNAPSHOT_MIN_SYMBOLS = 30    # 檔數超過這個數字時，兩次 snapshot 比逐檔查便宜
+SNAPSHOT_MARKETS = ("TSE", "OTC")
+
+
+class QuoteUnavailable(LookupError):
+    """snapshot 與逐檔查詢都沒有這檔的報價"""
+
+
+def snapshot_to_quote(item: dict, default_date: Optional[str] = None) -> dict:
+    """snapshot/quotes 的一筆轉成 intraday/quote 的欄位格式（previousClose 由 closePrice - change 推回）"""
+    close, change = item.get("closePrice"), item.get("change")
+    previous = round(close - change, 2) if close is not None and change is not None else None
+    return {
+        "date": item.get("date") or default_date,
+        "symbol": item.get("symbol"),
+        "name": item.get("name"),
+        "openPrice": item.get("openPrice"),
+        "highPrice": item.get("highPrice"),
+        "lowPrice": item.get("lowPrice"),
+        "closePrice": close,
+        "previousClose": previous,
+        "total": {"tradeVolume": item.get("tradeVolume")},
+        "lastUpdated": item.get("lastUpdated"),
+    }
+
+
+class QuoteService:
+    def __init__(self, sdk=None, ttl: float = QUOTE_TTL, max_workers: int = MAX_WORKERS,
+                 snapshot_min: int = SNAPSHOT_MIN_SYMBOLS, clock: Callable[[], float] = time.monotonic,
+                 realtime=None):
+        self.ttl = ttl
+        self.realtime = realtime            # common.realtime_quotes.QuoteTable（可省略）
+        self.max_workers = max_workers
+        self.snapshot_min = snapshot_min
+        self._sdk = sdk
+        self._clock = clock
+        self._client: Optional[FubonRestClient] = None
+        self._client_lock = threading.Lock()
+        self._cache: Dict[str, tuple] = {}                # symbol → (到期時間, ok, quote 或錯誤)
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "realtime": 0, "cache_hits": 0, "coalesced": 0, "fetched": 0,
+                      "snapshots": 0, "errors": 0}
+
+    # ---- 連線 ----
+    def bind(self, sdk) -> None:
+        """呼叫端手上已有登入的 sdk 時交給服務用（已建立連線後忽略）"""
+        if sdk is not None and self._client is None:
+            self._sdk = sdk
+
+    def client(self) -> FubonRestClient:
+        with self._client_lock:
+            if self._client is None:
+                if self._sdk is None:
+                    from common.login_helper import get_logged_in_sdk
+                    self._sdk = get_logged_in_sdk()
+                self._client = FubonRestClient(self._sdk)
+            return self._client
+
+    # ---- 取報價 ----
+    def _resolve(self, symbols: Iterable[str]) -> Dict[str, tuple]:
+        symbols = list(dict.fromkeys(str(s) for s in symbols))
+        entries: Dict[str, tuple] = {}
+        owned, waiting = [], {}
+        with self._lock:
+            now = self._clock()
+            for symbol in symbols:
+                self.stats["requests"] += 1
+                live = self.realtime.get(symbol) if self.realtime is not None else None
+                if live is not None:
+                    self.stats["realtime"] += 1
+                    entries[symbol] = (now, True, live)
+                    continue
+                entry = self._cache.get(symbol)
+                if entry is not None and entry[0] > now:
+                    self.stats["cache_hits"] += 1
+                    entries[symbol] = entry
+                elif symbol in self._inflight:
+                    self.stats["coalesced"] += 1
+                    waiting[symbol] = self._inflight[symbol]
+                else:
+                    self._inflight[symbol] = threading.Event()
+                    owned.append(symbol)
+
+        if owned:
+            try:
+                self._fetch(owned)
+            finally:
+                with self._lock:
+                    events = [self._inflight.pop(s) for s in owned]
+                for event in events:
+                    event.set()
+        for event in waiting.values():
+            event.wait()
+
+        with self._lock:
+            for symbol in [*owned, *waiting]:
+                if symbol in self._cache:
+                    entries[symbol] = self._cache[symbol]
+        return {s: entries[s] for s in symbols if s in entries}
+
+    def _fetch(self, symbols: list) -> None:
+        quotes: Dict[str, dict] = {}
+        errors: Dict[str, Exception] = {}
+        try:
+            client = self.client()
+        except Exception as e:
+            errors = {s: e for s in symbols}
+        else:
+            if len(symbols) >= self.snapshot_min:
+                quotes.update(self._snapshot(client))
+            rest = [s for s in symbols if s not in quotes]
+            if rest:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(rest))) as pool:
+                    futures = {pool.submit(client.quote, s): s for s in rest}
+                    for future in as_completed(futures):
+                        try:
+                            quotes[futures[future]] = future.result()
+                        except Exception as e:
+                            errors[futures[future]] = e
+            for s in symbols:
+                if s not in quotes and s not in errors:
+                    errors[s] = QuoteUnavailable(f"{s} 沒有報價")
+
+        now = self._clock()
+        with self._lock:
+            self.stats["fetched"] += len(quotes)
+            self.stats["errors"] += len(errors)
+            for s, quote in quotes.items():
+                self._cache[s] = (now + self.ttl, True, quote)
+            for s, error in errors.items():
+                self._cache[s] = (now + ERROR_TTL, False, error)
+            if len(self._cache) > 5000:
+                for key in [k for k, v in self._cache.items() if v[0] <= now]:
+                    del self._cache[key]
+
+    def _snapshot(self, client: FubonRestClient) -> Dict[str, dict]:
+        """上市 + 上櫃全市場快照；失敗時回傳已取得的部分（缺的改逐檔查）"""
+        quotes: Dict[str, dict] = {}
+        for market in SNAPSHOT_MARKETS:
+            try:
+                result = client.snapshot(market)
+            except Exception as e:
+                print(f"⚠️ {market} 快照取得失敗，改逐檔查詢：{e}")
+                continue
+            with self._lock:
+                self.stats["snapshots"] += 1
+            for item in result.get("data") or []:
+                if item.get("symbol"):
+                    quotes[item["symbol"]] = snapshot_to_quote(item, result.get("date"))
+        return quotes
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, dict]:
+        """{symbol: quote}；查不到的不在結果裡"""
+        return {s: value for s, (_, ok, value) in self._resolve(symbols).items() if ok}
+
+    def get(self, symbol: str) -> dict:
+        entry = self._resolve([symbol]).get(str(symbol))
+        if entry is None:
+            raise QuoteUnavailable(f"{symbol} 沒有報價")
+        _, ok, value = entry
+        if not ok:
+            raise value
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+_service: Optional[QuoteService] = None
+_service_lock = threading.Lock()
+
+
+def get_quote_service(sdk=None) -> QuoteService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            from common.realtime_quotes import get_quote_table
+            _service = QuoteService(realtime=get_quote_table())
+    _service.bind(sdk)
+    return _service
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+盤中即時報價快取：透過富邦行情 WebSocket 訂閱觀察清單（持股、temp_list、key_price.txt）的
+aggregates（整檔報價）與 trades（逐筆成交），在記憶體維護一張最新報價表。
+
+- QuoteTable：symbol → 開高低收、昨收、累計成交量（張）；輸出格式同 intraday/quote，
+  get_today_prices（經 common.quote_service）先查這張表，有就不打 REST
+- 連線超過 STALE_SECONDS 沒有任何訊息（含 heartbeat）或斷線時，表裡的資料不再提供，改走 REST
+- RealtimeFeed：背景 thread 負責連線、訂閱、斷線重連（指數退避）；觀察清單變動時只訂閱 / 取消差異
+- 只在交易時段（交易日 SESSION_OPEN～SESSION_CLOSE，common.trading_calendar）連線：盤外不啟動、不登入，
+  收盤後自動斷線結束 thread，下一次 ensure_realtime_feed()（畫面重繪）在盤中才再啟動
+- 同一個 process 內共用（get_quote_table()）；其他 process 透過 session broker
+  （src/tools/fubon_broker.py --realtime）共用同一張表
+- 離線：ReplayWebsocket 介面同富邦的 websocket_client.stock，重播錄下的訊息；
+  FETCH_REPLAY=record 時把收到的訊息錄到 <FETCH_REPLAY_DIR>/realtime/messages.jsonl，
+  FETCH_REPLAY=replay 時自動改用 ReplayWebsocket 重播（common.replay）
+
+使用方式
+    from common.realtime_quotes import ensure_realtime_feed, get_quote_table
+
+    ensure_realtime_feed()                   # 依觀察清單訂閱（已啟動時只更新清單）
+    quote = get_quote_table().get("2330")    # intraday/quote 格式的 dict，沒有即時資料時 None
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, time as dtime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+WATCHLIST_FILES = ("my_stock_holdings.txt", "temp_list.txt", "key_price.txt")
+CHANNELS = ("aggregates", "trades")
+MAX_SYMBOLS = 100            # 富邦 WebSocket 每條連線訂閱數有上限（每檔 2 個頻道）
+STALE_SECONDS = 90.0
+RECONNECT_BASE = 2.0
+RECONNECT_MAX = 60.0
+SESSION_OPEN = dtime(8, 30)          # 試撮開始
+SESSION_CLOSE = dtime(13, 35)        # 13:30 收盤撮合後再留幾分鐘收最後一筆
+SESSION_CHECK_SECONDS = 60.0         # 連線中多久檢查一次是否已收盤
+TPE = timezone(timedelta(hours=8))   # 台灣沒有夏令時間
+
+
+def in_trading_session(now: Optional[datetime] = None) -> bool:
+    """台北時間的交易日盤中（含盤前試撮）"""
+    now = now.astimezone(TPE) if now is not None else datetime.now(TPE)
+    if not SESSION_OPEN <= now.time() <= SESSION_CLOSE:
+        return False
+    from common.trading_calendar import get_trading_calendar
+
+    return get_trading_calendar().is_trading_day(now.date())
+
+
+def load_watchlist(files: Iterable[str] = WATCHLIST_FILES) -> List[str]:
+    """讀取觀察清單（每行第一個欄位是股票代碼；key_price.txt 是「代碼,價格」），去重保留順序"""
+    symbols: Dict[str, None] = {}
+    for file_path in files:
+        path = Path(file_path)
+        if not path.exists():
+            continue
+        for raw_line in path.read_text(encoding="utf-8").splitlines():
+            line = raw_line.strip()
+            if not line or line.startswith("#"):
+                continue
+            symbol = line.replace(",", " ").split()[0]
+            if symbol.isalnum():
+                symbols[symbol] = None
+    return list(symbols)
+
+
+class RealtimeUnavailable(RuntimeError):
+    """這個 SDK 沒有 WebSocket（例如 session broker 的 BrokerSDK），不必重試"""
+
+
+# ---------------------------- 報價表 ----------------------------
+@dataclass
+class LastQuote:
+    symbol: str
+    name: Optional[str] = None
+    date: Optional[str] = None
+    open: Optional[float] = None
+    high: Optional[float] = None
+    low: Optional[float] = None
+    close: Optional[float] = None
+    previous_close: Optional[float] = None
+    volume: Optional[float] = None          # 累計成交量（張）
+    last_size: Optional[float] = None
+    last_updated: Optional[int] = None      # 交易所時間（µs）
+    received_at: float = field(default=0.0)
+
+    @property
+    def complete(self) -> bool:
+        return None not in (self.date, self.open, self.high, self.low, self.close, self.previous_close, self.volume)
+
+    def to_quote(self) -> dict:
+        return {
+            "date": self.date, "symbol": self.symbol, "name": self.name,
+            "openPrice": self.open, "highPrice": self.high, "lowPrice": self.low,
+            "closePrice": self.close, "previousClose": self.previous_close,
+            "total": {"tradeVolume": self.volume}, "lastSize": self.last_size,
+            "lastUpdated": self.last_updated, "source": "realtime",
+        }
+
+
+class QuoteTable:
+    def __init__(self, clock: Callable[[], float] = time.monotonic, stale_seconds: float = STALE_SECONDS):
+        self._clock = clock
+        self.stale_seconds = stale_seconds
+        self._quotes: Dict[str, LastQuote] = {}
+        self._watching: Optional[set] = None          # None → 不限；否則只收 / 只提供這些代碼
+        self._lock = threading.Lock()
+        self.connected = False
+        self.last_message_at = 0.0
+        self.stats = {"messages": 0, "aggregates": 0, "trades": 0, "heartbeats": 0, "errors": 0}
+
+    def watch(self, symbols: Iterable[str]) -> None:
+        """只保留觀察清單內的代碼：移出清單的列立刻刪掉（不再提供凍結的報價），取消訂閱前送達的訊息也忽略"""
+        with self._lock:
+            self._watching = {str(s) for s in symbols}
+            for symbol in [s for s in self._quotes if s not in self._watching]:
+                del self._quotes[symbol]
+
+    def set_connected(self, connected: bool) -> None:
+        with self._lock:
+            self.connected = connected
+            if connected:
+                self.last_message_at = self._clock()
+
+    @property
+    def healthy(self) -> bool:
+        return self.connected and self._clock() - self.last_message_at < self.stale_seconds
+
+    def apply(self, message) -> Optional[str]:
+        """套用一則 WebSocket 訊息（str 或 dict），回傳更新到的股票代碼"""
+        if isinstance(message, (str, bytes)):
+            message = json.loads(message)
+        event, data = message.get("event"), message.get("data")
+        with self._lock:
+            self.stats["messages"] += 1
+            self.last_message_at = self._clock()
+            if event == "heartbeat":
+                self.stats["heartbeats"] += 1
+                return None
+            if event == "error":
+                self.stats["errors"] += 1
+                print(f"⚠️ 即時行情錯誤：{data}")
+                return None
+            if event not in ("data", "snapshot") or not isinstance(data, dict) or not data.get("symbol"):
+                return None
+            if self._watching is not None and str(data["symbol"]) not in self._watching:
+                return None
+            channel = message.get("channel")
+            if channel == "aggregates":
+                self.stats["aggregates"] += 1
+                return self._apply_aggregate(data)
+            if channel == "trades":
+                self.stats["trades"] += 1
+                return self._apply_trade(data)
+        return None
+
+    def _entry(self, symbol: str) -> LastQuote:
+        entry = self._quotes.get(symbol)
+        if entry is None:
+            entry = self._quotes[symbol] = LastQuote(symbol)
+        entry.received_at = self._clock()
+        return entry
+
+    def _apply_aggregate(self, data: dict) -> str:
+        entry = self._entry(data["symbol"])
+        entry.name = data.get("name") or entry.name
+        entry.date = data.get("date") or entry.date
+        entry.open = data.get("openPrice", entry.open)
+        entry.high = data.get("highPrice", entry.high)
+        entry.low = data.get("lowPrice", entry.low)
+        entry.close = data.get("closePrice", data.get("lastPrice", entry.close))
+        entry.previous_close = data.get("previousClose", data.get("referencePrice", entry.previous_close))
+        entry.volume = (data.get("total") or {}).get("tradeVolume", entry.volume)
+        entry.last_size = data.get("lastSize", entry.last_size)
+        entry.last_updated = data.get("lastUpdated", entry.last_updated)
+        return entry.symbol
+
+    def _apply_trade(self, data: dict) -> str:
+        entry = self._entry(data["symbol"])
+        price, trade_time = data.get("price"), data.get("time")
+        if price is None:
+            return entry.symbol
+        trade_date = (datetime.fromtimestamp(trade_time / 1_000_000, TPE).date().isoformat()
+                      if trade_time else entry.date)
+        if entry.date is not None and trade_date is not None and trade_date > entry.date:
+            # 換日：昨收 = 上一個交易日最後價，開高低從這筆重新算
+            entry.previous_close, entry.open, entry.high, entry.low = entry.close, price, price, price
+            entry.volume = None
+        entry.date = trade_date or entry.date
+        entry.close = price
+        if entry.open is None:
+            entry.open = price
+        entry.high = price if entry.high is None else max(entry.high, price)
+        entry.low = price if entry.low is None else min(entry.low, price)
+        entry.volume = data.get("volume", entry.volume)
+        entry.last_size = data.get("size", entry.last_size)
+        entry.last_updated = trade_time or entry.last_updated
+        return entry.symbol
+
+    def get(self, symbol: str) -> Optional[dict]:
+        """連線正常且欄位齊全時回傳 intraday/quote 格式的報價，否則 None（呼叫端改走 REST）"""
+        if not self.healthy:
+            return None
+        with self._lock:
+            entry = self._quotes.get(str(symbol))
+            return entry.to_quote() if entry is not None and entry.complete else None
+
+    def all(self) -> Dict[str, dict]:
+        with self._lock:
+            return {s: q.to_quote() for s, q in self._quotes.items() if q.complete}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._quotes.clear()
+
+
+# ---------------------------- 連線 ----------------------------
+class RealtimeFeed:
+    """
+    ws_factory() 回傳富邦 websocket_client.stock（或 ReplayWebsocket）：on(event, fn)、connect()、
+    subscribe({...})、unsubscribe({...})、disconnect()。背景 thread 斷線後自動重連並重新訂閱。
+    session()（例如 in_trading_session）回傳 False 時不連線、已連線的斷開，thread 結束；再 start() 才重新啟動。
+    """
+
+    def __init__(self, table: QuoteTable, ws_factory: Callable[[], object], channels: Iterable[str] = CHANNELS,
+                 record_to: Optional[str] = None, session: Optional[Callable[[], bool]] = None):
+        self.table = table
+        self._ws_factory = ws_factory
+        self._session = session
+        self.channels = tuple(channels)
+        self.record_to = record_to
+        self._symbols: List[str] = []
+        self._subscribed: set = set()                 # (channel, symbol)
+        self._ids: Dict[tuple, str] = {}               # (channel, symbol) → 訂閱 id（unsubscribe 用）
+        self._ws = None
+        self._lock = threading.Lock()
+        self._record_lock = threading.Lock()
+        self._disconnected = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reconnects = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, symbols: Iterable[str]) -> None:
+        self.update_watchlist(symbols)
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="realtime-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._disconnected.set()
+        self._close_ws()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.table.set_connected(False)
+
+    def _close_ws(self) -> None:
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            try:
+                ws.disconnect()
+            except Exception:
+                pass
+
+    def _in_session(self) -> bool:
+        return self._session is None or self._session()
+
+    def update_watchlist(self, symbols: Iterable[str]) -> None:
+        symbols = list(dict.fromkeys(str(s) for s in symbols))
+        if len(symbols) > MAX_SYMBOLS:
+            print(f"⚠️ 觀察清單 {len(symbols)} 檔超過上限 {MAX_SYMBOLS}，只訂閱前 {MAX_SYMBOLS} 檔")
+            symbols = symbols[:MAX_SYMBOLS]
+        with self._lock:
+            self._symbols = symbols
+        self.table.watch(symbols)
+        if self._ws is not None:
+            self._sync_subscriptions()
+
+    # ---- 訂閱 ----
+    def _sync_subscriptions(self) -> None:
+        ws = self._ws
+        with self._lock:
+            wanted = {(c, s) for c in self.channels for s in self._symbols}
+            removed = [key for key in self._subscribed if key not in wanted]
+            added = [key for key in sorted(wanted) if key not in self._subscribed]
+            self._subscribed.difference_update(removed)
+            self._subscribed.update(added)
+            ids = [sub_id for sub_id in (self._ids.pop(key, None) for key in removed) if sub_id]
+        if ids:
+            ws.unsubscribe({"ids": ids})
+        for channel in self.channels:
+            symbols = [s for c, s in added if c == channel]
+            if symbols:
+                ws.subscribe({"channel": channel, "symbols": symbols})
+
+    def _on_subscribed(self, data) -> None:
+        with self._lock:
+            for item in data if isinstance(data, list) else [data]:
+                if isinstance(item, dict) and item.get("id"):
+                    self._ids[(item.get("channel"), item.get("symbol"))] = item["id"]
+
+    # ---- 訊息 ----
+    def _on_message(self, raw) -> None:
+        try:
+            message = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+            if self.record_to:
+                self._record(message)
+            if message.get("event") == "subscribed":
+                self._on_subscribed(message.get("data"))
+            self.table.apply(message)
+        except Exception as e:
+            print(f"⚠️ 即時行情訊息處理失敗：{e}")
+
+    def _record(self, message: dict) -> None:
+        path = Path(self.record_to)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps({"t": time.time(), "message": message}, ensure_ascii=False)
+        with self._record_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _on_disconnect(self, *args) -> None:
+        self.table.set_connected(False)
+        self._disconnected.set()
+
+    # ---- 連線迴圈 ----
+    def _run(self) -> None:
+        delay = RECONNECT_BASE
+        while not self._stop.is_set():
+            if not self._in_session():
+                self._close_ws()
+                self.table.set_connected(False)
+                print("ℹ️ 非交易時段，即時行情停止（盤中再啟動）")
+                return
+            self._disconnected.clear()
+            try:
+                with self._lock:
+                    self._subscribed.clear()
+                    self._ids.clear()
+                ws = self._ws_factory()
+                ws.on("message", self._on_message)
+                ws.on("disconnect", self._on_disconnect)
+                ws.on("error", lambda error: print(f"⚠️ 即時行情連線錯誤：{error}"))
+                ws.connect()
+                self._ws = ws
+                self.table.set_connected(True)
+                self._sync_subscriptions()
+                print(f"📡 即時行情已連線，訂閱 {len(self._symbols)} 檔")
+                delay = RECONNECT_BASE
+            except RealtimeUnavailable as e:
+                print(f"ℹ️ 不啟動即時行情：{e}")
+                return
+            except Exception as e:
+                print(f"⚠️ 即時行情連線失敗，{delay:.0f}s 後重試：{e}")
+                self.table.set_connected(False)
+                self._disconnected.set()
+
+            while not self._disconnected.wait(SESSION_CHECK_SECONDS):
+                if not self._in_session():
+                    break             # 收盤：回到迴圈開頭斷線、結束
+            else:                     # 斷線：退避後重連
+                self._ws = None
+                if self._stop.wait(delay):
+                    break
+                self.reconnects += 1
+                delay = min(delay * 2, RECONNECT_MAX)
+
+
+class ReplayWebsocket:
+    """
+    離線替身：介面同富邦 websocket_client.stock，依錄製檔（RealtimeFeed record_to 產生的 JSONL）
+    或直接給的訊息清單重播；第一次訂閱後開始送，只送已訂閱股票的資料。speed=0 表示不等待，越快越好。
+    重播完後持續送 heartbeat，讓報價表維持可用。
+    """
+
+    def __init__(self, messages=None, path: Optional[str] = None, speed: float = 0.0, heartbeat: float = 15.0):
+        if messages is None:
+            messages = []
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        messages.append(json.loads(line))
+        self._messages = [m if "message" in m else {"t": None, "message": m} for m in messages]
+        self.speed = speed
+        self.heartbeat = heartbeat
+        self._handlers: Dict[str, List[Callable]] = {}
+        self._symbols: Dict[str, set] = {}
+        self._ids = 0
+        self._started = False
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self.done = threading.Event()
+
+    def on(self, event: str, handler: Callable) -> None:
+        self._handlers.setdefault(event, []).append(handler)
+
+    def _emit(self, event: str, *args) -> None:
+        for handler in self._handlers.get(event, []):
+            handler(*args)
+
+    def connect(self) -> None:
+        self._emit("message", json.dumps({"event": "authenticated", "data": {"message": "Authenticated successfully"}}))
+
+    def subscribe(self, params: dict) -> None:
+        channel = params["channel"]
+        symbols = params.get("symbols") or [params["symbol"]]
+        with self._lock:
+            self._symbols.setdefault(channel, set()).update(symbols)
+            replies = []
+            for symbol in symbols:
+                self._ids += 1
+                replies.append({"id": f"replay-{self._ids}", "channel": channel, "symbol": symbol})
+            start, self._started = not self._started, True
+        self._emit("message", json.dumps({"event": "subscribed", "data": replies}))
+        if start:     # 跟真的伺服器一樣，訂閱之後才有資料
+            threading.Thread(target=self._play, name="realtime-replay", daemon=True).start()
+
+    def unsubscribe(self, params: dict) -> None:
+        self._emit("message", json.dumps({"event": "unsubscribed", "data": [{"id": i} for i in params.get("ids", [])]}))
+
+    def disconnect(self) -> None:
+        self._closed.set()
+        self._emit("disconnect", 1000, "closed")
+
+    def _subscribed(self, message: dict) -> bool:
+        data = message.get("data")
+        if message.get("event") not in ("data", "snapshot") or not isinstance(data, dict):
+            return True
+        with self._lock:     # 只看股票代碼（RealtimeFeed 每檔都訂閱全部頻道，逐頻道訂閱之間不會漏訊息）
+            return any(data.get("symbol") in symbols for symbols in self._symbols.values())
+
+    def _play(self) -> None:
+        previous = None
+        for item in self._messages:
+            if self._closed.is_set():
+                return
+            t = item.get("t")
+            if self.speed and previous is not None and t is not None:
+                self._closed.wait(max(0.0, (t - previous) / self.speed))
+            previous = t if t is not None else previous
+            if self._subscribed(item["message"]):
+                self._emit("message", json.dumps(item["message"], ensure_ascii=False))
+        self.done.set()
+        while not self._closed.wait(self.heartbeat):
+            self._emit("message", json.dumps({"event": "heartbeat", "data": {"time": int(time.time() * 1e6)}}))
+
+
+# ---------------------------- 預設實例 ----------------------------
+def _replay_path() -> Optional[Path]:
+    from common import replay
+
+    store = replay.active_store()
+    return store.root / "realtime" / "messages.jsonl" if store is not None else None
+
+
+def fubon_websocket(sdk) -> object:
+    """登入後 SDK 的行情 WebSocket（init_realtime 之後才有）"""
+    marketdata = getattr(sdk, "marketdata", None)
+    if marketdata is None or not hasattr(marketdata, "websocket_client"):
+        raise RealtimeUnavailable("這個 SDK 沒有 WebSocket（session broker 模式請用 fubon_broker.py --realtime）")
+    return marketdata.websocket_client.stock
+
+
+def default_ws_factory() -> object:
+    from common import replay
+
+    if replay.replaying():
+        return ReplayWebsocket(path=str(_replay_path()))
+    from common.quote_service import get_quote_service
+
+    client = get_quote_service().client()
+    client.reststock                      # 確保 init_realtime() 做過（每個 SDK 只做一次）
+    return fubon_websocket(client.sdk)
+
+
+_table: Optional[QuoteTable] = None
+_feed: Optional[RealtimeFeed] = None
+_singleton_lock = threading.Lock()
+
+
+def get_quote_table() -> QuoteTable:
+    global _table
+    with _singleton_lock:
+        if _table is None:
+            _table = QuoteTable()
+        return _table
+
+
+def ensure_realtime_feed(symbols: Optional[Iterable[str]] = None) -> Optional[RealtimeFeed]:
+    """
+    啟動（或更新觀察清單）process 內的即時行情；FUBON_REALTIME=off 時不啟動。
+    非交易時段直接回傳 None：不建立連線，也不會為了 WebSocket 觸發富邦登入（重播模式不受限）
+    """
+    global _feed
+    if os.getenv("FUBON_REALTIME", "on").lower() in ("off", "0", "false"):
+        return None
+    from common import replay
+
+    session = None if replay.replaying() else in_trading_session
+    if session is not None and not session():
+        return None
+
+    table = get_quote_table()
+    with _singleton_lock:
+        if _feed is None:
+            store = replay.active_store()
+            record_to = str(_replay_path()) if store is not None and not store.replaying else None
+            _feed = RealtimeFeed(table, default_ws_factory, record_to=record_to, session=session)
+    _feed.start(load_watchlist() if symbols is None else symbols)
+    return _feed
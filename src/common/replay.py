@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取層的錄製 / 重播 (record / replay)：線上錄一次真實回應，之後離線重播做回歸測試與壓測。
+
+錄製的對象
+    http         : common.http_fetcher 的 HTTP body（交易所 JSON、籌碼 HTML…）
+    selenium     : fetch_html_selenium 的 page_source
+    finmind_rest : FinMindRestClient 的回應
+    fubon_sdk    : get_logged_in_sdk() 回傳的 SDK（呼叫鏈 + 參數 → 回傳值）
+    finmind_sdk  : get_logged_in_dl() 回傳的 DataLoader（DataFrame 以 split 格式存）
+
+以環境變數啟用（不設定時完全不影響既有行為）
+    FETCH_REPLAY=record | replay
+    FETCH_REPLAY_DIR=data/replay_store           # 每筆一個 .json.gz
+    FETCH_REPLAY_LATENCY=0.2                     # 重播時每個 request 的平均延遲（秒）
+    FETCH_REPLAY_JITTER=0.5                      # 延遲 ±50% 均勻分布
+    FETCH_REPLAY_ERROR_RATE=0.05                 # 重播時隨機丟出 InjectedFetchError 的機率
+    FETCH_REPLAY_SEED=42
+
+程式內使用（測試 / 壓測）
+    from common import replay
+    replay.set_store(replay.ReplayStore("tests/fixtures/replay", mode="replay", latency=0.05))
+
+壓測：python src/tools/bench_fetch_replay.py --help
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from common.response_cache import cache_key
+
+DEFAULT_DIR = "data/replay_store"
+_MISSING = object()
+
+_store: Optional["ReplayStore"] = None
+_store_from_env = False
+_store_lock = threading.Lock()
+
+
+class ReplayMiss(KeyError):
+    """重播模式下找不到對應的錄製資料"""
+
+
+class InjectedFetchError(ConnectionError):
+    """重播模式下依 error_rate 注入的錯誤（視同連線錯誤，會走各 client 的重試邏輯）"""
+
+
+# ---------------------------- 序列化 ----------------------------
+def _encode(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if type(value).__name__ == "DataFrame":
+        return {"__dataframe__": json.loads(value.to_json(orient="split", date_format="iso"))}
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, "__dict__"):  # SDK 回傳的結果物件（如 login result）
+        return {"__object__": {k: _encode(v) for k, v in vars(value).items() if not k.startswith("_")}}
+    return str(value)
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "__bytes__" in value:
+            return base64.b64decode(value["__bytes__"])
+        if "__dataframe__" in value:
+            import pandas as pd
+            split = value["__dataframe__"]
+            return pd.DataFrame(split["data"], index=split.get("index"), columns=split["columns"])
+        if "__object__" in value:
+            from types import SimpleNamespace
+            return SimpleNamespace(**{k: _decode(v) for k, v in value["__object__"].items()})
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+# ---------------------------- Store ----------------------------
+class ReplayStore:
+    def __init__(self, root: str = DEFAULT_DIR, mode: str = "replay", latency: float = 0.0,
+                 jitter: float = 0.5, error_rate: float = 0.0, seed: Optional[int] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"未知的 replay 模式：{mode}")
+        self.root = Path(root)
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "injected_errors": 0, "recorded": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _path(self, kind: str, key: str) -> Path:
+        return self.root / kind / key[:2] / f"{key}.json.gz"
+
+    def save(self, kind: str, key: str, meta: dict, value: Any) -> None:
+        path = self._path(kind, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        doc = {"kind": kind, "meta": meta, "value": _encode(value), "recorded_at": time.time()}
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
+        self._count("recorded")
+
+    def peek(self, kind: str, key: str) -> Any:
+        """直接讀錄製的值（不模擬延遲 / 錯誤）；沒有則回傳 _MISSING"""
+        path = self._path(kind, key)
+        if not path.exists():
+            return _MISSING
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return _decode(json.load(f)["value"])
+
+    def load(self, kind: str, key: str) -> Any:
+        """重播一個 request：模擬延遲、依機率注入錯誤，再回傳錄製的值"""
+        with self._lock:
+            delay = self.latency * self._rng.uniform(1 - self.jitter, 1 + self.jitter) if self.latency else 0.0
+            inject = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if inject:
+            self._count("injected_errors")
+            raise InjectedFetchError(f"injected error ({kind})")
+
+        value = self.peek(kind, key)
+        if value is _MISSING:
+            self._count("misses")
+            raise ReplayMiss(f"{kind}:{key}")
+        self._count("hits")
+        return value
+
+    def entries(self, kind: str) -> Iterator[dict]:
+        """列出某類錄製資料的 meta（壓測時用來重建同樣的 request）"""
+        for path in sorted((self.root / kind).rglob("*.json.gz")):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                yield json.load(f)["meta"]
+
+    def wrap(self, target: Any, kind: str) -> "ReplayProxy":
+        return ReplayProxy(target, kind, self)
+
+
+class ReplayResponse:
+    """重播時代替 httpx / requests 的 Response（只實作抓取層用到的部分）"""
+
+    status_code = 200
+
+    def __init__(self, content: bytes, encoding: Optional[str] = None):
+        self.content = content
+        self.encoding = encoding
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        return None
+
+
+class OfflineSession:
+    """重播模式下 FinMindRestClient 用的假 session（不需要安裝 requests）"""
+
+    def __init__(self):
+        self.headers = {}
+
+    def close(self):
+        pass
+
+
+class ReplayProxy:
+    """
+    包住 SDK 物件：錄製時轉呼叫真實物件並存下回傳值；重播時 target 可為 None，完全離線。
+    屬性若是單純值（int / str…）也會被錄下，例如 DataLoader.api_usage。
+    """
+
+    _PLAIN = (str, int, float, bool, type(None))
+
+    def __init__(self, target: Any, kind: str, store: ReplayStore, path: str = ""):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_kind", kind)
+        object.__setattr__(self, "_store", store)
+        object.__setattr__(self, "_path", path)
+
+    def __getattr__(self, name: str):
+        path = f"{self._path}.{name}" if self._path else name
+        store = self._store
+        key = cache_key(self._kind, {"attr": path})
+
+        if store.replaying:
+            value = store.peek(self._kind, key)
+            # 沒錄到屬性值 → 代表這是方法 / 子物件
+            return ReplayProxy(None, self._kind, store, path) if value is _MISSING else value
+
+        value = getattr(self._target, name)
+        if isinstance(value, self._PLAIN):
+            store.save(self._kind, key, {"attr": path}, value)
+            return value
+        return ReplayProxy(value, self._kind, store, path)
+
+    def __call__(self, *args, **kwargs):
+        meta = {"call": self._path, "args": _encode(list(args)), "kwargs": _encode(kwargs)}
+        key = cache_key(self._kind, meta)
+        if self._store.replaying:
+            return self._store.load(self._kind, key)
+        result = self._target(*args, **kwargs)
+        self._store.save(self._kind, key, meta, result)
+        return result
+
+
+# ---------------------------- 全域設定 ----------------------------
+def set_store(store: Optional[ReplayStore]) -> None:
+    global _store, _store_from_env
+    with _store_lock:
+        _store = store
+        _store_from_env = True  # 明確設定後不再讀環境變數
+
+
+def active_store() -> Optional[ReplayStore]:
+    """目前啟用的 ReplayStore；沒有設定 FETCH_REPLAY 時回傳 None"""
+    global _store, _store_from_env
+    if _store_from_env:
+        return _store
+    with _store_lock:
+        if not _store_from_env:
+            mode = os.getenv("FETCH_REPLAY", "").strip().lower()
+            if mode in ("record", "replay"):
+                seed = os.getenv("FETCH_REPLAY_SEED")
+                _store = ReplayStore(
+                    os.getenv("FETCH_REPLAY_DIR", DEFAULT_DIR),
+                    mode=mode,
+                    latency=float(os.getenv("FETCH_REPLAY_LATENCY", "0")),
+                    jitter=float(os.getenv("FETCH_REPLAY_JITTER", "0.5")),
+                    error_rate=float(os.getenv("FETCH_REPLAY_ERROR_RATE", "0")),
+                    seed=int(seed) if seed else None,
+                )
+            _store_from_env = True
+    return _store
+
+
+def replaying() -> bool:
+    store = active_store()
+    return store is not None and store.replaying
+
+
+def maybe_wrap(target: Any, kind: str) -> Any:
+    """record / replay 啟用時回傳 ReplayProxy，否則原物件"""
+    store = active_store()
+    return store.wrap(target, kind) if store is not None else target
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 回應的本機磁碟快取（content-addressed，以 URL + params 為 key），給所有 JSON 報表抓取共用。
+
+- 已結束的期間（上個月以前的 STOCK_DAY、過去交易日的 MI_INDEX / TWT38U…）內容不會再變 → TTL 無限
+- 尚未結束的期間（當月、今天）→ 短 TTL，盤後重跑仍會拿到最新資料
+- 「定案」看寫入時間：期間結束前寫入的快取（月中的 STOCK_DAY、盤中的 MI_INDEX）只是部分資料，
+  期間結束後仍用短 TTL，重抓一次覆寫後才永久有效（ttl_for_period 回傳的 PeriodTTL 帶著期間結束時間）
+- 以 zstd 壓縮存放（沒有安裝 zstandard 時退回 zlib），一個回應一個檔，寫入時先寫暫存檔再 rename
+
+回補 (backfill) 跑到一半失敗時，重跑只會對「還沒抓過」的 URL 發 request。
+
+使用方式（一般透過 common.http_fetcher.fetch_json_http 的 ttl 參數）
+    from common.http_fetcher import fetch_json_http
+    from common.response_cache import month_ttl
+
+    payload = fetch_json_http(STOCK_DAY_URL, params=params, verify=False, ttl=month_ttl(date))
+"""
+
+from __future__ import annotations
+
+import calendar
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Optional, Union
+
+CACHE_DIR = Path("data/http_cache")
+FOREVER = float("inf")
+OPEN_PERIOD_TTL = 30 * 60  # 秒；當月 / 當日的資料 30 分鐘內重複抓直接用快取
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+try:
+    import zstandard as _zstd
+except ImportError:  # 沒裝 zstandard 時用標準庫 zlib
+    _zstd = None
+
+_EXT = ".zst" if _zstd is not None else ".zlib"
+
+
+def _compress(data: bytes) -> bytes:
+    if _zstd is not None:
+        return _zstd.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data: bytes, ext: str) -> bytes:
+    if ext == ".zst":
+        return _zstd.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+# ---------------------------- TTL ----------------------------
+def _as_date(d: Union[date, datetime]) -> date:
+    return d.date() if isinstance(d, datetime) else d
+
+
+class PeriodTTL(float):
+    """
+    ttl_for_period 的結果（可當 float 用）：另外記著期間結束的時間點 closes_at（timestamp）。
+    get() 對 closes_at 之前寫入的快取一律只給 open_ttl —— 那時期間還沒結束，內容不是定案。
+    """
+
+    def __new__(cls, value: float, closes_at: float, open_ttl: float):
+        obj = super().__new__(cls, value)
+        obj.closes_at = closes_at
+        obj.open_ttl = open_ttl
+        return obj
+
+
+def ttl_for_period(period_end: Union[date, datetime], today: Optional[date] = None,
+                   open_ttl: float = OPEN_PERIOD_TTL) -> PeriodTTL:
+    """期間最後一天早於今天 → 已結束（FOREVER，但只限期間結束後寫入的快取）；否則用短 TTL"""
+    today = today or date.today()
+    end = _as_date(period_end)
+    closes_at = datetime.combine(end + timedelta(days=1), time.min).timestamp()
+    return PeriodTTL(FOREVER if end < today else open_ttl, closes_at, open_ttl)
+
+
+def month_ttl(d: Union[date, datetime], today: Optional[date] = None) -> float:
+    """月報（如 STOCK_DAY）：該月最後一天過了才算結束"""
+    d = _as_date(d)
+    last_day = d.replace(day=calendar.monthrange(d.year, d.month)[1])
+    return ttl_for_period(last_day, today)
+
+
+def day_ttl(d: Union[date, datetime], today: Optional[date] = None) -> float:
+    """日報（如 MI_INDEX、TWT38U）：隔天以後視為定案"""
+    return ttl_for_period(d, today)
+
+
+# ---------------------------- 快取存取 ----------------------------
+def cache_key(url: str, params: Optional[dict] = None) -> str:
+    raw = url + "?" + json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _path(key: str, ext: str = _EXT, cache_dir: Path = None) -> Path:
+    return Path(cache_dir or CACHE_DIR) / key[:2] / f"{key}{ext}"
+
+
+def get(url: str, params: Optional[dict] = None, ttl: float = FOREVER,
+        cache_dir: Path = None) -> Optional[bytes]:
+    """命中且未過期 → 回傳原始 body；否則 None"""
+    key = cache_key(url, params)
+    for ext in (".zst", ".zlib"):
+        path = _path(key, ext, cache_dir)
+        if not path.exists() or (ext == ".zst" and _zstd is None):
+            continue
+        mtime = path.stat().st_mtime
+        effective_ttl = ttl
+        if isinstance(ttl, PeriodTTL) and mtime < ttl.closes_at:
+            effective_ttl = min(ttl, ttl.open_ttl)     # 期間結束前寫入 → 部分資料，不能當定案
+        if datetime.now().timestamp() - mtime > effective_ttl:
+            break
+        try:
+            body = _decompress(path.read_bytes(), ext)
+        except Exception:
+            break  # 檔案損毀當作沒命中，之後會被覆寫
+        with _stats_lock:
+            _stats["hits"] += 1
+        return body
+    with _stats_lock:
+        _stats["misses"] += 1
+    return None
+
+
+def put(url: str, params: Optional[dict], body: bytes, cache_dir: Path = None) -> None:
+    path = _path(cache_key(url, params), cache_dir=cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f"{path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(_compress(body))
+    os.replace(tmp, path)
+
+
+def cache_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
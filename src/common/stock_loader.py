@@ -1,13 +1,11 @@
-import sqlite3
-import pandas as pd
-import streamlit as st
+from common.query_cache import get_query_cache
 
-# 讀取持股清單與公司名稱（可支援 refresh cache）
-@st.cache_data(show_spinner=False)
+# 讀取持股清單與公司名稱（stock_meta 走 query_cache：DB 有新寫入才重新查詢）
 def load_stock_list_with_names(file_path="my_stock_holdings.txt", db_path="data/institution.db", refresh=False):
     """讀取持股股票清單與名稱對照，回傳 stock_id 清單與顯示選項清單"""
+    cache = get_query_cache(db_path)
     if refresh:
-        st.cache_data.clear()
+        cache.clear()
 
     with open(file_path, "r", encoding="utf-8") as f:
         stocks = sorted(
@@ -15,16 +13,9 @@ def load_stock_list_with_names(file_path="my_stock_holdings.txt", db_path="data/
             if line.strip() and not line.strip().startswith("#")
         )
 
-    conn = sqlite3.connect(db_path)
-    # 同時讀取名稱與市場別（市/櫃）
-    df = pd.read_sql_query("SELECT stock_id, name, market FROM stock_meta", conn)
-    conn.close()
-
-    # 建立 {stock_id: (name, market)} 對照
-    id_info_map = {
-        str(row["stock_id"]): (row["name"], row.get("market")) if isinstance(row, dict) else (row["name"], row["market"])
-        for _, row in df.iterrows()
-    }
+    # 同時讀取名稱與市場別（市/櫃），建立 {stock_id: (name, market)} 對照
+    rows = cache.fetchall("SELECT stock_id, name, market FROM stock_meta", tables=["stock_meta"])
+    id_info_map = {str(stock_id): (name, market) for stock_id, name, market in rows}
 
     def format_display(stock_id: str) -> str:
         """將代碼、名稱與市場別組成顯示文字，如 2330 台積電 (市)"""
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+儀表板的個股資料快取 + 背景預取：畫完目前這檔後，在背景 thread 先把清單中「下一檔 / 上一檔」
+的圖表與重計算（強勢表、日K圖、基準價 / 扣抵值、週月高低…）算好放進快取，切換股票時直接命中。
+
+- StockCache.memoize：以 (函式, 綁定後的參數) 為 key；DB 有新寫入（common.query_cache 的
+  PRAGMA data_version）或跨日即失效；總大小超過 budget_mb 時依 LRU 淘汰
+- 同一個 key 正在背景計算時，前景會等它算完直接拿結果，不會重算一次
+- Prefetcher 只有一條 worker thread：前景執行中（enter_foreground ~ schedule 之間）不動作，
+  快取用量超過預算的 PREFETCH_FILL 就不再預取（預取永遠不會把前景的結果擠掉）
+
+使用方式
+    from common.stock_prefetch import get_prefetcher, get_stock_cache, neighbors
+
+    cache = get_stock_cache()
+    plot_price_interactive = cache.memoize(plot_price_interactive)
+
+    prefetcher = get_prefetcher()
+    prefetcher.enter_foreground()                     # 每次 rerun 開頭
+    ...                                               # 畫目前這檔
+    prefetcher.schedule(neighbors(stock_ids, selected), warm_stock)   # rerun 結尾
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Callable, Iterable, List, Optional
+
+from common.query_cache import DB_PATH, get_query_cache
+
+MEMORY_BUDGET_MB = 256
+PREFETCH_FILL = 0.8          # 快取用量超過預算的 80% 就停止預取
+IDLE_DELAY = 0.3             # 前景結束後至少等多久才開始預取（秒）
+FOREGROUND_TIMEOUT = 60      # enter_foreground 後超過這麼久沒 schedule，視為前景已結束（例外中斷等）
+
+
+def estimate_size(obj, _depth: int = 0) -> int:
+    """粗估物件佔用的位元組數（DataFrame、ndarray、plotly Figure、tuple/list/dict）"""
+    if _depth > 6:
+        return sys.getsizeof(obj)
+    if hasattr(obj, "memory_usage") and hasattr(obj, "index"):          # pandas
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if hasattr(obj, "nbytes"):                                            # numpy
+        return int(obj.nbytes)
+    if hasattr(obj, "to_plotly_json"):                                    # plotly Figure
+        return estimate_size(obj.to_plotly_json(), _depth + 1)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(v, _depth + 1) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(estimate_size(v, _depth + 1) for v in obj)
+    return sys.getsizeof(obj)
+
+
+class StockCache:
+    def __init__(self, db_path: str = DB_PATH, budget_mb: float = MEMORY_BUDGET_MB):
+        self.db_path = db_path
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.nbytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._entries: OrderedDict = OrderedDict()   # key → (token, 結果, 大小)
+        self._inflight = {}                          # key → threading.Event
+        self._lock = threading.Lock()
+
+    def _token(self):
+        return get_query_cache(self.db_path).data_version(), date.today()
+
+    def _store(self, key, token, value) -> None:
+        size = estimate_size(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            self._entries[key] = (token, value, size)
+            self.nbytes += size
+            while self.nbytes > self.budget and len(self._entries) > 1:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.stats["evictions"] += 1
+
+    def get_or_compute(self, key, compute: Callable):
+        token = self._token()
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == token:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    self.stats["misses"] += 1
+                    break
+            event.wait()          # 別的 thread 正在算同一個 key → 等它算完再查一次
+
+        try:
+            value = compute()
+            self._store(key, token, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def memoize(self, fn: Callable) -> Callable:
+        """
+        包裝純讀 DB 的函式；位置參數或關鍵字參數呼叫都對應到同一個 key。
+        signature 在第一次呼叫時才解析（fn 可以是 common.lazy_import.lazy_function，包裝時不必 import）
+        """
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        signature = None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            nonlocal signature
+            if signature is None:
+                signature = inspect.signature(fn)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (name, tuple(bound.arguments.items()))
+            return self.get_or_compute(key, lambda: fn(*args, **kwargs))
+
+        return wrapper
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+class Prefetcher:
+    def __init__(self, cache: StockCache, idle_delay: float = IDLE_DELAY):
+        self.cache = cache
+        self.idle_delay = idle_delay
+        self.stats = {"prefetched": 0, "skipped": 0, "errors": 0}
+        self._queue: queue.Queue = queue.Queue()
+        self._generation = 0
+        self._foreground_since: Optional[float] = None
+        self._last_foreground = 0.0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="stock-prefetch", daemon=True)
+        self._thread.start()
+
+    # ---- 前景 ----
+    def enter_foreground(self) -> None:
+        with self._lock:
+            self._foreground_since = time.monotonic()
+
+    def leave_foreground(self) -> None:
+        with self._lock:
+            self._foreground_since = None
+            self._last_foreground = time.monotonic()
+
+    def schedule(self, stock_ids: Iterable[str], warm: Callable[[str], None]) -> None:
+        """結束前景並排入預取；之前還沒做完的預取直接作廢"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        for stock_id in stock_ids:
+            self._queue.put((generation, stock_id, warm))
+        self.leave_foreground()
+
+    # ---- worker ----
+    def _foreground_busy(self) -> bool:
+        with self._lock:
+            since = self._foreground_since
+            if since is not None and time.monotonic() - since < FOREGROUND_TIMEOUT:
+                return True
+            return time.monotonic() - self._last_foreground < self.idle_delay
+
+    def _run(self) -> None:
+        while True:
+            generation, stock_id, warm = self._queue.get()
+            while self._foreground_busy() and generation == self._generation:
+                time.sleep(0.05)
+            if generation != self._generation or self.cache.nbytes >= self.cache.budget * PREFETCH_FILL:
+                self.stats["skipped"] += 1
+                continue
+            try:
+                warm(stock_id)
+                self.stats["prefetched"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️ 預取 {stock_id} 失敗：{e}")
+
+
+def neighbors(stock_ids: List[str], current: str, radius: int = 1) -> List[str]:
+    """清單中 current 的下一檔、上一檔（先下後上，越近越先）；頭尾循環"""
+    if current not in stock_ids or len(stock_ids) < 2:
+        return []
+    i, n = stock_ids.index(current), len(stock_ids)
+    out = []
+    for step in range(1, radius + 1):
+        for j in (i + step, i - step):
+            sid = stock_ids[j % n]
+            if sid != current and sid not in out:
+                out.append(sid)
+    return out
+
+
+_cache: Optional[StockCache] = None
+_prefetcher: Optional[Prefetcher] = None
+_singleton_lock = threading.Lock()
+
+
+def get_stock_cache() -> StockCache:
+    global _cache
+    with _singleton_lock:
+        if _cache is None:
+            _cache = StockCache()
+        return _cache
+
+
+def get_prefetcher() -> Prefetcher:
+    global _prefetcher
+    cache = get_stock_cache()
+    with _singleton_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(cache)
+        return _prefetcher
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+台股交易日曆：判斷某天是否開市、往前找最近的交易日。
+
+- 來源：FinMind TaiwanStockTradingDate，一年一個 request；過去的年度永久快取，
+  今年走 common.response_cache 的短 TTL（國定假日 / 颱風假公告後會更新）
+- 抓不到（離線、額度用完）或日期超出已知範圍時，退回「週一～週五」的規則
+- 同一個 process 內已結束的年度只查一次（記憶體快取）；年底前抓的（含今年）每天最多重查一次，
+  跨年後重抓一次才算定案（磁碟快取同理，見 common.response_cache.PeriodTTL）
+
+使用方式
+    from common.trading_calendar import get_trading_calendar
+
+    cal = get_trading_calendar()
+    cal.is_trading_day(date(2025, 10, 10))        # False（國慶日）
+    cal.latest_trading_day(date.today())          # 今天開市就是今天，否則往前找
+    cal.previous_trading_day(date.today())
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import date, timedelta
+from typing import Callable, Dict, FrozenSet, Optional, Tuple
+
+from common.response_cache import ttl_for_period
+
+DATASET = "TaiwanStockTradingDate"
+MAX_LOOKBACK = 30   # 往前找交易日最多找幾天（連假也不會超過）
+
+
+def _fetch_year_from_finmind(year: int) -> FrozenSet[date]:
+    from common.finmind_rest_client import FinMindRestClient
+
+    start, end = date(year, 1, 1), date(year, 12, 31)
+    rows = FinMindRestClient().get(DATASET, start_date=start.isoformat(), end_date=end.isoformat(),
+                                   ttl=ttl_for_period(end))
+    return frozenset(date.fromisoformat(str(r["date"])[:10]) for r in rows)
+
+
+class TradingCalendar:
+    def __init__(self, fetch_year: Optional[Callable[[int], FrozenSet[date]]] = None,
+                 today: Callable[[], date] = date.today):
+        self._fetch_year = fetch_year or _fetch_year_from_finmind
+        self._today = today
+        self._years: Dict[int, Tuple[Optional[FrozenSet[date]], Optional[date]]] = {}   # year → (交易日, 未定案時的抓取日)
+        self._lock = threading.Lock()
+
+    def _days(self, year: int) -> Optional[FrozenSet[date]]:
+        with self._lock:
+            today = self._today()
+            cached = self._years.get(year)
+            if cached is None or (cached[1] is not None and cached[1] != today):
+                try:
+                    days = self._fetch_year(year) or None
+                except Exception as e:
+                    print(f"⚠️ 交易日曆 {year} 取得失敗，改用週一～週五規則：{e}")
+                    days = None
+                # 年底前抓的（今年、或當時還沒過完的年度）不是定案：隔天再查一次
+                final = days is not None and today > date(year, 12, 31)
+                self._years[year] = (days, None if final else today)
+            return self._years[year][0]
+
+    def is_trading_day(self, d: date) -> bool:
+        days = self._days(d.year)
+        if days is None or d > max(days):   # 尚未公布的日期：只能用星期判斷
+            return d.weekday() < 5
+        return d in days
+
+    def previous_trading_day(self, d: date) -> date:
+        """d 之前（不含 d）最近的交易日"""
+        for step in range(1, MAX_LOOKBACK + 1):
+            candidate = d - timedelta(days=step)
+            if self.is_trading_day(candidate):
+                return candidate
+        raise RuntimeError(f"{d} 之前 {MAX_LOOKBACK} 天內沒有交易日")
+
+    def latest_trading_day(self, d: date) -> date:
+        """d 當天（含）以前最近的交易日"""
+        return d if self.is_trading_day(d) else self.previous_trading_day(d)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._years.clear()
+
+
+_calendar: Optional[TradingCalendar] = None
+_calendar_lock = threading.Lock()
+
+
+def get_trading_calendar() -> TradingCalendar:
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = TradingCalendar()
+        return _calendar
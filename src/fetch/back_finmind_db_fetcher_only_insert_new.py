@@ -1,5 +1,5 @@
-import sys, io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+import sys
+sys.stdout.reconfigure(encoding='utf-8')
 
 import sqlite3
 import pandas as pd
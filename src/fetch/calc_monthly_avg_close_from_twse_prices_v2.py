@@ -1,50 +1,37 @@
-import sqlite3
-import pandas as pd
+import sys
 from pathlib import Path
 
-DB_PATH = "data/institution.db"
-STOCK_ID = "2066"  # ✅ 修改這裡可以換個股
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
 
-def main():
-    # 連線並讀取該股每日收盤價
-    conn = sqlite3.connect(DB_PATH)
-    query = f"""
-        SELECT date, close
-        FROM twse_prices
-        WHERE stock_id = '{STOCK_ID}'
-        ORDER BY date
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-
-    if df.empty:
-        print(f"⚠️ 查無個股 {STOCK_ID} 的資料")
-        return
+from common.analytics_engine import get_engine, monthly_close_summary
 
-    # 將 date 欄轉換為 datetime，失敗的設為 NaT，並移除
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"])
+DB_PATH = "data/institution.db"
+STOCK_ID = "2066"  # ✅ 修改這裡可以換個股
 
-    # 加入年月欄位
-    df["year_month"] = df["date"].dt.strftime("%Y%m")
+def main(stock_id: str = STOCK_ID, engine: str = "sqlite"):
+    # 月均收盤 + 當月最後收盤（SQL 端聚合；engine="duckdb" 時由 DuckDB 執行）
+    with get_engine(engine, DB_PATH) as eng:
+        result = monthly_close_summary(eng, [stock_id])
 
-    # 分組計算：月均收盤 + 當月最後收盤
-    result = df.groupby("year_month").agg(
-        monthly_avg_close=("close", "mean"),
-        monthly_last_close=("close", lambda x: x.iloc[-1])
-    ).reset_index()
+    if result.empty:
+        print(f"⚠️ 查無個股 {stock_id} 的資料")
+        return
 
-    # 四捨五入取兩位小數
-    result["monthly_avg_close"] = result["monthly_avg_close"].round(2)
-    result["monthly_last_close"] = result["monthly_last_close"].round(2)
+    result = result.drop(columns=["stock_id"])
 
     # 顯示結果
     print(result)
 
     # 可選：匯出 CSV
     Path("output").mkdir(exist_ok=True)
-    result.to_csv(f"output/monthly_price_summary_{STOCK_ID}.csv", index=False, encoding="utf-8-sig")
-    print(f"✅ 已匯出至 output/monthly_price_summary_{STOCK_ID}.csv")
+    result.to_csv(f"output/monthly_price_summary_{stock_id}.csv", index=False, encoding="utf-8-sig")
+    print(f"✅ 已匯出至 output/monthly_price_summary_{stock_id}.csv")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    ap = argparse.ArgumentParser(description="個股月均收盤價 / 月底收盤價")
+    ap.add_argument("stock_id", nargs="?", default=STOCK_ID)
+    ap.add_argument("--engine", choices=["sqlite", "duckdb", "duckdb-columnar"], default="sqlite")
+    args = ap.parse_args()
+    main(args.stock_id, args.engine)
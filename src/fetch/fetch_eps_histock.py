@@ -1,10 +1,11 @@
 import sys
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+sys.stdout.reconfigure(encoding="utf-8")
 
 import sqlite3
 import time
 import os
+from datetime import datetime
+from pathlib import Path
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -13,6 +14,10 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.job_journal import JobJournal
+
 MAX_RETRIES = 3
 DB_PATH = "data/institution.db"
 
@@ -124,10 +129,10 @@ def save_eps_to_db(data, db_path=DB_PATH):
 # --------------------------------------------------------
 # 主程式 - 多檔股票
 # --------------------------------------------------------
-if __name__ == "__main__":
+def main(argv=None):
     # 預設股票清單檔
     stock_file = "my_stock_holdings.txt"
-    for arg in sys.argv:
+    for arg in (sys.argv if argv is None else argv):
         if arg.endswith(".txt") and os.path.exists(arg):
             stock_file = arg
             break
@@ -136,14 +141,25 @@ if __name__ == "__main__":
     with open(stock_file, "r", encoding="utf-8") as f:
         stock_list = [line.strip() for line in f if line.strip()]
 
-    for stock_id in stock_list:
+    # 同一天、同一份清單中斷後重跑 → 略過已完成的股票，只重試失敗的
+    journal = JobJournal("eps_histock", run_key=f"{datetime.today():%Y-%m-%d}:{os.path.basename(stock_file)}",
+                         db_path=DB_PATH)
+    for stock_id in journal.start(stock_list):
         print(f"📥 抓取 {stock_id} EPS（HiStock）...")
+        t0 = time.perf_counter()
         eps_records = fetch_eps_from_histock(stock_id)
         if eps_records:
             print(f"📊 解析到 {len(eps_records)} 筆 EPS 資料")
             success = save_eps_to_db(eps_records)
+            journal.mark_done(stock_id, time.perf_counter() - t0)
             print(f"✅ 更新 {success} 筆 EPS 資料")
         else:
+            journal.mark_failed(stock_id, "無 EPS 資料或失敗", time.perf_counter() - t0)
             print(f"⏭️  {stock_id} 無 EPS 資料或失敗")
 
-    print("🎉 所有股票處理完畢")
+    counts = journal.finish()
+    print(f"🎉 所有股票處理完畢：完成 {counts.get('done', 0)} 檔，失敗 {counts.get('failed', 0)} 檔")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import sys
 import time
 import sqlite3
 from datetime import datetime
@@ -9,17 +10,25 @@ from selenium.webdriver.support.ui import Select
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 import pandas as pd
+from pathlib import Path
 
-# ^OTCI
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.http_fetcher import FetchSource
+from fetch.html_parsers import parse_otc_index_html
 
-def convert_date(minguo_date_str):
-    y, m, d = minguo_date_str.split('/')
-    year = int(y) + 1911
-    return f"{year}-{int(m):02d}-{int(d):02d}"
+# ^OTCI
+# 頁面靠 JS 切換年/月選單才有資料 → 宣告為 http_ok=False (只能走瀏覽器)，
+# 但表格改成一次取 page_source 交給 lxml 解析，不再逐格呼叫 find_elements。
+OTC_INDEX_SOURCE = FetchSource(
+    name="tpex_daily_indices",
+    url_template="https://www.tpex.org.tw/zh-tw/mainboard/trading/info/daily-indices.html",
+    http_ok=False,
+)
 
 
 def fetch_otc_index(months=1):
-    url = "https://www.tpex.org.tw/zh-tw/mainboard/trading/info/daily-indices.html"
+    url = OTC_INDEX_SOURCE.url()
 
     options = webdriver.ChromeOptions()
     options.add_argument("--headless")  # ✅ 想在本地「暫時開啟」視窗做測試，只要把這行註解掉
@@ -53,26 +62,7 @@ def fetch_otc_index(months=1):
         time.sleep(3)
 
         # 抓取表格資料
-        rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-
-        for row in rows:
-            cols = row.find_elements(By.TAG_NAME, "td")
-            if len(cols) < 6:
-                continue
-
-            try:
-                date = convert_date(cols[0].text.strip())
-                volume = int(cols[1].text.replace(",", "").strip())
-                close = round(float(cols[4].text.strip()), 2)
-
-                all_data.append({
-                    "stock_id": "^OTCI",
-                    "date": date,
-                    "volume": volume,
-                    "close": close
-                })
-            except Exception as e:
-                print(f"⚠️ 資料錯誤跳過: {e}")
+        all_data.extend(parse_otc_index_html(driver.page_source))
 
     driver.quit()
     return pd.DataFrame(all_data)
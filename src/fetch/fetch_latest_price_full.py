@@ -1,26 +1,55 @@
 # fetch_latest_price_full.py
+# 用 FinMind TaiwanStockPrice 補最近 63 天的日K：一檔一個區間 request（原本一天一個、含週末共 63 個）
+# python src/fetch/fetch_latest_price_full.py 2330 2317 2454
 
-import requests
-import os
 import sqlite3
-from dotenv import load_dotenv
+import sys
+from pathlib import Path
 from datetime import datetime, timedelta
 
-load_dotenv()
-TOKEN = os.getenv("FINMIND_TOKEN")
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.finmind_rest_client import FinMindRestClient, price_rows_to_db_rows
+from common.response_cache import day_ttl
+from fetch.fetch_market_daily_prices import upsert_prices
+
 DB_PATH = "data/institution.db"
+LOOKBACK_DAYS = 63
 
-def fetch_and_store_price(stock_id="2330"):
-    if not TOKEN:
-        print("❌ 請在 .env 檔案中設定 FINMIND_TOKEN")
-        return
+_client = None
+
+
+def get_client() -> FinMindRestClient:
+    global _client
+    if _client is None:
+        _client = FinMindRestClient()
+    return _client
+
+
+def _date_range(days: int = LOOKBACK_DAYS):
+    end = datetime.today()
+    start = end - timedelta(days=days - 1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), day_ttl(end)
+
+
+def store_prices(conn: sqlite3.Connection, stock_id: str, rows: list) -> int:
+    """bulk insert（INSERT OR IGNORE：已存在的日期不覆蓋，與原本逐筆寫入相同），回傳原本 DB 沒有的日期數"""
+    db_rows = price_rows_to_db_rows(stock_id, rows)
+    if not db_rows:
+        return 0
+    existing = {r[0] for r in conn.execute(
+        "SELECT date FROM twse_prices WHERE stock_id = ? AND date BETWEEN ? AND ?",
+        (stock_id, min(r[1] for r in db_rows), max(r[1] for r in db_rows)),
+    )}
+    upsert_prices(conn, db_rows, on_conflict="ignore")
+    new_dates = sorted(r[1] for r in db_rows if r[1] not in existing)
+    for d in new_dates:
+        print(f"✅ 補上 {stock_id} - {d}")
+    return len(new_dates)
 
-    url = "https://api.finmindtrade.com/api/v4/data"
-    headers = {"Authorization": f"Bearer {TOKEN}"}
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
+def init_db(conn: sqlite3.Connection):
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS twse_prices (
             stock_id TEXT,
             date TEXT,
@@ -32,42 +61,35 @@ def fetch_and_store_price(stock_id="2330"):
             PRIMARY KEY (stock_id, date)
         )
     """)
-    count_inserted = 0
-    for i in range(63):
-        date_str = (datetime.today() - timedelta(days=i)).strftime("%Y-%m-%d")
-        params = {
-            "dataset": "TaiwanStockPrice",
-            "data_id": stock_id,
-            "start_date": date_str,
-            "end_date": date_str,
-        }
-
-        response = requests.get(url, params=params, headers=headers)
-        data = response.json()
-        rows = data.get("data", [])
-        # print([row["date"] for row in rows])  # 只印出日期
-        
-        for row in rows:
-            cursor.execute("""
-                INSERT OR IGNORE INTO twse_prices (stock_id, date, open, high, low, close, volume)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                stock_id,
-                row["date"],
-                row["open"],
-                row["max"],
-                row["min"],
-                row["close"],
-                row["Trading_Volume"]
-            ))
-            if cursor.rowcount > 0:
-                print(f"✅ 補上 {stock_id} - {row['date']}")
-                count_inserted += 1
-
-    conn.commit()
-    conn.close()
+
+
+def fetch_and_store_price(stock_id="2330"):
+    start, end, ttl = _date_range()
+    rows = get_client().get("TaiwanStockPrice", stock_id, start, end, ttl=ttl)
+
+    with sqlite3.connect(DB_PATH) as conn:
+        init_db(conn)
+        count_inserted = store_prices(conn, stock_id, rows)
     if count_inserted == 0:
-        print(f"ℹ️ {stock_id} 沒有需要補的資料（過去63天內皆已存在）")
+        print(f"ℹ️ {stock_id} 沒有需要補的資料（過去{LOOKBACK_DAYS}天內皆已存在）")
+
+
+def fetch_and_store_prices(stock_ids: list) -> dict:
+    """多檔並行抓（FinMindRestClient.max_workers），DB 寫入在主執行緒；回傳 {stock_id: 新增筆數 或 錯誤訊息}"""
+    start, end, ttl = _date_range()
+    results = get_client().fetch_many("TaiwanStockPrice", stock_ids, start, end, ttl=ttl)
+
+    summary = {}
+    with sqlite3.connect(DB_PATH) as conn:
+        init_db(conn)
+        for stock_id, rows in results.items():
+            if isinstance(rows, Exception):
+                print(f"❌ {stock_id} 抓取失敗：{rows}")
+                summary[stock_id] = str(rows)
+            else:
+                summary[stock_id] = store_prices(conn, stock_id, rows)
+    return summary
+
 
 if __name__ == "__main__":
-    fetch_and_store_price("2330")
+    fetch_and_store_prices(sys.argv[1:] or ["2330"])
@@ -1,7 +1,7 @@
 import os
 import sys
 import time
-import sqlite3
+from datetime import datetime
 from multiprocessing import Process, Queue
 import queue as pyqueue  # for Empty
 from selenium import webdriver
@@ -12,8 +12,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import WebDriverException, TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # 指到 src
+
+from common.db_writer import get_writer
+from common.job_journal import JobJournal
+
+sys.stdout.reconfigure(encoding='utf-8')
 
 DB_PATH = "data/institution.db"
 MAX_RETRY = 3
@@ -116,11 +120,8 @@ def fetch_main_force(stock_id: str):
 
 # ------------------------- DB 寫入 -------------------------
 def save_to_db(data, db_path=DB_PATH):
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    cursor.execute("""
+    writer = get_writer(db_path)
+    writer.execute("""
         CREATE TABLE IF NOT EXISTS main_force_trading (
             stock_id TEXT,
             date TEXT,
@@ -130,26 +131,18 @@ def save_to_db(data, db_path=DB_PATH):
             PRIMARY KEY (stock_id, date)
         )
     """)
-
-    success = 0
-    for row in data:
-        cursor.execute("""
-            INSERT OR IGNORE INTO main_force_trading
-            (stock_id, date, close_price, net_buy_sell, dealer_diff)
-            VALUES (?, ?, ?, ?, ?)
-        """, row)
-        if cursor.rowcount > 0:
-            success += 1
-
-    conn.commit()
-    conn.close()
-    return success
+    return writer.executemany("""
+        INSERT OR IGNORE INTO main_force_trading
+        (stock_id, date, close_price, net_buy_sell, dealer_diff)
+        VALUES (?, ?, ?, ?, ?)
+    """, data)
 
 # ------------------------- 入口 -------------------------
-if __name__ == "__main__":
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
     # 判斷是否有傳入 txt 清單檔
     stock_file = "my_stock_holdings.txt"
-    for arg in sys.argv[1:]:
+    for arg in argv[1:]:
         if arg.endswith(".txt") and os.path.exists(arg):
             stock_file = arg
             break
@@ -158,14 +151,24 @@ if __name__ == "__main__":
     with open(stock_file, "r", encoding="utf-8") as f:
         stock_list = [line.strip() for line in f if line.strip()]
 
-    timeout_list = []  # 方便最後列出逾時股票
-    for stock_id in stock_list:
+    # 同一天、同一份清單中斷後重跑 → 略過已完成的股票，只重試失敗的
+    journal = JobJournal("main_force", run_key=f"{datetime.today():%Y-%m-%d}:{os.path.basename(stock_file)}",
+                         db_path=DB_PATH)
+    for stock_id in journal.start(stock_list):
         print(f"📥 抓取 {stock_id} 主力進出資料中...")
+        t0 = time.perf_counter()
         records = fetch_main_force(stock_id)
         if records:
             inserted = save_to_db(records)
+            journal.mark_done(stock_id, time.perf_counter() - t0)
             print(f"✅ {stock_id} 新增 {inserted} 筆資料（不含重複）")
         else:
+            journal.mark_failed(stock_id, "無資料或全部重試失敗", time.perf_counter() - t0)
             print(f"⏭️  {stock_id} 無資料或全部重試失敗")
 
-    print("🎉 全部處理完畢")
+    counts = journal.finish()
+    print(f"🎉 全部處理完畢：完成 {counts.get('done', 0)} 檔，失敗 {counts.get('failed', 0)} 檔（重跑只會重試失敗的）")
+
+
+if __name__ == "__main__":
+    main()
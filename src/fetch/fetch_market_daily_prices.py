@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全市場日K一次抓：用交易所「每日收盤行情（全部）」報表，一個交易日只要 2 個 request
+（上市 MI_INDEX + 上櫃 daily close quotes），批次 upsert 進 twse_prices。
+
+舊做法（Fubon fetch_daily_ohlcv / FinMind taiwan_stock_daily / wearn）是一檔一檔抓，
+每天 ~1,900 個 request + time.sleep(1.2)；日常更新改用本程式，逐檔路徑只留給
+回補歷史 (backfill) 與本程式補不到的缺口 (--fill-gaps)。
+
+資料來源（--source）
+    exchange : TWSE MI_INDEX(type=ALLBUT0999) + TPEx 上櫃股票每日收盤行情（預設，免 quota）
+    finmind  : FinMind TaiwanStockPrice 只給日期、不給 stock_id（需贊助會員權限，1 個 request）
+
+使用方式
+    python src/fetch/fetch_market_daily_prices.py                    # 今天
+    python src/fetch/fetch_market_daily_prices.py --date 2025-08-15
+    python src/fetch/fetch_market_daily_prices.py --days 7           # 往回 7 個日曆日（補假期後的缺）
+    python src/fetch/fetch_market_daily_prices.py --fill-gaps        # 全市場報表缺的個股再用 FinMind 逐檔補
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.http_fetcher import fetch_json_http
+from common.response_cache import day_ttl
+
+DB_PATH = "data/institution.db"
+
+TWSE_MI_INDEX_URL = "https://www.twse.com.tw/exchangeReport/MI_INDEX"
+TPEX_DAILY_QUOTES_URL = "https://www.tpex.org.tw/web/stock/aftertrading/daily_close_quotes/stk_quote_result.php"
+
+PriceRow = Tuple[str, str, Optional[float], Optional[float], Optional[float], Optional[float], Optional[int]]
+
+
+def _to_float(text) -> Optional[float]:
+    if text is None:
+        return None
+    text = str(text).replace(",", "").strip()
+    if text in ("", "--", "---", "----", "除權息", "除權", "除息"):
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _to_int(text) -> Optional[int]:
+    value = _to_float(text)
+    return int(value) if value is not None else None
+
+
+def _iter_tables(payload: dict):
+    """MI_INDEX 新版回傳 tables=[{fields, data}]；舊版為 fields9/data9 等平鋪欄位，兩種都支援。"""
+    for table in payload.get("tables") or []:
+        if isinstance(table, dict):
+            yield table.get("fields") or [], table.get("data") or []
+    for key, fields in payload.items():
+        if key.startswith("fields") and isinstance(fields, list):
+            yield fields, payload.get("data" + key[len("fields"):]) or []
+
+
+def parse_twse_mi_index(payload: dict, date_str: str) -> List[PriceRow]:
+    """解析 TWSE MI_INDEX 的「每日收盤行情」表，回傳 [(stock_id, date, open, high, low, close, volume)]"""
+    if not payload or payload.get("stat") not in (None, "OK"):
+        return []
+
+    for fields, data in _iter_tables(payload):
+        if "證券代號" not in fields or "收盤價" not in fields:
+            continue
+        idx = {name: i for i, name in enumerate(fields)}
+        rows = []
+        for r in data:
+            close = _to_float(r[idx["收盤價"]])
+            if close is None:  # 當日無成交
+                continue
+            rows.append((
+                str(r[idx["證券代號"]]).strip(),
+                date_str,
+                _to_float(r[idx["開盤價"]]),
+                _to_float(r[idx["最高價"]]),
+                _to_float(r[idx["最低價"]]),
+                close,
+                _to_int(r[idx["成交股數"]]),
+            ))
+        return rows
+    return []
+
+
+def parse_tpex_daily_quotes(payload: dict, date_str: str) -> List[PriceRow]:
+    """
+    解析 TPEx 上櫃股票每日收盤行情。
+    欄位順序：代號, 名稱, 收盤, 漲跌, 開盤, 最高, 最低, 成交股數, ...
+    （舊版放在 aaData，新版放在 tables[0].data）
+    """
+    if not payload:
+        return []
+    data = payload.get("aaData")
+    if data is None:
+        tables = payload.get("tables") or []
+        data = tables[0].get("data", []) if tables else []
+
+    rows = []
+    for r in data:
+        if len(r) < 8:
+            continue
+        close = _to_float(r[2])
+        if close is None:
+            continue
+        rows.append((
+            str(r[0]).strip(),
+            date_str,
+            _to_float(r[4]),
+            _to_float(r[5]),
+            _to_float(r[6]),
+            close,
+            _to_int(r[7]),
+        ))
+    return rows
+
+
+def fetch_twse_market_daily(date: datetime) -> List[PriceRow]:
+    payload = fetch_json_http(
+        TWSE_MI_INDEX_URL,
+        params={"response": "json", "date": date.strftime("%Y%m%d"), "type": "ALLBUT0999"},
+        verify=False,
+        ttl=day_ttl(date),
+    )
+    return parse_twse_mi_index(payload, date.strftime("%Y-%m-%d"))
+
+
+def fetch_tpex_market_daily(date: datetime) -> List[PriceRow]:
+    roc_date = f"{date.year - 1911}/{date.month:02d}/{date.day:02d}"
+    payload = fetch_json_http(
+        TPEX_DAILY_QUOTES_URL,
+        params={"l": "zh-tw", "o": "json", "d": roc_date},
+        ttl=day_ttl(date),
+    )
+    return parse_tpex_daily_quotes(payload, date.strftime("%Y-%m-%d"))
+
+
+def fetch_finmind_market_daily(date: datetime, dl=None) -> List[PriceRow]:
+    """FinMind 只給日期不給 stock_id：一個 request 拿回全市場（需贊助會員）。"""
+    if dl is None:
+        from common.login_helper import get_logged_in_dl
+        dl = get_logged_in_dl()
+    date_str = date.strftime("%Y-%m-%d")
+    df = dl.taiwan_stock_daily(start_date=date_str, end_date=date_str)
+    if df is None or df.empty:
+        return []
+    df = df[df["close"] > 0]
+    return list(
+        df[["stock_id", "date", "open", "max", "min", "close", "Trading_Volume"]]
+        .itertuples(index=False, name=None)
+    )
+
+
+def get_universe(conn: sqlite3.Connection) -> set:
+    """與逐檔更新相同的股票範圍：stock_meta 中的上市(市)、上櫃(櫃)"""
+    rows = conn.execute("SELECT stock_id FROM stock_meta WHERE market IN ('市', '櫃')").fetchall()
+    return {str(r[0]) for r in rows}
+
+
+def upsert_prices(conn: sqlite3.Connection, rows: Iterable[PriceRow], on_conflict: str = "update") -> int:
+    """
+    單一交易批次寫入。on_conflict="update"：同日重跑時以交易所最終值覆蓋；
+    "ignore"：已存在的 (stock_id, date) 保留原值（只補缺的日期，不蓋掉其他來源寫入的資料）。
+    回傳送出的筆數
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    if on_conflict == "update":
+        sql = """
+            INSERT INTO twse_prices (stock_id, date, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(stock_id, date) DO UPDATE SET
+                open   = excluded.open,
+                high   = excluded.high,
+                low    = excluded.low,
+                close  = excluded.close,
+                volume = excluded.volume
+        """
+    elif on_conflict == "ignore":
+        sql = """
+            INSERT OR IGNORE INTO twse_prices (stock_id, date, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+    else:
+        raise ValueError(f"on_conflict 只能是 update / ignore：{on_conflict}")
+    conn.executemany(sql, rows)
+    conn.commit()
+    return len(rows)
+
+
+def ingest_market_daily(date: datetime, source: str = "exchange", db_path: str = DB_PATH, dl=None) -> dict:
+    """抓取某交易日全市場日K並寫入；回傳 {date, fetched, upserted, missing}"""
+    if source == "finmind":
+        rows = fetch_finmind_market_daily(date, dl=dl)
+    else:
+        rows = fetch_twse_market_daily(date) + fetch_tpex_market_daily(date)
+
+    date_str = date.strftime("%Y-%m-%d")
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        universe = get_universe(conn)
+        if universe:
+            rows = [r for r in rows if r[0] in universe]
+        upserted = upsert_prices(conn, rows)
+
+    got = {r[0] for r in rows}
+    missing = sorted(universe - got) if rows else []
+    return {"date": date_str, "fetched": len(rows), "upserted": upserted, "missing": missing}
+
+
+def fill_gaps_with_finmind(stock_ids: List[str]) -> None:
+    """全市場報表沒有的個股（暫停交易、新上市…）才逐檔用 FinMind 補"""
+    from common.login_helper import get_logged_in_dl
+    from fetch.finmind.finmind_db_fetcher import fetch_with_finmind_recent
+
+    dl = get_logged_in_dl()
+    for stock_id in stock_ids:
+        result = fetch_with_finmind_recent(stock_id, dl, months=1)
+        status = "✅" if result is None else f"⚠️ {result[1]}"
+        print(f"   {stock_id}: {status}")
+
+
+def main() -> None:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="全市場日K一次抓並 upsert 進 twse_prices")
+    ap.add_argument("--date", default=None, help="交易日 YYYY-MM-DD（預設今天）")
+    ap.add_argument("--days", type=int, default=1, help="從 --date 往回抓幾個日曆日（預設 1）")
+    ap.add_argument("--source", choices=["exchange", "finmind"], default="exchange")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--fill-gaps", action="store_true", help="缺的個股改用 FinMind 逐檔補")
+    args = ap.parse_args()
+
+    end = datetime.strptime(args.date, "%Y-%m-%d") if args.date else datetime.today()
+    dates = [end - timedelta(days=i) for i in range(args.days)]
+
+    for date in sorted(d for d in dates if d.weekday() < 5):
+        try:
+            result = ingest_market_daily(date, source=args.source, db_path=args.db)
+        except Exception as e:
+            print(f"❌ {date:%Y-%m-%d} 抓取失敗：{e}")
+            continue
+
+        if result["fetched"] == 0:
+            print(f"⚠️ {result['date']} 無資料（非交易日或尚未收盤公布）")
+            continue
+
+        print(f"✅ {result['date']} upsert {result['upserted']} 筆（缺 {len(result['missing'])} 檔）")
+        if result["missing"]:
+            print(f"   缺少: {' '.join(result['missing'][:50])}{' ...' if len(result['missing']) > 50 else ''}")
+            if args.fill_gaps:
+                fill_gaps_with_finmind(result["missing"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全市場法人買賣超 + 外資持股一次抓：每個交易日 4 個 request，批次 upsert 進 institutional_netbuy_holding。
+
+    上市 TWSE T86（三大法人買賣超日報）      → foreign_netbuy / trust_netbuy
+    上市 TWSE MI_QFIIS（外資及陸資持股統計）  → foreign_shares / foreign_ratio
+    上櫃 TPEx 三大法人買賣明細                → foreign_netbuy / trust_netbuy
+    上櫃 TPEx 外資及陸資持股統計              → foreign_shares / foreign_ratio
+
+舊做法（cmoney_institutional_multi_wz_schedule.py）是每檔股票開一次瀏覽器抓 5 筆，
+日常更新改用本程式；cmoney 版只留給需要它的投信持股數字時手動執行。
+
+- 單位與 cmoney 一致：買賣超、持股皆為「張」（交易所報表為股，/1000 四捨五入）
+- 交易所沒有公布投信持股：trust_shares 以「前一筆 trust_shares + 當日投信買賣超」推估，
+  trust_ratio = trust_shares / 發行股數；既有列（cmoney 寫入的值）不會被推估值覆蓋
+
+使用方式
+    python src/fetch/fetch_market_institutional.py                    # 今天
+    python src/fetch/fetch_market_institutional.py --date 2025-08-15
+    python src/fetch/fetch_market_institutional.py --days 7           # 往回 7 個日曆日
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.http_fetcher import fetch_json_http
+from common.response_cache import day_ttl
+from fetch.fetch_market_daily_prices import _iter_tables, _to_float, _to_int, get_universe
+
+DB_PATH = "data/institution.db"
+
+TWSE_T86_URL = "https://www.twse.com.tw/rwd/zh/fund/T86"
+TWSE_QFIIS_URL = "https://www.twse.com.tw/rwd/zh/fund/MI_QFIIS"
+TPEX_3INSTI_URL = "https://www.tpex.org.tw/web/stock/3insti/daily_trade/3itrade_hedge_result.php"
+TPEX_QFII_URL = "https://www.tpex.org.tw/web/stock/3insti/qfii/qfii_result.php"
+
+# TPEx 舊版 aaData 沒有欄位名稱時的欄位順序
+TPEX_3INSTI_FOREIGN_NET = 10   # 外資及陸資合計 買賣超股數
+TPEX_3INSTI_TRUST_NET = 13     # 投信 買賣超股數
+TPEX_QFII_FIELDS = ["排行", "代號", "名稱", "發行股數", "外資及陸資尚可投資股數", "全體外資及陸資持有股數",
+                    "外資及陸資尚可投資比率", "全體外資及陸資持股比率"]
+
+NetBuy = Dict[str, Tuple[Optional[int], Optional[int]]]                 # stock_id → (外資, 投信) 張
+Holding = Dict[str, Tuple[Optional[int], Optional[int], Optional[float]]]  # stock_id → (發行股數, 外資持股張, 外資持股%)
+InstRow = Tuple[str, str, Optional[int], Optional[int], Optional[int], Optional[float], Optional[int], Optional[float]]
+
+
+def _to_lots(text) -> Optional[int]:
+    shares = _to_float(text)
+    return int(round(shares / 1000)) if shares is not None else None
+
+
+def _find_col(fields: Sequence[str], *keywords: str, exclude: Sequence[str] = ()) -> Optional[int]:
+    for i, name in enumerate(fields):
+        if all(k in name for k in keywords) and not any(x in name for x in exclude):
+            return i
+    return None
+
+
+# ---------------------------- 解析 ----------------------------
+def parse_twse_t86(payload: dict) -> NetBuy:
+    """T86：外陸資(不含外資自營商) + 外資自營商 = 外資買賣超；投信買賣超"""
+    if not payload or str(payload.get("stat", "OK")).upper() != "OK":
+        return {}
+    for fields, data in _iter_tables(payload):
+        i_id = _find_col(fields, "證券代號")
+        i_foreign = _find_col(fields, "外陸資買賣超股數")
+        i_dealer = _find_col(fields, "外資自營商買賣超股數")
+        i_trust = _find_col(fields, "投信買賣超股數")
+        if None in (i_id, i_foreign, i_trust):
+            continue
+        result = {}
+        for r in data:
+            foreign = _to_float(r[i_foreign])
+            if foreign is not None and i_dealer is not None:
+                foreign += _to_float(r[i_dealer]) or 0
+            result[str(r[i_id]).strip()] = (
+                int(round(foreign / 1000)) if foreign is not None else None,
+                _to_lots(r[i_trust]),
+            )
+        return result
+    return {}
+
+
+def parse_tpex_3insti(payload: dict) -> NetBuy:
+    if not payload:
+        return {}
+    data = payload.get("aaData")
+    fields: Sequence[str] = []
+    if data is None:
+        tables = payload.get("tables") or []
+        data = tables[0].get("data", []) if tables else []
+        fields = tables[0].get("fields", []) if tables else []
+
+    i_foreign = _find_col(fields, "外資及陸資", "買賣超", exclude=("不含", "自營商")) if fields else None
+    i_trust = _find_col(fields, "投信", "買賣超") if fields else None
+    i_foreign = TPEX_3INSTI_FOREIGN_NET if i_foreign is None else i_foreign
+    i_trust = TPEX_3INSTI_TRUST_NET if i_trust is None else i_trust
+
+    result = {}
+    for r in data:
+        if len(r) <= max(i_foreign, i_trust):
+            continue
+        result[str(r[0]).strip()] = (_to_lots(r[i_foreign]), _to_lots(r[i_trust]))
+    return result
+
+
+def parse_foreign_holding(payload: dict, default_fields: Sequence[str] = ()) -> Holding:
+    """MI_QFIIS（上市）與 TPEx 外資持股統計（上櫃）共用：依欄位名稱找 代號 / 發行股數 / 持有股數 / 持股比率"""
+    if not payload or str(payload.get("stat", "OK")).upper() != "OK":
+        return {}
+    tables = list(_iter_tables(payload))
+    if payload.get("aaData") is not None:
+        tables.append((list(default_fields), payload["aaData"]))
+
+    for fields, data in tables:
+        i_id = _find_col(fields, "代號")
+        i_issued = _find_col(fields, "發行股數")
+        i_shares = _find_col(fields, "持有股數", exclude=("尚可",))
+        i_ratio = _find_col(fields, "持股比率", exclude=("尚可",))
+        if None in (i_id, i_shares, i_ratio):
+            continue
+        result = {}
+        for r in data:
+            if len(r) <= max(i_id, i_shares, i_ratio):
+                continue
+            result[str(r[i_id]).strip()] = (
+                _to_int(r[i_issued]) if i_issued is not None else None,
+                _to_lots(r[i_shares]),
+                _to_float(str(r[i_ratio]).replace("%", "")),
+            )
+        return result
+    return {}
+
+
+def merge_institutional(date_str: str, netbuy: NetBuy, holding: Holding,
+                        prev_trust_shares: Dict[str, int]) -> List[InstRow]:
+    rows = []
+    for stock_id in sorted(set(netbuy) | set(holding)):
+        foreign_netbuy, trust_netbuy = netbuy.get(stock_id, (None, None))
+        issued, foreign_shares, foreign_ratio = holding.get(stock_id, (None, None, None))
+
+        trust_shares = trust_ratio = None
+        prev = prev_trust_shares.get(stock_id)
+        if prev is not None:
+            trust_shares = max(prev + (trust_netbuy or 0), 0)
+            if issued:
+                trust_ratio = round(trust_shares * 1000 / issued * 100, 2)
+
+        rows.append((stock_id, date_str, foreign_netbuy, trust_netbuy,
+                     foreign_shares, foreign_ratio, trust_shares, trust_ratio))
+    return rows
+
+
+# ---------------------------- 抓取 ----------------------------
+def fetch_twse_institutional(date: datetime) -> Tuple[NetBuy, Holding]:
+    params = {"date": date.strftime("%Y%m%d"), "selectType": "ALLBUT0999", "response": "json"}
+    ttl = day_ttl(date)
+    netbuy = parse_twse_t86(fetch_json_http(TWSE_T86_URL, params=params, verify=False, ttl=ttl))
+    holding = parse_foreign_holding(fetch_json_http(TWSE_QFIIS_URL, params=params, verify=False, ttl=ttl))
+    return netbuy, holding
+
+
+def fetch_tpex_institutional(date: datetime) -> Tuple[NetBuy, Holding]:
+    roc_date = f"{date.year - 1911}/{date.month:02d}/{date.day:02d}"
+    ttl = day_ttl(date)
+    netbuy = parse_tpex_3insti(fetch_json_http(
+        TPEX_3INSTI_URL, params={"l": "zh-tw", "o": "json", "se": "EW", "t": "D", "d": roc_date}, ttl=ttl))
+    holding = parse_foreign_holding(
+        fetch_json_http(TPEX_QFII_URL, params={"l": "zh-tw", "o": "json", "d": roc_date}, ttl=ttl),
+        default_fields=TPEX_QFII_FIELDS,
+    )
+    return netbuy, holding
+
+
+# ---------------------------- DB ----------------------------
+def ensure_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS institutional_netbuy_holding (
+            stock_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            foreign_netbuy INTEGER,
+            trust_netbuy INTEGER,
+            foreign_shares INTEGER,
+            foreign_ratio REAL,
+            trust_shares INTEGER,
+            trust_ratio REAL,
+            PRIMARY KEY (stock_id, date)
+        )
+    """)
+
+
+def load_prev_trust_shares(conn: sqlite3.Connection, date_str: str) -> Dict[str, int]:
+    """每檔在 date_str 之前最近一筆的 trust_shares（推估當日投信持股的基準）"""
+    rows = conn.execute(
+        """
+        SELECT h.stock_id, h.trust_shares
+        FROM institutional_netbuy_holding h
+        JOIN (
+            SELECT stock_id, MAX(date) AS d
+            FROM institutional_netbuy_holding
+            WHERE date < ? AND trust_shares IS NOT NULL
+            GROUP BY stock_id
+        ) m ON h.stock_id = m.stock_id AND h.date = m.d
+        """,
+        (date_str,),
+    ).fetchall()
+    return {str(sid): int(v) for sid, v in rows}
+
+
+def upsert_institutional(conn: sqlite3.Connection, rows: List[InstRow]) -> int:
+    """單一交易批次 upsert；投信持股以既有值優先（cmoney 的數字比推估準）"""
+    if not rows:
+        return 0
+    conn.executemany(
+        """
+        INSERT INTO institutional_netbuy_holding
+            (stock_id, date, foreign_netbuy, trust_netbuy, foreign_shares, foreign_ratio, trust_shares, trust_ratio)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(stock_id, date) DO UPDATE SET
+            foreign_netbuy = COALESCE(excluded.foreign_netbuy, institutional_netbuy_holding.foreign_netbuy),
+            trust_netbuy   = COALESCE(excluded.trust_netbuy, institutional_netbuy_holding.trust_netbuy),
+            foreign_shares = COALESCE(excluded.foreign_shares, institutional_netbuy_holding.foreign_shares),
+            foreign_ratio  = COALESCE(excluded.foreign_ratio, institutional_netbuy_holding.foreign_ratio),
+            trust_shares   = COALESCE(institutional_netbuy_holding.trust_shares, excluded.trust_shares),
+            trust_ratio    = COALESCE(institutional_netbuy_holding.trust_ratio, excluded.trust_ratio)
+        """,
+        rows,
+    )
+    conn.commit()
+    return len(rows)
+
+
+def ingest_market_institutional(date: datetime, db_path: str = DB_PATH) -> dict:
+    """抓取某交易日全市場法人資料並寫入；回傳 {date, fetched, upserted, missing}"""
+    twse_netbuy, twse_holding = fetch_twse_institutional(date)
+    tpex_netbuy, tpex_holding = fetch_tpex_institutional(date)
+    netbuy = {**twse_netbuy, **tpex_netbuy}
+    holding = {**twse_holding, **tpex_holding}
+
+    date_str = date.strftime("%Y-%m-%d")
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        ensure_table(conn)
+        universe = get_universe(conn)
+        if universe:
+            netbuy = {k: v for k, v in netbuy.items() if k in universe}
+            holding = {k: v for k, v in holding.items() if k in universe}
+        rows = merge_institutional(date_str, netbuy, holding, load_prev_trust_shares(conn, date_str))
+        upserted = upsert_institutional(conn, rows)
+
+    got = {r[0] for r in rows}
+    missing = sorted(universe - got) if rows else []
+    return {"date": date_str, "fetched": len(rows), "upserted": upserted, "missing": missing}
+
+
+def main(argv=None) -> None:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="全市場法人買賣超 + 外資持股一次抓並 upsert 進 institutional_netbuy_holding")
+    ap.add_argument("--date", default=None, help="交易日 YYYY-MM-DD（預設今天）")
+    ap.add_argument("--days", type=int, default=1, help="從 --date 往回抓幾個日曆日（預設 1）")
+    ap.add_argument("--db", default=DB_PATH)
+    args = ap.parse_args(argv)
+
+    end = datetime.strptime(args.date, "%Y-%m-%d") if args.date else datetime.today()
+    dates = [end - timedelta(days=i) for i in range(args.days)]
+
+    # 由舊到新，投信持股推估才能一天接一天累加
+    for date in sorted(d for d in dates if d.weekday() < 5):
+        try:
+            result = ingest_market_institutional(date, db_path=args.db)
+        except Exception as e:
+            print(f"❌ {date:%Y-%m-%d} 抓取失敗：{e}")
+            continue
+
+        if result["fetched"] == 0:
+            print(f"⚠️ {result['date']} 無資料（非交易日或尚未公布）")
+            continue
+        print(f"✅ {result['date']} upsert {result['upserted']} 筆（缺 {len(result['missing'])} 檔）")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
-import httpx
 import pandas as pd
 import sqlite3
+import sys
 from datetime import datetime, timedelta
 import time
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.http_fetcher import fetch_json_http
+from common.response_cache import day_ttl
+
 """
 (暫時用不到)
 下載 TWSE 外資與投信每日買賣超資料(給某天日期，查當天的全上市公司)
@@ -44,13 +49,13 @@ print(f"📆 尚需抓取日期：{target_dates}")
 # === 抓取缺漏資料 ===
 for date_str in target_dates:
     date_api = date_str.replace("-", "")
+    ttl = day_ttl(datetime.strptime(date_str, "%Y-%m-%d"))
 
     # --- 外資資料 ---
-    url_foreign = f"https://www.twse.com.tw/fund/TWT38U?response=json&date={date_api}"
+    url_foreign = "https://www.twse.com.tw/fund/TWT38U"
     try:
-        print(f"🔍 外資請求中：{url_foreign}")
-        resp = httpx.get(url_foreign, timeout=10.0, verify=False)
-        data = resp.json()
+        print(f"🔍 外資請求中：{url_foreign}?date={date_api}")
+        data = fetch_json_http(url_foreign, params={"response": "json", "date": date_api}, verify=False, ttl=ttl)
         if not data.get("data"):
             print(f"⚠️ {date_str} 無資料，跳過（可能為非交易日）")
             continue
@@ -68,11 +73,10 @@ for date_str in target_dates:
         continue
 
     # --- 投信資料 ---
-    url_trust = f"https://www.twse.com.tw/fund/TWT44U?response=json&date={date_api}"
+    url_trust = "https://www.twse.com.tw/fund/TWT44U"
     try:
-        print(f"🔍 投信請求中：{url_trust}")
-        resp = httpx.get(url_trust, timeout=10.0, verify=False)
-        data = resp.json()
+        print(f"🔍 投信請求中：{url_trust}?date={date_api}")
+        data = fetch_json_http(url_trust, params={"response": "json", "date": date_api}, verify=False, ttl=ttl)
         if not data.get("data"):
             print(f"⚠️ {date_str} 無資料，跳過（可能為非交易日）")
             continue
@@ -9,7 +9,7 @@ import os
 import re
 import sys
 import time
-import sqlite3
+from datetime import datetime
 from typing import List, Tuple
 
 from selenium import webdriver
@@ -21,6 +21,11 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import WebDriverException, TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # 指到 src
+
+from common.db_writer import get_writer
+from common.job_journal import JobJournal
+
 DB_PATH = "data/institution.db"
 MAX_RETRY = 3
 PAGE_LOAD_TIMEOUT = 30
@@ -182,10 +187,8 @@ def fetch_wantgoo_main_trend(stock_id: str) -> List[Tuple[str, str, float, int,
 def save_to_db(rows: List[Tuple[str, str, float, int, int]], db_path: str = DB_PATH) -> int:
     if not rows:
         return 0
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute("""
+    writer = get_writer(db_path)
+    writer.execute("""
         CREATE TABLE IF NOT EXISTS main_force_trading (
             stock_id TEXT,
             date TEXT,
@@ -195,43 +198,56 @@ def save_to_db(rows: List[Tuple[str, str, float, int, int]], db_path: str = DB_P
             PRIMARY KEY (stock_id, date)
         )
     """)
-    success = 0
-    for row in rows:
-        cur.execute("""
-            INSERT OR IGNORE INTO main_force_trading
-            (stock_id, date, close_price, net_buy_sell, dealer_diff)
-            VALUES (?, ?, ?, ?, ?)
-        """, row)
-        if cur.rowcount > 0:
-            success += 1
-    conn.commit()
-    conn.close()
-    return success
+    return writer.executemany("""
+        INSERT OR IGNORE INTO main_force_trading
+        (stock_id, date, close_price, net_buy_sell, dealer_diff)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows)
 
 def _read_stock_list(fp: str):
     with open(fp, "r", encoding="utf-8") as f:
         return [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
 
-if __name__ == "__main__":
-    args = sys.argv[1:]
+def main(argv=None):
+    args = (sys.argv if argv is None else argv)[1:]
+    list_file = None
     if not args:
-        stocks = _read_stock_list("my_stock_holdings.txt")
-        print(f"[LIST] 使用股票清單: my_stock_holdings.txt ({len(stocks)} 檔)")
+        list_file = "my_stock_holdings.txt"
+    elif args[0].endswith(".txt") and os.path.exists(args[0]):
+        list_file = args[0]
+    if list_file:
+        stocks = _read_stock_list(list_file)
+        print(f"[LIST] 使用股票清單: {list_file} ({len(stocks)} 檔)")
     else:
-        arg = args[0]
-        if arg.endswith(".txt") and os.path.exists(arg):
-            stocks = _read_stock_list(arg)
-            print(f"[LIST] 使用股票清單: {arg} ({len(stocks)} 檔)")
-        else:
-            stocks = [arg]
-            print(f"[SINGLE] 單檔執行: {arg}")
+        stocks = [args[0]]
+        print(f"[SINGLE] 單檔執行: {args[0]}")
+
+    # 清單模式：同一天、同一份清單中斷後重跑 → 略過已完成的股票，只重試失敗的
+    journal = None
+    if list_file:
+        journal = JobJournal("wantgoo_main_trend",
+                             run_key=f"{datetime.today():%Y-%m-%d}:{os.path.basename(list_file)}", db_path=DB_PATH)
+        stocks = journal.start(stocks)
 
     for sid in stocks:
         print(f"[FETCH] 抓取 {sid} WantGoo 主力進出動向...")
+        t0 = time.perf_counter()
         recs = fetch_wantgoo_main_trend(sid)
         if not recs:
+            if journal is not None:
+                journal.mark_failed(sid, "無可寫入資料", time.perf_counter() - t0)
             print(f"[SKIP] {sid} 無可寫入資料")
             continue
         n = save_to_db(recs)
+        if journal is not None:
+            journal.mark_done(sid, time.perf_counter() - t0)
         print(f"[OK] {sid} 新增 {n} 筆 (不含重複)")
-    print("[DONE] 完成")
+    if journal is not None:
+        counts = journal.finish()
+        print(f"[DONE] 完成 {counts.get('done', 0)} 檔，失敗 {counts.get('failed', 0)} 檔")
+    else:
+        print("[DONE] 完成")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,15 @@ import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 import argparse
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))  # 指到 src
+
+from common.job_journal import JobJournal
 
 DB_PATH = "data/institution.db"
 TABLE = "twse_prices"
-PROGRESS_LOG = "wearn_completed.log"
+JOB_SOURCE = "wearn_prices"
 MAX_RETRIES = 3
 THREADS = 6
 '''
@@ -49,17 +54,6 @@ def get_all_stock_ids():
         rows = cursor.fetchall()
     return [row[0] for row in rows]
 
-def load_progress():
-    if Path(PROGRESS_LOG).exists():
-        with open(PROGRESS_LOG, "r", encoding="utf-8") as f:
-            return set(line.strip() for line in f if line.strip())
-    return set()
-
-def mark_complete(stock_id):
-    with lock:
-        with open(PROGRESS_LOG, "a", encoding="utf-8") as f:
-            f.write(str(stock_id) + "\n")
-
 def fetch_monthly_data(stock_id: str, roc_year: int, month: int):
     url = f"https://stock.wearn.com/cdata.asp?Year={roc_year}&month={month:02d}&kind={stock_id}"
     for attempt in range(MAX_RETRIES):
@@ -91,6 +85,7 @@ def fetch_monthly_data(stock_id: str, roc_year: int, month: int):
         except Exception as e:
             if attempt == MAX_RETRIES - 1:
                 print(f"❌ {stock_id} {roc_year}/{month:02d} 失敗: {e}")
+                raise  # 交給 journal 記為 failed，下次只重試失敗的股票
             time.sleep(1)
     return []
 
@@ -126,7 +121,6 @@ def process_stock(stock_id, months):
     for y, m in months:
         data = fetch_monthly_data(stock_id, y, m)
         total_inserted += save_to_db(data)
-    mark_complete(stock_id)
     return stock_id, total_inserted
 
 def get_target_months(months_back: int = 1):
@@ -142,18 +136,30 @@ def main():
     init_db()
     all_stocks = get_all_stock_ids()
 
-    completed = load_progress()
-    stock_list = [s for s in all_stocks if s not in completed]
-
     month_params = get_target_months(args.months)
 
-    print(f"🧪 本次待處理股票數：{len(stock_list)}，已完成數：{len(completed)}，月份數：{len(month_params)}")
+    # 同一個月、同樣月份數的 run 中斷後重跑 → 從上次停下的地方繼續，只重試失敗的股票
+    journal = JobJournal(JOB_SOURCE, run_key=f"{datetime.today():%Y-%m}:months={args.months}", db_path=DB_PATH)
+    stock_list = journal.start(all_stocks)
+
+    print(f"🧪 本次待處理股票數：{len(stock_list)}，已完成數：{len(all_stocks) - len(stock_list)}，月份數：{len(month_params)}")
+
+    def run(stock_id):
+        with journal.track(stock_id):
+            return process_stock(stock_id, month_params)
 
     with ThreadPoolExecutor(max_workers=THREADS) as executor:
-        futures = {executor.submit(process_stock, sid, month_params): sid for sid in stock_list}
+        futures = {executor.submit(run, sid): sid for sid in stock_list}
         for f in tqdm(as_completed(futures), total=len(futures), desc="處理中", ncols=80):
-            stock_id, inserted = f.result()
+            try:
+                stock_id, inserted = f.result()
+            except Exception as e:
+                tqdm.write(f"❌ {futures[f]} 失敗：{e}")
+                continue
             tqdm.write(f"📌 {stock_id} 新增 {inserted} 筆")
 
+    counts = journal.finish()
+    print(f"📋 完成 {counts.get('done', 0)} 檔，失敗 {counts.get('failed', 0)} 檔（重跑本程式只會重試失敗的）")
+
 if __name__ == "__main__":
     main()
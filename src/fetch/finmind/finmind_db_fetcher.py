@@ -1,5 +1,7 @@
-import sys, io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+from __future__ import annotations
+
+import sys
+sys.stdout.reconfigure(encoding='utf-8')
 
 import sqlite3
 import pandas as pd
@@ -7,11 +9,18 @@ from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from pathlib import Path
 from tqdm import tqdm
-from FinMind.data import DataLoader
+from typing import TYPE_CHECKING
 import logging
 from dotenv import load_dotenv
 import os
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))  # 指到 src
+
+from common.db_writer import get_writer
+
+if TYPE_CHECKING:  # 儀表板只呼叫 fetch_with_finmind_recent(dl=...)，不必在 import 時載入 FinMind
+    from FinMind.data import DataLoader
+
 DB_PATH = "data/institution.db"
 
 # 初始化 log 系統
@@ -112,6 +121,22 @@ def fetch_with_finmind_data_full_wash(stock_id: str, dl: DataLoader, months: int
     return None
 
 
+def insert_new_rows(stock_id: str, df: pd.DataFrame) -> int:
+    """只補還沒存在的日期（INSERT OR IGNORE，經 common.db_writer 單一寫入者），回傳實際新增筆數"""
+    existing_dates = get_existing_dates(stock_id)
+    df = df[~df["date"].isin(existing_dates)]
+    if df.empty:
+        return 0
+
+    return get_writer(DB_PATH).executemany("""
+        INSERT OR IGNORE INTO twse_prices (stock_id, date, open, high, low, close, volume)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (stock_id, row["date"], row["open"], row["max"], row["min"], row["close"], row["Trading_Volume"])
+        for _, row in df.iterrows()
+    ])
+
+
 def fetch_with_finmind_recent(stock_id: str, dl: DataLoader, months: int = 2):
     """僅抓取最近 N 個月資料，並採 INSERT OR IGNORE 模式補足缺資料"""
     today = datetime.today()
@@ -127,31 +152,9 @@ def fetch_with_finmind_recent(stock_id: str, dl: DataLoader, months: int = 2):
     if df.empty:
         return (stock_id, "No data")
 
-    # 只補還沒存在的日期
-    existing_dates = get_existing_dates(stock_id)
-    df = df[~df["date"].isin(existing_dates)]
-
-    if df.empty:
+    if insert_new_rows(stock_id, df) == 0:
         return (stock_id, "Already up-to-date")
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    for _, row in df.iterrows():
-        cursor.execute("""
-            INSERT OR IGNORE INTO twse_prices (stock_id, date, open, high, low, close, volume)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            stock_id,
-            row["date"],
-            row["open"],
-            row["max"],
-            row["min"],
-            row["close"],
-            row["Trading_Volume"]
-        ))
-    conn.commit()
-    conn.close()
-
     return None  # 成功
 
 
@@ -168,6 +171,7 @@ if __name__ == "__main__":
     load_dotenv()
     user = os.getenv("FINMIND_USER")
     password = os.getenv("FINMIND_PASSWORD")
+    from FinMind.data import DataLoader
     dl = DataLoader()
 
     success = dl.login(user_id=user, password=password)
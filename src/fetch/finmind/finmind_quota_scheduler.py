@@ -0,0 +1,277 @@
+import sys
+import time
+import queue
+import threading
+from datetime import datetime, timedelta
+from collections import deque
+from pathlib import Path
+from FinMind.data import DataLoader
+from .finmind_db_fetcher import insert_new_rows
+from .fetch_wearn_price_all_stocks_52weeks_threaded_safe import get_all_stock_ids
+from .update_twse_prices_wz_param import get_latest_trading_date, filter_already_updated
+sys.path.append(str(Path(__file__).resolve().parents[2]))  # 指到 src
+from common.job_journal import JobJournal
+from dateutil.relativedelta import relativedelta
+from dotenv import load_dotenv
+import os
+import logging
+
+'''
+多帳號 FinMind 排程器：一次登入所有 .env 中設定的 FINMIND_USER_n 帳號，並行補 twse_prices。
+
+用法：
+    python -m src.fetch.finmind.finmind_quota_scheduler            # 全部帳號，每帳號 1 個 worker
+    python -m src.fetch.finmind.finmind_quota_scheduler --months 13 --workers-per-account 2
+
+取代 update_twse_prices_wz_param.py「一次一個帳號 + 每 10 分鐘查一次 quota」的手動輪替：
+- 每個帳號維護一個「滑動一小時」的 quota 模型（同 predict_finmind_quota_restore.py 的假設：
+  每筆 request 在發出 60 分鐘後釋放），只要模型判定還有額度就立刻發 request，
+  不必等到回血 ≥ 510 才整批放行。
+- 所有帳號的 worker 從同一個待辦 queue 取股票：誰有額度誰就做，額度用完的帳號只睡到
+  「最早一筆 request 滿 60 分鐘」為止，其他帳號照常工作 → 總耗時最短。
+- 每帳號保留 SAFETY_MARGIN 筆不用，且每用 SYNC_EVERY 筆就用伺服器的 api_usage 校正模型，
+  確保不會超過帳號上限。
+'''
+
+logging.getLogger("FinMind").setLevel(logging.WARNING)
+
+WINDOW_SECONDS = 3600       # FinMind quota 為滑動一小時
+SAFETY_MARGIN = 30          # 每帳號保留不用的 request 數（同舊版 510 - 480）
+SYNC_EVERY = 100            # 每用 N 筆就向伺服器校正一次已用量
+MAX_ATTEMPTS = 2            # 同一檔最多嘗試次數（失敗會丟回 queue 給任一帳號重試）
+
+print_lock = threading.Lock()
+log_fp = None
+
+
+def safe_print(msg):
+    timestamp = datetime.now().strftime('%H:%M:%S')
+    formatted = f"{timestamp} | {msg}"
+    with print_lock:
+        print(formatted)
+        if log_fp:
+            log_fp.write(formatted + "\n")
+            log_fp.flush()
+
+
+class SlidingHourQuota:
+    """
+    單一帳號的 quota 模型：記錄每筆 request 的時間，超過一小時即釋放。
+    登入時伺服器回報的已用量 (api_usage) 不知道實際發生時間 → 保守視為「剛剛用掉」。
+    """
+
+    def __init__(self, limit: int, used: int, margin: int = SAFETY_MARGIN):
+        self.limit = limit
+        self.margin = margin
+        self._lock = threading.Lock()
+        now = time.monotonic()
+        self._events = deque([now] * max(used, 0))
+        self._since_sync = 0
+
+    def _expire(self, now: float):
+        while self._events and now - self._events[0] >= WINDOW_SECONDS:
+            self._events.popleft()
+
+    def available(self) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            return self.limit - self.margin - len(self._events)
+
+    def try_acquire(self) -> float:
+        """有額度就記一筆並回傳 0；否則回傳需等待的秒數（最早一筆釋放的時間）。"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if len(self._events) < self.limit - self.margin:
+                self._events.append(now)
+                self._since_sync += 1
+                return 0.0
+            return max(WINDOW_SECONDS - (now - self._events[0]), 1.0)
+
+    def refund(self):
+        """預留了額度但沒有實際發 request（例如 queue 已空）時退回。"""
+        with self._lock:
+            if self._events:
+                self._events.pop()
+                self._since_sync -= 1
+
+    def needs_sync(self) -> bool:
+        return self._since_sync >= SYNC_EVERY
+
+    def sync(self, server_used: int):
+        """以伺服器回報的已用量校正：模型偏低就補記（視為剛用掉），偏高就釋放最舊的。"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            diff = server_used - len(self._events)
+            if diff > 0:
+                self._events.extend([now] * diff)
+            else:
+                for _ in range(-diff):
+                    self._events.popleft()
+            self._since_sync = 0
+
+
+def load_finmind_accounts() -> list[dict]:
+    """讀取 .env 的 FINMIND_USER_n / FINMIND_PASSWORD_n / FINMIND_TOKEN_n（n 從 1 開始，遇缺即停）"""
+    load_dotenv()
+    accounts = []
+    index = 1
+    while True:
+        user = os.getenv(f"FINMIND_USER_{index}")
+        password = os.getenv(f"FINMIND_PASSWORD_{index}")
+        if not user or not password:
+            break
+        accounts.append({
+            "index": index,
+            "user": user,
+            "password": password,
+            "token": os.getenv(f"FINMIND_TOKEN_{index}"),
+        })
+        index += 1
+    return accounts
+
+
+def login_account(account: dict):
+    dl = DataLoader()
+    if not dl.login(user_id=account["user"], password=account["password"]):
+        safe_print(f"❌ 帳號 {account['index']} ({account['user']}) 登入失敗，略過")
+        return None, None
+    if account["token"]:
+        dl.token = account["token"]
+
+    quota = SlidingHourQuota(limit=dl.api_usage_limit, used=dl.api_usage)
+    safe_print(f"🔑 帳號 {account['index']} ({account['user']}) 上限 {quota.limit}，目前可用 {quota.available()}")
+    return dl, quota
+
+
+def account_worker(name: str, dl: DataLoader, quota: SlidingHourQuota, pending: queue.Queue,
+                   start_date: str, end_date: str, stats: dict, journal=None):
+    while True:
+        if pending.empty():
+            return
+
+        wait = quota.try_acquire()
+        while wait > 0:
+            safe_print(f"⏳ {name} 額度用完，{int(wait)} 秒後釋放")
+            time.sleep(min(wait, 60))
+            if pending.empty():
+                return
+            wait = quota.try_acquire()
+
+        try:
+            stock_id, attempt = pending.get_nowait()
+        except queue.Empty:
+            quota.refund()
+            return
+
+        t0 = time.perf_counter()
+        try:
+            df = dl.taiwan_stock_daily(stock_id=stock_id, start_date=start_date, end_date=end_date)
+            if df.empty:
+                raise ValueError("No data")
+            inserted = insert_new_rows(stock_id, df)  # 寫入由 common.db_writer 序列化並群組 commit
+            if journal is not None:
+                journal.mark_done(stock_id, time.perf_counter() - t0)
+            with print_lock:
+                stats["done"] += 1
+                stats["per_account"][name] = stats["per_account"].get(name, 0) + 1
+            safe_print(f"✅ {name} {stock_id} 新增 {inserted} 筆")
+        except Exception as e:
+            if journal is not None:
+                journal.mark_failed(stock_id, str(e), time.perf_counter() - t0)
+            if attempt < MAX_ATTEMPTS:
+                pending.put((stock_id, attempt + 1))
+            else:
+                with print_lock:
+                    stats["skipped"].append(stock_id)
+                safe_print(f"⚠️ {name} {stock_id} 失敗 {attempt} 次，略過：{e}")
+        finally:
+            pending.task_done()
+
+        if quota.needs_sync():
+            try:
+                quota.sync(dl.api_usage)
+            except Exception as e:
+                safe_print(f"⚠️ {name} 校正 quota 失敗：{e}")
+
+
+def login_all_accounts() -> list[tuple]:
+    """登入所有帳號，回傳 [(名稱, DataLoader, SlidingHourQuota), ...]（登入失敗的略過）"""
+    sessions = []
+    for account in load_finmind_accounts():
+        dl, quota = login_account(account)
+        if dl is not None:
+            sessions.append((f"帳號{account['index']}", dl, quota))
+    return sessions
+
+
+def run_scheduler(sessions: list[tuple], stock_ids: list[str], months: int = 13, workers_per_account: int = 1,
+                  journal=None) -> dict:
+    today = datetime.today()
+    start_date = (today - relativedelta(months=months)).strftime('%Y-%m-%d')
+    end_date = today.strftime('%Y-%m-%d')
+
+    pending = queue.Queue()
+    for stock_id in stock_ids:
+        pending.put((stock_id, 1))
+
+    stats = {"done": 0, "skipped": [], "per_account": {}}
+    started = time.perf_counter()
+
+    threads = []
+    for name, dl, quota in sessions:
+        for _ in range(workers_per_account):
+            t = threading.Thread(
+                target=account_worker,
+                args=(name, dl, quota, pending, start_date, end_date, stats, journal),
+                daemon=True,
+            )
+            t.start()
+            threads.append(t)
+    for t in threads:
+        t.join()
+
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, default=13, help="每檔抓取最近幾個月（預設 13，RS 指標需 52 週）")
+    parser.add_argument("--workers-per-account", type=int, default=1, help="每個帳號同時發送的 request 數")
+    args = parser.parse_args()
+
+    global log_fp
+    Path("logs").mkdir(exist_ok=True)
+    log_filename = Path("logs") / f"twse_prices_multi_account_{datetime.today().strftime('%Y%m%d_%H%M%S')}.log"
+    with open(log_filename, "w", encoding="utf-8") as log_fp:   # 提早 return 也會關檔
+        sessions = login_all_accounts()
+        if not sessions:
+            safe_print("❌ 沒有任何 FINMIND_USER_n 帳號登入成功")
+            return
+        dl = sessions[0][1]
+
+        latest_date = get_latest_trading_date(dl)
+        if not latest_date:
+            safe_print("❌ 無法取得最新交易日，終止執行")
+            return
+        pending_ids = filter_already_updated(get_all_stock_ids(), latest_date)
+        journal = JobJournal("finmind_prices", run_key=latest_date)
+        pending_ids = journal.start(pending_ids)
+        safe_print(f"🚀 開始更新 twse_prices（共 {len(pending_ids)} 檔個股，{len(sessions)} 個帳號）")
+
+        stats = run_scheduler(sessions, pending_ids, months=args.months, workers_per_account=args.workers_per_account,
+                              journal=journal)
+        journal.finish()
+        per_account = "、".join(f"{k}: {v}" for k, v in stats["per_account"].items())
+        safe_print(f"🎉 完成 {stats['done']} 檔，略過 {len(stats['skipped'])} 檔，耗時 {timedelta(seconds=int(stats['elapsed']))}")
+        safe_print(f"📊 各帳號處理數：{per_account}")
+        if stats["skipped"]:
+            safe_print(f"⚠️ 被跳過的股票代碼: {', '.join(stats['skipped'])}")
+
+
+if __name__ == "__main__":
+    main()
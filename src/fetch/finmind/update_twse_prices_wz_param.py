@@ -24,6 +24,8 @@ import logging
 帳號2 + 手機: 480筆
 帳號3 + 手機(開關飛航，利用浮動ip): 480筆
 理論上1次可以更到 1440筆資料 (反正先這樣用用看，不行再調整)
+
+多帳號一次跑完（自動輪替 + 並行）：python -m src.fetch.finmind.finmind_quota_scheduler
 '''
 
 logging.getLogger("FinMind").setLevel(logging.WARNING)
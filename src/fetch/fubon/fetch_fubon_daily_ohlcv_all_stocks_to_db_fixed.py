@@ -1,15 +1,19 @@
-import time
 import sqlite3
+import time
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import pandas as pd
 
 # sys.path.append(str(Path(__file__).resolve().parent.parent))  # 指到 src/fetch
 # sys.path.append(str(Path(__file__).resolve().parents[3]))  # 指到 MyStockTools 根目錄
 from common.login_helper import get_logged_in_sdk
+from common.fubon_rest_client import FubonRestClient
+from common.job_journal import JobJournal
 from fetch.finmind.fetch_wearn_price_all_stocks_52weeks_threaded_safe import get_all_stock_ids
 
 DB_PATH = "data/institution.db"
+MAX_WORKERS = 4  # 實際速率由 FubonRestClient 的 token bucket 控制
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(exist_ok=True)
 
@@ -22,25 +26,18 @@ def safe_print(msg):
     print(line)
     log_fp.write(line + "\n")
 
-def fetch_daily_ohlcv(sdk, symbol, days=10):
+def fetch_daily_ohlcv(client, symbol, days=10):
     end = datetime.today()
     start = end - timedelta(days=days * 2)
-    sdk.init_realtime()
-    reststock = sdk.marketdata.rest_client.stock
     try:
-        result = reststock.historical.candles(
-            symbol=symbol,
-            from_=start.strftime("%Y-%m-%d"),
-            to=end.strftime("%Y-%m-%d"),
-            timeframe="D"
-        )
-        return pd.DataFrame(result.get("data", []))
+        rows = client.candles(symbol, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+        return pd.DataFrame(rows)
     except Exception as e:
         safe_print(f"❌ {symbol} 抓取失敗: {e}")
         return None
 
-def get_latest_trading_date(sdk):
-    df = fetch_daily_ohlcv(sdk, symbol="2330", days=10)
+def get_latest_trading_date(client):
+    df = fetch_daily_ohlcv(client, symbol="2330", days=10)
     print(df)
     if df is None or df.empty:
         safe_print("❌ 無法取得最新交易日")
@@ -85,22 +82,41 @@ def insert_ohlcv_to_db(stock_id, df):
 
 def main():
     sdk = get_logged_in_sdk()
+    client = FubonRestClient(sdk)
     all_ids = get_all_stock_ids()
-    latest_date = get_latest_trading_date(sdk)
+    latest_date = get_latest_trading_date(client)
     if not latest_date:
         return
     all_ids = filter_already_updated(all_ids, latest_date)
     safe_print(f"📝 需更新個股數: {len(all_ids)}")
 
-    for idx, stock_id in enumerate(all_ids):
-        for attempt in range(2):
-            df = fetch_daily_ohlcv(sdk, symbol=stock_id, days=10)
-            inserted = insert_ohlcv_to_db(stock_id, df)
-            if inserted > 0 or attempt == 1:
-                break
-        safe_print(f"✅ {stock_id} 完成寫入 {inserted} 筆")
-        time.sleep(1.2)  # 每檔間隔 1.2 秒
+    journal = JobJournal("fubon_ohlcv", run_key=latest_date, db_path=DB_PATH)
+    all_ids = journal.start(all_ids)
+
+    def fetch_timed(sid):
+        t0 = time.perf_counter()
+        df = fetch_daily_ohlcv(client, sid, 10)
+        return df, time.perf_counter() - t0
+
+    total_inserted, no_new = 0, []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(fetch_timed, sid): sid for sid in all_ids}
+        for f in as_completed(futures):
+            stock_id = futures[f]
+            df, elapsed = f.result()
+            if df is None:
+                journal.mark_failed(stock_id, "抓取失敗", elapsed)
+                continue
+            inserted = insert_ohlcv_to_db(stock_id, df)  # DB 寫入留在主執行緒
+            journal.mark_done(stock_id, elapsed)
+            total_inserted += inserted
+            if inserted == 0:
+                no_new.append(stock_id)
+            safe_print(f"✅ {stock_id} 完成寫入 {inserted} 筆")
 
+    safe_print(f"📦 共寫入 {total_inserted} 筆，無新資料 {len(no_new)} 檔")
+    journal.finish()
+    safe_print(client.summary())
     safe_print("🎉 全部更新完成")
     log_fp.write("🎉 全部更新完成\n")
     log_fp.close()
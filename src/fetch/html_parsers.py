@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+各資料來源的 HTML 解析純函式（輸入 HTML 字串，輸出資料列）。
+
+- 使用 lxml（C 實作，比 BeautifulSoup + html.parser 快很多）
+- 不碰網路、不碰 DB：可直接用 tests/fixtures/ 下存好的 HTML 做單元測試
+"""
+
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import lxml.html
+
+
+def _cell_text(td) -> str:
+    return td.text_content().strip()
+
+
+def parse_holder_concentration_html(html: str, stock_id: str) -> List[Tuple[str, str, str, str, str]]:
+    """
+    解析 norway.twsthr.info StockHolders.aspx 的 #Details 表格。
+    回傳 [(stock_id, date(YYYYMMDD), avg_shares, ratio_1000, close_price), ...]
+    """
+    if not html:
+        return []
+    doc = lxml.html.fromstring(html)
+    tables = doc.xpath('//table[@id="Details"]')
+    if not tables:
+        return []
+
+    data = []
+    for row in tables[0].xpath(".//tr"):
+        cols = row.xpath("./td")
+        if len(cols) < 15:
+            continue
+        date = _cell_text(cols[2]).replace("/", "")
+        avg_shares = _cell_text(cols[5]).replace(",", "")
+        ratio_1000 = _cell_text(cols[13])
+        close_price = _cell_text(cols[14])
+
+        if date.isdigit() and len(date) == 8:
+            data.append((stock_id, date, avg_shares, ratio_1000, close_price))
+    return data
+
+
+def _convert_roc_date(roc_date_str: str) -> str:
+    y, m, d = roc_date_str.split("/")
+    return f"{int(y) + 1911}-{int(m):02d}-{int(d):02d}"
+
+
+def parse_otc_index_html(html: str) -> List[dict]:
+    """
+    解析 TPEx 每日指數頁（daily-indices.html）渲染後的表格。
+    回傳 [{"stock_id": "^OTCI", "date": "YYYY-MM-DD", "volume": int, "close": float}, ...]
+    """
+    if not html:
+        return []
+    doc = lxml.html.fromstring(html)
+
+    data = []
+    for row in doc.xpath("//table//tbody/tr"):
+        cols = row.xpath("./td")
+        if len(cols) < 6:
+            continue
+        try:
+            date = _convert_roc_date(_cell_text(cols[0]))
+            volume = int(_cell_text(cols[1]).replace(",", ""))
+            close = round(float(_cell_text(cols[4]).replace(",", "")), 2)
+        except Exception as e:
+            print(f"⚠️ 資料錯誤跳過: {e}")
+            continue
+        data.append({"stock_id": "^OTCI", "date": date, "volume": volume, "close": close})
+    return data
@@ -1,139 +1,102 @@
 import sys
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+sys.stdout.reconfigure(encoding='utf-8')
 
-import sqlite3
 import time
+from datetime import datetime
 from pathlib import Path
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.db_writer import DB_PATH, get_writer
+from common.http_fetcher import FetchSource, fetch_html
+from common.job_journal import JobJournal
+from fetch.html_parsers import parse_holder_concentration_html
 
 """
 用途: 更新每週 籌碼集中度 與 千張大戶持股比率
 使用方式：
     python save_holder_concentration.py           # 預設讀取 my_stock_holdings.txt
     python save_holder_concentration.py abc.txt   # 改為讀取 abc.txt
-"""
-
-def fetch_holder_concentration_selenium(stock_id: str):
-    url = f"https://norway.twsthr.info/StockHolders.aspx?stock={stock_id}"
-
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    driver.get(url)
 
-    time.sleep(3)
-
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    driver.quit()
-
-    table = soup.find("table", id="Details")
-    if not table:
-        print(f"❌ 找不到資料表格 for {stock_id}")
-        return []
-
-    rows = table.find_all("tr")
-    print(f"✅ 共找到 {len(rows)} 列 tr")
+StockHolders.aspx 為伺服器端渲染，預設走純 HTTP (共用 httpx 連線池 + lxml 解析)，
+HTTP 失敗、或回應裡解析不出資料表（被擋 / 驗證碼頁）時才退回 Selenium。
+寫入走 common.db_writer 的單一寫入者（群組 commit），不再自己處理 database is locked 重試。
+"""
 
-    data = []
-    for i, row in enumerate(rows):
-        cols = row.find_all("td")
-        if len(cols) >= 15:
-            date = cols[2].text.strip().replace("/", "")
-            avg_shares = cols[5].text.strip().replace(",", "")
-            ratio_1000 = cols[13].text.strip()
-            close_price = cols[14].text.strip()
+HOLDER_SOURCE = FetchSource(
+    name="holder_concentration",
+    url_template="https://norway.twsthr.info/StockHolders.aspx?stock={stock_id}",
+    http_ok=True,
+)
 
-            if date.isdigit() and len(date) == 8:
-                data.append((stock_id, date, avg_shares, ratio_1000, close_price))
 
+def _parse_and_report(html: str, stock_id: str):
+    data = parse_holder_concentration_html(html, stock_id)
     if not data:
-        print("❌ 表格抓到但沒有有效資料列")
+        print(f"❌ 找不到資料表格或沒有有效資料列 for {stock_id}")
+    else:
+        print(f"✅ 共解析出 {len(data)} 筆")
     return data
 
 
+def fetch_holder_concentration(stock_id: str):
+    html = fetch_html(HOLDER_SOURCE, validate=lambda page: bool(parse_holder_concentration_html(page, stock_id)),
+                      stock_id=stock_id)
+    return _parse_and_report(html, stock_id)
+
+
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    input_file = argv[1] if len(argv) > 1 else "my_stock_holdings.txt"
+
+    writer = get_writer(DB_PATH)
+    writer.execute("""
+        CREATE TABLE IF NOT EXISTS holder_concentration (
+            stock_id TEXT,
+            date TEXT,
+            avg_shares REAL,
+            ratio_1000 REAL,
+            close_price REAL,
+            PRIMARY KEY (stock_id, date)
+        )
+    """)
+
+    with open(input_file, "r", encoding="utf-8") as f:
+        stock_list = [line.strip() for line in f if line.strip()]
+
+    # 同一天、同一份清單中斷後重跑 → 略過已完成的股票，只重試失敗的
+    journal = JobJournal("holder_concentration",
+                         run_key=f"{datetime.today():%Y-%m-%d}:{Path(input_file).name}", db_path=DB_PATH)
+    for stock_id in journal.start(stock_list):
+        print(f"\n🔍 正在處理股票: {stock_id}...")
+        t0 = time.perf_counter()
+        try:
+            records = fetch_holder_concentration(stock_id)
+        except Exception as e:
+            journal.mark_failed(stock_id, f"{type(e).__name__}: {e}", time.perf_counter() - t0)
+            print(f"❌ 發生錯誤: {e}")
+            continue
+        if not records:
+            journal.mark_failed(stock_id, "沒有有效資料列", time.perf_counter() - t0)
+            continue
+
+        try:
+            # DBWriter 回傳實際變動筆數（sqlite changes），已存在而被 IGNORE 的日期不算
+            inserted = writer.executemany("""
+                INSERT OR IGNORE INTO holder_concentration
+                (stock_id, date, avg_shares, ratio_1000, close_price)
+                VALUES (?, ?, ?, ?, ?)
+            """, records)
+        except Exception as e:
+            journal.mark_failed(stock_id, f"insert error: {e}", time.perf_counter() - t0)
+            print(f"❌ insert error: {e}")
+        else:
+            journal.mark_done(stock_id, time.perf_counter() - t0)
+            print(f"✅ 新增 {inserted} 筆資料（共 {len(records)} 筆，其餘已存在）")
+
+    counts = journal.finish()
+    print(f"\n🎉 全部完成：成功 {counts.get('done', 0)} 檔，失敗 {counts.get('failed', 0)} 檔（重跑只會重試失敗的）")
+
+
 if __name__ == "__main__":
-    input_file = sys.argv[1] if len(sys.argv) > 1 else "my_stock_holdings.txt"
-
-    db_path = Path("data/institution.db")
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-
-    def execute_with_retry(cursor, sql, params, retries: int = 3, delay: float = 1.5):
-        for attempt in range(retries):
-            try:
-                cursor.execute(sql, params)
-                return
-            except sqlite3.OperationalError as e:
-                if "locked" in str(e).lower() and attempt < retries - 1:
-                    time.sleep(delay)
-                else:
-                    raise
-
-    def commit_with_retry(conn, retries: int = 3, delay: float = 1.5):
-        for attempt in range(retries):
-            try:
-                conn.commit()
-                return
-            except sqlite3.OperationalError as e:
-                if "locked" in str(e).lower() and attempt < retries - 1:
-                    time.sleep(delay)
-                else:
-                    raise
-
-    with sqlite3.connect(db_path, timeout=30) as conn:
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA busy_timeout = 30000;")
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS holder_concentration (
-                stock_id TEXT,
-                date TEXT,
-                avg_shares REAL,
-                ratio_1000 REAL,
-                close_price REAL,
-                PRIMARY KEY (stock_id, date)
-            )
-        """)
-
-        with open(input_file, "r", encoding="utf-8") as f:
-            stock_list = [line.strip() for line in f if line.strip()]
-
-        for stock_id in stock_list:
-            print(f"\n🔍 正在處理股票: {stock_id}...")
-            try:
-                records = fetch_holder_concentration_selenium(stock_id)
-            except Exception as e:
-                print(f"❌ 發生錯誤: {e}")
-                continue
-
-            success = 0
-            for row in records:
-                try:
-                    execute_with_retry(cursor, """
-                        INSERT OR IGNORE INTO holder_concentration 
-                        (stock_id, date, avg_shares, ratio_1000, close_price)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, row)
-                    if cursor.rowcount > 0:
-                        success += 1
-                except Exception as e:
-                    print(f"❌ insert error: {e}")
-
-            try:
-                commit_with_retry(conn)
-            except Exception as e:
-                print(f"❌ commit error: {e}")
-                continue
-
-            print(f"✅ 新增 {success} 筆資料")
-
-    print("\n🎉 全部完成")
+    main()
@@ -1,19 +1,23 @@
-import httpx
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 from dateutil.relativedelta import relativedelta
 from tqdm import tqdm
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.http_fetcher import fetch_json_http
+from common.response_cache import month_ttl
+
+STOCK_DAY_URL = "https://www.twse.com.tw/exchangeReport/STOCK_DAY"
 
 def get_twse_month_data(stock_code: str, date: datetime) -> list:
-    date_str = date.strftime("%Y%m01")
-    url = f"https://www.twse.com.tw/exchangeReport/STOCK_DAY?response=json&date={date_str}&stockNo={stock_code}"
-    # print("📡 正在抓取：", url)
     # https://www.twse.com.tw/exchangeReport/STOCK_DAY?response=json&date=20250501&stockNo=8358
-
+    # 已結束的月份不會再變 → 永久快取；當月短 TTL
+    params = {"response": "json", "date": date.strftime("%Y%m01"), "stockNo": stock_code}
     try:
-        response = httpx.get(url, timeout=10.0, verify=False)
-        data = response.json()
+        data = fetch_json_http(STOCK_DAY_URL, params=params, verify=False, ttl=month_ttl(date))
         return data.get("data", [])
     except:
         return []
@@ -1,21 +1,27 @@
 import sys
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+sys.stdout.reconfigure(encoding='utf-8')
 
 import sqlite3
-import pandas as pd
-from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.db_writer import get_writer
 
 """
 補上 monthly_revenue 資料庫中 所有缺少的 monthly_avg_close 和 monthly_last_close 欄位
 這些欄位是從 twse_prices 資料庫中計算得來的(所以需要先有 twse_prices 的資料就能補)。
 finmind_db_fetcher.py 可以抓寫69個月的 twse_prices 資料。
+
+使用方式
+    python src/fetch/update_monthly_avg_price_from_local_db.py                  # SQLite
+    python src/fetch/update_monthly_avg_price_from_local_db.py --engine duckdb  # DuckDB 引擎
 """
 
 DB_PATH = "data/institution.db"
 
-def get_missing_rows():
-    conn = sqlite3.connect(DB_PATH)
+def get_missing_rows(db_path: str = DB_PATH):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     cursor.execute("""
         SELECT stock_id, year_month
@@ -26,55 +32,52 @@ def get_missing_rows():
     conn.close()
     return rows
 
-def compute_monthly_prices_from_db(stock_id: str, year_month: str):
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query(f"""
-        SELECT date, close FROM twse_prices
-        WHERE stock_id = '{stock_id}'
-    """, conn)
-
-    conn.close()
-
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"])
-    df["ym"] = df["date"].dt.strftime("%Y%m")
-
-    df_month = df[df["ym"] == year_month]
-
-    if df_month.empty:
-        return None, None
-
-    avg = round(df_month["close"].mean(), 2)
-    last = round(df_month["close"].iloc[-1], 2)
-    return avg, last
-
-def update_price_to_db(stock_id: str, year_month: str, avg: float, last: float):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE monthly_revenue
-        SET monthly_avg_close = ?, monthly_last_close = ?
-        WHERE stock_id = ? AND year_month = ?
-    """, (avg, last, stock_id, year_month))
-
-    if cursor.rowcount > 0:
-        print(f"[OK] 補上 {stock_id} {year_month} → avg: {avg}, last: {last}")
-    else:
-        print(f"[SKIP] 找不到 row 可更新：{stock_id} {year_month}")
-
-    conn.commit()
-    conn.close()
-
-def main():
-    missing_list = get_missing_rows()
+def compute_missing_monthly_prices(missing_list, engine_name: str = "sqlite", db_path: str = DB_PATH) -> dict:
+    """
+    一次 set-based 查詢算出所有缺值月份的 (avg, last)，取代每筆各讀一次整段股價；
+    engine_name="duckdb" 時交給 DuckDB（common.analytics_engine）多執行緒執行。
+    """
+    from common.analytics_engine import get_engine, monthly_close_summary
+
+    wanted = set(missing_list)
+    with get_engine(engine_name, db_path) as engine:
+        summary = monthly_close_summary(engine, sorted({sid for sid, _ in wanted}))
+    return {
+        (sid, ym): (avg, last)
+        for sid, ym, avg, last in summary.itertuples(index=False, name=None)
+        if (sid, ym) in wanted
+    }
+
+
+def main(engine: str = "sqlite", db_path: str = DB_PATH):
+    missing_list = get_missing_rows(db_path)
     print(f"🔍 共需補上 {len(missing_list)} 筆資料")
+    if not missing_list:
+        return
 
+    prices = compute_missing_monthly_prices(missing_list, engine, db_path)
+    updates = []
     for stock_id, year_month in missing_list:
-        avg, last = compute_monthly_prices_from_db(stock_id, year_month)
+        avg, last = prices.get((stock_id, year_month), (None, None))
         if avg is not None and last is not None:
-            update_price_to_db(stock_id, year_month, avg, last)
+            updates.append((avg, last, stock_id, year_month))
+            print(f"[OK] 補上 {stock_id} {year_month} → avg: {avg}, last: {last}")
         else:
             print(f"[FAIL] {stock_id} {year_month} 無法從 twse_prices 計算資料")
 
+    updated = get_writer(db_path).executemany("""
+        UPDATE monthly_revenue
+        SET monthly_avg_close = ?, monthly_last_close = ?
+        WHERE stock_id = ? AND year_month = ?
+    """, updates)
+    print(f"✅ 共更新 {updated} 筆")
+
+
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    ap = argparse.ArgumentParser(description="補上 monthly_revenue 缺少的月均價 / 月底收盤價")
+    ap.add_argument("--engine", choices=["sqlite", "duckdb", "duckdb-columnar"], default="sqlite")
+    ap.add_argument("--db", default=DB_PATH)
+    args = ap.parse_args()
+    main(args.engine, args.db)
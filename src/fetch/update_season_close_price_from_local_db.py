@@ -4,8 +4,7 @@ import os
 import sqlite3
 import pandas as pd
 from datetime import datetime
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+sys.stdout.reconfigure(encoding='utf-8')
 
 '''
 補上 profitability_ratios 資料表中缺少的季收盤價
@@ -31,9 +30,9 @@ def ensure_column_exists():
     conn.commit()
     conn.close()
 
-def load_stock_list():
+def load_stock_list(argv=None):
     stock_file = "my_stock_holdings.txt"
-    for arg in sys.argv:
+    for arg in (sys.argv if argv is None else argv):
         if arg.endswith(".txt") and os.path.exists(arg):
             stock_file = arg
             break
@@ -95,9 +94,9 @@ def update_season_close_price(stock_id, season, close_price):
     conn.commit()
     conn.close()
 
-def main():
+def main(argv=None):
     ensure_column_exists()
-    stock_list = load_stock_list()
+    stock_list = load_stock_list(argv)
 
     for stock_id in stock_list:
         missing_seasons = get_missing_season_closes(stock_id)
@@ -5,14 +5,19 @@
 
 from __future__ import annotations
 
-import os, io, re, argparse
+import os, argparse, sys
 from datetime import datetime, date, timedelta, timezone
-from typing import Optional, Tuple
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 
-import requests
 import pandas as pd
 import yfinance as yf
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+# 期貨 (FinMind TaiwanFuturesDaily, TX 近月)：近月挑選與區間回溯共用 tx_near_month_finmind
+from futures_spread.tx_near_month_finmind import get_tx_near_month_with_lookback
+
 # ---------- 時區 ----------
 try:
     from zoneinfo import ZoneInfo
@@ -24,8 +29,14 @@ def today_tpe() -> date:
     return datetime.now(TPE).date()
 
 # ---------- 現貨 (^TWII) ----------
+# the_date 當天已有收盤的結果不會再變，同一個 process 內記住（儀表板 rerun 不再重打 yfinance）
+_twii_memo: Dict[date, Tuple[date, float]] = {}
+
+
 def get_twii_close_for_date(the_date: date, lookback_days: int = 30) -> Tuple[date, float]:
     """回傳 (實際交易日, 收盤價)；若 the_date 無資料則向前回溯到最近交易日"""
+    if the_date in _twii_memo:
+        return _twii_memo[the_date]
     t = yf.Ticker("^TWII")
     start = (the_date - timedelta(days=lookback_days + 10)).strftime("%Y-%m-%d")
     end   = (the_date + timedelta(days=2)).strftime("%Y-%m-%d")
@@ -44,78 +55,10 @@ def get_twii_close_for_date(the_date: date, lookback_days: int = 30) -> Tuple[da
         raise RuntimeError(f"^TWII 在 {the_date}（含）以前查無收盤資料")
 
     row = sub.iloc[-1]
-    return row["trade_date"], float(row["Close"])
-
-# ---------- 期貨 (FinMind TaiwanFuturesDaily, TX 近月) ----------
-FINMIND_API = "https://api.finmindtrade.com/api/v4/data"
-
-def _parse_contract_date(x) -> Optional[date]:
-    if pd.isna(x): return None
-    s = str(x).strip()
-    if re.fullmatch(r"\d{6}", s):      # e.g. 202510
-        return datetime.strptime(s, "%Y%m").date().replace(day=1)
-    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", s):
-        return datetime.strptime(s, "%Y-%m-%d").date()
-    try:
-        return pd.to_datetime(s).date()
-    except Exception:
-        return None
-
-def get_tx_near_month_price_on(the_date: date,
-                               token: Optional[str] = None) -> Tuple[str, float]:
-    """回傳 (近月YYYYMM, 當日價格)。若該天沒有，外層會回溯。"""
-    ds = the_date.strftime("%Y-%m-%d")
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    params = {"dataset": "TaiwanFuturesDaily", "data_id": "TX",
-              "start_date": ds, "end_date": ds}
-    r = requests.get(FINMIND_API, headers=headers, params=params, timeout=20)
-    j = r.json()
-    if not j.get("data"):
-        raise RuntimeError(j.get("msg") or "FinMind 無資料")
-
-    df = pd.DataFrame(j["data"])
-    if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        df = df[df["date"] == the_date]
-    if "trading_session" in df.columns:
-        df = df[df["trading_session"].isin(["regular", "position", "day"])]
-    if df.empty:
-        raise RuntimeError("指定日期沒有台指期日盤資料")
-
-    if "contract_date" not in df.columns:
-        raise RuntimeError("缺少 contract_date 欄位")
-    df["contract_date_parsed"] = df["contract_date"].map(_parse_contract_date)
-    df = df.dropna(subset=["contract_date_parsed"])
-    if df.empty:
-        raise RuntimeError("contract_date 格式無法解析")
-
-    row = df.loc[df["contract_date_parsed"].idxmin()]  # 近月
-    price = None
-    # 🔧 修改：優先取 close，因為 FinMind 的 position 時段 settlement_price 可能是 0
-    for col in ("close", "close_price", "settlement_price", "end_price"):
-        if col in df.columns and pd.notna(row.get(col)):
-            val = float(row[col])
-            if val > 0:  # 確保價格有效（> 0）
-                price = val
-                break
-    if price is None:
-        raise RuntimeError("找不到價格欄位（settlement/close）")
-
-    ym = row["contract_date_parsed"].strftime("%Y%m")
-    return ym, price
-
-def get_tx_near_month_with_lookback(base_day: date,
-                                    token: Optional[str],
-                                    lookback_days: int = 30) -> Tuple[date, str, float]:
-    """向前回溯直到找到 TX 近月價；回傳 (實際交易日, 近月YYYYMM, 價格)"""
-    cur = base_day
-    for _ in range(lookback_days + 1):
-        try:
-            ym, px = get_tx_near_month_price_on(cur, token=token)
-            return cur, ym, px
-        except Exception:
-            cur -= timedelta(days=1)
-    raise RuntimeError(f"台指期近月價回溯 {lookback_days} 天仍無資料")
+    result = row["trade_date"], float(row["Close"])
+    if result[0] == the_date:
+        _twii_memo[the_date] = result
+    return result
 
 # ---------- 整體：期現價差 ----------
 def compute_tw_fut_spread(on_day: Optional[date] = None,
@@ -130,6 +73,7 @@ def compute_tw_fut_spread(on_day: Optional[date] = None,
         "future_near_month": ym,
         "future_price": fut_px,
         "spread_pts": spread_pts,
+        "spot_date": spot_day.strftime("%Y-%m-%d"),   # 與 trade_date 不同表示 ^TWII 當天收盤還沒更新
     }
 
 # ---------- CLI ----------
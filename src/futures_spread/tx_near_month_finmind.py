@@ -1,16 +1,24 @@
 # -*- coding: utf-8 -*-
 # tx_near_month_finmind.py  — 取得指定日期 台指期(TX) 近月合約價格（用 FinMind）
-from datetime import datetime, date
-from typing import Tuple, Optional
 import re
-import requests
-import pandas as pd
+import sys
+from datetime import datetime, date, timedelta
+from pathlib import Path
+from typing import Tuple, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.finmind_rest_client import FinMindRestClient
+from common.response_cache import day_ttl
+
+DAY_SESSIONS = ("regular", "position", "day")
+# FinMind 的 position 時段 settlement_price 可能是 0，所以優先取 close，且價格必須 > 0
+PRICE_COLUMNS = ("close", "close_price", "settlement_price", "end_price")
 
-FINMIND_API = "https://api.finmindtrade.com/api/v4/data"
 
 def _parse_contract_date(x) -> Optional[date]:
-    """支援 'YYYYMM' 或 'YYYY-MM-DD' 或一般日期字串"""
-    if pd.isna(x):
+    """支援 'YYYYMM' 或 'YYYY-MM-DD'；價差合約（202510/202511）等無法解析者回傳 None"""
+    if x is None or x != x:  # None / NaN
         return None
     s = str(x).strip()
     # 202510 → 2025-10-01 當月第一天當作代表
@@ -19,68 +27,73 @@ def _parse_contract_date(x) -> Optional[date]:
     # 2025-10-01 直接解析
     if re.fullmatch(r"\d{4}-\d{2}-\d{2}", s):
         return datetime.strptime(s, "%Y-%m-%d").date()
-    # 其他交給 pandas（盡量容錯）
     try:
-        return pd.to_datetime(s).date()
-    except Exception:
+        return datetime.fromisoformat(s).date()
+    except ValueError:
         return None
 
+
+def pick_near_month(rows: list, the_date: date) -> Tuple[str, float]:
+    """
+    從 TaiwanFuturesDaily 的 data 中挑出 the_date 當日、日盤、近月（contract_date 最早）的價格。
+    回傳: (近月契約YYYYMM, 當日價格)；找不到則 RuntimeError
+    """
+    ds = the_date.strftime("%Y-%m-%d")
+    candidates = []
+    for r in rows:
+        if str(r.get("date", ""))[:10] != ds:
+            continue
+        if "trading_session" in r and r["trading_session"] not in DAY_SESSIONS:
+            continue
+        contract = _parse_contract_date(r.get("contract_date"))
+        if contract is not None:
+            candidates.append((contract, r))
+    if not candidates:
+        raise RuntimeError("指定日期沒有台指期日盤資料")
+
+    contract, row = min(candidates, key=lambda c: c[0])  # 近月
+    for col in PRICE_COLUMNS:
+        val = row.get(col)
+        if val is not None and val == val and float(val) > 0:
+            return contract.strftime("%Y%m"), float(val)
+    raise RuntimeError("找不到價格欄位（settlement/close）")
+
+
+def _fetch_tx_rows(start: date, end: date, token: Optional[str] = None,
+                   client: Optional[FinMindRestClient] = None) -> list:
+    client = client or FinMindRestClient(token=token)
+    return client.get("TaiwanFuturesDaily", "TX", start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"),
+                      ttl=day_ttl(end))
+
+
 def get_tx_near_month_price_on(the_date: date,
-                               token: Optional[str] = None) -> Tuple[str, float]:
+                               token: Optional[str] = None,
+                               client: Optional[FinMindRestClient] = None) -> Tuple[str, float]:
     """
     回傳: (近月契約YYYYMM, 當日價格)
     資料源: FinMind TaiwanFuturesDaily（data_id='TX'）
-    價格欄位優先順序: settlement_price → close → close_price → end_price
     """
-    ds = the_date.strftime("%Y-%m-%d")
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    params = {
-        "dataset": "TaiwanFuturesDaily",
-        "data_id": "TX",
-        "start_date": ds,
-        "end_date": ds,
-    }
-    r = requests.get(FINMIND_API, headers=headers, params=params, timeout=20)
-    j = r.json()
-    if not j.get("data"):
-        raise RuntimeError(f"FinMind 回傳空資料: {j.get('msg') or 'no data'}")
-
-    df = pd.DataFrame(j["data"])
-
-    # 只留當日
-    if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        df = df[df["date"] == the_date]
-
-    # 只留日盤 / 一般盤（欄位可能叫 trading_session）
-    if "trading_session" in df.columns:
-        df = df[df["trading_session"].isin(["regular", "position", "day"])]
-
-    if df.empty:
-        raise RuntimeError("指定日期沒有台指期日盤資料")
+    rows = _fetch_tx_rows(the_date, the_date, token, client)
+    if not rows:
+        raise RuntimeError("FinMind 回傳空資料")
+    return pick_near_month(rows, the_date)
+
+
+def get_tx_near_month_with_lookback(base_day: date,
+                                    token: Optional[str] = None,
+                                    lookback_days: int = 30,
+                                    client: Optional[FinMindRestClient] = None) -> Tuple[date, str, float]:
+    """一個區間 request 抓回 lookback_days 天，從 base_day 往前找第一個有近月價的交易日；回傳 (實際交易日, 近月YYYYMM, 價格)"""
+    rows = _fetch_tx_rows(base_day - timedelta(days=lookback_days), base_day, token, client)
+    cur = base_day
+    for _ in range(lookback_days + 1):
+        try:
+            ym, px = pick_near_month(rows, cur)
+            return cur, ym, px
+        except RuntimeError:
+            cur -= timedelta(days=1)
+    raise RuntimeError(f"台指期近月價回溯 {lookback_days} 天仍無資料")
 
-    # 解析合約到期欄（可能是 YYYYMM）
-    if "contract_date" not in df.columns:
-        raise RuntimeError("缺少 contract_date 欄位")
-    df["contract_date_parsed"] = df["contract_date"].map(_parse_contract_date)
-    df = df.dropna(subset=["contract_date_parsed"])
-    if df.empty:
-        raise RuntimeError("contract_date 欄位格式無法解析")
-
-    # 近月 = contract_date 最早者
-    row = df.loc[df["contract_date_parsed"].idxmin()]
-
-    # 取價格
-    price = None
-    for col in ("settlement_price", "close", "close_price", "end_price"):
-        if col in df.columns and pd.notna(row.get(col)):
-            price = float(row[col])
-            break
-    if price is None:
-        raise RuntimeError("找不到價格欄位（settlement/close）")
-
-    ym = row["contract_date_parsed"].strftime("%Y%m")
-    return ym, price
 
 if __name__ == "__main__":
     # 範例：抓 2025-10-01
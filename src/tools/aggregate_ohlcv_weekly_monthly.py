@@ -29,16 +29,23 @@ into two new SQLite tables:
     # 僅指定 DB，匯總所有股票至今天（以 DB 內最大日期作為定錨）
     python aggregate_ohlcv_weekly_monthly.py --db data/institution.db --today 2025-08-22
 
+    # 日K改由欄式鏡像讀取（先 python src/common/columnar_store.py --sync）
+    python aggregate_ohlcv_weekly_monthly.py --engine columnar
+
 """
 
 from __future__ import annotations
 
 import argparse
 import sqlite3
+import sys
+from pathlib import Path
 from typing import Iterable, List, Optional, Tuple
 
 import pandas as pd
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
 
 def ensure_tables(conn: sqlite3.Connection) -> None:
     """Create weekly/monthly tables if not exist."""
@@ -80,30 +87,30 @@ def load_daily(
     stock_ids: Optional[Iterable[str]] = None,
     today_date: Optional[str] = None,
 ) -> pd.DataFrame:
-    """Load daily K from twse_prices with optional stock filter and anchor date."""
-    base_sql = """
-        SELECT stock_id, date, open, high, low, close, volume
-        FROM twse_prices
+    """Load daily K from twse_prices with optional stock filter and anchor date.
+
+    Compact dtypes (common.db_helpers.load_price_frame): float32 OHLC, int64 volume,
+    categorical stock_id, dates parsed once while reading.
     """
-    conds: List[str] = []
-    params: List[object] = []
+    from common.db_helpers import load_price_frame
 
-    if stock_ids:
-        placeholders = ",".join(["?"] * len(list(stock_ids)))
-        conds.append(f"stock_id IN ({placeholders})")
-        params.extend(list(stock_ids))
+    df = load_price_frame(conn, stock_ids=list(stock_ids) if stock_ids else None, end=today_date)
+    return _clean_daily(df)
 
-    if today_date:
-        conds.append("date <= ?")
-        params.append(today_date)
 
-    if conds:
-        base_sql += " WHERE " + " AND ".join(conds)
+def load_daily_columnar(
+    stock_ids: Optional[Iterable[str]] = None,
+    today_date: Optional[str] = None,
+) -> pd.DataFrame:
+    """Same as load_daily, but reads the Arrow mirror (common.columnar_store; run --sync first)."""
+    from common.columnar_store import load_prices
 
-    base_sql += " ORDER BY stock_id, date"
+    df = load_prices("daily", end=today_date, stock_ids=list(stock_ids) if stock_ids else None)
+    df = df.sort_values(["stock_id", "date"], kind="stable").reset_index(drop=True)
+    return _clean_daily(df)
 
-    df = pd.read_sql_query(base_sql, conn, params=params, parse_dates=["date"])
 
+def _clean_daily(df: pd.DataFrame) -> pd.DataFrame:
     # ---- 缺值與「零價」處理：確保只用有效日K ----
     # 任一 OHLC 為 NaN 或 0 的日K，視為「無效交易日」→ 排除。
     before_len = len(df)
@@ -145,7 +152,7 @@ def aggregate_weekly(df: pd.DataFrame) -> pd.DataFrame:
 
     wk = (
         df_sorted
-        .groupby(["stock_id", "year_week"], as_index=False)
+        .groupby(["stock_id", "year_week"], as_index=False, observed=True)
         .agg(
             open=("open", "first"),
             high=("high", "max"),
@@ -170,7 +177,7 @@ def aggregate_monthly(df: pd.DataFrame) -> pd.DataFrame:
 
     mk = (
         df_sorted
-        .groupby(["stock_id", "year_month"], as_index=False)
+        .groupby(["stock_id", "year_month"], as_index=False, observed=True)
         .agg(
             open=("open", "first"),
             high=("high", "max"),
@@ -183,14 +190,27 @@ def aggregate_monthly(df: pd.DataFrame) -> pd.DataFrame:
     return mk
 
 
+def _db_rows(bars: pd.DataFrame, period_col: str) -> List[Tuple]:
+    """
+    寫回 SQLite 的列：stock_id 轉回字串；float32 價格轉回 float64 並四捨五入，
+    避免 10.55 被寫成 10.550000190734863（日K價格最多到小數第 2 位）。
+    """
+    out = bars[["stock_id", period_col, "open", "high", "low", "close", "volume"]].copy()
+    out["stock_id"] = out["stock_id"].astype(str)
+    for col in ("open", "high", "low", "close"):
+        out[col] = out[col].astype("float64").round(4)
+    out["volume"] = out["volume"].astype("int64")
+    return [
+        (sid, period, float(o), float(h), float(l), float(c), int(v))
+        for sid, period, o, h, l, c, v in out.itertuples(index=False, name=None)
+    ]
+
+
 def upsert_weekly(conn: sqlite3.Connection, wk: pd.DataFrame) -> int:
     """UPSERT weekly rows with ON CONFLICT ... DO UPDATE (就地更新，不先刪再插)。"""
     if wk.empty:
         return 0
-    rows: List[Tuple] = list(
-        wk[["stock_id", "year_week", "open", "high", "low", "close", "volume"]]
-        .itertuples(index=False, name=None)
-    )
+    rows = _db_rows(wk, "year_week")
     conn.executemany(
         """
         INSERT INTO twse_prices_weekly
@@ -212,10 +232,7 @@ def upsert_monthly(conn: sqlite3.Connection, mk: pd.DataFrame) -> int:
     """UPSERT monthly rows with ON CONFLICT ... DO UPDATE (就地更新，不先刪再插)。"""
     if mk.empty:
         return 0
-    rows: List[Tuple] = list(
-        mk[["stock_id", "year_month", "open", "high", "low", "close", "volume"]]
-        .itertuples(index=False, name=None)
-    )
+    rows = _db_rows(mk, "year_month")
     conn.executemany(
         """
         INSERT INTO twse_prices_monthly
@@ -238,13 +255,18 @@ def main() -> None:
     ap.add_argument("--db", default="data/institution.db", help="SQLite DB path (default: data/institution.db)")
     ap.add_argument("--today", dest="today_date", default=None, help="Anchor date YYYY-MM-DD (optional)")
     ap.add_argument("--stock", nargs="*", default=None, help="One or more stock IDs to aggregate (default: all)")
+    ap.add_argument("--engine", choices=["sqlite", "columnar"], default="sqlite",
+                    help="Daily K source: sqlite (default) or columnar (Arrow mirror from common.columnar_store)")
     args = ap.parse_args()
 
     conn = sqlite3.connect(args.db)
     try:
         ensure_tables(conn)
 
-        df_daily = load_daily(conn, stock_ids=args.stock, today_date=args.today_date)
+        if args.engine == "columnar":
+            df_daily = load_daily_columnar(stock_ids=args.stock, today_date=args.today_date)
+        else:
+            df_daily = load_daily(conn, stock_ids=args.stock, today_date=args.today_date)
         if df_daily.empty:
             print("❗ twse_prices 無符合條件的資料，未進行聚合。")
             return
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+壓測 common.analytics_engine：同一組夜間批次查詢分別交給 SQLite、DuckDB（ATTACH institution.db）
+與 DuckDB + 欄式鏡像執行，比較耗時與結果筆數。
+
+查詢 (--query)
+    monthly_close : 每檔每月平均收盤價 / 月底收盤價（update_monthly_avg_price_from_local_db）
+    ma20          : 每檔最新 20 日均線（window function）
+    returns_1y    : 近一年報酬率（calculate_rs_rsi 的 RS 排名）
+
+使用方式
+    python src/tools/bench_analytics_engines.py
+    python src/tools/bench_analytics_engines.py --engine sqlite duckdb --repeat 5 --threads 4
+    # duckdb-columnar 需先 python src/common/columnar_store.py --sync
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.analytics_engine import DB_PATH, get_engine, latest_moving_average, monthly_close_summary, period_returns
+
+ENGINES = ("sqlite", "duckdb", "duckdb-columnar")
+
+
+def _since_1y() -> str:
+    return (date.today() - timedelta(days=365)).isoformat()
+
+
+QUERIES = {
+    "monthly_close": lambda eng: monthly_close_summary(eng),
+    "ma20": lambda eng: latest_moving_average(eng, window=20, since=(date.today() - timedelta(days=60)).isoformat()),
+    "returns_1y": lambda eng: period_returns(eng, _since_1y()),
+}
+
+
+def bench(engine: str, queries, db_path: str, repeat: int, threads=None) -> list:
+    kwargs = {"threads": threads} if threads and engine != "sqlite" else {}
+    t0 = time.perf_counter()
+    eng = get_engine(engine, db_path, **kwargs)
+    setup = time.perf_counter() - t0
+
+    results = []
+    with eng:
+        for name in queries:
+            timings, rows = [], 0
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                rows = len(QUERIES[name](eng))
+                timings.append(time.perf_counter() - t0)
+            results.append({
+                "engine": engine,
+                "query": name,
+                "rows": rows,
+                "setup": setup,
+                "best": min(timings),
+                "median": statistics.median(timings),
+            })
+    return results
+
+
+def format_report(results: list) -> str:
+    lines = [f"{'engine':<16} {'query':<14} {'rows':>8} {'setup':>8} {'best':>8} {'median':>8} {'vs sqlite':>9}"]
+    base = {r["query"]: r["median"] for r in results if r["engine"] == "sqlite"}
+    for r in results:
+        speedup = f"{base[r['query']] / r['median']:>8.1f}x" if r["query"] in base and r["median"] else f"{'-':>9}"
+        lines.append(
+            f"{r['engine']:<16} {r['query']:<14} {r['rows']:>8} {r['setup']:>7.2f}s "
+            f"{r['best']:>7.3f}s {r['median']:>7.3f}s {speedup}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="比較 SQLite 與 DuckDB 跑夜間批次查詢的耗時")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--engine", nargs="*", choices=ENGINES, default=list(ENGINES))
+    ap.add_argument("--query", nargs="*", choices=list(QUERIES), default=list(QUERIES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--threads", type=int, default=None, help="DuckDB 執行緒數（預設：全部核心）")
+    args = ap.parse_args(argv)
+
+    results = []
+    for engine in args.engine:
+        try:
+            results.extend(bench(engine, args.query, args.db, args.repeat, args.threads))
+        except (ImportError, FileNotFoundError) as e:
+            print(f"⚠️ {engine} 無法使用，略過：{e}")
+    if results:
+        print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+離線壓測抓取層：用 common.replay 錄下的真實回應，模擬延遲 / 錯誤，比較不同並行數的
+吞吐量 (items/s)、DB 寫入速率 (rows/s) 與記憶體峰值 (tracemalloc)。
+
+1) 先線上錄一次（照平常方式執行，只多設環境變數）
+    FETCH_REPLAY=record python src/fetch/fetch_market_daily_prices.py --days 10
+    FETCH_REPLAY=record python src/fetch/fetch_latest_price_full.py 2330 2317 2454
+    FETCH_REPLAY=record python src/fetch/fubon/fetch_fubon_daily_ohlcv_all_stocks_to_db_fixed.py
+
+2) 離線重播壓測（寫入暫存 DB，不會動到 data/institution.db）
+    python src/tools/bench_fetch_replay.py --workers 1 4 8 --latency 0.15 --error-rate 0.02
+
+情境 (--scenario)
+    market_daily   : 錄到的每個交易日跑 ingest_market_daily（全市場日K）
+    finmind_prices : 錄到的 TaiwanStockPrice 區間查詢用 FinMindRestClient.fetch_many 重跑
+    fubon_candles  : 錄到的 historical.candles 用 FubonRestClient 重跑
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common import replay, response_cache
+
+SCENARIOS = ("market_daily", "finmind_prices", "fubon_candles")
+
+
+def _init_db(db_path: str) -> None:
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS twse_prices (
+                stock_id TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+                PRIMARY KEY (stock_id, date)
+            )
+        """)
+        conn.execute("CREATE TABLE IF NOT EXISTS stock_meta (stock_id TEXT PRIMARY KEY, market TEXT)")
+
+
+# ---------------------------- 情境 ----------------------------
+def run_market_daily(store: replay.ReplayStore, db_path: str, workers: int) -> tuple:
+    from datetime import datetime
+    from fetch.fetch_market_daily_prices import TWSE_MI_INDEX_URL, ingest_market_daily
+
+    dates = sorted({m["params"]["date"] for m in store.entries("http")
+                    if m.get("url") == TWSE_MI_INDEX_URL and m.get("params")})
+
+    def _one(date_str):
+        return ingest_market_daily(datetime.strptime(date_str, "%Y%m%d"), db_path=db_path)
+
+    errors = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(_one, d) for d in dates]:
+            try:
+                future.result()
+            except Exception:
+                errors += 1
+    return len(dates), errors
+
+
+def run_finmind_prices(store: replay.ReplayStore, db_path: str, workers: int) -> tuple:
+    from common.finmind_rest_client import FinMindRestClient, price_rows_to_db_rows
+    from fetch.fetch_market_daily_prices import upsert_prices
+
+    groups = defaultdict(list)
+    for m in store.entries("finmind_rest"):
+        p = m.get("params") or {}
+        if p.get("dataset") == "TaiwanStockPrice" and p.get("data_id"):
+            groups[(p.get("start_date"), p.get("end_date"))].append(p["data_id"])
+
+    client = FinMindRestClient(token="replay", max_workers=workers)
+    items = errors = 0
+    with sqlite3.connect(db_path) as conn:
+        for (start, end), ids in groups.items():
+            for stock_id, rows in client.fetch_many("TaiwanStockPrice", ids, start, end).items():
+                items += 1
+                if isinstance(rows, Exception):
+                    errors += 1
+                else:
+                    upsert_prices(conn, price_rows_to_db_rows(stock_id, rows))
+    return items, errors
+
+
+def run_fubon_candles(store: replay.ReplayStore, db_path: str, workers: int) -> tuple:
+    from common.fubon_rest_client import FubonRestClient
+
+    calls = [m["kwargs"] for m in store.entries("fubon_sdk") if str(m.get("call", "")).endswith("historical.candles")]
+    client = FubonRestClient(store.wrap(None, "fubon_sdk"))
+
+    def _one(kwargs):
+        return kwargs["symbol"], client.candles(kwargs["symbol"], kwargs["from_"], kwargs["to"],
+                                                kwargs.get("timeframe", "D"))
+
+    errors = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor, sqlite3.connect(db_path) as conn:
+        for future in [executor.submit(_one, kw) for kw in calls]:
+            try:
+                symbol, rows = future.result()
+            except Exception:
+                errors += 1
+                continue
+            conn.executemany(
+                "INSERT OR IGNORE INTO twse_prices (stock_id, date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, r["date"], r["open"], r["high"], r["low"], r["close"], r["volume"]) for r in rows],
+            )
+        conn.commit()
+    return len(calls), errors
+
+
+RUNNERS = {
+    "market_daily": run_market_daily,
+    "finmind_prices": run_finmind_prices,
+    "fubon_candles": run_fubon_candles,
+}
+
+
+# ---------------------------- 量測 ----------------------------
+def bench(scenario: str, store: replay.ReplayStore, workers: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        _init_db(db_path)
+        cache_dir, response_cache.CACHE_DIR = response_cache.CACHE_DIR, Path(tmp) / "http_cache"  # 不讓快取命中掩蓋重播延遲
+        before = dict(store.stats)
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            items, errors = RUNNERS[scenario](store, db_path, workers)
+        finally:
+            elapsed = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            response_cache.CACHE_DIR = cache_dir
+
+        with sqlite3.connect(db_path) as conn:
+            rows = conn.execute("SELECT COUNT(*) FROM twse_prices").fetchone()[0]
+
+    return {
+        "scenario": scenario,
+        "workers": workers,
+        "items": items,
+        "errors": errors,
+        "rows": rows,
+        "elapsed": elapsed,
+        "items_per_s": items / elapsed if elapsed else 0.0,
+        "rows_per_s": rows / elapsed if elapsed else 0.0,
+        "peak_mb": peak / 1024 / 1024,
+        "requests": store.stats["hits"] - before["hits"],
+        "injected": store.stats["injected_errors"] - before["injected_errors"],
+    }
+
+
+def format_report(results: list) -> str:
+    lines = [f"{'scenario':<15} {'workers':>7} {'items':>6} {'err':>4} {'rows':>8} {'elapsed':>8} "
+             f"{'items/s':>8} {'rows/s':>9} {'peakMB':>7} {'req':>6} {'inj':>4}"]
+    for r in results:
+        lines.append(
+            f"{r['scenario']:<15} {r['workers']:>7} {r['items']:>6} {r['errors']:>4} {r['rows']:>8} "
+            f"{r['elapsed']:>7.2f}s {r['items_per_s']:>8.1f} {r['rows_per_s']:>9.0f} {r['peak_mb']:>7.1f} "
+            f"{r['requests']:>6} {r['injected']:>4}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="用錄製的回應離線壓測抓取層")
+    ap.add_argument("--store", default=replay.DEFAULT_DIR, help="錄製資料目錄")
+    ap.add_argument("--scenario", nargs="*", choices=SCENARIOS, default=list(SCENARIOS))
+    ap.add_argument("--workers", nargs="*", type=int, default=[1, 4, 8])
+    ap.add_argument("--latency", type=float, default=0.1, help="每個 request 平均延遲（秒）")
+    ap.add_argument("--jitter", type=float, default=0.5)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args(argv)
+
+    results = []
+    for scenario in args.scenario:
+        for workers in args.workers:
+            store = replay.ReplayStore(args.store, mode="replay", latency=args.latency, jitter=args.jitter,
+                                       error_rate=args.error_rate, seed=args.seed)
+            replay.set_store(store)
+            result = bench(scenario, store, workers)
+            if result["items"] == 0:
+                print(f"⚠️ {scenario}：{args.store} 沒有錄製資料，略過")
+                break
+            results.append(result)
+    replay.set_store(None)
+
+    if results:
+        print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+入口程式的 import 耗時稽核（python -X importtime）：取出入口檔最上層的所有 import 敘述，
+在全新的 python process 中執行並解析 importtime 輸出，列出最耗時的模組。
+
+- 只執行 import，不執行頁面本身（Streamlit 指令不會跑），量到的就是冷啟動前的載入成本
+- --baseline <git rev>：同樣方式量測該版本的入口檔，並排比較（例如 HEAD~1 看這次改動省了多少）
+- --out：報表另存成檔案（benchmarks/ 下留存，之後可再比較）
+- 畫面實際的首次繪製時間見效能分析面板的 first_paint 區塊（common.profiler）
+
+使用方式
+    python src/tools/bench_import_time.py
+    python src/tools/bench_import_time.py --baseline HEAD~1 --repeat 5
+    python src/tools/bench_import_time.py --entry src/ui/plot_gap_sr_interactive.py --top 30
+    python src/tools/bench_import_time.py --out benchmarks/import_time_app.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import os
+import io
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_ENTRY = "app_v5_visual_modules_with_zone.py"
+
+
+def entry_imports(source: str) -> List[str]:
+    """入口檔最上層（模組層級）的 import 敘述；函式內的延遲 import 不算"""
+    tree = ast.parse(source.lstrip("﻿"))
+    return [ast.unparse(node) for node in tree.body
+            if isinstance(node, ast.Import) or (isinstance(node, ast.ImportFrom) and node.level == 0)]
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """解析 `import time: self [us] | cumulative | imported package`"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cum_ms": int(cum_us) / 1000,
+        })
+    return rows
+
+
+def run_once(statements: List[str], root: Path = PROJECT_ROOT) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(root / "src"), os.environ.get("PYTHONPATH", "")]))
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "\n".join(statements)],
+                          cwd=root, env=env, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    wall = time.perf_counter() - t0
+    rows = parse_importtime(proc.stderr)
+    error = None
+    if proc.returncode != 0:
+        error = next((l for l in reversed(proc.stderr.splitlines()) if l and not l.startswith("import time:")), "failed")
+    return {"wall_ms": wall * 1000, "rows": rows, "error": error}
+
+
+def measure(statements: List[str], repeat: int = 3, root: Path = PROJECT_ROOT) -> dict:
+    """重複 repeat 次（每次都是新 process），取 wall-clock 中位數那一次的明細"""
+    runs = sorted((run_once(statements, root) for _ in range(repeat)), key=lambda r: r["wall_ms"])
+    median = runs[len(runs) // 2]
+    median["walls"] = [r["wall_ms"] for r in runs]
+    return median
+
+
+def top_level_packages(rows: List[dict]) -> Dict[str, float]:
+    """依最上層套件名稱加總 self 時間（streamlit、pandas、plotly…）"""
+    totals: Dict[str, float] = {}
+    for r in rows:
+        top = r["module"].split(".")[0]
+        totals[top] = totals.get(top, 0.0) + r["self_ms"]
+    return totals
+
+
+def format_report(label: str, result: dict, top: int = 20) -> str:
+    rows = result["rows"]
+    lines = [f"== {label} ==",
+             f"wall-clock（含直譯器啟動）中位數 {statistics.median(result['walls']):.0f} ms "
+             f"（{', '.join(f'{w:.0f}' for w in result['walls'])}）",
+             f"import 總計 {sum(r['self_ms'] for r in rows):.0f} ms，{len(rows)} 個模組"]
+    if result["error"]:
+        lines.append(f"⚠️ import 中斷：{result['error']}")
+
+    lines.append(f"\n最耗時的最上層套件（self 加總，前 {top}）")
+    for name, ms in sorted(top_level_packages(rows).items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"  {ms:9.1f} ms  {name}")
+
+    lines.append(f"\n入口直接 import 的模組（cumulative，前 {top}）")
+    direct = [r for r in rows if r["depth"] == 0]
+    for r in sorted(direct, key=lambda r: -r["cum_ms"])[:top]:
+        lines.append(f"  {r['cum_ms']:9.1f} ms  {r['module']}")
+    return "\n".join(lines)
+
+
+def format_comparison(base: dict, current: dict, top: int = 15) -> str:
+    b, c = top_level_packages(base["rows"]), top_level_packages(current["rows"])
+    b_total, c_total = sum(b.values()), sum(c.values())
+    lines = ["== baseline → current ==",
+             f"import 總計 {b_total:.0f} ms → {c_total:.0f} ms（{c_total - b_total:+.0f} ms）",
+             f"wall-clock 中位數 {statistics.median(base['walls']):.0f} ms → {statistics.median(current['walls']):.0f} ms"]
+    diffs = sorted(set(b) | set(c), key=lambda k: c.get(k, 0.0) - b.get(k, 0.0))
+    lines.append("\n差異最大的套件")
+    for name in diffs[:top]:
+        delta = c.get(name, 0.0) - b.get(name, 0.0)
+        if abs(delta) >= 1:
+            lines.append(f"  {delta:+9.1f} ms  {name}")
+    return "\n".join(lines)
+
+
+def export_revision(rev: str, entry: str, dest: Path) -> Path:
+    """把該版本的 src/ 與入口檔解到 dest（git archive），被 import 的模組也是那個版本"""
+    tar = subprocess.run(["git", "archive", "--format=tar", rev, "src", entry], cwd=PROJECT_ROOT,
+                         capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(tar)) as tf:
+        tf.extractall(dest)
+    return dest
+
+
+def main(argv=None) -> Optional[str]:
+    ap = argparse.ArgumentParser(description="入口程式的 import 耗時稽核（-X importtime）")
+    ap.add_argument("--entry", default=DEFAULT_ENTRY, help="入口檔（相對專案根目錄）")
+    ap.add_argument("--baseline", default=None, help="比較用的 git revision（例如 HEAD~1）")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--out", default=None, help="報表另存路徑")
+    args = ap.parse_args(argv)
+
+    current = measure(entry_imports((PROJECT_ROOT / args.entry).read_text(encoding="utf-8")), args.repeat)
+    parts = [format_report(f"{args.entry}（目前）", current, args.top)]
+    if args.baseline:
+        with tempfile.TemporaryDirectory(prefix="bench_import_") as tmp:
+            root = export_revision(args.baseline, args.entry, Path(tmp))
+            base = measure(entry_imports((root / args.entry).read_text(encoding="utf-8")), args.repeat, root)
+        parts.insert(0, format_report(f"{args.entry}（{args.baseline}）", base, args.top))
+        parts.append(format_comparison(base, current))
+
+    report = "\n\n".join(parts)
+    print(report)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(report + "\n", encoding="utf-8")
+        print(f"📝 已寫入 {args.out}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
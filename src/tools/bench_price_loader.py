@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+量測全市場日K載入的記憶體與耗時：原本的 read_sql_query + pd.to_datetime（float64 / object）
+對照 common.db_helpers.load_price_frame（float32 OHLC、int64 volume、category stock_id、
+讀取時即解析日期）。
+
+    frame MB : DataFrame 本身佔用（memory_usage(deep=True)）
+    peak MB  : 載入過程的記憶體峰值（tracemalloc，含轉型時的暫存）
+
+使用方式
+    python src/tools/bench_price_loader.py
+    python src/tools/bench_price_loader.py --start 2024-01-01 --columns stock_id date close volume
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.db_helpers import PRICE_COLUMNS, frame_memory_mb, load_price_frame
+
+DB_PATH = "data/institution.db"
+
+
+def load_legacy(conn: sqlite3.Connection, columns, start=None) -> pd.DataFrame:
+    sql = f"SELECT {', '.join(columns)} FROM twse_prices"
+    params = []
+    if start:
+        sql += " WHERE date >= ?"
+        params.append(start)
+    df = pd.read_sql_query(sql, conn, params=params)
+    if "date" in df:
+        df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def measure(name: str, fn) -> dict:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        df = fn()
+    finally:
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "loader": name,
+        "rows": len(df),
+        "elapsed": elapsed,
+        "frame_mb": frame_memory_mb(df),
+        "peak_mb": peak / 1024 / 1024,
+        "dtypes": ", ".join(f"{c}:{t}" for c, t in df.dtypes.astype(str).items()),
+    }
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="比較日K載入的記憶體用量")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--start", default=None, help="只載入此日期（含）之後，YYYY-MM-DD")
+    ap.add_argument("--columns", nargs="*", choices=PRICE_COLUMNS, default=list(PRICE_COLUMNS))
+    args = ap.parse_args(argv)
+
+    with sqlite3.connect(args.db) as conn:
+        results = [
+            measure("legacy", lambda: load_legacy(conn, args.columns, args.start)),
+            measure("compact", lambda: load_price_frame(conn, columns=args.columns, start=args.start)),
+        ]
+
+    print(f"{'loader':<8} {'rows':>10} {'elapsed':>8} {'frame MB':>9} {'peak MB':>8}")
+    for r in results:
+        print(f"{r['loader']:<8} {r['rows']:>10} {r['elapsed']:>7.2f}s {r['frame_mb']:>9.1f} {r['peak_mb']:>8.1f}")
+    for r in results:
+        print(f"  {r['loader']}: {r['dtypes']}")
+    legacy, compact = results
+    if compact["frame_mb"]:
+        print(f"📉 DataFrame 佔用縮小為 {compact['frame_mb'] / legacy['frame_mb']:.0%}"
+              f"（{legacy['frame_mb']:.1f} → {compact['frame_mb']:.1f} MB）")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,59 @@
-import sqlite3
+import sys
+from pathlib import Path
+
 import pandas as pd
 import matplotlib.pyplot as plt
 
-# 正確路徑
-conn = sqlite3.connect("data/institution.db")
-
-# 讀取 twse_prices 的收盤價
-df_twse = pd.read_sql_query("""
-    SELECT date, close FROM twse_prices
-    WHERE stock_id = '2330'
-    ORDER BY date
-""", conn)
-df_twse["date"] = pd.to_datetime(df_twse["date"])
-df_twse.set_index("date", inplace=True)
-df_twse.rename(columns={"close": "TWSE_Close"}, inplace=True)
-
-# 讀取 yf_prices 的收盤價
-df_yf = pd.read_sql_query("""
-    SELECT date, close FROM yf_prices
-    WHERE stock_id = '2330'
-    ORDER BY date
-""", conn)
-conn.close()
-
-df_yf["date"] = pd.to_datetime(df_yf["date"])
-df_yf.set_index("date", inplace=True)
-df_yf.rename(columns={"close": "YF_Close"}, inplace=True)
-
-# 合併資料
-df = pd.merge(df_twse, df_yf, left_index=True, right_index=True, how="inner")
-
-# 差異欄位
-df["差異"] = df["TWSE_Close"] - df["YF_Close"]
-
-# 儲存成 CSV
-df.to_csv("output/2330_compare.csv", encoding="utf-8-sig")
-
-# 繪圖
-plt.figure(figsize=(12, 6))
-plt.plot(df.index, df["TWSE_Close"], label="TWSE 收盤價")
-plt.plot(df.index, df["YF_Close"], label="Yahoo Finance 收盤價")
-plt.title("2330 收盤價對比 (TWSE vs Yahoo Finance)")
-plt.xlabel("日期")
-plt.ylabel("收盤價")
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.xticks(rotation=45)
-plt.show()
\ No newline at end of file
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.analytics_engine import get_engine
+
+DB_PATH = "data/institution.db"
+
+
+def load_compare(stock_id: str = "2330", engine: str = "sqlite") -> pd.DataFrame:
+    # twse_prices 與 yf_prices 在 SQL 端依日期 join（yf 的 date 可能帶時間，只取前 10 碼）
+    with get_engine(engine, DB_PATH) as eng:
+        df = eng.query_df("""
+            SELECT t.date AS date, t.close AS TWSE_Close, y.close AS YF_Close
+            FROM twse_prices t
+            JOIN yf_prices y ON y.stock_id = t.stock_id AND substr(y.date, 1, 10) = t.date
+            WHERE t.stock_id = ?
+            ORDER BY t.date
+        """, [stock_id])
+    df["date"] = pd.to_datetime(df["date"])
+    df.set_index("date", inplace=True)
+
+    # 差異欄位
+    df["差異"] = df["TWSE_Close"] - df["YF_Close"]
+    return df
+
+
+def main(stock_id: str = "2330", engine: str = "sqlite"):
+    df = load_compare(stock_id, engine)
+
+    # 儲存成 CSV
+    df.to_csv(f"output/{stock_id}_compare.csv", encoding="utf-8-sig")
+
+    # 繪圖
+    plt.figure(figsize=(12, 6))
+    plt.plot(df.index, df["TWSE_Close"], label="TWSE 收盤價")
+    plt.plot(df.index, df["YF_Close"], label="Yahoo Finance 收盤價")
+    plt.title(f"{stock_id} 收盤價對比 (TWSE vs Yahoo Finance)")
+    plt.xlabel("日期")
+    plt.ylabel("收盤價")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.xticks(rotation=45)
+    plt.show()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="twse_prices 與 yf_prices 收盤價對比")
+    ap.add_argument("stock_id", nargs="?", default="2330")
+    ap.add_argument("--engine", choices=["sqlite", "duckdb", "duckdb-columnar"], default="sqlite")
+    args = ap.parse_args()
+    main(args.stock_id, args.engine)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+富邦 SDK session broker 常駐程式（common.fubon_broker）：登入一次，其他程式透過本機 socket 查行情。
+
+- 開著的期間，get_logged_in_sdk() 會自動改用 broker（CLI 與 Streamlit 都不必再各自登入）
+- --fake：用 FakeFubonSDK（離線、不需要憑證），開發 / 測試用
+- --realtime：同時訂閱觀察清單的 WebSocket 即時報價（common.realtime_quotes），quote 先查即時報價表；
+  只在交易時段連線（收盤後斷線，隔天開盤前後自動再連）；--replay-file 改用錄下的訊息重播（離線、不受時段限制）
+- --status / --relogin / --stop：對正在跑的 broker 下指令
+- 位址預設 127.0.0.1:8765，可用 --address 或環境變數 FUBON_BROKER_ADDR 指定
+- 每個請求都要帶 authkey：第一次啟動時產生本機使用者專屬的 data/.fubon_broker.key（0600），同一個使用者的
+  程式自動讀取；跨帳號 / 跨機器共用時，broker 與使用端都設同一個 FUBON_BROKER_AUTHKEY
+
+使用方式
+    python src/tools/fubon_broker.py
+    python src/tools/fubon_broker.py --fake --latency 0.1
+    python src/tools/fubon_broker.py --realtime
+    python src/tools/fubon_broker.py --fake --realtime --replay-file data/replay_store/realtime/messages.jsonl
+    python src/tools/fubon_broker.py --status
+    python src/tools/fubon_broker.py --stop
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.fubon_broker import BrokerClient, BrokerServer, FakeFubonSDK, SessionBroker
+from common.realtime_quotes import (QuoteTable, RealtimeFeed, ReplayWebsocket, fubon_websocket, in_trading_session,
+                                    load_watchlist)
+
+WATCHLIST_REFRESH_SECONDS = 60
+
+
+def _sdk_factory(fake: bool, latency: float):
+    if fake:
+        def factory():
+            sdk = FakeFubonSDK(latency=latency)
+            sdk.login()
+            return sdk
+        return factory
+
+    def factory():
+        from common.login_helper import get_logged_in_sdk
+        return get_logged_in_sdk(use_broker=False)
+    return factory
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="富邦 SDK 共用 session broker")
+    ap.add_argument("--address", default=None, help="host:port（預設 127.0.0.1:8765）")
+    ap.add_argument("--fake", action="store_true", help="離線假資料（FakeFubonSDK）")
+    ap.add_argument("--latency", type=float, default=0.0, help="--fake 時每次呼叫的模擬延遲（秒）")
+    ap.add_argument("--realtime", action="store_true", help="訂閱觀察清單的 WebSocket 即時報價")
+    ap.add_argument("--replay-file", default=None, help="--realtime 改用錄下的訊息（JSONL）重播")
+    ap.add_argument("--status", action="store_true", help="顯示正在跑的 broker 狀態")
+    ap.add_argument("--relogin", action="store_true", help="讓正在跑的 broker 重新登入")
+    ap.add_argument("--stop", action="store_true", help="停止正在跑的 broker")
+    args = ap.parse_args(argv)
+
+    client = BrokerClient(args.address)
+    if args.status or args.relogin or args.stop:
+        if not client.ping():
+            print("❌ broker 沒有在執行")
+            return 1
+        if args.relogin:
+            client.call("relogin")
+            print("🔄 已要求重新登入（下一個請求登入）")
+        if args.status:
+            print(json.dumps(client.status(), ensure_ascii=False, indent=2))
+        if args.stop:
+            client.shutdown()
+            print("👋 broker 已停止")
+        return 0
+
+    if client.ping():
+        print(f"⚠️ {client.address[0]}:{client.address[1]} 已有 broker 在執行")
+        return 1
+
+    table = QuoteTable() if args.realtime else None
+    broker = SessionBroker(_sdk_factory(args.fake, args.latency), realtime=table)
+    server = BrokerServer(broker, args.address)
+    try:
+        broker.client()       # 啟動時就登入，第一個請求不用等
+    except Exception as e:
+        print(f"⚠️ 登入失敗，第一個請求時再試：{e}")
+
+    feed = None
+    if table is not None:
+        session = None
+        if args.replay_file:
+            ws_factory = lambda: ReplayWebsocket(path=args.replay_file)
+        else:
+            session = in_trading_session
+            def ws_factory():
+                client = broker.client()
+                client.reststock          # init_realtime()
+                return fubon_websocket(client.sdk)
+        feed = RealtimeFeed(table, ws_factory, session=session)
+        feed.start(load_watchlist())
+
+        def refresh_watchlist():          # 觀察清單檔案改了（新增持股、key_price）也跟著訂閱；收盤後隔天盤中再啟動
+            while True:
+                time.sleep(WATCHLIST_REFRESH_SECONDS)
+                if feed.running or (session is not None and session()):
+                    feed.start(load_watchlist())
+        threading.Thread(target=refresh_watchlist, name="watchlist-refresh", daemon=True).start()
+    print(f"🚀 富邦 session broker{'（假資料）' if args.fake else ''} 啟動於 {server.address}，Ctrl+C 停止")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if feed is not None:
+            feed.stop()
+        server.server_close()
+        print(f"📊 {broker.status()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日資料更新 orchestrator（單一程序、宣告式 DAG），取代 .bat 串接 + subprocess 逐支啟動 python。
+
+    prices ──► prices_gap ──┬─► aggregate_weekly_monthly ──► columnar_mirror
+                            ├─► rs_rsi
+                            ├─► price_matrix
+    revenue ────────────────┴─► monthly_avg_close
+    institutional / main_force / holder_concentration（各自獨立）
+
+- 獨立來源（prices、institutional、main_force、revenue、holder）並行；prices / institutional 為全市場報表（每日一個 request）
+- 衍生工作（週/月K 聚合、RS/RSI、月均價）在上游完成的當下就開跑
+- pandas / selenium 只 import 一次；FinMind / 富邦登入由 JobContext 共用
+- 結束時輸出每個 Job 的耗時報表（同時寫入 logs/daily_ingestion_*.log）
+
+使用方式
+    python src/tools/run_daily_ingestion.py                          # my_stock_holdings.txt，全部 Job
+    python src/tools/run_daily_ingestion.py temp_list.txt
+    python src/tools/run_daily_ingestion.py --only prices_gap rs_rsi  # 只跑指定 Job（與其上游）
+    python src/tools/run_daily_ingestion.py --schedule                # 各來源的排程限制（週末、月營收 6~14 號）
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.job_dag import Job, format_timing_report, run_dag, select_jobs
+
+DB_PATH = "data/institution.db"
+
+
+class JobContext:
+    """所有 Job 共用的設定與登入（延遲登入，只登入一次）"""
+
+    def __init__(self, stock_file: str, db_path: str = DB_PATH, days: int = 1, schedule: bool = False):
+        self.stock_file = stock_file
+        self.db_path = db_path
+        self.days = days
+        self.schedule = schedule
+        self.today = datetime.today()
+        self._lock = threading.Lock()
+        self._dl = None
+
+    @property
+    def argv(self) -> list:
+        """給舊腳本 main(argv) 用的參數"""
+        argv = ["orchestrator", self.stock_file]
+        if self.schedule:
+            argv.append("--schedule")
+        return argv
+
+    def dl(self):
+        with self._lock:
+            if self._dl is None:
+                from common.login_helper import get_logged_in_dl
+                self._dl = get_logged_in_dl()
+            return self._dl
+
+
+# ---------------------------- Jobs ----------------------------
+def job_prices(ctx: JobContext, inputs: dict):
+    from fetch.fetch_market_daily_prices import ingest_market_daily
+
+    missing = set()
+    for i in range(ctx.days):
+        date = ctx.today - timedelta(days=i)
+        if date.weekday() >= 5:
+            continue
+        result = ingest_market_daily(date, db_path=ctx.db_path)
+        if result["fetched"]:
+            print(f"📈 {result['date']} 全市場 upsert {result['upserted']} 筆，缺 {len(result['missing'])} 檔")
+            missing.update(result["missing"])
+    return sorted(missing)
+
+
+def job_prices_gap(ctx: JobContext, inputs: dict):
+    from fetch.finmind.finmind_db_fetcher import fetch_with_finmind_recent
+
+    missing = inputs["prices"]
+    if not missing:
+        return 0
+    dl = ctx.dl()
+    filled = 0
+    for stock_id in missing:
+        if fetch_with_finmind_recent(stock_id, dl, months=1) is None:
+            filled += 1
+    print(f"🩹 FinMind 逐檔補缺：{filled}/{len(missing)} 檔")
+    return filled
+
+
+def job_institutional(ctx: JobContext, inputs: dict):
+    from fetch.fetch_market_institutional import ingest_market_institutional
+
+    upserted = 0
+    for i in reversed(range(ctx.days)):  # 由舊到新，投信持股推估逐日累加
+        date = ctx.today - timedelta(days=i)
+        if date.weekday() >= 5:
+            continue
+        result = ingest_market_institutional(date, db_path=ctx.db_path)
+        if result["fetched"]:
+            print(f"🏦 {result['date']} 全市場法人 upsert {result['upserted']} 筆，缺 {len(result['missing'])} 檔")
+            upserted += result["upserted"]
+    return upserted
+
+
+def job_main_force(ctx: JobContext, inputs: dict):
+    from fetch import fetch_main_force_multi
+    return fetch_main_force_multi.main(ctx.argv)
+
+
+def job_revenue(ctx: JobContext, inputs: dict):
+    from fetch import fetch_monthly_revenue_multi_v5
+    return fetch_monthly_revenue_multi_v5.main(ctx.argv)
+
+
+def job_holder_concentration(ctx: JobContext, inputs: dict):
+    from fetch import save_holder_concentration
+    return save_holder_concentration.main(ctx.argv)
+
+
+def job_aggregate_weekly_monthly(ctx: JobContext, inputs: dict):
+    from tools.aggregate_ohlcv_weekly_monthly import (
+        aggregate_monthly, aggregate_weekly, ensure_tables, load_daily, upsert_monthly, upsert_weekly,
+    )
+
+    conn = sqlite3.connect(ctx.db_path, timeout=30)
+    try:
+        ensure_tables(conn)
+        df_daily = load_daily(conn)
+        n_w = upsert_weekly(conn, aggregate_weekly(df_daily))
+        n_m = upsert_monthly(conn, aggregate_monthly(df_daily))
+        conn.commit()
+    finally:
+        conn.close()
+    return {"weekly": n_w, "monthly": n_m}
+
+
+def job_rs_rsi(ctx: JobContext, inputs: dict):
+    from analyze.calculate_rs_rsi import compute_minervini_rs
+    compute_minervini_rs(db_path=ctx.db_path)
+
+
+def job_columnar_mirror(ctx: JobContext, inputs: dict):
+    from common import columnar_store
+
+    if not columnar_store.available():
+        return "略過（未安裝 pyarrow）"
+    return columnar_store.sync(ctx.db_path)
+
+
+def job_price_matrix(ctx: JobContext, inputs: dict):
+    from common import price_matrix
+    return price_matrix.update(ctx.db_path)
+
+
+def job_monthly_avg_close(ctx: JobContext, inputs: dict):
+    from fetch import update_monthly_avg_price_from_local_db
+    update_monthly_avg_price_from_local_db.main(db_path=ctx.db_path)
+
+
+JOBS = [
+    Job("prices", job_prices),
+    Job("institutional", job_institutional),
+    Job("main_force", job_main_force),
+    Job("revenue", job_revenue),
+    Job("holder_concentration", job_holder_concentration),
+    Job("prices_gap", job_prices_gap, deps=("prices",)),
+    Job("aggregate_weekly_monthly", job_aggregate_weekly_monthly, deps=("prices_gap",)),
+    Job("rs_rsi", job_rs_rsi, deps=("prices_gap",)),
+    Job("columnar_mirror", job_columnar_mirror, deps=("aggregate_weekly_monthly",)),
+    Job("price_matrix", job_price_matrix, deps=("prices_gap",)),
+    Job("monthly_avg_close", job_monthly_avg_close, deps=("prices_gap", "revenue")),
+]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="每日資料更新 orchestrator（in-process DAG）")
+    ap.add_argument("stock_file", nargs="?", default="my_stock_holdings.txt", help="個股來源清單（主力 / 營收 / 籌碼）")
+    ap.add_argument("--only", nargs="*", default=None, help=f"只跑指定 Job（含上游）：{[j.name for j in JOBS]}")
+    ap.add_argument("--workers", type=int, default=4, help="同時執行的 Job 數")
+    ap.add_argument("--days", type=int, default=1, help="全市場日K 往回抓幾個日曆日")
+    ap.add_argument("--schedule", action="store_true", help="排程模式（套用各來源的週末 / 公告期間限制）")
+    ap.add_argument("--db", default=DB_PATH)
+    args = ap.parse_args(argv)
+
+    jobs = select_jobs(JOBS, args.only) if args.only else JOBS
+    ctx = JobContext(args.stock_file, db_path=args.db, days=args.days, schedule=args.schedule)
+
+    Path("logs").mkdir(exist_ok=True)
+    log_path = Path("logs") / f"daily_ingestion_{datetime.today().strftime('%Y%m%d_%H%M%S')}.log"
+    log_lock = threading.Lock()
+    with open(log_path, "w", encoding="utf-8") as log_fp:
+        def log(msg: str):
+            line = f"{datetime.now().strftime('%H:%M:%S')} | {msg}"
+            with log_lock:
+                print(line)
+                log_fp.write(line + "\n")
+                log_fp.flush()
+
+        results = run_dag(jobs, ctx, max_workers=args.workers, log=log)
+        report = format_timing_report(results)
+        log("📋 每日更新耗時報表\n" + report)
+
+    print(f"📝 log：{log_path}")
+    return 0 if all(r.status == "ok" for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
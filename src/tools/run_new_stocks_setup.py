@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+新增持股的初始資料建立（r_new_stocks_manual_setup.bat 的 in-process 版），儀表板的
+「➕ 更新 temp_list 的股票」按鈕透過 common.job_runner 在背景執行 run_setup()。
+
+    institutional_init ──► institutional_5d
+    main_force / wantgoo / holder_concentration / profitability（各自獨立）
+    revenue ──► monthly_avg_close
+    eps ──► season_close
+
+- 各步驟直接呼叫原腳本的 main(argv)，不再每步啟動一次 python；順序相依以 common.job_dag 宣告
+- save_institutional_holding_multi.py 是整支在 import 時執行的腳本，仍以子行程執行（sys.executable，不經過 start）
+- main_force 沿用 .bat 的 50 秒硬上限（原本 run_with_timeout.ps1 50）：以子行程執行，逾時整個行程樹砍掉、
+  該步驟記為失敗，其他步驟照常；已完成的股票記在 JobJournal，下次重跑只補剩下的
+- 每個步驟結束時 report_progress() 回報進度，畫面上看得到目前做到哪一步
+
+使用方式
+    python src/tools/run_new_stocks_setup.py                  # temp_list.txt
+    python src/tools/run_new_stocks_setup.py my_list.txt --workers 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # 指到 src
+
+from common.job_dag import Job, format_timing_report, run_dag
+from common.job_runner import attach_job, current_job, report_progress
+
+STOCK_FILE = "temp_list.txt"
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+MAIN_FORCE_TIMEOUT = 50   # 秒；與 r_new_stocks_manual_setup.bat 相同
+
+
+def _argv(ctx: dict) -> list:
+    return ["new_stocks_setup", ctx["stock_file"]]
+
+
+def _kill_tree(proc: subprocess.Popen) -> None:
+    # 腳本自己會再開 multiprocessing 子行程，只砍直接的子行程會留下孤兒
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)], capture_output=True)
+    else:
+        os.killpg(proc.pid, 9)
+
+
+def _run_script(script: str, *args: str, timeout: float = None) -> None:
+    """以子行程執行 src 下的腳本（sys.executable，不經過 shell）；失敗或逾時拋出例外"""
+    popen_kwargs = {} if os.name == "nt" else {"start_new_session": True}
+    with subprocess.Popen([sys.executable, str(PROJECT_ROOT / "src" / script), *args], cwd=PROJECT_ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          text=True, encoding="utf-8", errors="replace", **popen_kwargs) as proc:
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill_tree(proc)
+            stdout, _ = proc.communicate()
+            print(stdout[-4000:])
+            print(f"[WARN] 逾時 {timeout:g} 秒，已中止該步驟並繼續後續任務。")
+            raise TimeoutError(f"{script} 超過 {timeout:g} 秒")
+    print(stdout[-4000:])
+    if proc.returncode != 0:
+        raise RuntimeError(stderr.strip().splitlines()[-1] if stderr.strip() else f"exit {proc.returncode}")
+
+
+def job_institutional_init(ctx: dict, inputs: dict):
+    # 腳本固定讀 temp_list.txt，且在 import 時就執行
+    _run_script("fetch/save_institutional_holding_multi.py")
+
+
+def job_institutional_5d(ctx: dict, inputs: dict):
+    from fetch import cmoney_institutional_multi_wz_schedule
+    return cmoney_institutional_multi_wz_schedule.main(_argv(ctx))
+
+
+def job_main_force(ctx: dict, inputs: dict):
+    # in-process 無法從外面中止，用子行程才能保住 .bat 的硬上限
+    _run_script("fetch/fetch_main_force_multi.py", ctx["stock_file"], timeout=MAIN_FORCE_TIMEOUT)
+
+
+def job_wantgoo(ctx: dict, inputs: dict):
+    from fetch import fetch_wantgoo_main_trend
+    return fetch_wantgoo_main_trend.main(_argv(ctx))
+
+
+def job_holder_concentration(ctx: dict, inputs: dict):
+    from fetch import save_holder_concentration
+    return save_holder_concentration.main(_argv(ctx))
+
+
+def job_revenue(ctx: dict, inputs: dict):
+    from fetch import fetch_monthly_revenue_multi_v5
+    return fetch_monthly_revenue_multi_v5.main(_argv(ctx))
+
+
+def job_monthly_avg_close(ctx: dict, inputs: dict):
+    from fetch import update_monthly_avg_price_from_local_db
+    return update_monthly_avg_price_from_local_db.main()
+
+
+def job_profitability(ctx: dict, inputs: dict):
+    from fetch import fetch_profitability_histock
+    return fetch_profitability_histock.main(_argv(ctx))
+
+
+def job_eps(ctx: dict, inputs: dict):
+    from fetch import fetch_eps_histock
+    return fetch_eps_histock.main(_argv(ctx))
+
+
+def job_season_close(ctx: dict, inputs: dict):
+    from fetch import update_season_close_price_from_local_db
+    return update_season_close_price_from_local_db.main(_argv(ctx))
+
+
+JOBS = [
+    Job("institutional_init", job_institutional_init),
+    Job("institutional_5d", job_institutional_5d, deps=("institutional_init",)),
+    Job("main_force", job_main_force),
+    Job("wantgoo", job_wantgoo),
+    Job("holder_concentration", job_holder_concentration),
+    Job("revenue", job_revenue),
+    Job("monthly_avg_close", job_monthly_avg_close, deps=("revenue",)),
+    Job("profitability", job_profitability),
+    Job("eps", job_eps),
+    Job("season_close", job_season_close, deps=("eps",)),
+]
+
+
+def _attached(job, func):
+    def _run(ctx: dict, inputs: dict):
+        with attach_job(job):     # DAG 的 worker thread 輸出也記在同一個背景工作
+            return func(ctx, inputs)
+    return _run
+
+
+def run_setup(stock_file: str = STOCK_FILE, workers: int = 2, jobs=None) -> dict:
+    """執行全部步驟，回傳 {job 名稱: JobResult}；在 JobRunner 內執行時會回報進度"""
+    jobs = list(JOBS if jobs is None else jobs)
+    runner_job = current_job()
+    if runner_job is not None:
+        jobs = [Job(j.name, _attached(runner_job, j.func), j.deps) for j in jobs]
+    finished = []
+
+    def log(msg: str) -> None:
+        with attach_job(runner_job):
+            print(msg)
+        if msg.startswith(("✅", "❌", "⏭️")):
+            finished.append(msg)
+            report_progress(len(finished) / len(jobs), msg.splitlines()[0], job=runner_job)
+
+    report_progress(0.0, f"{stock_file}：{len(jobs)} 個步驟")
+    results = run_dag(jobs, {"stock_file": stock_file}, max_workers=workers, log=log)
+    print("📋 新增持股初始資料耗時報表\n" + format_timing_report(results))
+    return results
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="新增持股的初始資料建立（in-process）")
+    ap.add_argument("stock_file", nargs="?", default=STOCK_FILE)
+    ap.add_argument("--workers", type=int, default=2, help="同時執行的步驟數（多數步驟會開 Chrome）")
+    args = ap.parse_args(argv)
+
+    results = run_setup(args.stock_file, workers=args.workers)
+    return 0 if all(r.status == "ok" for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 """
 背景執行：更新單一股票的主力買賣超資料
 使用方式: python src/tools/update_single_stock_main_force.py <stock_id>
+儀表板：common.job_runner 在背景直接呼叫 update_main_force(stock_id)
 """
 import sys
 import os
@@ -11,19 +12,17 @@ sys.path.insert(0, project_root)
 
 from src.fetch.fetch_main_force_multi import fetch_main_force, save_to_db as save_cmoney_to_db
 from src.fetch.fetch_wantgoo_main_trend import fetch_wantgoo_main_trend, save_to_db as save_wantgoo_to_db
+from common.job_runner import report_progress  # fetch_main_force_multi 已把 src 加進路徑
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("❌ 請提供股票代碼")
-        sys.exit(1)
-    
-    stock_id = sys.argv[1]
+def update_main_force(stock_id: str) -> int:
+    """CMoney + WantGoo 主力買賣超，回傳新增筆數（也可由 common.job_runner 在背景執行）"""
     print(f"開始更新 {stock_id} 主力買賣超資料...")
-    
+
     total_inserted = 0
-    
+
     # 1. 更新 CMoney 主力進出資料
+    report_progress(0.0, "CMoney")
     try:
         print(f"📥 [CMoney] 抓取 {stock_id}...")
         records_cmoney = fetch_main_force(stock_id)
@@ -35,8 +34,9 @@ def main():
             print(f"⏭️  [CMoney] 無新資料")
     except Exception as e:
         print(f"❌ [CMoney] 錯誤: {e}")
-    
+
     # 2. 更新 WantGoo 主力進出資料
+    report_progress(0.5, "WantGoo")
     try:
         print(f"📥 [WantGoo] 抓取 {stock_id}...")
         records_wantgoo = fetch_wantgoo_main_trend(stock_id)
@@ -48,13 +48,22 @@ def main():
             print(f"⏭️  [WantGoo] 無新資料")
     except Exception as e:
         print(f"❌ [WantGoo] 錯誤: {e}")
-    
+
     # 3. 完成提示
     if total_inserted > 0:
         print(f"\n✅ {stock_id} 更新完成！共新增 {total_inserted} 筆資料")
     else:
         print(f"\n⚠️ {stock_id} 無新資料")
-    
+    return total_inserted
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("❌ 請提供股票代碼")
+        sys.exit(1)
+
+    update_main_force(sys.argv[1])
+
     # 播放提示音
     try:
         import subprocess
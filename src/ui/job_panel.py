@@ -0,0 +1,64 @@
+import streamlit as st
+
+from common.job_runner import Job, get_job_runner
+
+# 已提示過完成的 job_id（每個使用者 session 各自記錄）
+SEEN_KEY = "job_panel_seen"
+STATUS_ICON = {"queued": "🕒", "running": "⏳", "done": "✅", "failed": "❌"}
+
+
+def _fragment(run_every: float):
+    wrapper = getattr(st, "fragment", None)
+    if wrapper is None:
+        return lambda fn: fn
+    return wrapper(run_every=run_every)
+
+
+def render_job_badge(job: Job) -> None:
+    """單一背景工作的狀態列（放在「🔄 更新」按鈕旁）"""
+    if job is None:
+        return
+    icon = STATUS_ICON.get(job.status, "")
+    text = f"{icon} {job.label}：{job.message or job.status}（{job.elapsed:.0f}s）"
+    if job.active and job.progress is not None:
+        st.progress(job.progress, text=text)
+    elif job.status == "failed":
+        st.error(f"{text}\n\n{job.error}")
+    else:
+        st.caption(text)
+
+
+@_fragment(run_every=2.0)
+def render_job_panel() -> None:
+    """
+    背景工作清單：執行中的顯示進度與最後幾行輸出；每 2 秒自動更新。
+    有工作完成時跳出提示並重跑整頁，讓圖表讀到新資料（query_cache 依 data_version 自動失效）。
+    """
+    runner = get_job_runner()
+    jobs = runner.jobs()
+    seen = st.session_state.setdefault(SEEN_KEY, {j.job_id for j in jobs if not j.active})
+
+    newly_finished = [j for j in jobs if not j.active and j.job_id not in seen]
+    for job in newly_finished:
+        seen.add(job.job_id)
+        if job.status == "done":
+            st.toast(f"✅ {job.label} 完成（{job.elapsed:.0f}s）")
+        else:
+            st.toast(f"❌ {job.label} 失敗：{job.error}")
+
+    active = [j for j in jobs if j.active]
+    if active:
+        st.markdown("**⚙️ 背景工作**")
+        for job in active:
+            render_job_badge(job)
+            if job.status == "running" and job.log:
+                st.code("\n".join(list(job.log)[-5:]), language=None)
+
+    finished = [j for j in jobs if not j.active][:5]
+    if finished:
+        with st.expander(f"最近完成的背景工作（{len(finished)}）", expanded=False):
+            for job in finished:
+                render_job_badge(job)
+
+    if newly_finished and any(j.status == "done" for j in newly_finished):
+        st.rerun()
@@ -5,7 +5,8 @@ from typing import Dict, Optional
 
 import streamlit as st
 
-from analyze.analyze_price_break_conditions_dataloader import get_today_prices
+from analyze.analyze_price_break_conditions_dataloader import get_today_prices, prefetch_today_prices
+from common.query_cache import get_query_cache
 
 
 KEY_PRICE_FILE = "key_price.txt"
@@ -85,15 +86,8 @@ def clear_key_prices(file_path: str = KEY_PRICE_FILE) -> None:
     write_key_price_map(OrderedDict(), file_path=file_path)
 
 
-@st.cache_data(show_spinner=False)
 def load_stock_meta_map(db_path: str = DB_PATH) -> Dict[str, Dict[str, str]]:
-    conn = sqlite3.connect(db_path)
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT stock_id, name, market FROM stock_meta")
-        rows = cursor.fetchall()
-    finally:
-        conn.close()
+    rows = get_query_cache(db_path).fetchall("SELECT stock_id, name, market FROM stock_meta", tables=["stock_meta"])
 
     return {
         str(stock_id): {
@@ -283,6 +277,7 @@ def render_key_price_checker(file_path: str = KEY_PRICE_FILE, db_path: str = DB_
             above_results = []
             below_results = []
             skipped_count = 0
+            prefetch_today_prices(list(entries), sdk=sdk)
 
             for stock_id, target_price in entries.items():
                 result = evaluate_key_price_condition(
@@ -0,0 +1,55 @@
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+from common.profiler import profile_section
+
+# 每個區塊的耗時（秒）存在 session_state，供畫面顯示與之後分析
+TIMINGS_KEY = "section_timings"
+
+
+def _fragment(fn):
+    """有 st.fragment（Streamlit ≥ 1.37）就包成 fragment：區塊內的按鈕只重跑該區塊"""
+    wrapper = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return wrapper(fn) if wrapper else fn
+
+
+def record_section_cost(key: str, seconds: float) -> None:
+    st.session_state.setdefault(TIMINGS_KEY, {})[key] = seconds
+
+
+def get_section_timings() -> dict:
+    return dict(st.session_state.get(TIMINGS_KEY, {}))
+
+
+@contextmanager
+def timed_section(key: str):
+    """一般（非延遲）區塊也記錄耗時；啟用 common.profiler 時同時記一個區塊"""
+    t0 = time.perf_counter()
+    try:
+        with profile_section(key):
+            yield
+    finally:
+        record_section_cost(key, time.perf_counter() - t0)
+
+
+@_fragment
+def _run_section(key: str, render_fn, args: tuple) -> None:
+    with timed_section(key):
+        render_fn(*args)
+    st.caption(f"⏱️ {st.session_state[TIMINGS_KEY][key]:.2f}s")
+
+
+def render_lazy_section(key: str, title: str, render_fn, *args, default_open: bool = False) -> bool:
+    """
+    延遲載入的圖表區塊：標題下方一個開關，打開後才查詢資料、產生圖表。
+    開關狀態存在 session_state（切換股票時維持），回傳此區塊是否有畫出來。
+    """
+    st.subheader(title)
+    toggle = getattr(st, "toggle", st.checkbox)
+    if not toggle("顯示圖表", value=default_open, key=f"section_open_{key}"):
+        st.session_state.get(TIMINGS_KEY, {}).pop(key, None)
+        return False
+    _run_section(key, render_fn, args)
+    return True
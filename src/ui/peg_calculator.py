@@ -1,5 +1,5 @@
 # src/ui/peg_calculator.py
-import sqlite3
+from common.db_writer import open_reader
 import pandas as pd
 from datetime import datetime
 import streamlit as st
@@ -26,7 +26,7 @@ import streamlit.components.v1 as components
 # --- 取去年 EPS（同 plot_eps_with_close_price 的邏輯） ---
 def _get_last_year_eps(stock_id: str, db_path: str = "data/institution.db"):
     try:
-        conn = sqlite3.connect(db_path)
+        conn = open_reader(db_path)
         df = pd.read_sql_query(
             "SELECT season, eps FROM profitability_ratios WHERE stock_id = ?",
             conn, params=(stock_id,)
@@ -25,6 +25,11 @@ from common.stock_loader import load_stock_list_with_names
 from ui.sr_prev_high_on_heavy import scan_prev_high_on_heavy_from_df  # 或用 scan_prev_high_on_heavy_all
 from common.login_helper import init_session_login_objects
 from common.shared_stock_selector import save_selected_stock, get_last_selected_or_default, load_selected_stock
+from common.profiler import current_render, finish_render, profiled, start_render
+from ui.profiler_panel import profiler_enabled, render_profiler_panel
+
+# 效能分析：帶量前波高掃描也算一個區塊
+scan_prev_high_on_heavy_from_df = profiled("scan.prev_high")(scan_prev_high_on_heavy_from_df)
 # === 盤中取價（直接用 analyze 模組的函式） ===
 try:
     from analyze.analyze_price_break_conditions_dataloader import get_today_prices
@@ -74,6 +79,7 @@ def get_stock_id_by_name(stock_name: str) -> str:
 # -----------------------------
 # 資料載入（DB）
 # -----------------------------
+@profiled("db.daily")
 def load_daily(conn: sqlite3.Connection, stock_id: str, last_n: int = 270) -> pd.DataFrame:
     sql = f"""
         SELECT date, open, high, low, close, volume
@@ -118,6 +124,7 @@ def load_monthly(conn: sqlite3.Connection, stock_id: str, last_n: int = 12) -> p
     return df.sort_values("key").reset_index(drop=True)
 
 
+@profiled("db.c1")
 def get_c1(conn: sqlite3.Connection, stock_id: str) -> float:
     row = pd.read_sql_query(
         "SELECT close FROM twse_prices WHERE stock_id=? ORDER BY date DESC LIMIT 1",
@@ -193,6 +200,7 @@ def _mark_volume_shrinkage(df: pd.DataFrame,
 # -----------------------------
 # 新增：關鍵價位掃描（價格聚集點）
 # -----------------------------
+@profiled("scan.key_levels")
 def scan_key_price_levels(df: pd.DataFrame, c1: float,
                          min_high_count: int = 3,
                          min_low_count: int = 3,
@@ -378,6 +386,7 @@ def _find_price_clusters_simple(prices: list, tolerance_pct: float, min_count: i
 # -----------------------------
 # 新增：均線支撐壓力掃描
 # -----------------------------
+@profiled("scan.ma_sr")
 def scan_ma_sr_from_stock(stock_id: str, today_date: str, c1: float) -> List[Gap]:
     """
     掃描均線支撐壓力，包含：
@@ -530,6 +539,7 @@ def _fmt_key_for_tf(val, timeframe: str) -> str:
 # -----------------------------
 # 缺口掃描（既有）
 # -----------------------------
+@profiled("scan.gaps")
 def scan_gaps_from_df(df: pd.DataFrame, key_col: str, timeframe: str, c1: float) -> List[Gap]:
     out: List[Gap] = []
     if len(df) < 2:
@@ -611,6 +621,7 @@ def enrich_kbar_signals(df: pd.DataFrame,
 # -----------------------------
 # 情況 1：大量 K 棒的 S/R（新版規則）
 # -----------------------------
+@profiled("scan.heavy_sr")
 def scan_heavy_sr_from_df(df: pd.DataFrame, key_col: str, timeframe: str, c1: float,
                           window: int = 20,
                           multiple: float = 1.7,
@@ -705,6 +716,7 @@ def scan_heavy_sr_from_df(df: pd.DataFrame, key_col: str, timeframe: str, c1: fl
 # -----------------------------
 # 畫圖（含成交量）
 # -----------------------------
+@profiled("plotly.make_chart")
 def make_chart(daily: pd.DataFrame, gaps: List[Gap], c1: float,
                show_zones: bool, show_labels: bool,
                include: Dict[str, bool],
@@ -928,6 +940,7 @@ def _safe_float(d: dict, key: str, default=None):
         return default
 
 
+@profiled("pandas.attach_intraday")
 def attach_intraday_to_daily(daily: pd.DataFrame, today: dict) -> pd.DataFrame:
     if daily.empty or not today:
         return daily
@@ -964,6 +977,7 @@ def attach_intraday_to_daily(daily: pd.DataFrame, today: dict) -> pd.DataFrame:
     return df.sort_values("date").reset_index(drop=True)
 
 
+@profiled("pandas.aggregate_weekly")
 def aggregate_weekly_from_daily(daily_with_today: pd.DataFrame, last_n: int = 52) -> pd.DataFrame:
     if daily_with_today.empty:
         return pd.DataFrame(columns=["key", "open", "high", "low", "close", "volume"])
@@ -986,6 +1000,7 @@ def aggregate_weekly_from_daily(daily_with_today: pd.DataFrame, last_n: int = 52
     return wk
 
 
+@profiled("pandas.aggregate_monthly")
 def aggregate_monthly_from_daily(daily_with_today: pd.DataFrame, last_n: int = 12) -> pd.DataFrame:
     if daily_with_today.empty:
         return pd.DataFrame(columns=["key", "open", "high", "low", "close", "volume"])
@@ -1014,7 +1029,7 @@ def main() -> None:
     st.set_page_config(page_title="S/R 撐壓系統 (D/W/M)", layout="wide")
     st.title("📈 either 遠離(上方)壓力 or 帶量突破壓力（被動當沖）(日週月k)")
 
-def main() -> None:
+def _render_page() -> None:
     st.set_page_config(page_title="S/R 撐壓系統 (D/W/M)", layout="wide", initial_sidebar_state="collapsed")
     st.title("📈 either 遠離(上方)壓力 or 帶量突破壓力（被動當沖）(日週月k)")
 
@@ -1122,6 +1137,8 @@ def main() -> None:
 
 
     stock_name = get_stock_name_by_id(stock_id)
+    if current_render() is not None:
+        current_render().meta["stock_id"] = stock_id
 
     from pathlib import Path
 
@@ -1150,7 +1167,7 @@ def main() -> None:
         today_info = None
         if get_today_prices is not None:
             try:
-                today_info = get_today_prices(stock_id, sdk=None)
+                today_info = get_today_prices(stock_id, sdk=sdk)
             except Exception:
                 today_info = None
 
@@ -1939,5 +1956,15 @@ def main() -> None:
         conn.close()
 
 
+def main() -> None:
+    # 效能分析（debug expander 勾選或 DASHBOARD_PROFILE=1 時才記錄）
+    render = start_render("gap_sr", enabled=profiler_enabled())
+    try:
+        _render_page()
+    finally:
+        finish_render(render)
+    render_profiler_panel("gap_sr")
+
+
 if __name__ == "__main__":
     main()
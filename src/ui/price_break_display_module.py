@@ -4,6 +4,8 @@ from analyze.analyze_price_break_conditions_dataloader import (
     get_yesterday_hl, get_week_month_high_low
 )
 from common.db_helpers import fetch_close_history_from_db, fetch_close_history_trading_only_from_db
+from common.db_writer import open_reader
+from common.stock_prefetch import get_stock_cache
 from analyze.price_baseline_checker import check_price_vs_baseline_and_deduction
 from analyze.moving_average_weekly import (
     get_wma5_position_flags_with_today,
@@ -22,7 +24,6 @@ except Exception:  # pragma: no cover
 from analyze.week_month_kbar_tags_helper import get_week_month_tags
 
 
-import sqlite3
 import pandas as pd
 from datetime import datetime
 
@@ -32,6 +33,11 @@ from math import isclose
 from typing import Optional, Dict, Tuple
 from decimal import Decimal, ROUND_HALF_UP
 
+# 純讀 DB 的計算走共用快取（common.stock_prefetch），背景預取算好的結果在這裡直接命中
+_stock_cache = get_stock_cache()
+get_week_month_high_low = _stock_cache.memoize(get_week_month_high_low)
+
+@_stock_cache.memoize
 def get_baseline_and_deduction(stock_id: str, today_date: str, n: int = 5):
     """
     針對 N 日均線，回傳：
@@ -119,6 +125,7 @@ def compute_ma_with_today(stock_id: str, today_date: str, today_close: float, n:
     ma = (today_close + float(tail.sum())) / n
     return ma
 
+@_stock_cache.memoize
 def get_week_month_baseline_and_deduction(stock_id: str, today_date: str, period: str = 'W', n: int = 5):
     """
     計算週K棒或月K棒的 N 均線基準價、扣抵值、前基準
@@ -132,13 +139,12 @@ def get_week_month_baseline_and_deduction(stock_id: str, today_date: str, period
     回傳:
         (baseline, deduction, prev_baseline) 或 (None, None, None)
     """
-    import sqlite3
     from datetime import datetime
     
     if period == 'W':
         # 週K棒：使用 twse_prices_weekly 資料表
         # 直接從資料庫查詢，按時間倒序取得最近的週K資料
-        conn = sqlite3.connect('data/institution.db')
+        conn = open_reader()
         
         # 取得今天的ISO週數（用於判斷是否包含當週）
         today = pd.to_datetime(today_date)
@@ -222,7 +228,7 @@ def get_week_month_baseline_and_deduction(stock_id: str, today_date: str, period
         prev_baseline_y, prev_baseline_m = get_year_month(year, prev_baseline_month)
         
         # 查詢資料庫
-        conn = sqlite3.connect('data/institution.db')
+        conn = open_reader()
         query = """
         SELECT year_month, close
         FROM twse_prices_monthly
@@ -707,7 +713,7 @@ def compute_recent_netbuy_buyday_counts(
     trust_vals = []
 
     try:
-        with sqlite3.connect(db_path) as conn:
+        with open_reader(db_path) as conn:
             try:
                 rows = conn.execute(
                     """
@@ -759,7 +765,7 @@ def _get_latest_trade_day_numbers(
     inst_day: Optional[int] = None
 
     try:
-        with sqlite3.connect(db_path) as conn:
+        with open_reader(db_path) as conn:
             try:
                 row = conn.execute(
                     """
@@ -812,7 +818,7 @@ def compute_recent_netbuy_streaks(stock_id: str, db_path: str = "data/institutio
     trust_vals = []
 
     try:
-        with sqlite3.connect(db_path) as conn:
+        with open_reader(db_path) as conn:
             try:
                 rows = conn.execute(
                     """
@@ -866,7 +872,7 @@ def _load_recent_daily_volumes(db_path: str, stock_id: str, last_n: int = 300) -
         ORDER BY date DESC
         LIMIT {int(last_n)}
     """
-    with sqlite3.connect(db_path) as conn:
+    with open_reader(db_path) as conn:
         df = pd.read_sql_query(sql, conn, params=[stock_id], parse_dates=["date"])
     df = df.dropna(subset=["date", "volume"]).copy()
     df["date"] = pd.to_datetime(df["date"]).dt.normalize()
@@ -1081,7 +1087,6 @@ def get_volume_status(today_info: dict, y_volume_in_shares: Optional[float], sto
     
     # 3. 今昨量無資料：查詢DB最近兩筆
     try:
-        import sqlite3
         sql = """
             SELECT date, volume
             FROM twse_prices
@@ -1089,7 +1094,7 @@ def get_volume_status(today_info: dict, y_volume_in_shares: Optional[float], sto
             ORDER BY date DESC
             LIMIT 2
         """
-        with sqlite3.connect(db_path) as conn:
+        with open_reader(db_path) as conn:
             df = pd.read_sql_query(sql, conn, params=[stock_id])
         
         if len(df) >= 2:
@@ -1274,6 +1279,14 @@ def get_price_change_and_kbar(c1: float, c2: float, o: float) -> str:
     return f" ({change_str}{pct_html} / {kbar_str})"
 
 
+def get_effective_today_date(api_date=None) -> str:
+    """報價日期（quote.date）與本機日曆日取較大者，作為 DB cutoff；背景預取也要用同一個日期才會命中快取"""
+    local_date = datetime.now().strftime("%Y-%m-%d")
+    if isinstance(api_date, str) and len(api_date) >= 10:
+        return max(api_date[:10], local_date)
+    return local_date
+
+
 def display_price_break_analysis(stock_id: str, dl=None, sdk=None):
     try:
         today = get_today_prices(stock_id, sdk)
@@ -1286,12 +1299,7 @@ def display_price_break_analysis(stock_id: str, dl=None, sdk=None):
         # 富邦 API 的 quote.date 有時會落在「上一個交易日」（例如開盤前/某些時段），
         # 若直接用該日期做 DB cutoff (date < today_date)，會把「昨量」誤判成「前天量」。
         # 因此用本機日曆日與 quote.date 取較大者作為 DB cutoff。
-        api_date = today.get("date")
-        local_date = datetime.now().strftime("%Y-%m-%d")
-        if isinstance(api_date, str) and len(api_date) >= 10:
-            effective_today_date = max(api_date[:10], local_date)
-        else:
-            effective_today_date = local_date
+        effective_today_date = get_effective_today_date(today.get("date"))
 
         today_date = effective_today_date
         db_data = get_recent_prices(stock_id, effective_today_date)
@@ -0,0 +1,80 @@
+import os
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from common.profiler import ENV_FLAG, flatten, last_render, section_trend
+
+# 勾選後下一次 rerun 開始記錄（環境變數 DASHBOARD_PROFILE=1 則一律啟用）
+ENABLE_KEY = "profiler_enabled"
+
+
+def profiler_enabled() -> bool:
+    return os.getenv(ENV_FLAG, "0") == "1" or bool(st.session_state.get(ENABLE_KEY, False))
+
+
+def build_flame_figure(rows: list) -> go.Figure:
+    """icicle 式 flame 圖：每一層一列，橫軸為相對 render 開始的毫秒數"""
+    fig = go.Figure(go.Bar(
+        orientation="h",
+        base=[r["start_ms"] for r in rows],
+        x=[max(r["wall_ms"], 0.5) for r in rows],
+        y=[r["depth"] for r in rows],
+        text=[f"{r['name']} {r['wall_ms']:.0f}ms" for r in rows],
+        textposition="inside",
+        insidetextanchor="start",
+        hovertext=[
+            f"{r['path']}<br>wall {r['wall_ms']:.1f}ms / self {r['self_ms']:.1f}ms"
+            f"<br>查詢 {r['queries']} 次 / 讀取 {r['rows']} 筆"
+            for r in rows
+        ],
+        hoverinfo="text",
+        marker=dict(color=[r["self_ms"] for r in rows], colorscale="YlOrRd", line=dict(width=1, color="white")),
+    ))
+    depth = max((r["depth"] for r in rows), default=0)
+    fig.update_layout(
+        height=60 + 34 * (depth + 1),
+        margin=dict(l=10, r=10, t=10, b=30),
+        bargap=0.05,
+        xaxis_title="ms",
+        yaxis=dict(autorange="reversed", showticklabels=False),
+        showlegend=False,
+    )
+    return fig
+
+
+def render_profiler_panel(page: str) -> None:
+    """頁面底部的 debug expander：本次 render 的 flame 圖、區塊明細與最近趨勢"""
+    with st.expander("⏱️ 效能分析 (debug)", expanded=False):
+        st.checkbox("啟用效能分析（記錄各區塊耗時、查詢次數，寫入 data/metrics.db）", key=ENABLE_KEY)
+        render = last_render(page)
+        if render is None:
+            st.caption("尚無紀錄：勾選後重新整理一次頁面。")
+            return
+
+        rows = flatten(render)
+        root = rows[0]
+        st.markdown(
+            f"**{render.started_at}** {render.meta.get('stock_id', '')}　"
+            f"總耗時 **{root['wall_ms']:.0f} ms**，查詢 {root['queries']} 次、讀取 {root['rows']} 筆"
+        )
+        st.plotly_chart(build_flame_figure(rows), use_container_width=True, config={"displayModeBar": False})
+
+        st.dataframe(
+            [
+                {"區塊": r["path"], "wall ms": round(r["wall_ms"], 1), "self ms": round(r["self_ms"], 1),
+                 "查詢": r["queries"], "筆數": r["rows"]}
+                for r in sorted(rows[1:], key=lambda r: r["self_ms"], reverse=True)
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+        trend = section_trend(page)
+        if trend:
+            st.caption("最近 50 次 render（依平均耗時排序）")
+            st.dataframe(
+                [{"區塊": p, "次數": n, "平均 ms": avg, "最大 ms": mx, "平均查詢": q} for p, n, avg, mx, q in trend],
+                use_container_width=True,
+                hide_index=True,
+            )
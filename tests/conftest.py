@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 與 .vscode/settings.json 的 extraPaths 一致：讓測試可以 `from common... / from fetch...`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+from common.analytics_engine import (SqliteExtensionUnavailable, get_engine, latest_moving_average,
+                                     monthly_close_summary, period_returns)
+
+pd = pytest.importorskip("pandas")
+
+
+def _make_db(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE twse_prices (
+                stock_id TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+                PRIMARY KEY (stock_id, date)
+            )
+        """)
+        conn.executemany("INSERT INTO twse_prices VALUES (?, ?, 0, 0, 0, ?, 0)", [
+            ("2330", "2025-07-30", 1100),
+            ("2330", "2025-07-31", 1120),
+            ("2330", "2025-08-01", 1150),
+            ("2330", "2025-08-04", 1160),
+            ("2317", "2025-08-01", 200),
+            ("2317", "2025-08-04", 210),
+            ("2317", "2025-08-05", None),
+        ])
+
+
+def _queries(eng):
+    return (
+        monthly_close_summary(eng),
+        latest_moving_average(eng, window=2),
+        period_returns(eng, "2025-08-01", ["2330", "2317"]),
+    )
+
+
+def test_sqlite_engine_nightly_queries(tmp_path):
+    db = str(tmp_path / "p.db")
+    _make_db(db)
+    with get_engine("sqlite", db) as eng:
+        monthly, ma, ret = _queries(eng)
+
+    assert monthly.values.tolist() == [
+        ["2317", "202508", 205.0, 210.0],
+        ["2330", "202507", 1110.0, 1120.0],
+        ["2330", "202508", 1155.0, 1160.0],
+    ]
+    assert ma.set_index("stock_id")["ma"].to_dict() == {"2317": 205.0, "2330": 1155.0}
+    assert ret.set_index("stock_id")["ret"].round(4).to_dict() == {"2317": 0.05, "2330": 0.0087}
+
+
+def test_unknown_engine(tmp_path):
+    with pytest.raises(ValueError):
+        get_engine("postgres", str(tmp_path / "p.db"))
+
+
+def test_duckdb_matches_sqlite(tmp_path):
+    pytest.importorskip("duckdb")
+    db = str(tmp_path / "p.db")
+    _make_db(db)
+    try:
+        duck = get_engine("duckdb", db)
+    except SqliteExtensionUnavailable as e:
+        pytest.skip(str(e))
+    with get_engine("sqlite", db) as a, duck as b:
+        for left, right in zip(_queries(a), _queries(b)):
+            pd.testing.assert_frame_equal(left, right, check_dtype=False)
@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+from common import columnar_store
+from common.columnar_store import period_to_int
+
+pa = pytest.importorskip("pyarrow")
+
+
+def _make_db(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE twse_prices (
+                stock_id TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+                PRIMARY KEY (stock_id, date)
+            )
+        """)
+        conn.executemany("INSERT INTO twse_prices VALUES (?, ?, ?, ?, ?, ?, ?)", [
+            ("2330", "2024-12-31", 1070, 1080, 1065, 1075.5, 20_000_000),
+            ("2330", "2025-08-14", 1170, 1185, 1165, 1180, 25_000_000),
+            ("2317", "2025-08-14", 200, 203, 199, 201.5, 30_000_000),
+            ("2317", "2025-08-15", 201, 205, 200, 204, 28_000_000),
+        ])
+
+
+def test_period_to_int():
+    assert period_to_int("2025-08-15") == 20250815
+    assert period_to_int("2025-34") == 202534
+    assert period_to_int("2025-08") == 202508
+    assert period_to_int(20250815) == 20250815
+
+
+def test_sync_is_incremental_and_loads_typed_columns(tmp_path):
+    db, root = str(tmp_path / "p.db"), str(tmp_path / "col")
+    _make_db(db)
+
+    assert columnar_store.sync(db, root, ["daily"]) == {"daily": ["2024", "2025"]}
+    assert columnar_store.sync(db, root, ["daily"]) == {"daily": []}
+    assert columnar_store.latest_period("daily", root) == 20250815
+
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO twse_prices VALUES ('2330', '2025-08-15', 1180, 1190, 1175, 1185, 1)")
+    assert columnar_store.sync(db, root, ["daily"]) == {"daily": ["2025"]}
+
+    table = columnar_store.load_table("daily", columns=["stock_id", "date", "close"], start="2025-08-15", root=root)
+    assert table.schema.field("stock_id").type == pa.dictionary(pa.int32(), pa.string())
+    assert table.schema.field("date").type == pa.int32()
+    assert table.schema.field("close").type == pa.float32()
+    assert sorted(zip(table.column("stock_id").to_pylist(), table.column("close").to_pylist())) == [
+        ("2317", 204.0), ("2330", 1185.0),
+    ]
+
+    only = columnar_store.load_table("daily", stock_ids=["2330"], end="2024-12-31", root=root)
+    assert only.num_rows == 1 and only.column("volume").to_pylist() == [20_000_000]
+
+
+def test_sync_detects_edits_to_any_price_column(tmp_path):
+    db, root = str(tmp_path / "p.db"), str(tmp_path / "col")
+    _make_db(db)
+    columnar_store.sync(db, root, ["daily"])
+
+    with sqlite3.connect(db) as conn:     # 筆數、日期、close 都沒變，只更正成交量
+        conn.execute("UPDATE twse_prices SET volume = 21000000 WHERE stock_id = '2330' AND date = '2024-12-31'")
+    assert columnar_store.sync(db, root, ["daily"]) == {"daily": ["2024"]}
+    only = columnar_store.load_table("daily", stock_ids=["2330"], end="2024-12-31", root=root)
+    assert only.column("volume").to_pylist() == [21_000_000]
+
+    with sqlite3.connect(db) as conn:
+        conn.execute("UPDATE twse_prices SET high = 206 WHERE stock_id = '2317' AND date = '2025-08-15'")
+    assert columnar_store.sync(db, root, ["daily"]) == {"daily": ["2025"]}
@@ -0,0 +1,53 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from common.db_helpers import fetch_stock_history_from_db, load_price_frame
+
+pd = pytest.importorskip("pandas")
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "p.db")
+    conn.execute("""
+        CREATE TABLE twse_prices (
+            stock_id TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+            PRIMARY KEY (stock_id, date)
+        )
+    """)
+    conn.executemany("INSERT INTO twse_prices VALUES (?, ?, ?, ?, ?, ?, ?)", [
+        ("2330", "2025-08-14", 1170, 1185, 1165, 1180, 25_000_000),
+        ("2330", "2025-08-15", 1180, 1190, 1175, 1185, None),
+        ("2317", "2025-08-15", 201, 205, 200, 10.55, 28_000_000),
+    ])
+    yield conn
+    conn.close()
+
+
+def test_load_price_frame_compact_dtypes(conn):
+    df = load_price_frame(conn, chunksize=2)
+    assert df["stock_id"].dtype == "category" and list(df["stock_id"].cat.categories) == ["2317", "2330"]
+    assert df["date"].dtype.kind == "M"
+    assert df["close"].dtype == np.float32 and df["volume"].dtype == np.int64
+    assert df["stock_id"].astype(str).tolist() == ["2317", "2330", "2330"]
+    assert df["volume"].tolist() == [28_000_000, 25_000_000, 0]
+
+
+def test_load_price_frame_projection_and_filters(conn):
+    df = load_price_frame(conn, stock_ids=["2330"], columns=["date", "close"], start="2025-08-15")
+    assert list(df.columns) == ["date", "close"]
+    assert df["date"].tolist() == [pd.Timestamp("2025-08-15")] and df["close"].tolist() == [1185.0]
+
+    empty = load_price_frame(conn, stock_ids=["9999"])
+    assert empty.empty and empty["close"].dtype == np.float32
+
+    with pytest.raises(ValueError):
+        load_price_frame(conn, columns=["close; DROP TABLE twse_prices"])
+
+
+def test_fetch_stock_history_keeps_float64_close(conn):
+    df = fetch_stock_history_from_db(conn, "2317")
+    assert list(df.columns) == ["Close", "Volume"] and df.index.name == "date"
+    assert df["Close"].dtype == np.float64 and df["Close"].iloc[0] == 10.55
@@ -0,0 +1,100 @@
+import socket
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from common import db_writer
+from common.db_writer import DBWriter, get_writer, open_reader
+
+INSERT = "INSERT OR IGNORE INTO t (k, v) VALUES (?, ?)"
+
+
+@pytest.fixture
+def writer(tmp_path):
+    w = DBWriter(str(tmp_path / "w.db"), linger=0.05)
+    w.execute("CREATE TABLE t (k TEXT PRIMARY KEY, v INTEGER)")
+    yield w
+    w.close()
+
+
+def test_concurrent_producers_share_group_commits(writer):
+    def produce(n):
+        assert writer.executemany(INSERT, [(f"{n}-{i}", i) for i in range(50)]) == 50
+
+    threads = [threading.Thread(target=produce, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with open_reader(writer.db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 400
+    assert writer.stats["jobs"] == 9
+    assert writer.stats["transactions"] < writer.stats["jobs"]
+
+
+def test_failed_batch_rolls_back_only_itself(writer):
+    ok = writer.submit(INSERT, [("a", 1), ("b", 2)])
+    bad = writer.submit("INSERT INTO t (k, v) VALUES (?, ?)", [("c", 3), ("c", 4)])
+    dup = writer.submit(INSERT, [("a", 9), ("d", 4)])
+    assert ok.result() == 2
+    with pytest.raises(sqlite3.IntegrityError):
+        bad.result()
+    assert dup.result() == 1
+
+    with open_reader(writer.db_path) as conn:
+        assert conn.execute("SELECT k, v FROM t ORDER BY k").fetchall() == [("a", 1), ("b", 2), ("d", 4)]
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM t")  # reader 為 query_only
+
+
+def test_get_writer_uses_server_when_running(monkeypatch, tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    monkeypatch.setenv("DB_WRITER_ADDRESS", f"127.0.0.1:{port}")
+    monkeypatch.setattr("common.local_secret.SECRET_DIR", str(tmp_path))
+    monkeypatch.delenv("DB_WRITER_AUTHKEY", raising=False)
+    db_path = str(tmp_path / "served.db")
+    threading.Thread(target=db_writer.serve, args=(db_path,), daemon=True).start()
+
+    for _ in range(100):
+        remote = db_writer._connect_remote(db_path)
+        if remote is not None:
+            break
+        time.sleep(0.05)
+    assert isinstance(remote, db_writer.RemoteWriter)
+    assert db_writer._connect_remote(str(tmp_path / "other.db")) is None  # 服務的不是同一個 DB
+    key_file = tmp_path / ".db_writer.key"
+    assert oct(key_file.stat().st_mode & 0o777) == "0o600"      # 服務啟動時產生、只有自己讀得到
+    monkeypatch.setenv("DB_WRITER_AUTHKEY", "guessed")
+    assert db_writer._connect_remote(db_path) is None           # 金鑰不符 → 連不上，服務照常
+    monkeypatch.delenv("DB_WRITER_AUTHKEY")
+
+    remote.execute("CREATE TABLE t (k TEXT PRIMARY KEY, v INTEGER)")
+    assert remote.executemany(INSERT, [("x", 1), ("y", 2), ("x", 3)]) == 2
+    with pytest.raises(sqlite3.OperationalError):
+        remote.execute("INSERT INTO missing VALUES (1)")
+    remote.close()
+
+    monkeypatch.setattr(db_writer, "_writers", {})
+    served = get_writer(db_path)
+    assert isinstance(served, db_writer.RemoteWriter)
+    local = get_writer(str(tmp_path / "local.db"))
+    assert isinstance(local, DBWriter)
+
+    served._conn.close()                                    # 服務重啟中 → 重連
+    assert served.executemany(INSERT, [("z", 1)]) == 1
+    assert isinstance(get_writer(db_path), db_writer.RemoteWriter) and get_writer(db_path) is not served
+
+    reconnected = get_writer(db_path)
+    reconnected._conn.close()
+    monkeypatch.setenv("DB_WRITER_ADDRESS", "127.0.0.1:1")   # 服務不在了 → process 內的 DBWriter
+    assert reconnected.executemany(INSERT, [("w", 1), ("z", 2)]) == 1
+    assert isinstance(get_writer(db_path), DBWriter)
+    assert served.execute(INSERT, ("v", 1)) == 1             # 舊的參照也跟著改用新的 writer
+    with open_reader(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 5
+    db_writer.close_all()
@@ -0,0 +1,102 @@
+import json
+from datetime import date
+
+import pytest
+
+from common import finmind_rest_client, response_cache
+from common.finmind_rest_client import FinMindRestClient, FinMindRestError, price_rows_to_db_rows
+from futures_spread.tx_near_month_finmind import get_tx_near_month_with_lookback, pick_near_month
+
+
+class _Resp:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _FakeSession:
+    def __init__(self, responder):
+        self.headers = {}
+        self.calls = []
+        self.responder = responder
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(dict(params))
+        return self.responder(params)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def _isolate(monkeypatch, tmp_path):
+    monkeypatch.setattr(finmind_rest_client, "BACKOFF_BASE", 0)
+    monkeypatch.setattr(response_cache, "CACHE_DIR", tmp_path)
+
+
+def test_range_query_sends_bearer_token_and_one_request():
+    rows = [{"date": "2025-08-14", "open": 1, "max": 2, "min": 0.5, "close": 1.5, "Trading_Volume": 100},
+            {"date": "2025-08-15", "open": 1, "max": 2, "min": 0.5, "close": 0, "Trading_Volume": 0}]
+    session = _FakeSession(lambda p: _Resp({"msg": "success", "status": 200, "data": rows}))
+    client = FinMindRestClient(token="abc", session=session)
+
+    got = client.get("TaiwanStockPrice", "2330", "2025-06-01", "2025-08-15")
+    assert got == rows
+    assert session.headers["Authorization"] == "Bearer abc"
+    assert session.calls == [{"dataset": "TaiwanStockPrice", "data_id": "2330",
+                              "start_date": "2025-06-01", "end_date": "2025-08-15"}]
+    # close = 0（當日無成交）不寫入
+    assert price_rows_to_db_rows("2330", got) == [("2330", "2025-08-14", 1, 2, 0.5, 1.5, 100)]
+
+
+def test_retries_server_errors_but_not_quota_errors():
+    replies = iter([_Resp({}, 503), _Resp({"status": 200, "data": [{"x": 1}]})])
+    client = FinMindRestClient(token="t", session=_FakeSession(lambda p: next(replies)))
+    assert client.get("TaiwanStockPrice", "2330") == [{"x": 1}]
+
+    session = _FakeSession(lambda p: _Resp({"msg": "Requests reach the upper limit", "status": 402}, 402))
+    client = FinMindRestClient(token="t", session=session)
+    with pytest.raises(FinMindRestError) as exc:
+        client.get("TaiwanStockPrice", "2330")
+    assert exc.value.status == 402
+    assert len(session.calls) == 1
+
+
+def test_fetch_many_returns_errors_per_id():
+    def responder(params):
+        if params["data_id"] == "9999":
+            return _Resp({"msg": "bad data_id", "status": 400}, 400)
+        return _Resp({"status": 200, "data": [{"stock_id": params["data_id"]}]})
+
+    client = FinMindRestClient(token="t", session=_FakeSession(responder), max_workers=2)
+    results = client.fetch_many("TaiwanStockPrice", ["2330", "9999", "2317"], "2025-08-01", "2025-08-15")
+    assert list(results) == ["2330", "9999", "2317"]
+    assert results["2330"] == [{"stock_id": "2330"}]
+    assert isinstance(results["9999"], FinMindRestError)
+
+
+TX_ROWS = [
+    {"date": "2025-10-01", "contract_date": "202510", "trading_session": "position", "close": 25800, "settlement_price": 0},
+    {"date": "2025-10-01", "contract_date": "202511", "trading_session": "position", "close": 25850},
+    {"date": "2025-10-01", "contract_date": "202510/202511", "trading_session": "position", "close": 50},
+    {"date": "2025-10-01", "contract_date": "202510", "trading_session": "after_market", "close": 25900},
+    {"date": "2025-09-30", "contract_date": "202510", "trading_session": "position", "close": 25700},
+]
+
+
+def test_pick_near_month_prefers_day_session_front_contract():
+    assert pick_near_month(TX_ROWS, date(2025, 10, 1)) == ("202510", 25800.0)
+    with pytest.raises(RuntimeError):
+        pick_near_month(TX_ROWS, date(2025, 10, 2))
+
+
+def test_lookback_uses_single_range_request():
+    session = _FakeSession(lambda p: _Resp({"status": 200, "data": TX_ROWS}))
+    client = FinMindRestClient(token="t", session=session)
+    # 10/4、10/3、10/2 沒資料 → 回溯到 10/1
+    assert get_tx_near_month_with_lookback(date(2025, 10, 4), client=client) == (date(2025, 10, 1), "202510", 25800.0)
+    assert len(session.calls) == 1
+    assert session.calls[0]["start_date"] == "2025-09-04"
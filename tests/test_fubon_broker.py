@@ -0,0 +1,108 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+from common.fubon_broker import (BrokerAuthError, BrokerClient, BrokerError, BrokerServer, FakeFubonSDK,
+                                 SessionBroker, connect_broker_sdk)
+
+
+@pytest.fixture(autouse=True)
+def _secret_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("common.local_secret.SECRET_DIR", str(tmp_path))
+    monkeypatch.delenv("FUBON_BROKER_AUTHKEY", raising=False)
+
+
+@pytest.fixture
+def served():
+    sdk = FakeFubonSDK(latency=0.2, today=date(2025, 8, 15))
+    broker = SessionBroker(lambda: sdk)
+    server = BrokerServer(broker, "127.0.0.1:0")
+    server.serve_in_thread()
+    yield sdk, broker, server.address
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_quotes_are_coalesced_and_cached(served):
+    sdk, broker, address = served
+    client = BrokerClient(address)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        quotes = list(pool.map(lambda _: client.quote("2330"), range(6)))
+    assert all(q == quotes[0] for q in quotes)
+    assert quotes[0]["date"] == "2025-08-15" and quotes[0]["total"]["tradeVolume"] > 0
+    assert client.quote("2330") == quotes[0]
+
+    assert sdk.calls["quote"] == 1 and sdk.calls["init_realtime"] == 1
+    status = client.status()
+    assert status["upstream"] == 1 and status["coalesced"] + status["cache_hits"] == 6
+    assert status["logins"] == 1
+
+
+def test_broker_sdk_matches_fubon_interface(served, monkeypatch):
+    sdk, broker, address = served
+    monkeypatch.setenv("FUBON_BROKER_ADDR", address)
+
+    remote = connect_broker_sdk()
+    assert remote is not None
+    remote.init_realtime()
+    stock = remote.marketdata.rest_client.stock
+    result = stock.historical.candles(symbol="2330", from_="2025-08-11", to="2025-08-15", timeframe="D")
+    assert [bar["date"] for bar in result["data"]] == [f"2025-08-{d}" for d in (15, 14, 13, 12, 11)]
+    assert stock.intraday.quote(symbol="2330")["closePrice"] == result["data"][0]["close"]
+    remote.logout()                       # 不會登出 broker 的 session
+    assert broker.status()["logged_in"]
+
+    monkeypatch.setenv("FUBON_BROKER", "off")
+    assert connect_broker_sdk() is None
+
+
+def test_errors_are_returned_to_client(served, monkeypatch):
+    monkeypatch.setattr("common.fubon_rest_client.BACKOFF_BASE", 0)
+    sdk, broker, address = served
+    client = BrokerClient(address)
+    with pytest.raises(BrokerError):
+        client.call("candles", symbol="2330", from_="not-a-date", to="2025-08-15")
+    with pytest.raises(BrokerError):
+        client.call("place_order", symbol="2330")
+    with pytest.raises(BrokerError):
+        client.call("quote", ticker="2330")
+    assert client.ping()
+
+
+def test_requests_without_authkey_are_rejected(served, monkeypatch):
+    sdk, broker, address = served
+    intruder = BrokerClient(address, authkey="wrong")
+    with pytest.raises(BrokerAuthError):
+        intruder.quote("2330")
+    with pytest.raises(BrokerAuthError):
+        intruder.shutdown()
+    assert not intruder.ping()
+    assert sdk.calls["quote"] == 0 and broker.status()["logins"] == 0
+
+    monkeypatch.setenv("FUBON_BROKER_AUTHKEY", "wrong")
+    assert connect_broker_sdk(address) is None
+    monkeypatch.delenv("FUBON_BROKER_AUTHKEY")
+    assert BrokerClient(address).ping()                    # 沒被關掉
+
+
+def test_authkey_is_a_per_user_secret(tmp_path):
+    assert not BrokerClient("127.0.0.1:1").ping()          # broker 沒啟動過 → 沒有金鑰，直接當作沒在跑
+
+    server = BrokerServer(SessionBroker(lambda: FakeFubonSDK()), "127.0.0.1:0")
+    try:
+        key_file = tmp_path / ".fubon_broker.key"
+        assert os.stat(key_file).st_mode & 0o777 == 0o600
+        assert server.authkey == key_file.read_text(encoding="utf-8") and len(server.authkey) == 64
+        server.serve_in_thread()
+        assert BrokerClient(server.address).ping()         # 同一個使用者的用戶端讀同一把
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_no_broker_running():
+    assert not BrokerClient("127.0.0.1:1").ping()
+    assert connect_broker_sdk("127.0.0.1:1") is None
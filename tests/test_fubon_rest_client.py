@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import common.fubon_rest_client as frc
+from common.fubon_rest_client import FubonRestClient, TokenBucket
+
+
+class FakeSDK:
+    def __init__(self, responses):
+        self.init_calls = 0
+        self.responses = list(responses)
+        historical = SimpleNamespace(candles=self._candles)
+        self.marketdata = SimpleNamespace(rest_client=SimpleNamespace(stock=SimpleNamespace(historical=historical)))
+
+    def init_realtime(self):
+        self.init_calls += 1
+
+    def _candles(self, **kwargs):
+        return self.responses.pop(0)
+
+
+def test_init_realtime_once_and_backoff_on_rate_limit(monkeypatch):
+    monkeypatch.setattr(frc, "BACKOFF_BASE", 0.001)
+    sdk = FakeSDK([
+        {"statusCode": 429, "message": "Rate limit exceeded"},
+        {"data": [{"date": "2025-08-15", "close": 1180}]},
+        {"data": []},
+    ])
+    client = FubonRestClient(sdk, historical_per_minute=6000)
+
+    assert client.candles("2330", "2025-08-01", "2025-08-15") == [{"date": "2025-08-15", "close": 1180}]
+    assert client.candles("2317", "2025-08-01", "2025-08-15") == []
+    assert sdk.init_calls == 1
+    assert client.stats["requests"] == 3
+    assert client.stats["rate_limited"] == 1
+    assert client.stats["failures"] == []
+
+
+def test_token_bucket_burst_capacity():
+    bucket = TokenBucket(per_minute=60, capacity=3)
+    for _ in range(3):
+        bucket.acquire()  # 突發額度內不等待
+    assert bucket._tokens < 1
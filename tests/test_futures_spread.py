@@ -0,0 +1,100 @@
+from datetime import date, datetime
+
+from common.futures_spread_helper import FuturesSpreadService, expected_trade_date
+from common.trading_calendar import TradingCalendar
+
+# 2025-10-10（五）國慶日休市
+CALENDAR = TradingCalendar(lambda year: frozenset({date(2025, 10, 8), date(2025, 10, 9), date(2025, 10, 13)}))
+
+
+def _spread(day: date, spot_day: date = None) -> dict:
+    return {
+        "trade_date": day.isoformat(), "spot_close": 26000.0, "future_near_month": "202510",
+        "future_price": 26050.0, "spread_pts": 50.0, "spot_date": (spot_day or day).isoformat(),
+    }
+
+
+def test_expected_trade_date_follows_calendar_and_publish_time():
+    assert expected_trade_date(datetime(2025, 10, 9, 10, 0), CALENDAR) == date(2025, 10, 8)
+    assert expected_trade_date(datetime(2025, 10, 9, 16, 0), CALENDAR) == date(2025, 10, 9)
+    assert expected_trade_date(datetime(2025, 10, 12, 16, 0), CALENDAR) == date(2025, 10, 9)  # 連假
+
+
+def test_latest_fetches_once_per_trade_date_and_persists(tmp_path):
+    calls = []
+
+    def fetch(on_day):
+        calls.append(on_day)
+        return _spread(date(2025, 10, 9), spot_day=date(2025, 10, 8) if len(calls) == 1 else None)
+
+    db = str(tmp_path / "spread.db")
+    service = FuturesSpreadService(db, fetch=fetch, calendar=CALENDAR, retry_seconds=0)
+    evening = datetime(2025, 10, 9, 16, 0)
+
+    assert service.latest(evening) is None            # ^TWII 還沒更新 → 不寫入
+    first = service.latest(evening)
+    assert first.trade_date == "2025-10-09" and len(calls) == 2
+    assert service.latest(datetime(2025, 10, 12, 9, 0)) == first   # 休市日：沿用快取
+    assert len(calls) == 2
+
+    reopened = FuturesSpreadService(db, fetch=lambda on_day: 1 / 0, calendar=CALENDAR)
+    assert reopened.latest(evening) == first          # 從歷史表讀回，不需要抓
+    assert [h.trade_date for h in reopened.history()] == ["2025-10-09"]
+
+
+def test_retry_is_throttled_while_source_lags(tmp_path):
+    calls = []
+
+    def fetch(on_day):
+        calls.append(on_day)
+        return _spread(date(2025, 10, 8))
+
+    service = FuturesSpreadService(str(tmp_path / "spread.db"), fetch=fetch, calendar=CALENDAR)
+    for _ in range(3):
+        assert service.latest(datetime(2025, 10, 9, 16, 0)).trade_date == "2025-10-08"
+    assert len(calls) == 1
+
+
+def test_calendar_falls_back_to_weekdays_when_unavailable():
+    cal = TradingCalendar(lambda year: 1 / 0)
+    assert cal.is_trading_day(date(2025, 10, 10))          # 抓不到假日資料時只看星期
+    assert cal.latest_trading_day(date(2025, 10, 12)) == date(2025, 10, 10)
+    assert CALENDAR.previous_trading_day(date(2025, 10, 13)) == date(2025, 10, 9)
+
+
+def test_calendar_refetches_open_year_until_fetched_after_year_end():
+    today = [date(2025, 12, 30)]
+    calls = []
+
+    def fetch(year):
+        calls.append(today[0])
+        return frozenset({date(2025, 12, 30)} if today[0] < date(2026, 1, 1) else {date(2025, 12, 30), date(2025, 12, 31)})
+
+    cal = TradingCalendar(fetch, today=lambda: today[0])
+    assert cal.is_trading_day(date(2025, 12, 30))
+    cal.is_trading_day(date(2025, 12, 29))
+    assert len(calls) == 1                                 # 同一天不重查
+
+    today[0] = date(2026, 1, 2)                            # 跨年後重抓一次才定案
+    assert cal.is_trading_day(date(2025, 12, 31))
+    today[0] = date(2026, 3, 1)
+    cal.is_trading_day(date(2025, 12, 31))
+    assert calls == [date(2025, 12, 30), date(2026, 1, 2)]
+
+
+def test_refresh_skips_write_when_value_is_unchanged(tmp_path):
+    values = iter([50.0, 50.0, 55.0])
+
+    def fetch(on_day):
+        return {**_spread(date(2025, 10, 9)), "spread_pts": next(values)}
+
+    service = FuturesSpreadService(str(tmp_path / "spread.db"), fetch=fetch, calendar=CALENDAR)
+    writes = []
+    execute = service._writer.execute
+    service._writer.execute = lambda sql, *args: writes.append(sql) or execute(sql, *args)
+
+    assert service.refresh().spread_pts == 50.0
+    assert service.refresh().spread_pts == 50.0     # 同一天、同樣的值 → 不寫
+    assert service.refresh().spread_pts == 55.0     # 盤後更正 → 覆蓋
+    assert len(writes) == 2
+    assert service.stored("2025-10-09").spread_pts == 55.0
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from fetch.html_parsers import parse_holder_concentration_html, parse_otc_index_html
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def _read(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def test_parse_holder_concentration_fixture():
+    rows = parse_holder_concentration_html(_read("holder_concentration_2330.html"), "2330")
+    assert rows == [
+        ("2330", "20250815", "14.28", "87.55", "1180.00"),
+        ("2330", "20250808", "14.15", "87.49", "1160.00"),
+    ]
+
+
+def test_parse_holder_concentration_without_table():
+    assert parse_holder_concentration_html("<html><body></body></html>", "2330") == []
+    assert parse_holder_concentration_html("", "2330") == []
+
+
+def test_parse_otc_index_fixture():
+    rows = parse_otc_index_html(_read("tpex_daily_indices_202508.html"))
+    assert rows == [
+        {"stock_id": "^OTCI", "date": "2025-08-14", "volume": 98765432, "close": 263.51},
+        {"stock_id": "^OTCI", "date": "2025-08-15", "volume": 87654321, "close": 265.13},
+    ]
+
+
+def test_fetch_html_falls_back_to_selenium_when_http_page_has_no_data(monkeypatch):
+    from common import http_fetcher
+    from fetch import save_holder_concentration
+
+    blocked = "<html><body>請完成驗證</body></html>"
+    monkeypatch.setattr(http_fetcher, "fetch_html_http", lambda url, encoding=None: blocked)
+    opened = []
+    monkeypatch.setattr(http_fetcher, "fetch_html_selenium",
+                        lambda url, wait_seconds=3.0: opened.append(url) or _read("holder_concentration_2330.html"))
+
+    assert http_fetcher.fetch_html(save_holder_concentration.HOLDER_SOURCE, stock_id="2330") == blocked
+    assert not opened                                   # 沒給 validate → 照舊回傳 HTTP 結果
+
+    rows = save_holder_concentration.fetch_holder_concentration("2330")
+    assert opened == ["https://norway.twsthr.info/StockHolders.aspx?stock=2330"] and len(rows) == 2
@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+from common.job_dag import Job, format_timing_report, run_dag, select_jobs
+
+
+def test_independent_jobs_run_in_parallel_and_pass_inputs():
+    barrier = threading.Barrier(2, timeout=2)
+
+    def source(value):
+        def _f(ctx, inputs):
+            barrier.wait()  # 兩個來源必須同時在跑才會通過
+            return value
+        return _f
+
+    jobs = [
+        Job("a", source(1)),
+        Job("b", source(2)),
+        Job("sum", lambda ctx, inputs: inputs["a"] + inputs["b"], deps=("a", "b")),
+    ]
+    results = run_dag(jobs, max_workers=2, log=lambda msg: None)
+    assert results["sum"].status == "ok"
+    assert results["sum"].value == 3
+    assert results["sum"].started >= max(results["a"].started, results["b"].started)
+
+
+def test_failed_upstream_skips_dependents_only():
+    def boom(ctx, inputs):
+        raise SystemExit(1)
+
+    jobs = [
+        Job("prices", boom),
+        Job("rs", lambda ctx, inputs: "rs", deps=("prices",)),
+        Job("revenue", lambda ctx, inputs: time.sleep(0.01) or "rev"),
+    ]
+    results = run_dag(jobs, log=lambda msg: None)
+    assert results["prices"].status == "failed"
+    assert results["rs"].status == "skipped"
+    assert results["revenue"].status == "ok"
+    assert "skipped" in format_timing_report(results)
+
+
+def test_select_jobs_keeps_upstream_and_rejects_cycles():
+    noop = lambda ctx, inputs: None
+    jobs = [Job("a", noop), Job("b", noop, deps=("a",)), Job("c", noop)]
+    assert [j.name for j in select_jobs(jobs, ["b"])] == ["a", "b"]
+
+    with pytest.raises(ValueError):
+        run_dag([Job("x", noop, deps=("y",)), Job("y", noop, deps=("x",))], log=lambda msg: None)
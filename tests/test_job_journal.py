@@ -0,0 +1,63 @@
+import pytest
+
+from common.job_journal import JobJournal, latency_stats
+
+
+def test_resume_skips_done_and_retries_failed(tmp_path):
+    db = str(tmp_path / "journal.db")
+    items = ["1101", "2330", "2317"]
+
+    journal = JobJournal("wearn_prices", run_key="2025-08:months=13", db_path=db)
+    assert journal.start(items) == items
+    journal.mark_done("1101", 0.5)
+    with pytest.raises(RuntimeError):
+        with journal.track("2330"):
+            raise RuntimeError("timeout")
+    journal.close()  # 模擬中斷：2317 還沒處理、run 沒有 finish
+
+    resumed = JobJournal("wearn_prices", run_key="2025-08:months=13", db_path=db)
+    assert resumed.start(items) == ["2330", "2317"]
+    with resumed.track("2330"):
+        pass
+    resumed.mark_done("2317", 0.2)
+    assert resumed.finish() == {"done": 3}
+    resumed.close()
+
+    # run 已完成 → 同一個 key 會開新的 run
+    fresh = JobJournal("wearn_prices", run_key="2025-08:months=13", db_path=db)
+    assert fresh.start(items) == items
+    assert fresh.run_id != resumed.run_id
+    fresh.close()
+
+
+def test_failed_items_stop_after_max_attempts(tmp_path):
+    db = str(tmp_path / "journal.db")
+    for _ in range(2):
+        journal = JobJournal("fubon_ohlcv", run_key="2025-08-15", db_path=db, max_attempts=2)
+        todo = journal.start(["2330"])
+        for item in todo:
+            journal.mark_failed(item, "抓取失敗", 1.0)
+        assert journal.finish() == {"failed": 1}
+        journal.close()
+
+    journal = JobJournal("fubon_ohlcv", run_key="2025-08-15", db_path=db, max_attempts=2)
+    assert journal.start(["2330"]) == []
+    assert journal.failed_items() == [("2330", 2, "抓取失敗")]
+    journal.close()
+
+
+def test_latency_stats_per_source(tmp_path):
+    db = str(tmp_path / "journal.db")
+    journal = JobJournal("finmind_prices", run_key="2025-08-15", db_path=db)
+    journal.start(["a", "b", "c", "d"])
+    for item, seconds in [("a", 1.0), ("b", 2.0), ("c", 3.0)]:
+        journal.mark_done(item, seconds)
+    journal.mark_failed("d", "No data", 4.0)
+    journal.close()
+
+    [stats] = latency_stats(db, "finmind_prices")
+    assert stats["count"] == 4
+    assert stats["fail_rate"] == pytest.approx(0.25)
+    assert stats["avg"] == pytest.approx(2.5)
+    assert stats["p50"] == pytest.approx(2.5)
+    assert stats["max"] == pytest.approx(4.0)
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from common.job_dag import Job as DagJob
+from common.job_runner import JobRunner, report_progress, warm_resource
+
+
+@pytest.fixture
+def runner():
+    r = JobRunner(max_workers=2)
+    yield r
+    r.shutdown()
+
+
+def test_identical_pending_jobs_are_deduplicated(runner):
+    release = threading.Event()
+    calls = []
+
+    def work(stock_id):
+        calls.append(stock_id)
+        report_progress(0.5, "CMoney")
+        print(f"抓取 {stock_id}")
+        release.wait(2)
+        return stock_id
+
+    first = runner.submit("main_force", work, "2330")
+    assert runner.submit("main_force", work, "2330") is first
+    other = runner.submit("main_force", work, "2317")
+    release.set()
+    assert first.done.wait(2) and other.done.wait(2)
+
+    assert sorted(calls) == ["2317", "2330"]
+    assert (first.status, first.result, first.progress, first.message) == ("done", "2330", 1.0, "CMoney")
+    assert list(first.log) == ["抓取 2330"]
+    assert runner.find("main_force", "2330") is first
+    assert runner.submit("main_force", work, "2330") is not first   # 結束後可再排入
+
+
+def test_failure_is_recorded_and_warm_resource_is_reused():
+    runner = JobRunner(max_workers=1)          # 同一個 worker thread → 建立次數固定
+    created, closed = [], []
+
+    def factory():
+        created.append(object())
+        return created[-1]
+
+    def use(fail):
+        with warm_resource("chrome", factory, close=closed.append) as driver:
+            if fail:
+                raise RuntimeError("page crashed")
+            return driver
+
+    jobs = [runner.submit("scrape", use, i == 1) for i in range(3)]
+    for job in jobs:
+        job.done.wait(2)
+    assert [j.status for j in jobs] == ["done", "failed", "done"]
+    assert "RuntimeError: page crashed" in jobs[1].error
+    assert len(created) == 2 and closed == [created[0]]     # 失敗的那個關掉重建，其餘沿用
+    assert jobs[0].result is created[0] and jobs[2].result is created[1]
+    runner.shutdown()
+    assert set(map(id, closed)) == set(map(id, created))
+
+
+def test_run_setup_reports_progress_from_dag_threads(runner):
+    from tools.run_new_stocks_setup import run_setup
+
+    steps = [
+        DagJob("a", lambda ctx, inputs: print(f"a {ctx['stock_file']}")),
+        DagJob("b", lambda ctx, inputs: "b", deps=("a",)),
+    ]
+    job = runner.submit("setup", lambda f: run_setup(f, jobs=steps), "temp_list.txt")
+    assert job.done.wait(5)
+    assert job.status == "done" and job.progress == 1.0
+    assert {r.status for r in job.result.values()} == {"ok"}
+    assert "a temp_list.txt" in job.log
+
+
+def test_run_script_enforces_hard_timeout(tmp_path, monkeypatch):
+    import time
+
+    from tools import run_new_stocks_setup
+
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "slow.py").write_text("import time\nprint('start', flush=True)\ntime.sleep(30)\n")
+    monkeypatch.setattr(run_new_stocks_setup, "PROJECT_ROOT", tmp_path)
+
+    t0 = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        run_new_stocks_setup._run_script("slow.py", timeout=0.5)
+    assert time.perf_counter() - t0 < 10
@@ -0,0 +1,101 @@
+import inspect
+import sqlite3
+import sys
+import types
+
+import pytest
+
+from common.lazy_import import lazy_function
+from common.stock_prefetch import StockCache
+from tools.bench_import_time import entry_imports, parse_importtime, top_level_packages
+
+
+@pytest.fixture
+def fake_module(monkeypatch):
+    """每次 import 都會被記錄的假模組（放進 sys.meta_path 之前先確認還沒被載入）"""
+    loads = []
+
+    class Finder:
+        def find_spec(self, name, path=None, target=None):
+            if name != "fake_heavy_plot":
+                return None
+            import importlib.machinery
+
+            class Loader:
+                def create_module(self, spec):
+                    return None
+
+                def exec_module(self, module):
+                    loads.append(module.__name__)
+
+                    def plot(stock_id, days=30):
+                        return (stock_id, days)
+                    module.plot = plot
+
+            return importlib.machinery.ModuleSpec(name, Loader())
+
+    monkeypatch.delitem(sys.modules, "fake_heavy_plot", raising=False)
+    monkeypatch.setattr(sys, "meta_path", [Finder(), *sys.meta_path])
+    yield loads
+    sys.modules.pop("fake_heavy_plot", None)
+
+
+def test_lazy_function_imports_on_first_call(fake_module):
+    plot = lazy_function("fake_heavy_plot", "plot")
+    assert fake_module == [] and not plot.loaded
+    assert plot.__module__ == "fake_heavy_plot" and plot.__qualname__ == "plot"
+
+    assert plot("2330", days=5) == ("2330", 5)
+    assert plot("2317") == ("2317", 30)
+    assert fake_module == ["fake_heavy_plot"] and plot.loaded
+    assert list(inspect.signature(plot).parameters) == ["stock_id", "days"]
+
+
+def test_memoize_lazy_function_defers_import_until_call(fake_module, tmp_path):
+    db = str(tmp_path / "s.db")
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    cache = StockCache(db, budget_mb=1.0)
+
+    plot = cache.memoize(lazy_function("fake_heavy_plot", "plot"))
+    assert fake_module == []
+
+    assert plot("2330") == ("2330", 30)
+    assert plot("2330", days=30) == ("2330", 30)   # 關鍵字參數對應到同一個 key
+    assert fake_module == ["fake_heavy_plot"] and cache.stats["hits"] == 1
+
+
+def test_lazy_login_defers_and_caches_failure(monkeypatch):
+    pytest.importorskip("dotenv")
+    from common.login_helper import LazyLogin
+
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise ConnectionError("login failed")
+
+    sdk = LazyLogin(failing, "fubon_sdk")
+    assert calls == [] and not sdk.logged_in
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            sdk.marketdata
+    assert len(calls) == 1       # RETRY_SECONDS 內不重登
+
+    dl = LazyLogin(lambda: types.SimpleNamespace(taiwan_stock_daily=lambda sid: sid), "finmind_dl")
+    assert dl.taiwan_stock_daily("2330") == "2330" and dl.logged_in
+
+
+def test_entry_imports_and_importtime_parsing():
+    source = "﻿import os\nfrom pathlib import Path\n\ndef f():\n    import pandas\n\nfrom . import x\n"
+    assert entry_imports(source) == ["import os", "from pathlib import Path"]
+
+    rows = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     pandas._libs\n"
+        "import time:      3000 |       3120 | pandas\n"
+        "import time:       500 |        500 | streamlit\n"
+        "Traceback (most recent call last):\n"
+    )
+    assert [(r["module"], r["depth"]) for r in rows] == [("pandas._libs", 2), ("pandas", 0), ("streamlit", 0)]
+    assert top_level_packages(rows) == {"pandas": pytest.approx(3.12), "streamlit": pytest.approx(0.5)}
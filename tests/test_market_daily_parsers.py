@@ -0,0 +1,70 @@
+from fetch.fetch_market_daily_prices import parse_tpex_daily_quotes, parse_twse_mi_index
+
+TWSE_FIELDS = [
+    "證券代號", "證券名稱", "成交股數", "成交筆數", "成交金額", "開盤價", "最高價", "最低價",
+    "收盤價", "漲跌(+/-)", "漲跌價差", "最後揭示買價", "最後揭示買量", "最後揭示賣價", "最後揭示賣量", "本益比",
+]
+
+
+def _twse_row(stock_id, volume, o, h, l, c):
+    return [stock_id, "名稱", volume, "1", "1", o, h, l, c, "+", "0", "", "", "", "", ""]
+
+
+def test_parse_twse_mi_index_tables_format():
+    payload = {
+        "stat": "OK",
+        "tables": [
+            {"title": "價格指數", "fields": ["指數", "收盤指數"], "data": [["發行量加權股價指數", "24,000"]]},
+            {
+                "title": "每日收盤行情(全部(不含權證、牛熊證))",
+                "fields": TWSE_FIELDS,
+                "data": [
+                    _twse_row("2330", "30,123,456", "1,175.00", "1,185.00", "1,170.00", "1,180.00"),
+                    _twse_row("9999", "0", "--", "--", "--", "--"),
+                ],
+            },
+        ],
+    }
+    assert parse_twse_mi_index(payload, "2025-08-15") == [
+        ("2330", "2025-08-15", 1175.0, 1185.0, 1170.0, 1180.0, 30123456),
+    ]
+
+
+def test_parse_twse_mi_index_legacy_format_and_closed_day():
+    payload = {"stat": "OK", "fields9": TWSE_FIELDS, "data9": [_twse_row("2317", "1,000", "200", "201", "199", "200.5")]}
+    assert parse_twse_mi_index(payload, "2025-08-15") == [
+        ("2317", "2025-08-15", 200.0, 201.0, 199.0, 200.5, 1000),
+    ]
+    assert parse_twse_mi_index({"stat": "很抱歉，沒有符合條件的資料!"}, "2025-08-16") == []
+
+
+def test_parse_tpex_daily_quotes():
+    payload = {
+        "aaData": [
+            ["6488", "環球晶", "420.00", "+5.00", "416.00", "422.50", "414.00", "1,234,567", "0", "0"],
+            ["8069", "元太", "----", "0", "----", "----", "----", "0", "0", "0"],
+        ]
+    }
+    assert parse_tpex_daily_quotes(payload, "2025-08-15") == [
+        ("6488", "2025-08-15", 416.0, 422.5, 414.0, 420.0, 1234567),
+    ]
+    assert parse_tpex_daily_quotes({"tables": [{"data": []}]}, "2025-08-15") == []
+
+
+def test_upsert_prices_ignore_keeps_existing_rows():
+    import sqlite3
+
+    from fetch.fetch_latest_price_full import init_db, store_prices
+
+    conn = sqlite3.connect(":memory:")
+    init_db(conn)
+    conn.execute("INSERT INTO twse_prices VALUES ('2330', '2025-08-14', 10, 11, 9, 10.5, 999)")
+    rows = [
+        {"date": "2025-08-14", "open": 1, "max": 2, "min": 0.5, "close": 1.5, "Trading_Volume": 100},
+        {"date": "2025-08-15", "open": 3, "max": 4, "min": 2.5, "close": 3.5, "Trading_Volume": 200},
+    ]
+    assert store_prices(conn, "2330", rows) == 1
+    assert conn.execute("SELECT date, close, volume FROM twse_prices ORDER BY date").fetchall() == [
+        ("2025-08-14", 10.5, 999),
+        ("2025-08-15", 3.5, 200),
+    ]
@@ -0,0 +1,66 @@
+import sqlite3
+
+from fetch.fetch_market_institutional import (
+    TPEX_QFII_FIELDS, ensure_table, load_prev_trust_shares, merge_institutional, parse_foreign_holding,
+    parse_tpex_3insti, parse_twse_t86, upsert_institutional,
+)
+
+T86_FIELDS = [
+    "證券代號", "證券名稱", "外陸資買進股數(不含外資自營商)", "外陸資賣出股數(不含外資自營商)",
+    "外陸資買賣超股數(不含外資自營商)", "外資自營商買進股數", "外資自營商賣出股數", "外資自營商買賣超股數",
+    "投信買進股數", "投信賣出股數", "投信買賣超股數", "自營商買賣超股數", "三大法人買賣超股數",
+]
+QFIIS_FIELDS = [
+    "證券代號", "證券名稱", "國際證券編碼", "發行股數", "外資及陸資尚可投資股數", "全體外資及陸資持有股數",
+    "外資及陸資尚可投資比率", "全體外資及陸資持股比率", "外資及陸資共用法令投資上限比率",
+]
+
+
+def test_parse_twse_t86_sums_foreign_dealer_and_converts_to_lots():
+    payload = {"stat": "OK", "fields": T86_FIELDS, "data": [
+        ["2330", "台積電", "0", "0", "5,000,400", "0", "0", "-1,000", "0", "0", "-2,499", "0", "0"],
+    ]}
+    assert parse_twse_t86(payload) == {"2330": (4999, -2)}
+    assert parse_twse_t86({"stat": "很抱歉，沒有符合條件的資料!"}) == {}
+
+
+def test_parse_tpex_3insti_legacy_positions():
+    row = ["6488", "環球晶"] + ["0"] * 8 + ["12,000"] + ["0", "0", "-3,000"] + ["0"] * 10
+    assert parse_tpex_3insti({"aaData": [row]}) == {"6488": (12, -3)}
+
+
+def test_parse_foreign_holding_twse_fields_and_tpex_default_layout():
+    twse = {"stat": "OK", "fields": QFIIS_FIELDS, "data": [
+        ["2330", "台積電", "TW0002330008", "25,930,380,458", "0", "18,500,000,000", "0", "71.34", "100"],
+    ]}
+    assert parse_foreign_holding(twse) == {"2330": (25930380458, 18500000, 71.34)}
+
+    tpex = {"aaData": [["1", "6488", "環球晶", "478,000,000", "0", "120,000,000", "0", "25.10%"]]}
+    assert parse_foreign_holding(tpex, TPEX_QFII_FIELDS) == {"6488": (478000000, 120000, 25.1)}
+
+
+def test_merge_and_upsert_keeps_existing_trust_holding():
+    conn = sqlite3.connect(":memory:")
+    ensure_table(conn)
+    conn.execute(
+        "INSERT INTO institutional_netbuy_holding VALUES ('2330', '2025-08-14', 1, 1, 1, 1.0, 10000, 0.5)"
+    )
+    conn.execute(
+        "INSERT INTO institutional_netbuy_holding VALUES ('2330', '2025-08-15', 1, 1, 1, 1.0, 10200, 0.52)"
+    )
+
+    prev = load_prev_trust_shares(conn, "2025-08-15")
+    assert prev == {"2330": 10000}
+    rows = merge_institutional("2025-08-15", {"2330": (500, 300), "2317": (-20, 0)},
+                               {"2330": (25_930_380_458, 18_500_000, 71.34)}, prev)
+    assert rows == [
+        ("2317", "2025-08-15", -20, 0, None, None, None, None),
+        ("2330", "2025-08-15", 500, 300, 18_500_000, 71.34, 10300, 0.04),
+    ]
+    assert upsert_institutional(conn, rows) == 2
+
+    got = conn.execute(
+        "SELECT foreign_netbuy, trust_netbuy, foreign_shares, trust_shares, trust_ratio "
+        "FROM institutional_netbuy_holding WHERE stock_id = '2330' AND date = '2025-08-15'"
+    ).fetchone()
+    assert got == (500, 300, 18_500_000, 10200, 0.52)  # 既有（cmoney）投信持股不被推估值覆蓋
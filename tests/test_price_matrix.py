@@ -0,0 +1,98 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from analyze.calculate_rs_rsi import _load_close_sqlite, _rs_from_frame, _rs_from_matrix
+
+from common import price_matrix
+from common.price_matrix import PriceMatrix, first_last_valid
+
+
+def _make_db(path, rows):
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS twse_prices (
+                stock_id TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+                PRIMARY KEY (stock_id, date)
+            )
+        """)
+        conn.executemany("INSERT OR REPLACE INTO twse_prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def test_build_then_append_without_rewriting_files(tmp_path):
+    db, root = str(tmp_path / "p.db"), str(tmp_path / "m")
+    _make_db(db, [
+        ("2330", "2025-08-13", 0, 1170, 1160, 1165, 100),
+        ("2330", "2025-08-14", 0, 1185, 1165, 1180, 200),
+        ("2317", "2025-08-14", 0, 203, 199, 201.5, 300),
+        ("2317", "2025-08-13", 0, 0, 0, 0, 0),          # 無收盤價 → NaN
+    ])
+    info = price_matrix.build(db, root, slack=2)
+    assert (info["dates"], info["stocks"]) == (2, 2)
+
+    m = PriceMatrix(root)
+    assert m.stock_ids == ["2317", "2330"]
+    assert m.dates.tolist() == [20250813, 20250814]
+    assert m.field("close").dtype == np.float32 and m.field("volume").dtype == np.int64
+    assert np.isnan(m.series("2317")[0]) and m.series("2317")[1] == np.float32(201.5)
+    assert m.series("2330", "volume").tolist() == [100, 200]
+
+    inode = os.stat(os.path.join(root, "close.npy")).st_ino
+    _make_db(db, [
+        ("2330", "2025-08-14", 0, 1185, 1165, 1181, 200),   # 最近幾天的更正會覆寫
+        ("2330", "2025-08-15", 0, 1190, 1175, 1185, 250),
+        ("6488", "2025-08-15", 0, 301, 298, 300, 50),       # 新上市 → 預留欄位
+    ])
+    info = price_matrix.update(db, root, refresh_days=1)
+    assert info["rebuilt"] is False and info["appended"] == 1 and info["new_stocks"] == ["6488"]
+    assert os.stat(os.path.join(root, "close.npy")).st_ino == inode
+
+    m = PriceMatrix(root)
+    assert m.dates.tolist() == [20250813, 20250814, 20250815]
+    assert m.window("close", start=20250814).shape == (2, 3)
+    assert m.series("2330").tolist() == [1165, 1181, 1185]
+    assert m.series("6488", "volume").tolist() == [0, 0, 50]
+    assert np.load(os.path.join(root, "high.npy"), mmap_mode="r").shape == (3, 4)
+
+    _make_db(db, [("9999", "2025-08-15", 0, 1, 1, 1, 1), ("8888", "2025-08-15", 0, 1, 1, 1, 1)])
+    assert price_matrix.update(db, root, refresh_days=1)["rebuilt"] is True  # 預留欄位用完
+    assert PriceMatrix(root).stock_ids == ["2317", "2330", "6488", "8888", "9999"]
+
+
+def test_first_last_valid():
+    values = np.array([[np.nan, 1.0, np.nan], [2.0, np.nan, np.nan], [3.0, 4.0, np.nan]])
+    first, last = first_last_valid(values)
+    assert first[:2].tolist() == [2.0, 1.0] and last[:2].tolist() == [3.0, 4.0]
+    assert np.isnan(first[2]) and np.isnan(last[2])
+
+
+def _history(stock_id, dates, base):
+    return [(stock_id, d, 0, base + i + 1, base + i - 1, base + i + (i % 3), 100 + i)
+            for i, d in enumerate(dates)]
+
+
+def test_update_picks_up_backfill_and_new_stock_history(tmp_path):
+    db, root = str(tmp_path / "p.db"), str(tmp_path / "m")
+    dates = [d.strftime("%Y-%m-%d") for d in pd.bdate_range("2025-06-02", periods=40)]
+    _make_db(db, _history("2330", dates[:30], 1000) + _history("2317", dates[10:30], 200))
+    price_matrix.build(db, root, slack=4)
+
+    # 2317 補回較早的歷史（早於 refresh 視窗）、新股票 6488 帶著完整歷史進來、接上新交易日
+    _make_db(db, _history("2317", dates[:10], 190) + _history("6488", dates, 300)
+             + _history("2330", dates[30:], 1030) + _history("2317", dates[30:], 230))
+    info = price_matrix.update(db, root, refresh_days=2)
+    assert info["rebuilt"] is False and info["new_stocks"] == ["6488"] and info["refresh_from"] == 20250602
+
+    m = PriceMatrix(root)
+    assert not np.isnan(m.series("2317")).any() and not np.isnan(m.series("6488")).any()
+    assert m.series("6488", "volume").tolist() == list(range(100, 140))
+
+    ids = ["2317", "2330", "6488"]
+    with sqlite3.connect(db) as conn:
+        frame = _rs_from_frame(_load_close_sqlite(conn, "twse_prices", ids), months=1)
+    matrix = _rs_from_matrix(ids, months=1, root=root)
+    for left, right in zip(frame, matrix):
+        pd.testing.assert_frame_equal(left.sort_values("stock_id").reset_index(drop=True),
+                                      right.sort_values("stock_id").reset_index(drop=True), check_dtype=False)
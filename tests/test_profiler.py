@@ -0,0 +1,74 @@
+import sqlite3
+import threading
+
+import pytest
+
+from common import profiler
+from common.profiler import flatten, profile_render, profile_section, profiled, section_trend
+
+
+@pytest.fixture(autouse=True)
+def _restore_connect():
+    yield
+    profiler.uninstall_sqlite_hook()
+
+
+def test_sections_count_queries_and_rows(tmp_path):
+    db, metrics = str(tmp_path / "p.db"), str(tmp_path / "metrics.db")
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(5)])
+
+    @profiled("scan")
+    def scan():
+        conn = sqlite3.connect(db)
+        try:
+            return conn.execute("SELECT x FROM t").fetchall()
+        finally:
+            conn.close()
+
+    with profile_render("page", enabled=True, save=False, stock_id="2330") as render:
+        with profile_section("load"):
+            scan()
+            with profile_section("inner"):
+                conn = sqlite3.connect(db)
+                assert [r for r in conn.execute("SELECT x FROM t WHERE x < 2")] == [(0,), (1,)]
+                conn.close()
+
+    rows = {r["path"]: r for r in flatten(render)}
+    assert list(rows) == ["page", "page/load", "page/load/scan", "page/load/inner"]
+    assert (rows["page/load/scan"]["queries"], rows["page/load/scan"]["rows"]) == (1, 5)
+    assert (rows["page/load"]["queries"], rows["page/load"]["rows"]) == (2, 7)
+    assert rows["page"]["wall_ms"] >= rows["page/load"]["wall_ms"] >= rows["page/load"]["self_ms"]
+
+    profiler.save_render(render, metrics)
+    trend = section_trend("page", db_path=metrics)
+    assert {p for p, *_ in trend} == set(rows) and all(n == 1 for _, n, *_ in trend)
+
+
+def test_disabled_is_noop():
+    with profile_render("page", enabled=False) as render:
+        with profile_section("load") as span:
+            assert span is None
+    assert render is None and sqlite3.connect is profiler._original_connect
+
+
+def test_sqlite_hook_is_removed_after_the_last_render():
+    started, release = threading.Event(), threading.Event()
+
+    def other_session():
+        render = profiler.start_render("b", enabled=True)
+        started.set()
+        release.wait(2)
+        profiler.finish_render(render, save=False)
+
+    worker = threading.Thread(target=other_session)
+    outer = profiler.start_render("a", enabled=True)
+    worker.start()
+    started.wait(2)
+    profiler.finish_render(outer, save=False)
+    assert sqlite3.connect is not profiler._original_connect    # 另一個 thread 的 render 還沒結束
+
+    release.set()
+    worker.join()
+    assert sqlite3.connect is profiler._original_connect
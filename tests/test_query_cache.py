@@ -0,0 +1,61 @@
+import sqlite3
+
+from common.db_writer import DBWriter
+from common.query_cache import QueryCache
+
+
+def _make_db(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE stock_meta (stock_id TEXT PRIMARY KEY, name TEXT)")
+        conn.execute("CREATE TABLE twse_prices (stock_id TEXT, date TEXT, close REAL)")
+        conn.execute("INSERT INTO stock_meta VALUES ('2330', '台積電')")
+
+
+def test_hits_until_another_connection_writes(tmp_path):
+    db = str(tmp_path / "q.db")
+    _make_db(db)
+    cache = QueryCache(db)
+    sql = "SELECT stock_id, name FROM stock_meta ORDER BY stock_id"
+
+    assert cache.fetchall(sql) == [("2330", "台積電")]
+    assert cache.fetchall(sql) == [("2330", "台積電")]
+    assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0}
+
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO stock_meta VALUES ('2317', '鴻海')")
+    assert cache.fetchall(sql) == [("2317", "鴻海"), ("2330", "台積電")]
+    assert cache.stats["misses"] == 2
+    cache.close()
+
+
+def test_lru_bound(tmp_path):
+    db = str(tmp_path / "q.db")
+    _make_db(db)
+    cache = QueryCache(db, maxsize=2)
+    for sid in ("1", "2", "3"):
+        cache.fetchall("SELECT name FROM stock_meta WHERE stock_id = ?", [sid])
+    cache.fetchall("SELECT name FROM stock_meta WHERE stock_id = ?", ["1"])
+    assert cache.stats == {"hits": 0, "misses": 4, "evictions": 2}
+    cache.close()
+
+
+def test_table_versions_keep_results_of_untouched_tables(tmp_path):
+    db = str(tmp_path / "q.db")
+    _make_db(db)
+    writer = DBWriter(db)
+    writer.flush()                                    # 建立 table_versions
+    cache = QueryCache(db, use_table_versions=True)
+    meta_sql, price_sql = "SELECT COUNT(*) FROM stock_meta", "SELECT COUNT(*) FROM twse_prices"
+
+    assert cache.fetchall(meta_sql, tables=["stock_meta"]) == [(1,)]
+    assert cache.fetchall(price_sql, tables=["twse_prices"]) == [(0,)]
+    writer.executemany("INSERT INTO twse_prices VALUES (?, ?, ?)", [("2330", "2025-08-15", 1185)])
+
+    assert cache.fetchall(meta_sql, tables=["stock_meta"]) == [(1,)]     # 沒被寫到 → 沿用
+    assert cache.fetchall(price_sql, tables=["twse_prices"]) == [(1,)]   # 版本號變了 → 重查
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 3
+
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT version FROM table_versions WHERE table_name = 'twse_prices'").fetchone() == (1,)
+    writer.close()
+    cache.close()
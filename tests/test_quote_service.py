@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+from common.fubon_broker import FakeFubonSDK
+from common.quote_service import QuoteService, QuoteUnavailable, snapshot_to_quote
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _service(latency=0.0, **kwargs):
+    sdk = FakeFubonSDK(latency=latency, today=date(2025, 8, 15))
+    clock = Clock()
+    return sdk, clock, QuoteService(sdk, clock=clock, **kwargs)
+
+
+def test_fan_out_dedupes_and_caches():
+    sdk, clock, service = _service()
+    quotes = service.get_many(["2330", "2317", "2330", "2454"])
+    assert list(quotes) == ["2330", "2317", "2454"]
+    assert sdk.calls["quote"] == 3 and sdk.calls["init_realtime"] == 1
+
+    assert service.get("2317") == quotes["2317"]
+    assert sdk.calls["quote"] == 3 and service.stats["cache_hits"] == 1
+
+    clock.now += service.ttl + 1
+    service.get("2317")
+    assert sdk.calls["quote"] == 4
+
+
+def test_concurrent_requests_for_same_symbol_fetch_once():
+    sdk, clock, service = _service(latency=0.2)
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: service.get("2330"), range(5)))
+    assert all(r == results[0] for r in results)
+    assert sdk.calls["quote"] == 1 and service.stats["coalesced"] == 4
+
+
+def test_large_batch_uses_snapshot_and_falls_back_per_symbol():
+    sdk, clock, service = _service(snapshot_min=3)
+    sdk.symbols = {"TSE": ["2330", "2317"], "OTC": ["6488"]}
+    quotes = service.get_many(["2330", "2317", "6488", "9999"])
+
+    assert sdk.calls["snapshot"] == 2 and sdk.calls["quote"] == 1     # 9999 不在快照裡 → 逐檔
+    direct = sdk.marketdata.rest_client.stock.intraday.quote(symbol="2330")
+    for key in ("date", "openPrice", "closePrice", "previousClose", "total"):
+        assert quotes["2330"][key] == direct[key]
+
+
+def test_errors_are_cached_briefly():
+    sdk, clock, service = _service()
+    calls = []
+
+    def failing(symbol, **_):
+        calls.append(symbol)
+        raise ValueError("boom")
+
+    service.client().quote = failing      # 略過 FubonRestClient 的重試 / 退避
+    with pytest.raises(ValueError):
+        service.get("2330")
+    with pytest.raises(ValueError):
+        service.get("2330")
+    assert calls == ["2330"] and service.get_many(["2330"]) == {}
+
+
+def test_snapshot_to_quote_derives_previous_close():
+    q = snapshot_to_quote({"symbol": "2330", "closePrice": 1180.0, "change": -15.0, "tradeVolume": 321}, "2025-08-15")
+    assert q["previousClose"] == 1195.0 and q["date"] == "2025-08-15" and q["total"]["tradeVolume"] == 321
+    assert issubclass(QuoteUnavailable, LookupError)
@@ -0,0 +1,133 @@
+import json
+from datetime import date, datetime
+
+from common.fubon_broker import FakeFubonSDK
+from common.quote_service import QuoteService
+from common.realtime_quotes import TPE, QuoteTable, RealtimeFeed, ReplayWebsocket, load_watchlist
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _aggregate(symbol, close=100.0, volume=500):
+    return {"event": "data", "channel": "aggregates", "data": {
+        "date": "2025-08-15", "symbol": symbol, "name": f"N{symbol}", "previousClose": 98.0,
+        "openPrice": 99.0, "highPrice": 101.0, "lowPrice": 97.5, "closePrice": close,
+        "total": {"tradeVolume": volume}}}
+
+
+def _trade(symbol, price, volume, at="2025-08-15 10:00"):
+    t = int(datetime.strptime(at, "%Y-%m-%d %H:%M").replace(tzinfo=TPE).timestamp() * 1_000_000)
+    return {"event": "data", "channel": "trades",
+            "data": {"symbol": symbol, "price": price, "size": 3, "volume": volume, "time": t}}
+
+
+def _wait_for(predicate, timeout=2.0):
+    import time
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_table_merges_aggregates_and_trades():
+    clock = Clock()
+    table = QuoteTable(clock=clock, stale_seconds=30)
+    table.set_connected(True)
+
+    table.apply(_trade("2330", 100.5, 400))
+    assert table.get("2330") is None                 # 只有成交、還沒有昨收 → 不完整
+
+    table.apply(json.dumps(_aggregate("2330")))
+    table.apply(_trade("2330", 102.0, 520))
+    quote = table.get("2330")
+    assert (quote["closePrice"], quote["highPrice"], quote["lowPrice"]) == (102.0, 102.0, 97.5)
+    assert quote["total"]["tradeVolume"] == 520 and quote["previousClose"] == 98.0
+
+    table.apply(_trade("2330", 103.0, 10, at="2025-08-18 09:01"))     # 換日
+    quote = table.get("2330")
+    assert quote["date"] == "2025-08-18" and quote["previousClose"] == 102.0 and quote["openPrice"] == 103.0
+
+    clock.now += 31                                   # 沒有訊息（含 heartbeat）→ 不再提供
+    assert table.get("2330") is None
+    table.apply({"event": "heartbeat", "data": {}})
+    assert table.get("2330") is not None
+    table.set_connected(False)
+    assert table.get("2330") is None
+
+
+def test_feed_replays_watchlist_and_serves_quote_service(tmp_path):
+    messages = [_aggregate("2330"), _aggregate("2317", close=50.0), _trade("2330", 101.0, 600)]
+    table = QuoteTable()
+    record = tmp_path / "realtime" / "messages.jsonl"
+    ws = ReplayWebsocket(messages)
+    feed = RealtimeFeed(table, lambda: ws, record_to=str(record))
+    feed.start(["2330"])
+    _wait_for(ws.done.is_set)
+
+    assert table.get("2330")["closePrice"] == 101.0
+    assert table.get("2317") is None                 # 沒訂閱的不會進表
+
+    sdk = FakeFubonSDK(today=date(2025, 8, 15))
+    service = QuoteService(sdk, realtime=table)
+    assert service.get("2330")["source"] == "realtime"
+    assert sdk.calls["quote"] == 0
+    assert service.get("2454")["symbol"] == "2454"   # 不在觀察清單 → REST
+    assert sdk.calls["quote"] == 1
+
+    feed.update_watchlist(["2317"])
+    assert table.get("2330") is None                 # 移出觀察清單 → 不再提供凍結的報價
+    assert "2330" not in table.all()
+    recorded = [json.loads(line)["message"] for line in record.read_text(encoding="utf-8").splitlines()]
+    assert any(m["event"] == "unsubscribed" and m["data"] for m in recorded)
+    feed.stop()
+    assert not table.healthy
+
+    replay_table = QuoteTable()                        # 錄下的檔案可以直接重播
+    replay_ws = ReplayWebsocket(path=str(record))
+    replay_feed = RealtimeFeed(replay_table, lambda: replay_ws)
+    replay_feed.start(["2330"])
+    _wait_for(replay_ws.done.is_set)
+    assert replay_table.get("2330")["total"]["tradeVolume"] == 600
+    replay_feed.stop()
+
+
+def test_load_watchlist(tmp_path):
+    (tmp_path / "holdings.txt").write_text("2330\n# 註解\n2317\n", encoding="utf-8")
+    (tmp_path / "key_price.txt").write_text("2454,1200\n2330,1000\n", encoding="utf-8")
+    files = [str(tmp_path / "holdings.txt"), str(tmp_path / "missing.txt"), str(tmp_path / "key_price.txt")]
+    assert load_watchlist(files) == ["2330", "2317", "2454"]
+
+
+def test_feed_only_connects_during_trading_session(monkeypatch):
+    from common import realtime_quotes, trading_calendar
+
+    monkeypatch.setattr(realtime_quotes, "SESSION_CHECK_SECONDS", 0.01)
+    table, connects, session = QuoteTable(), [], {"open": False}
+
+    def factory():
+        connects.append(1)
+        return ReplayWebsocket([_aggregate("2330")])
+
+    feed = RealtimeFeed(table, factory, session=lambda: session["open"])
+    feed.start(["2330"])
+    _wait_for(lambda: not feed.running)
+    assert connects == []                             # 盤外：不連線（也就不會觸發登入）
+
+    session["open"] = True
+    feed.start(["2330"])
+    _wait_for(lambda: table.get("2330") is not None)
+    session["open"] = False                           # 收盤：斷線、thread 結束，不再重連
+    _wait_for(lambda: not feed.running)
+    assert connects == [1] and not table.healthy
+
+    calendar = trading_calendar.TradingCalendar(fetch_year=lambda year: frozenset({date(2025, 8, 15)}))
+    monkeypatch.setattr(trading_calendar, "get_trading_calendar", lambda: calendar)
+    assert realtime_quotes.in_trading_session(datetime(2025, 8, 15, 9, 0, tzinfo=TPE))
+    assert not realtime_quotes.in_trading_session(datetime(2025, 8, 15, 14, 0, tzinfo=TPE))
+    assert not realtime_quotes.in_trading_session(datetime(2025, 8, 14, 9, 0, tzinfo=TPE))
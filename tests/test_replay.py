@@ -0,0 +1,138 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from common import http_fetcher, replay, response_cache
+from common.replay import InjectedFetchError, ReplayMiss, ReplayStore
+
+
+class _FakeHttpResponse:
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode("utf-8")
+        self.encoding = None
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _FakeHttpClient:
+    def __init__(self, responder):
+        self.responder = responder
+        self.calls = 0
+
+    def get(self, url, params=None, headers=None):
+        self.calls += 1
+        return _FakeHttpResponse(self.responder(url, params))
+
+
+@pytest.fixture(autouse=True)
+def _isolate(monkeypatch, tmp_path):
+    monkeypatch.setattr(response_cache, "CACHE_DIR", tmp_path / "http_cache")
+    monkeypatch.setattr(http_fetcher, "get_http_client", lambda verify=True: pytest.fail("不應連線"))
+    yield
+    replay.set_store(None)
+
+
+def _record(monkeypatch, store, responder):
+    client = _FakeHttpClient(responder)
+    monkeypatch.setattr(http_fetcher, "get_http_client", lambda verify=True: client)
+    replay.set_store(store)
+    return client
+
+
+def test_http_record_then_replay_offline(monkeypatch, tmp_path):
+    root = tmp_path / "store"
+    client = _record(monkeypatch, ReplayStore(root, mode="record"),
+                     lambda url, params: {"stat": "OK", "date": params["date"]})
+    assert http_fetcher.fetch_json_http("https://x/MI_INDEX", {"date": "20250815"})["date"] == "20250815"
+    assert client.calls == 1
+
+    monkeypatch.setattr(http_fetcher, "get_http_client", lambda verify=True: pytest.fail("不應連線"))
+    store = ReplayStore(root, mode="replay")
+    replay.set_store(store)
+    assert http_fetcher.fetch_json_http("https://x/MI_INDEX", {"date": "20250815"}) == {"stat": "OK", "date": "20250815"}
+    with pytest.raises(ReplayMiss):
+        http_fetcher.fetch_json_http("https://x/MI_INDEX", {"date": "20250816"}, delay=0)
+    assert store.stats["hits"] == 1 and store.stats["misses"] == 1
+    assert list(store.entries("http")) == [{"url": "https://x/MI_INDEX", "params": {"date": "20250815"}}]
+
+
+def test_injected_errors_go_through_retry(monkeypatch, tmp_path):
+    root = tmp_path / "store"
+    _record(monkeypatch, ReplayStore(root, mode="record"), lambda url, params: {"stat": "OK"})
+    http_fetcher.fetch_json_http("https://x/T86", {"date": "20250815"})
+
+    store = ReplayStore(root, mode="replay", error_rate=1.0, seed=1)
+    replay.set_store(store)
+    with pytest.raises(InjectedFetchError):
+        http_fetcher.fetch_json_http("https://x/T86", {"date": "20250815"}, retries=2, delay=0)
+    assert store.stats["injected_errors"] == 3
+
+
+class _FakeCandles:
+    def candles(self, symbol, from_, to, timeframe="D"):
+        return {"symbol": symbol, "data": [{"date": from_, "close": 1180.0}]}
+
+
+class _FakeSdk:
+    api_usage = 123
+
+    def __init__(self):
+        self.marketdata = SimpleNamespace(rest_client=SimpleNamespace(
+            stock=SimpleNamespace(historical=_FakeCandles())))
+
+    def init_realtime(self):
+        return None
+
+
+def test_sdk_proxy_records_calls_and_plain_attributes(tmp_path):
+    root = tmp_path / "store"
+    recorded = ReplayStore(root, mode="record").wrap(_FakeSdk(), "fubon_sdk")
+    recorded.init_realtime()
+    got = recorded.marketdata.rest_client.stock.historical.candles(symbol="2330", from_="2025-08-15", to="2025-08-15")
+    assert got["data"][0]["close"] == 1180.0
+    assert recorded.api_usage == 123
+
+    offline = ReplayStore(root, mode="replay").wrap(None, "fubon_sdk")
+    assert offline.init_realtime() is None
+    assert offline.marketdata.rest_client.stock.historical.candles(
+        symbol="2330", from_="2025-08-15", to="2025-08-15") == got
+    assert offline.api_usage == 123
+    with pytest.raises(ReplayMiss):
+        offline.marketdata.rest_client.stock.historical.candles(symbol="2317", from_="2025-08-15", to="2025-08-15")
+
+
+def test_bench_market_daily_from_recorded_responses(monkeypatch, tmp_path):
+    from fetch.fetch_market_daily_prices import TWSE_MI_INDEX_URL
+    from tools.bench_fetch_replay import bench
+
+    fields = ["證券代號", "證券名稱", "成交股數", "成交筆數", "成交金額", "開盤價", "最高價", "最低價", "收盤價"]
+
+    def responder(url, params):
+        if url == TWSE_MI_INDEX_URL:
+            return {"stat": "OK", "tables": [{"fields": fields, "data": [
+                ["2330", "台積電", "1,000", "1", "1", "10", "11", "9", "10.5"],
+                ["2317", "鴻海", "2,000", "1", "1", "20", "21", "19", "20.5"],
+            ]}]}
+        return {"aaData": [["6488", "環球晶", "300", "+1", "299", "301", "298", "5,000"]]}
+
+    root = tmp_path / "store"
+    _record(monkeypatch, ReplayStore(root, mode="record"), responder)
+    from datetime import datetime
+    from fetch.fetch_market_daily_prices import fetch_tpex_market_daily, fetch_twse_market_daily
+    for day in ("2025-08-14", "2025-08-15"):
+        fetch_twse_market_daily(datetime.strptime(day, "%Y-%m-%d"))
+        fetch_tpex_market_daily(datetime.strptime(day, "%Y-%m-%d"))
+
+    monkeypatch.setattr(http_fetcher, "get_http_client", lambda verify=True: pytest.fail("不應連線"))
+    store = ReplayStore(root, mode="replay", latency=0.01, seed=0)
+    replay.set_store(store)
+    result = bench("market_daily", store, workers=2)
+    assert result["items"] == 2
+    assert result["errors"] == 0
+    assert result["rows"] == 6
+    assert result["requests"] == 4
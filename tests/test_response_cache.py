@@ -0,0 +1,81 @@
+import os
+import time
+from datetime import date, datetime
+
+from common import http_fetcher, response_cache
+from common.response_cache import FOREVER, OPEN_PERIOD_TTL, day_ttl, month_ttl
+
+
+def test_ttl_closed_periods_are_forever():
+    today = date(2025, 8, 15)
+    assert month_ttl(date(2025, 7, 1), today) == FOREVER
+    assert month_ttl(date(2025, 8, 1), today) == OPEN_PERIOD_TTL
+    assert day_ttl(date(2025, 8, 14), today) == FOREVER
+    assert day_ttl(date(2025, 8, 15), today) == OPEN_PERIOD_TTL
+
+
+def test_put_get_roundtrip_and_expiry(tmp_path):
+    url, params = "https://www.twse.com.tw/exchangeReport/STOCK_DAY", {"date": "20250701", "stockNo": "2330"}
+    assert response_cache.get(url, params, cache_dir=tmp_path) is None
+
+    response_cache.put(url, params, b'{"stat": "OK", "data": [[1]]}', cache_dir=tmp_path)
+    # params 順序不同仍是同一個 key
+    assert response_cache.get(url, {"stockNo": "2330", "date": "20250701"}, cache_dir=tmp_path) == b'{"stat": "OK", "data": [[1]]}'
+
+    [path] = [p for p in tmp_path.rglob("*") if p.is_file()]
+    old = time.time() - 3600
+    os.utime(path, (old, old))
+    assert response_cache.get(url, params, ttl=60, cache_dir=tmp_path) is None
+    assert response_cache.get(url, params, ttl=FOREVER, cache_dir=tmp_path) is not None
+
+
+def test_entry_written_mid_period_is_not_final_after_period_ends(tmp_path):
+    url, params = "https://www.twse.com.tw/exchangeReport/STOCK_DAY", {"date": "20251001", "stockNo": "2330"}
+    response_cache.put(url, params, b'{"partial": true}', cache_dir=tmp_path)
+    [path] = [p for p in tmp_path.rglob("*") if p.is_file()]
+
+    written = datetime(2025, 10, 15, 14, 0).timestamp()        # 10 月還沒結束時寫入
+    os.utime(path, (written, written))
+    ttl = month_ttl(date(2025, 10, 1), today=date(2025, 11, 3))
+    assert ttl == FOREVER
+    assert response_cache.get(url, params, ttl=ttl, cache_dir=tmp_path) is None
+
+    final = datetime(2025, 11, 1, 9, 0).timestamp()             # 月底之後重抓覆寫 → 定案
+    os.utime(path, (final, final))
+    assert response_cache.get(url, params, ttl=ttl, cache_dir=tmp_path) == b'{"partial": true}'
+
+    intraday = datetime(2025, 10, 15, 11, 0).timestamp()        # 盤中寫入的日報，隔天也不能用
+    os.utime(path, (intraday, intraday))
+    assert response_cache.get(url, params, ttl=day_ttl(date(2025, 10, 15), date(2025, 10, 16)),
+                              cache_dir=tmp_path) is None
+
+
+class _FakeResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def json(self):
+        import json
+        return json.loads(self.content)
+
+
+def test_fetch_json_http_uses_cache_and_skips_error_payloads(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, "CACHE_DIR", tmp_path)
+    calls = []
+    payloads = {
+        "20250701": b'{"stat": "OK", "data": [["114/07/01"]]}',
+        "20250705": '{"stat": "很抱歉，沒有符合條件的資料!"}'.encode("utf-8"),
+    }
+
+    def fake_get(url, params, verify, retries, delay, headers=None):
+        calls.append(params["date"])
+        return _FakeResponse(payloads[params["date"]])
+
+    monkeypatch.setattr(http_fetcher, "_get_with_retry", fake_get)
+
+    for _ in range(2):
+        assert http_fetcher.fetch_json_http("u", {"date": "20250701"}, ttl=FOREVER)["data"] == [["114/07/01"]]
+        http_fetcher.fetch_json_http("u", {"date": "20250705"}, ttl=FOREVER)
+    http_fetcher.fetch_json_http("u", {"date": "20250701"})  # ttl=0 不走快取
+
+    assert calls == ["20250701", "20250705", "20250705", "20250701"]
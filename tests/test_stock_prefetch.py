@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from common.stock_prefetch import Prefetcher, StockCache, estimate_size, neighbors
+
+
+def _cache(tmp_path, budget_mb=1.0):
+    db = str(tmp_path / "s.db")
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    return db, StockCache(db, budget_mb=budget_mb)
+
+
+def test_memoize_binds_arguments_and_invalidates_on_write(tmp_path):
+    db, cache = _cache(tmp_path)
+    calls = []
+
+    @cache.memoize
+    def baseline(stock_id, today_date, n=5):
+        calls.append(stock_id)
+        return (stock_id, n)
+
+    assert baseline("2330", "2025-08-15") == ("2330", 5)
+    assert baseline("2330", today_date="2025-08-15", n=5) == ("2330", 5)
+    assert calls == ["2330"] and cache.stats["hits"] == 1
+
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+    baseline("2330", "2025-08-15")
+    assert calls == ["2330", "2330"]
+
+
+def test_budget_evicts_lru(tmp_path):
+    _, cache = _cache(tmp_path, budget_mb=1.0)
+    load = cache.memoize(lambda sid: np.zeros(50_000))        # 400 KB
+    for sid in ("a", "b", "c"):
+        load(sid)
+    assert cache.stats["evictions"] == 1 and cache.nbytes <= cache.budget
+    assert estimate_size({"x": [np.zeros(10), (np.zeros(10),)]}) > 160
+
+
+def test_foreground_waits_for_inflight_prefetch(tmp_path):
+    _, cache = _cache(tmp_path)
+    started, calls = threading.Event(), []
+
+    @cache.memoize
+    def slow(sid):
+        started.set()
+        calls.append(sid)
+        time.sleep(0.2)
+        return sid
+
+    prefetcher = Prefetcher(cache, idle_delay=0)
+    prefetcher.enter_foreground()
+    prefetcher.schedule(["2317"], slow)
+    assert started.wait(2)
+    assert slow("2317") == "2317"                              # 等背景算完，不重算
+    assert calls == ["2317"] and cache.stats["hits"] == 1
+
+
+def test_neighbors():
+    ids = ["1101", "2317", "2330", "2454"]
+    assert neighbors(ids, "2317") == ["2330", "1101"]
+    assert neighbors(ids, "2454") == ["1101", "2330"]
+    assert neighbors(ids, "9999") == [] and neighbors(["2330"], "2330") == []